@@ -46,7 +46,11 @@ def create_app(config_class=Config):
     
     # Audit trail
     from app.audit import register_audit_events
+    from app.audit_writer import init_audit_writer
+    from app.audit_chain import init_audit_chain
     register_audit_events(db)
+    init_audit_chain(app)
+    init_audit_writer(app)
 
     # Register Blueprints
     from app.main import bp as main_bp
@@ -1,21 +1,23 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class AOCalculator:
     """Calculator for Autorisation d'occuper (Permis d'occuper)."""
     
 
     @staticmethod
-    def calculate(valeur: float, taux_enregistrement: float = 10.0, include_cf: bool = False) -> Dict[str, Any]:
+    def calculate(valeur: float, taux_enregistrement: float = 10.0, include_cf: bool = False, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(valeur))
         
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(
             val, 
-            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075')
+            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075', parametres=p)
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         
         # 2. Enregistrement
         enregistrement = val * (Decimal(str(taux_enregistrement)) / Decimal('100'))
@@ -27,8 +29,8 @@ class AOCalculator:
             
         # 4. Debours
         debours = {
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         
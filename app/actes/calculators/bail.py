@@ -1,12 +1,14 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class BailCalculator:
 
 
     @staticmethod
-    def calculate(loyer_mensuel: float = 0, duree_mois: int = 12) -> Dict[str, Any]:
+    def calculate(loyer_mensuel: float = 0, duree_mois: int = 12, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         loyer = Decimal(str(loyer_mensuel))
         duree = Decimal(str(duree_mois))
         base = loyer * duree
@@ -14,9 +16,9 @@ class BailCalculator:
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(
             base, 
-            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075')
+            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075', parametres=p)
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (5%)
@@ -24,8 +26,8 @@ class BailCalculator:
         
         # 3. Debours
         debours = {
-            'publicite': SharedCalculator.frais_publicite(),
-            'divers': SharedCalculator.frais_divers()
+            'publicite': p.frais_publicite,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         
@@ -2,31 +2,37 @@
 Base abstraite commune à tous les calculateurs de barème OHADA.
 
 Les paramètres fiscaux (TVA, Conservation Foncière, droits de mutation, débours)
-sont lus depuis ParametreService qui les charge depuis la base de données.
-Un fallback sur les valeurs par défaut (DEFAULTS) garantit le fonctionnement
-même avant initialisation de la DB.
+sont lus depuis un ParametresSnapshot : valeurs Decimal figées pour une version
+des paramètres, construites une fois par ParametreService.snapshot() et passées
+aux calculateurs par leur argument `parametres`. Un fallback sur les valeurs par
+défaut (DEFAULTS) garantit le fonctionnement même avant initialisation de la DB.
 """
 
 from abc import ABC, abstractmethod
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from app.actes.services.parametres import ParametresSnapshot
 
 
 class BaseCalculator(ABC):
     """
     Contrat commun pour tous les calculateurs de barème notarial OHADA.
 
-    Accès aux paramètres configurables via des méthodes de classe :
-        BaseCalculator.tva_rate()          → Decimal('0.18')
-        BaseCalculator.cf_taux()           → Decimal('0.01')
-        BaseCalculator.mutation_amount(v)  → montant droits de mutation selon valeur
+    Dans un calculateur, les paramètres se lisent sur le snapshot reçu :
+        p = SharedCalculator.parametres(parametres)
+        p.tva_rate                  → Decimal('0.18')
+        p.cf_taux                   → Decimal('0.01')
+        p.mutation_amount(v)        → montant droits de mutation selon valeur
 
+    Les méthodes de classe ci-dessous (tva_rate(), cf_taux(), ...) restent
+    disponibles hors calcul et lisent le snapshot courant.
     Tous ces paramètres sont modifiables via l'interface admin sans redéploiement.
     La constante TVA_RATE est conservée pour la rétrocompatibilité avec SharedCalculator.
     """
 
     # ------------------------------------------------------------------ #
-    #  Accès au service de paramètres                                     #
+    #  Accès aux paramètres                                               #
     # ------------------------------------------------------------------ #
 
     @classmethod
@@ -35,6 +41,11 @@ class BaseCalculator(ABC):
         from app.actes.services.parametres import ParametreService
         return ParametreService
 
+    @classmethod
+    def parametres(cls, parametres: Optional[ParametresSnapshot] = None) -> ParametresSnapshot:
+        """Snapshot fourni par l'appelant, ou à défaut celui de la version courante."""
+        return parametres if parametres is not None else cls._p().snapshot()
+
     # ------------------------------------------------------------------ #
     #  Taux et paramètres fiscaux — appelés comme méthodes                #
     # ------------------------------------------------------------------ #
@@ -42,7 +53,7 @@ class BaseCalculator(ABC):
     @classmethod
     def tva_rate(cls) -> Decimal:
         """Taux TVA (ex: Decimal('0.18') pour 18%)."""
-        return cls._p().get_decimal('taux_tva', Decimal('0.18'))
+        return cls.parametres().tva_rate
 
     # Alias statique pour rétrocompatibilité avec SharedCalculator.TVA_RATE
     TVA_RATE: Decimal = Decimal('0.18')  # Valeur par défaut — surchargée à l'exécution
@@ -50,43 +61,44 @@ class BaseCalculator(ABC):
     @classmethod
     def cf_taux(cls) -> Decimal:
         """Taux proportionnel de Conservation Foncière (ex: Decimal('0.01'))."""
-        return cls._p().get_decimal('taux_cf_proportionnel', Decimal('0.01'))
+        return cls.parametres().cf_taux
 
     @classmethod
     def cf_fixe(cls) -> Decimal:
         """Frais fixes de Conservation Foncière standard (ex: Decimal('6500'))."""
-        return cls._p().get_decimal('frais_cf_fixe_standard', Decimal('6500'))
+        return cls.parametres().cf_fixe
 
     @classmethod
     def cf_fixe_double(cls) -> Decimal:
         """Frais fixes CF pour acte d'échange (2 titres) (ex: Decimal('14000'))."""
-        return cls._p().get_decimal('frais_cf_fixe_double', Decimal('14000'))
+        return cls.parametres().cf_fixe_double
 
     @classmethod
     def frais_expeditions(cls) -> Decimal:
-        return cls._p().get_decimal('frais_expeditions_base', Decimal('50000'))
+        return cls.parametres().frais_expeditions
 
     @classmethod
     def frais_publicite(cls) -> Decimal:
-        return cls._p().get_decimal('frais_publicite_base', Decimal('55000'))
+        return cls.parametres().frais_publicite
 
     @classmethod
     def frais_divers(cls) -> Decimal:
-        return cls._p().get_decimal('frais_divers_base', Decimal('50000'))
+        return cls.parametres().frais_divers
 
     @classmethod
     def frais_morcellement(cls) -> Decimal:
-        return cls._p().get_decimal('frais_morcellement', Decimal('22500'))
+        return cls.parametres().frais_morcellement
         
     @classmethod
-    def seuil_bareme(cls, tranche: int) -> Decimal:
+    def seuil_bareme(cls, tranche: int, parametres: Optional[ParametresSnapshot] = None) -> Decimal:
         """Retourne dynamiquement les montants des tranches (0->20M, ->60M, ->220M...)"""
+        p = cls.parametres(parametres)
         if tranche == 1:
-            return cls._p().get_decimal('seuil_bareme_tranche1', Decimal('20000000'))
+            return p.seuil_bareme_tranche1
         elif tranche == 2:
-            return cls._p().get_decimal('seuil_bareme_tranche2', Decimal('60000000'))
+            return p.seuil_bareme_tranche2
         elif tranche == 3:
-            return cls._p().get_decimal('seuil_bareme_tranche3', Decimal('220000000'))
+            return p.seuil_bareme_tranche3
         return None
 
     # ------------------------------------------------------------------ #
@@ -94,9 +106,9 @@ class BaseCalculator(ABC):
     # ------------------------------------------------------------------ #
 
     @classmethod
-    def apply_tva(cls, amount_ht: Decimal) -> Decimal:
+    def apply_tva(cls, amount_ht: Decimal, parametres: Optional[ParametresSnapshot] = None) -> Decimal:
         """Calcule la TVA à appliquer sur un montant HT."""
-        return amount_ht * cls.tva_rate()
+        return amount_ht * cls.parametres(parametres).tva_rate
 
     @staticmethod
     def roundup_thousand(amount: Decimal) -> Decimal:
@@ -104,34 +116,23 @@ class BaseCalculator(ABC):
         return (amount / 1000).quantize(Decimal('1'), rounding='ROUND_UP') * 1000
 
     @classmethod
-    def mutation_amount(cls, valeur: Decimal) -> Decimal:
+    def mutation_amount(cls, valeur: Decimal, parametres: Optional[ParametresSnapshot] = None) -> Decimal:
         """
         Calcule les droits de mutation selon la valeur du bien.
         Les seuils et montants sont configurables via l'interface admin.
         """
-        p = cls._p()
-        seuil_haut  = p.get_decimal('seuil_mutation_haut',  Decimal('2500000'))
-        seuil_moyen = p.get_decimal('seuil_mutation_moyen', Decimal('1500000'))
-        frais_haut  = p.get_decimal('frais_mutation_haut',  Decimal('20000'))
-        frais_moyen = p.get_decimal('frais_mutation_moyen', Decimal('10000'))
-        frais_bas   = p.get_decimal('frais_mutation_bas',   Decimal('5000'))
-
-        if valeur > seuil_haut:
-            return frais_haut
-        elif valeur > seuil_moyen:
-            return frais_moyen
-        return frais_bas
+        return cls.parametres(parametres).mutation_amount(valeur)
 
     @classmethod
-    def conservation_fonciere(cls, valeur: Decimal, double: bool = False) -> Decimal:
+    def conservation_fonciere(cls, valeur: Decimal, double: bool = False,
+                              parametres: Optional[ParametresSnapshot] = None) -> Decimal:
         """
         Calcule la taxe de Conservation Foncière.
         Args:
             valeur: montant de base (arrondi au millier inférieur automatiquement)
             double: True pour les actes d'échange (2 titres → frais fixes doublés)
         """
-        cf_fixe = cls.cf_fixe_double() if double else cls.cf_fixe()
-        return (valeur // 1000 * 1000) * cls.cf_taux() + cf_fixe
+        return cls.parametres(parametres).conservation_fonciere(valeur, double)
 
     # ------------------------------------------------------------------ #
     #  Contrat obligatoire                                                #
@@ -142,6 +143,7 @@ class BaseCalculator(ABC):
     def calculate(**params) -> Dict[str, Any]:
         """
         Effectue le calcul du barème et retourne un dictionnaire de résultats.
+        Accepte un argument `parametres` (ParametresSnapshot, optionnel).
 
         Le dict retourné DOIT contenir au minimum :
             - ``total_general`` (float) : total arrondi au millier FCFA
@@ -0,0 +1,294 @@
+"""
+Banc d'essai des calculateurs de barèmes (commande `flask bench-baremes`).
+
+Mesure chaque entrée de CALCULATOR_REGISTRY et chaque BaremeModele actif
+(via DynamicCalculatorEngine) sur une distribution de saisies réaliste :
+montants log-uniformes entre 1 et 500 millions FCFA, taux d'enregistrement,
+degrés de parenté et booléens tirés au hasard. Les saisies des calculateurs
+codés passent par leur `params_extractor`, comme un formulaire posté.
+
+Pour chaque calculateur :
+  - latences p50 / p95 / p99 (microsecondes) et appels par seconde ;
+  - mémoire allouée par appel (tracemalloc, passe séparée pour ne pas
+    fausser les temps).
+
+Les barèmes dynamiques sont évalués hors cache de résultats
+(`calculate_uncached`) : sinon l'échauffement et la passe mémoire, qui
+rejouent les premières saisies, ne mesureraient que des succès de cache.
+
+Le résultat est un dict sérialisable en JSON afin de comparer les versions
+entre elles (`comparer`).
+"""
+
+import math
+import platform
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import current_app
+
+from app import db
+
+
+# Valeurs plausibles pour les champs à choix des formulaires de barème
+CHOIX_REALISTES = {
+    'taux_enregistrement': ('1', '2', '5', '10'),
+    'parente': ('1', '2', '3', '4'),
+    'lieu_deces': ('1', '2'),
+    'duree_mois': ('12', '24', '36', '60', '108'),
+}
+
+# Nombre d'appels mesurés sous tracemalloc pour chaque calculateur
+ECHANTILLON_MEMOIRE = 50
+
+
+def _montant(rng: random.Random, mini: float = 1e6, maxi: float = 5e8) -> float:
+    """Montant log-uniforme arrondi au millier (la plupart des actes sont < 50M)."""
+    return round(math.exp(rng.uniform(math.log(mini), math.log(maxi))), -3)
+
+
+def _valeur_formulaire(rng: random.Random, cle: str, defaut: Any) -> Optional[str]:
+    """Valeur de formulaire (str) pour un champ ; None = champ laissé vide."""
+    if isinstance(defaut, bool):
+        return 'on' if rng.random() < 0.5 else None
+    if cle in CHOIX_REALISTES:
+        return rng.choice(CHOIX_REALISTES[cle])
+    if cle == 'annee_acquisition':
+        return str(rng.randint(1990, 2020))
+    if cle == 'annee_vente':
+        return str(rng.randint(2021, 2025))
+    if cle.startswith('nb_'):
+        return str(rng.randint(1, 5))
+    if 'mois' in cle:
+        return str(rng.choice((0, 0, 0, 1, 3, 6, 12)))
+    if defaut:
+        # Champ à valeur par défaut métier (coût d'expédition, etc.) : inchangé
+        return None
+    if 'loyer' in cle:
+        return str(_montant(rng, 50000, 5e6))
+    return str(_montant(rng))
+
+
+def saisies_calculateur(config: Dict[str, Any], n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Génère n jeux de paramètres via le params_extractor du calculateur."""
+    with current_app.test_request_context(method='POST', data={}):
+        defauts = config['params_extractor']()
+
+    saisies = []
+    for _ in range(n):
+        form = {}
+        for cle, defaut in defauts.items():
+            valeur = _valeur_formulaire(rng, cle, defaut)
+            if valeur is not None:
+                form[cle] = valeur
+        with current_app.test_request_context(method='POST', data=form):
+            saisies.append(config['params_extractor']())
+    return saisies
+
+
+def saisies_bareme(bareme, n: int, rng: random.Random) -> List[Dict[str, Any]]:
+    """Génère n jeux de saisies pour un barème dynamique selon le type des variables."""
+    saisies = []
+    for _ in range(n):
+        inputs = {}
+        for v in bareme.variables:
+            if v.type_champ == 'MONTANT':
+                inputs[v.code] = _montant(rng)
+            elif v.type_champ == 'ENTIER':
+                inputs[v.code] = rng.randint(1, 10)
+            elif v.type_champ == 'POURCENTAGE':
+                inputs[v.code] = rng.choice((1, 2, 5, 10, 15, 20))
+            elif v.type_champ == 'CHOIX':
+                inputs[v.code] = rng.choice(v.choix_json or [v.valeur_defaut])
+            elif v.type_champ == 'BOOLEEN':
+                inputs[v.code] = rng.random() < 0.5
+            else:
+                inputs[v.code] = v.valeur_defaut
+        saisies.append(inputs)
+    return saisies
+
+
+def _percentile(valeurs_triees: List[float], p: float) -> float:
+    """Percentile au rang le plus proche."""
+    if not valeurs_triees:
+        return 0.0
+    rang = max(math.ceil(p / 100 * len(valeurs_triees)) - 1, 0)
+    return valeurs_triees[rang]
+
+
+def mesurer(fonction: Callable[[Any], Any], saisies: List[Any], echauffement: int = 10) -> Dict[str, Any]:
+    """
+    Chronomètre `fonction(saisie)` pour chaque saisie.
+
+    Retourne latences (µs), débit, mémoire allouée par appel et nombre
+    d'appels en erreur (les erreurs sont chronométrées comme les autres).
+    """
+    erreurs = 0
+
+    def appel(saisie):
+        nonlocal erreurs
+        try:
+            fonction(saisie)
+        except Exception:
+            erreurs += 1
+
+    for saisie in saisies[:echauffement]:
+        appel(saisie)
+    erreurs = 0
+
+    durees = []
+    debut = time.perf_counter()
+    for saisie in saisies:
+        t0 = time.perf_counter_ns()
+        appel(saisie)
+        durees.append((time.perf_counter_ns() - t0) / 1000)
+    total = time.perf_counter() - debut
+    erreurs_mesurees = erreurs
+
+    # Passe mémoire séparée : tracemalloc ralentit fortement l'exécution
+    pics = []
+    deja_actif = tracemalloc.is_tracing()
+    if not deja_actif:
+        tracemalloc.start()
+    try:
+        for saisie in saisies[:ECHANTILLON_MEMOIRE]:
+            tracemalloc.reset_peak()
+            avant, _ = tracemalloc.get_traced_memory()
+            appel(saisie)
+            _, pic = tracemalloc.get_traced_memory()
+            pics.append(max(pic - avant, 0))
+    finally:
+        if not deja_actif:
+            tracemalloc.stop()
+
+    durees.sort()
+    return {
+        'appels': len(durees),
+        'erreurs': erreurs_mesurees,
+        'p50_us': round(_percentile(durees, 50), 1),
+        'p95_us': round(_percentile(durees, 95), 1),
+        'p99_us': round(_percentile(durees, 99), 1),
+        'max_us': round(durees[-1], 1) if durees else 0.0,
+        'appels_par_seconde': round(len(durees) / total, 1) if total else 0.0,
+        'memoire_moyenne_octets': round(sum(pics) / len(pics)) if pics else 0,
+        'memoire_max_octets': max(pics) if pics else 0,
+    }
+
+
+def run_benchmark(iterations: int = 500, graine: int = 42, filtre: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Mesure tous les calculateurs codés et tous les barèmes dynamiques actifs
+    de la base courante. `filtre` restreint aux slugs/codes le contenant.
+    """
+    from app.actes.calculators.registry import CALCULATOR_REGISTRY
+    from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+    from app.models import BaremeModele
+    from sqlalchemy.orm import selectinload
+
+    rng = random.Random(graine)
+    resultats: Dict[str, Any] = {
+        'meta': {
+            'date': datetime.utcnow().isoformat(timespec='seconds'),
+            'version': current_app.config.get('APP_VERSION'),
+            'python': platform.python_version(),
+            'plateforme': platform.platform(),
+            'iterations': iterations,
+            'graine': graine,
+        },
+        'calculateurs': {},
+        'baremes': {},
+    }
+
+    for slug, config in CALCULATOR_REGISTRY.items():
+        if filtre and filtre.lower() not in slug.lower():
+            continue
+        fonction = config['class'].calculate if config.get('class') else config['calculator_func']
+        saisies = saisies_calculateur(config, iterations, rng)
+        resultats['calculateurs'][slug] = mesurer(lambda params: fonction(**params), saisies)
+
+    baremes = db.session.execute(
+        db.select(BaremeModele).filter_by(is_active=True).order_by(BaremeModele.code)
+        .options(selectinload(BaremeModele.variables))
+    ).scalars().all()
+    for bareme in baremes:
+        if filtre and filtre.lower() not in bareme.code.lower():
+            continue
+        code = bareme.code
+        saisies = saisies_bareme(bareme, iterations, rng)
+        resultats['baremes'][code] = mesurer(
+            lambda inputs: DynamicCalculatorEngine.calculate_uncached(code, inputs), saisies
+        )
+
+    return resultats
+
+
+def comparer(actuel: Dict[str, Any], reference: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Ecarts de p50/p99 (en %) entre deux exécutions, par calculateur commun."""
+    ecarts = []
+    for section in ('calculateurs', 'baremes'):
+        for nom, stats in actuel.get(section, {}).items():
+            avant = reference.get(section, {}).get(nom)
+            if not avant:
+                continue
+            ecarts.append({
+                'nom': nom,
+                'section': section,
+                'p50_pct': round((stats['p50_us'] - avant['p50_us']) / avant['p50_us'] * 100, 1) if avant['p50_us'] else None,
+                'p99_pct': round((stats['p99_us'] - avant['p99_us']) / avant['p99_us'] * 100, 1) if avant['p99_us'] else None,
+            })
+    return ecarts
+
+
+def copier_baremes(baremes: List[Dict[str, Any]]) -> int:
+    """
+    Recopie dans la base courante des barèmes exportés par `exporter_baremes`
+    (remplace les barèmes de même code). Retourne le nombre de barèmes copiés.
+    """
+    from app.models import BaremeModele, BaremeVariable, BaremeLigneCalcul
+    from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+
+    for data in baremes:
+        existant = db.session.execute(db.select(BaremeModele).filter_by(code=data['code'])).scalar_one_or_none()
+        if existant:
+            db.session.delete(existant)
+            db.session.flush()
+        bareme = BaremeModele(code=data['code'], nom=data['nom'], is_active=True)
+        db.session.add(bareme)
+        db.session.flush()
+        db.session.add_all([BaremeVariable(bareme_id=bareme.id, **v) for v in data['variables']])
+        db.session.add_all([BaremeLigneCalcul(bareme_id=bareme.id, **l) for l in data['lignes']])
+    db.session.commit()
+    DynamicCalculatorEngine.invalidate_plan()
+    return len(baremes)
+
+
+def exporter_baremes() -> List[Dict[str, Any]]:
+    """Barèmes dynamiques actifs de la base courante, sous forme de dicts."""
+    from app.models import BaremeModele
+    from sqlalchemy.orm import selectinload
+
+    baremes = db.session.execute(
+        db.select(BaremeModele).filter_by(is_active=True)
+        .options(selectinload(BaremeModele.variables), selectinload(BaremeModele.lignes))
+    ).scalars().all()
+    return [
+        {
+            'code': b.code,
+            'nom': b.nom,
+            'variables': [
+                {'code': v.code, 'label': v.label, 'type_champ': v.type_champ, 'choix_json': v.choix_json,
+                 'valeur_defaut': v.valeur_defaut, 'requis': v.requis, 'ordre': v.ordre}
+                for v in b.variables
+            ],
+            'lignes': [
+                {'ordre': l.ordre, 'code': l.code, 'libelle': l.libelle, 'type_ligne': l.type_ligne,
+                 'condition_affichage': l.condition_affichage, 'formule_ou_montant': l.formule_ou_montant,
+                 'tranches_json': l.tranches_json, 'soumis_tva': l.soumis_tva}
+                for l in b.lignes
+            ],
+        }
+        for b in baremes
+    ]
@@ -0,0 +1,194 @@
+"""
+Moteur de calcul des barèmes à tranches, commun aux calculateurs codés
+(SharedCalculator.calculate_brackets) et au moteur dynamique
+(DynamicCalculatorEngine).
+
+Une table de tranches est précalculée une fois : bornes cumulées et
+montants cumulés au début de chaque tranche. Le montant pour une base
+quelconque s'obtient alors par une recherche dichotomique (bisect) suivie
+d'une seule multiplication :
+
+    i = tranche contenant la base
+    total = cumul[i] + (base - borne[i]) * taux[i]
+"""
+
+from bisect import bisect_left, bisect_right
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.actes.calculators.fixed_point import ECHELLE, division_arrondie, vers_fixe
+
+
+class BracketTable:
+    """
+    Table de tranches précalculée.
+
+    Construite via `depuis_largeurs` (format SharedCalculator : largeur de
+    chaque tranche, taux en fraction) ou `depuis_plafonds` (format JSON des
+    barèmes dynamiques : plafond cumulé, taux en pourcentage).
+    """
+    __slots__ = ('bornes', 'cumuls', 'taux', 'libelles', 'taux_libelles', 'nb_tranches',
+                 'min_premiere_tranche', '_arrays', '_entiers')
+
+    def __init__(self, tranches: List[Tuple[Optional[Decimal], Decimal, str, str]],
+                 min_premiere_tranche: Decimal = Decimal('0')):
+        """
+        Args:
+            tranches: liste de (largeur, taux, libellé, libellé du taux).
+                      Une largeur None signifie « sans plafond » : les tranches
+                      suivantes sont ignorées.
+            min_premiere_tranche: montant minimal appliqué sur la première tranche.
+        """
+        self.bornes: List[Decimal] = []
+        self.cumuls: List[Decimal] = []
+        self.taux: List[Decimal] = []
+        self.libelles: List[str] = []
+        self.taux_libelles: List[str] = []
+        self.min_premiere_tranche = min_premiere_tranche
+
+        borne = Decimal('0')
+        cumul = Decimal('0')
+        largeur = None
+        for largeur, taux, libelle, taux_libelle in tranches:
+            self.bornes.append(borne)
+            self.cumuls.append(cumul)
+            self.taux.append(taux)
+            self.libelles.append(libelle)
+            self.taux_libelles.append(taux_libelle)
+            if largeur is None:
+                break
+            borne += largeur
+            cumul += largeur * taux
+        self.nb_tranches = len(self.bornes)
+
+        # Au-delà de la dernière tranche plafonnée, plus rien n'est dû
+        if largeur is not None:
+            self.bornes.append(borne)
+            self.cumuls.append(cumul)
+            self.taux.append(Decimal('0'))
+        self._arrays = None
+        self._entiers = None
+
+    # ------------------------------------------------------------------ #
+    #  Constructeurs                                                     #
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def depuis_largeurs(cls, brackets: List[Tuple[Any, Decimal, str]],
+                        min_first_tranche: Decimal = Decimal('0')) -> 'BracketTable':
+        """Table au format SharedCalculator, mise en cache par contenu."""
+        return cls._depuis_largeurs_cache(tuple(tuple(b) for b in brackets), min_first_tranche)
+
+    @classmethod
+    @lru_cache(maxsize=128)
+    def _depuis_largeurs_cache(cls, brackets: Tuple, min_first_tranche: Decimal) -> 'BracketTable':
+        return cls(
+            [(None if limit is None else Decimal(str(limit)), Decimal(str(rate)), label, f"{float(rate) * 100}%")
+             for limit, rate, label in brackets],
+            min_premiere_tranche=min_first_tranche
+        )
+
+    @classmethod
+    def depuis_plafonds(cls, tranches: List[Dict[str, Any]]) -> 'BracketTable':
+        """
+        Table au format JSON des barèmes dynamiques :
+        [{"max": 3000000, "taux": 2.25}, ..., {"max": None, "taux": 0.75}]
+        Les tranches sont triées par plafond croissant (sans plafond en dernier).
+        """
+        def tranche_sort_key(t):
+            return t.get('max') if t.get('max') is not None else float('inf')
+
+        lignes = []
+        precedent = Decimal('0')
+        for t in sorted(tranches, key=tranche_sort_key):
+            taux = t.get('taux', 0)
+            if t.get('max') is None:
+                largeur = None
+                libelle = t.get('libelle') or f"Plus de {precedent:,.0f}".replace(',', ' ')
+            else:
+                plafond = Decimal(str(t['max']))
+                largeur = max(plafond - precedent, Decimal('0'))
+                libelle = t.get('libelle') or f"{precedent:,.0f} à {plafond:,.0f}".replace(',', ' ')
+                precedent = max(plafond, precedent)
+            lignes.append((largeur, Decimal(str(taux)) / Decimal('100'), libelle, f"{taux}%"))
+        return cls(lignes)
+
+    # ------------------------------------------------------------------ #
+    #  Calcul                                                            #
+    # ------------------------------------------------------------------ #
+
+    def _premiere_tranche(self, base: Decimal) -> Decimal:
+        if len(self.bornes) > 1:
+            base = min(base, self.bornes[1])
+        return base * self.taux[0]
+
+    def total(self, base: Decimal) -> Decimal:
+        """Montant total dû pour une base : une recherche + une multiplication."""
+        if base <= 0 or not self.nb_tranches:
+            return Decimal('0')
+        i = bisect_right(self.bornes, base) - 1
+        total = self.cumuls[i] + (base - self.bornes[i]) * self.taux[i]
+        if self.min_premiere_tranche:
+            premiere = self._premiere_tranche(base)
+            if premiere < self.min_premiere_tranche:
+                total += self.min_premiere_tranche - premiere
+        return total
+
+    def total_fixe(self, base: int) -> int:
+        """
+        Equivalent de `total` en virgule fixe : base et résultat sont des
+        entiers à l'échelle de fixed_point (aucune conversion Decimal).
+        """
+        if base <= 0 or not self.nb_tranches:
+            return 0
+        if self._entiers is None:
+            self._entiers = (
+                [vers_fixe(b) for b in self.bornes],
+                [vers_fixe(c) for c in self.cumuls],
+                [vers_fixe(t) for t in self.taux],
+                vers_fixe(self.min_premiere_tranche),
+            )
+        bornes, cumuls, taux, minimum = self._entiers
+        i = bisect_right(bornes, base) - 1
+        total = cumuls[i] + division_arrondie((base - bornes[i]) * taux[i], ECHELLE)
+        if minimum:
+            premiere = division_arrondie((min(base, bornes[1]) if len(bornes) > 1 else base) * taux[0], ECHELLE)
+            if premiere < minimum:
+                total += minimum - premiere
+        return total
+
+    def details(self, base: Decimal) -> List[Dict[str, Any]]:
+        """Détail par tranche effectivement atteinte (format attendu par les templates)."""
+        if base <= 0 or not self.nb_tranches:
+            return []
+        details = []
+        for i in range(min(bisect_left(self.bornes, base), self.nb_tranches)):
+            haut = self.bornes[i + 1] if i + 1 < len(self.bornes) else base
+            tranche_base = min(base, haut) - self.bornes[i]
+            amt = tranche_base * self.taux[i]
+            # Appliquer le minimum uniquement sur la première tranche
+            if i == 0 and amt < self.min_premiere_tranche:
+                amt = self.min_premiere_tranche
+            details.append({
+                'tranche': self.libelles[i],
+                'taux': self.taux_libelles[i],
+                'base': float(tranche_base),
+                'montant': float(amt)
+            })
+        return details
+
+    def calculate(self, base: Decimal) -> Tuple[Decimal, List[Dict[str, Any]]]:
+        """(total, détails) — même contrat que SharedCalculator.calculate_brackets."""
+        return self.total(base), self.details(base)
+
+    def arrays(self):
+        """Bornes, cumuls et taux sous forme de tableaux NumPy (évaluation vectorisée)."""
+        if self._arrays is None:
+            import numpy as np
+            self._arrays = (
+                np.array([float(b) for b in self.bornes]),
+                np.array([float(c) for c in self.cumuls]),
+                np.array([float(t) for t in self.taux]),
+            )
+        return self._arrays
@@ -1,20 +1,22 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class CessionPartsCalculator:
 
 
     @staticmethod
-    def calculate(prix: float = 0) -> Dict[str, Any]:
+    def calculate(prix: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val_prix = Decimal(str(prix))
         
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(
             val_prix, 
-            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075')
+            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075', parametres=p)
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (1%)
@@ -23,8 +25,8 @@ class CessionPartsCalculator:
         # 3. Debours
         debours = {
             'greffe': Decimal('12000'),
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         
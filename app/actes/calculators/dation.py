@@ -1,39 +1,41 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class DationCalculator:
     @staticmethod
-    def calculate(prix: float = 0, taux_enregistrement: int = 10, morcellement: bool = True, plus_value: bool = False) -> Dict[str, Any]:
+    def calculate(prix: float = 0, taux_enregistrement: int = 10, morcellement: bool = True, plus_value: bool = False, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val_prix = Decimal(str(prix))
         
         # 1. Honoraires
         if plus_value:
-            brackets = SharedCalculator.get_standard_brackets('0.0225', '0.015', '0.0075', '0.00375')
+            brackets = SharedCalculator.get_standard_brackets('0.0225', '0.015', '0.0075', '0.00375', parametres=p)
         else:
-            brackets = SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075')
+            brackets = SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075', parametres=p)
             
         honoraires_ht, details = SharedCalculator.calculate_brackets(val_prix, brackets)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement
         enregistrement = val_prix * (Decimal(str(taux_enregistrement)) / Decimal('100'))
         
         # 3. Conservation Fonciere
-        cf = SharedCalculator.conservation_fonciere(val_prix)
+        cf = p.conservation_fonciere(val_prix)
         
         # 4. Morcellement
         frais_morcellement = Decimal('20000') if morcellement else Decimal('0')
         
         # 5. Droits sur Mutation
-        mutation = SharedCalculator.mutation_amount(val_prix)
+        mutation = p.mutation_amount(val_prix)
             
         # 6. Debours
         debours = {
             'mutation': mutation,
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values()) + frais_morcellement
         
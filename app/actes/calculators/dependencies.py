@@ -0,0 +1,127 @@
+"""
+Graphe de dépendances entre les lignes d'un barème dynamique.
+
+Chaque ligne dépend des noms utilisés dans sa condition et sa formule :
+variables saisies (codes en majuscules, ex. PRIX_VENTE) ou résultats des
+lignes précédentes (codes en minuscules, ex. honoraires_normal). Le graphe
+sert à refuser à l'enregistrement les références en avant et les cycles ;
+les noms utilisés par chaque ligne (noms_utilises, compilés dans le plan)
+permettent à DynamicCalculatorEngine.calculate_incremental de ne réévaluer
+que les lignes touchées par une saisie modifiée.
+"""
+
+import ast
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import simpleeval
+
+
+def noms_utilises(expr: Optional[str], parsed=None) -> FrozenSet[str]:
+    """Noms (variables, lignes, fonctions) référencés par une expression."""
+    if parsed is None:
+        if not expr or expr.strip() == '':
+            return frozenset()
+        try:
+            parsed = simpleeval.SimpleEval.parse(expr)
+        except Exception:
+            return frozenset()
+    return frozenset(n.id for n in ast.walk(parsed) if isinstance(n, ast.Name))
+
+
+class GrapheDependances:
+    """
+    Dépendances des lignes d'un barème, dans leur ordre d'exécution.
+
+    Args:
+        codes_variables: codes des variables saisies.
+        lignes: liste ordonnée de (code, noms utilisés par la condition et la formule).
+    """
+
+    def __init__(self, codes_variables: Iterable[str], lignes: List[Tuple[str, FrozenSet[str]]]):
+        self.variables = frozenset(c.upper() for c in codes_variables)
+        self.ordre = [code.lower() for code, _ in lignes]
+        position = {nom: i for i, nom in enumerate(self.ordre)}
+
+        # Pour chaque ligne : variables et lignes dont elle dépend
+        self.dependances: Dict[str, FrozenSet[str]] = {}
+        for code, noms in lignes:
+            self.dependances[code.lower()] = frozenset(
+                n for n in noms if n in self.variables or n in position or n == 'TVA_RATE'
+            )
+        self._position = position
+
+    @classmethod
+    def depuis_lignes(cls, codes_variables: Iterable[str], lignes) -> 'GrapheDependances':
+        """
+        Construit le graphe à partir d'objets ou de dicts exposant `code`,
+        `condition_affichage` et `formule_ou_montant`, déjà triés par ordre.
+        """
+        def champ(l, nom):
+            return l.get(nom) if isinstance(l, dict) else getattr(l, nom)
+
+        return cls(codes_variables, [
+            ((champ(l, 'code') or ''),
+             noms_utilises(champ(l, 'condition_affichage')) | noms_utilises(champ(l, 'formule_ou_montant')))
+            for l in lignes
+        ])
+
+    def impactees(self, noms_modifies: Iterable[str]) -> List[str]:
+        """
+        Lignes (dans l'ordre d'exécution) potentiellement affectées par la
+        modification des noms donnés, par propagation le long du graphe.
+        """
+        sales = set(noms_modifies)
+        resultat = []
+        for nom in self.ordre:
+            if self.dependances[nom] & sales:
+                sales.add(nom)
+                resultat.append(nom)
+        return resultat
+
+    def references_en_avant(self) -> List[Tuple[str, str]]:
+        """Couples (ligne, ligne référencée) où la référence n'est pas encore calculée."""
+        erreurs = []
+        for i, nom in enumerate(self.ordre):
+            for dep in sorted(self.dependances[nom]):
+                if dep in self._position and self._position[dep] >= i:
+                    erreurs.append((nom, dep))
+        return erreurs
+
+    def cycles(self) -> List[List[str]]:
+        """Cycles entre lignes, indépendamment de leur ordre (parcours en profondeur)."""
+        BLANC, GRIS, NOIR = 0, 1, 2
+        couleur = {nom: BLANC for nom in self.ordre}
+        pile: List[str] = []
+        cycles = []
+
+        def visiter(nom):
+            couleur[nom] = GRIS
+            pile.append(nom)
+            for dep in sorted(self.dependances[nom]):
+                if dep not in couleur:
+                    continue
+                if couleur[dep] == GRIS:
+                    cycles.append(pile[pile.index(dep):] + [dep])
+                elif couleur[dep] == BLANC:
+                    visiter(dep)
+            pile.pop()
+            couleur[nom] = NOIR
+
+        for nom in self.ordre:
+            if couleur[nom] == BLANC:
+                visiter(nom)
+        return cycles
+
+    def erreurs(self) -> List[str]:
+        """Messages d'erreur destinés à l'administrateur du barème."""
+        messages = [
+            "Cycle de dépendances : " + " → ".join(c.upper() for c in cycle)
+            for cycle in self.cycles()
+        ]
+        # Une ligne qui se référence elle-même est déjà signalée comme cycle
+        messages += [
+            f"La ligne {nom.upper()} utilise {dep.upper()}, qui n'est calculée qu'après elle."
+            for nom, dep in self.references_en_avant()
+            if nom != dep
+        ]
+        return messages
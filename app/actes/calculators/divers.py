@@ -1,7 +1,8 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from datetime import datetime
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class DiversCalculator:
     # 1. Location Gérance
@@ -13,12 +14,13 @@ class DiversCalculator:
     ]
 
     @staticmethod
-    def calculate_location_gerance(loyer_mensuel: float, duree_mois: int) -> Dict[str, Any]:
+    def calculate_location_gerance(loyer_mensuel: float, duree_mois: int, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         total_loyer = Decimal(str(loyer_mensuel)) * Decimal(str(duree_mois))
         
         # Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(total_loyer, DiversCalculator.LG_BRACKETS)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         
         # Enregistrement (2% as per BAIL 1 usually, but let's check dump... wait, LG often has specific rates)
         # Based on Bail logic usually 2%
@@ -26,8 +28,8 @@ class DiversCalculator:
         
         # Debours
         debours = {
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         
@@ -52,12 +54,13 @@ class DiversCalculator:
     ]
 
     @staticmethod
-    def calculate_copropriete(valeur_immeuble: float, nb_titres: int = 1) -> Dict[str, Any]:
+    def calculate_copropriete(valeur_immeuble: float, nb_titres: int = 1, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(valeur_immeuble))
         
         # Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(val, DiversCalculator.RCP_BRACKETS, min_first_tranche=Decimal('1500000'))
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         
         # Enregistrement (Fixed 5000 usually)
         enregistrement = Decimal('5000')
@@ -70,8 +73,8 @@ class DiversCalculator:
         
         # Debours
         debours = {
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values()) + frais_titres
         
@@ -98,10 +101,11 @@ class DiversCalculator:
     ]
 
     @staticmethod
-    def calculate_mandat_sequestre(montant: float) -> Dict[str, Any]:
+    def calculate_mandat_sequestre(montant: float, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(montant))
         honoraires_ht, details = SharedCalculator.calculate_brackets(val, DiversCalculator.MS_BRACKETS)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         divers = Decimal('10000')
         
         total_general = SharedCalculator.roundup_thousand(honoraires_ht + tva + divers)
@@ -117,10 +121,11 @@ class DiversCalculator:
 
     # 4. Acte de Dépôt
     @staticmethod
-    def calculate_acte_depot(nb_annexes: int = 1, penalites_mois: int = 0) -> Dict[str, Any]:
+    def calculate_acte_depot(nb_annexes: int = 1, penalites_mois: int = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         # Fixed fees usually
         honoraires_ht = Decimal('20000')
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         
         enregistrement = Decimal('5000')
         frais_annexes = Decimal(str(nb_annexes)) * Decimal('2000') # Estimated from dump logic (8000 for 12, wait... 2000*D40... wait R31 says 12.0 | 8000.0)
@@ -131,8 +136,8 @@ class DiversCalculator:
         greffe = Decimal('12000')
         
         debours = {
-            'publicite': SharedCalculator.frais_publicite(),
-            'expeditions': SharedCalculator.frais_expeditions()
+            'publicite': p.frais_publicite,
+            'expeditions': p.frais_expeditions
         }
         total_debours = sum(debours.values()) + greffe + frais_annexes + penalites
         
@@ -158,12 +163,13 @@ class DiversCalculator:
     ]
 
     @staticmethod
-    def calculate_cession_creances(montant: float) -> Dict[str, Any]:
+    def calculate_cession_creances(montant: float, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(montant))
         
         # Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(val, DiversCalculator.CC_BRACKETS)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         
         # Enregistrement (1%)
         enregistrement = val * Decimal('0.01')
@@ -175,8 +181,8 @@ class DiversCalculator:
         mutation = Decimal('20000') if val > 2500000 else Decimal('0')
         
         debours = {
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers(),
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers,
             'mutation': mutation
         }
         total_debours = sum(debours.values())
@@ -196,12 +202,13 @@ class DiversCalculator:
 
     # 6. Nantissement
     @staticmethod
-    def calculate_nantissement(montant: float) -> Dict[str, Any]:
+    def calculate_nantissement(montant: float, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(montant))
         
         # Honoraires (Same as CC/Mortgage)
         honoraires_ht, details = SharedCalculator.calculate_brackets(val, DiversCalculator.CC_BRACKETS)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         
         # Enregistrement (Fixed 5000)
         enregistrement = Decimal('5000')
@@ -216,8 +223,8 @@ class DiversCalculator:
             
         # Debours
         debours = {
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values()) + greffe
         
@@ -1,6 +1,7 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class DonationCalculator:
     # ... (unchanged code for DonationCalculator, keeping it here for context if reusing same file, 
@@ -9,22 +10,23 @@ class DonationCalculator:
 
 
     @staticmethod
-    def calculate(valeur: float = 0, parente: int = 1) -> Dict[str, Any]:
+    def calculate(valeur: float = 0, parente: int = 1, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(valeur))
         honoraires_ht, details = SharedCalculator.calculate_brackets(
             val, 
-            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075')
+            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075', parametres=p)
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         rate = Decimal('0.03') if parente == 1 else Decimal('0.10')
         enregistrement = (val * Decimal('0.5')) * rate
-        cf = SharedCalculator.conservation_fonciere(val)
-        mutation = SharedCalculator.mutation_amount(val)
+        cf = p.conservation_fonciere(val)
+        mutation = p.mutation_amount(val)
         debours = {
             'mutation': mutation,
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         subtotal = total_honoraires + enregistrement + cf + total_debours
@@ -58,8 +60,10 @@ class PartageCalculator:
     def calculate(actif_brut: float = 0, passif: float = 0, soulte: float = 0,
                  avec_morcellement: bool = False, nb_parcelles: int = 1, cout_par_parcelle: float = 20000,
                  avec_cf: bool = False, valeur_immeuble_cf: float = 0,
-                 cout_expeditions: float = 0, cout_divers: float = 0) -> Dict[str, Any]:
+                 cout_expeditions: float = 0, cout_divers: float = 0,
+                 parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
         
+        p = SharedCalculator.parametres(parametres)
         val_actif = Decimal(str(actif_brut))
         val_passif = Decimal(str(passif))
         val_soulte = Decimal(str(soulte))
@@ -74,7 +78,7 @@ class PartageCalculator:
             val_actif_net, 
             PartageCalculator.get_partage_brackets()
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 3. Enregistrement
@@ -87,7 +91,7 @@ class PartageCalculator:
         val_base_cf = Decimal(str(valeur_immeuble_cf)) if valeur_immeuble_cf > 0 else val_actif_net
         
         if avec_cf:
-            cf = SharedCalculator.conservation_fonciere(val_base_cf)
+            cf = p.conservation_fonciere(val_base_cf)
         
         # 5. Morcellement (Débours cadastre / géomètre)
         cout_morcellement = Decimal('0')
@@ -97,12 +101,12 @@ class PartageCalculator:
 
         # 6. Débours & Divers
         # Mutation (Frais fixes d'état)
-        mutation = SharedCalculator.mutation_amount(val_base_cf)
+        mutation = p.mutation_amount(val_base_cf)
 
         debours_detail = {
             'mutation': mutation,
-            'expeditions': SharedCalculator.frais_expeditions() if val_expeditions == 0 else val_expeditions,
-            'divers': SharedCalculator.frais_divers() if val_divers == 0 else val_divers,
+            'expeditions': p.frais_expeditions if val_expeditions == 0 else val_expeditions,
+            'divers': p.frais_divers if val_divers == 0 else val_divers,
             'morcellement': cout_morcellement
         }
         total_debours = sum(debours_detail.values())
@@ -1,21 +1,132 @@
 import json
-from decimal import Decimal
-from typing import Dict, Any, List
+import time
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Any, List, Optional
+import numpy as np
 import simpleeval
+from flask import current_app, has_app_context
+from sqlalchemy.orm import selectinload
 
+from app import db
 from app.models import BaremeModele, BaremeLigneCalcul
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.calculators.brackets import BracketTable
+from app.actes.calculators.dependencies import noms_utilises
+from app.actes.calculators.result_cache import ResultCache
+from app.actes.services.parametres import ParametresSnapshot
+from app.actes.calculators.fixed_point import (
+    FixedEval, FIXED_FUNCTIONS, ECHELLE, convertir_constantes, depuis_fixe, vers_fixe
+)
+from app.actes.calculators.vectorized import (
+    VectorEval, VECTOR_FUNCTIONS, contexte_scalaire, tranches_vectorisees, vector_eval
+)
+
+
+class LignePlan:
+    """
+    Ligne de calcul pré-compilée : AST des formules parsé (et sa variante
+    à constantes mises à l'échelle pour le mode virgule fixe), table de
+    tranches précalculée.
+    """
+    __slots__ = ('code', 'nom_contexte', 'libelle', 'type_ligne', 'soumis_tva',
+                 'condition', 'condition_ast', 'condition_ast_fixe', 'formule', 'formule_ast', 'formule_ast_fixe',
+                 'table_tranches', 'dependances')
+
+    def __init__(self, ligne: BaremeLigneCalcul):
+        self.code = ligne.code
+        self.nom_contexte = ligne.code.lower()
+        self.libelle = ligne.libelle
+        self.type_ligne = ligne.type_ligne
+        self.soumis_tva = ligne.soumis_tva
+        self.condition = ligne.condition_affichage
+        self.condition_ast = BaremePlan.parse(ligne.condition_affichage)
+        self.formule = ligne.formule_ou_montant
+        self.formule_ast = BaremePlan.parse(ligne.formule_ou_montant)
+        self.condition_ast_fixe = convertir_constantes(self.condition_ast)
+        self.formule_ast_fixe = convertir_constantes(self.formule_ast)
+        self.table_tranches = BracketTable.depuis_plafonds(ligne.tranches_json) if ligne.tranches_json else None
+        self.dependances = noms_utilises(None, self.condition_ast) if self.condition_ast else frozenset()
+        if self.formule_ast:
+            self.dependances |= noms_utilises(None, self.formule_ast)
+
+
+class BaremePlan:
+    """
+    Plan d'exécution compilé d'un barème dynamique.
+
+    Construit une seule fois à partir du modèle (variables + lignes) puis
+    conservé dans le cache du worker. Les formules et conditions sont parsées
+    en AST à la compilation : l'exécution ne fait plus qu'évaluer des noeuds.
+    """
+    __slots__ = ('code', 'updated_at', 'variables', 'lignes', 'a_tva_explicite', 'vectorisable', 'checked_at')
+
+    def __init__(self, modele: BaremeModele):
+        self.code = modele.code
+        self.updated_at = modele.updated_at
+        self.variables = [(v.code.upper(), v.type_champ, v.valeur_defaut) for v in modele.variables]
+        self.lignes = [LignePlan(l) for l in sorted(modele.lignes, key=lambda l: l.ordre)]
+        self.a_tva_explicite = any(l.code == 'TVA' for l in self.lignes)
+        # Seuls les barèmes à variables numériques/booléennes passent par NumPy
+        self.vectorisable = all(
+            type_champ in DynamicCalculatorEngine.NUMERIC_TYPES or type_champ == 'BOOLEEN'
+            for _, type_champ, _ in self.variables
+        )
+        self.checked_at = time.monotonic()
+
+    @staticmethod
+    def parse(expr: Optional[str]):
+        """
+        Parse une expression en AST simpleeval.
+        Retourne None si l'expression est vide ou invalide : l'évaluation
+        retombera alors sur le texte source et journalisera l'erreur.
+        """
+        if not expr or expr.strip() == '':
+            return None
+        try:
+            return simpleeval.SimpleEval.parse(expr)
+        except Exception:
+            return None
+
 
 class DynamicCalculatorEngine:
-    
+
+    # Cache des plans compilés, par worker : {code: BaremePlan}
+    _plans: Dict[str, BaremePlan] = {}
+
+    # Délai (secondes) pendant lequel un plan est réutilisé sans revérifier
+    # `updated_at` en base. Les modifications faites depuis un autre worker
+    # sont donc visibles au plus tard après ce délai.
+    PLAN_TTL = 5.0
+
+    NUMERIC_TYPES = ('MONTANT', 'ENTIER', 'POURCENTAGE', 'CHOIX')
+
+    # Résultats de calculate() mémorisés par worker (cf. result_cache)
+    _results = ResultCache(maxsize=1024)
+
+    # Nombre maximal de simulations acceptées par calculate_many
+    MAX_BATCH_SIZE = 100000
+
+    FORMULA_FUNCTIONS = {
+        'min': min,
+        'max': max,
+        'arrondi_mille': SharedCalculator.roundup_thousand,
+    }
+
+    # Mode virgule fixe (entiers à l'échelle, cf. fixed_point) par défaut.
+    # Surchargeable par la clé de configuration BAREME_FIXED_POINT ou par
+    # appel (paramètre fixed_point).
+    FIXED_POINT = False
+
     @staticmethod
-    def _evaluate_condition(condition_str: str, context: Dict[str, Any]) -> bool:
+    def _evaluate_condition(condition_str: str, context: Dict[str, Any], parsed=None, evaluator=None) -> bool:
         """Evalue une condition logique (ex: 'taux_enreg == 1' ou 'avec_morcellement')"""
         if not condition_str or condition_str.strip() == '':
             return True
         try:
             # We allow basic comparisons and logic
-            result = simpleeval.simple_eval(condition_str, names=context)
+            if evaluator is None:
+                evaluator = simpleeval.SimpleEval(names=context)
+            result = evaluator.eval(condition_str, previously_parsed=parsed)
             return bool(result)
         except Exception as e:
             # Log error in real app
@@ -23,23 +134,37 @@ class DynamicCalculatorEngine:
             return False
 
     @staticmethod
-    def _evaluate_formula(formula_str: str, context: Dict[str, Any]) -> Decimal:
+    def _evaluate_formula(formula_str: str, context: Dict[str, Any], parsed=None, evaluator=None) -> Decimal:
         """Evalue une formule mathématique basée sur les variables du contexte"""
         if not formula_str or formula_str.strip() == '':
             return Decimal('0')
-            
-        functions = {
-            'min': min,
-            'max': max,
-            'arrondi_mille': SharedCalculator.roundup_thousand,
-        }
+
         try:
-            result = simpleeval.simple_eval(formula_str, names=context, functions=functions)
+            if evaluator is None:
+                evaluator = simpleeval.SimpleEval(names=context, functions=DynamicCalculatorEngine.FORMULA_FUNCTIONS)
+            result = evaluator.eval(formula_str, previously_parsed=parsed)
             return Decimal(str(result))
         except Exception as e:
             print(f"Erreur évaluation formule '{formula_str}': {e}")
             return Decimal('0')
 
+    @staticmethod
+    def _evaluate_formula_fixe(formula_str: str, context: Dict[str, Any], parsed=None, evaluator=None) -> int:
+        """Evalue une formule en virgule fixe ; retourne un entier à l'échelle."""
+        if not formula_str or formula_str.strip() == '':
+            return 0
+
+        try:
+            if evaluator is None:
+                evaluator = FixedEval(names=context, functions=FIXED_FUNCTIONS)
+            result = evaluator.eval(formula_str, previously_parsed=parsed)
+            if type(result) is not int:
+                raise TypeError(f"résultat non numérique : {result!r}")
+            return result
+        except Exception as e:
+            print(f"Erreur évaluation formule '{formula_str}': {e}")
+            return 0
+
     @staticmethod
     def _calculate_tranches(base: Decimal, tranches: List[Dict[str, Any]]) -> Decimal:
         """
@@ -50,146 +175,574 @@ class DynamicCalculatorEngine:
             {"max": 10000000, "taux": 1.5},
             {"max": None, "taux": 0.75}
         ]
+        Les plans compilés conservent directement leur BracketTable ; cette
+        méthode sert aux appels ponctuels.
         """
         if not tranches:
             return Decimal('0')
-            
-        total = Decimal('0')
-        restant = base
-        borne_precedente = Decimal('0')
-        
-        # Sort just in case it's not ordered
-        def tranche_sort_key(t):
-            return t.get('max') if t.get('max') is not None else float('inf')
-            
-        tranches_triees = sorted(tranches, key=tranche_sort_key)
-        
-        for tranche in tranches_triees:
-            tranche_max = tranche.get('max')
-            taux = Decimal(str(tranche.get('taux', 0))) / Decimal('100')
-            
-            plafond = Decimal(str(tranche_max)) if tranche_max is not None else Decimal('Infinity')
-            
-            if restant <= 0:
-                break
-                
-            # Calculer la part de la base qui tombe dans cette tranche
-            taille_tranche = plafond - borne_precedente
-            if base > plafond:
-                montant_tranche = taille_tranche
-            else:
-                montant_tranche = base - borne_precedente
-                
-            if montant_tranche > 0:
-                total += montant_tranche * taux
-                
-            borne_precedente = plafond
-            
-        return total
+        return BracketTable.depuis_plafonds(tranches).total(base)
+
+    # ------------------------------------------------------------------ #
+    #  Cache des plans compilés                                          #
+    # ------------------------------------------------------------------ #
 
     @classmethod
-    def calculate(cls, bareme_code: str, user_inputs: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Exécute le moteur de règles pour un type de barème donné.
-        user_inputs doit être un dictionnaire des variables (par ex. {'prix_vente': 15000000, 'morcellement': False})
-        """
-        modele = BaremeModele.query.filter_by(code=bareme_code).first()
+    def compile(cls, bareme_code: str) -> BaremePlan:
+        """Charge le barème (variables + lignes en une passe) et le compile."""
+        modele = db.session.execute(
+            db.select(BaremeModele)
+            .filter_by(code=bareme_code)
+            .options(selectinload(BaremeModele.variables), selectinload(BaremeModele.lignes))
+        ).scalar_one_or_none()
         if not modele:
             raise ValueError(f"Barème {bareme_code} introuvable.")
-            
-        # 1. Préparation du contexte d'évaluation
+        return BaremePlan(modele)
+
+    @classmethod
+    def get_plan(cls, bareme_code: str) -> BaremePlan:
+        """
+        Retourne le plan compilé du barème depuis le cache du worker.
+        Au-delà de PLAN_TTL, seul `updated_at` est relu en base : le barème
+        n'est recompilé que s'il a été modifié entre-temps.
+        """
+        plan = cls._plans.get(bareme_code)
+        now = time.monotonic()
+        if plan is not None:
+            if now - plan.checked_at < cls.PLAN_TTL:
+                return plan
+            updated_at = db.session.execute(
+                db.select(BaremeModele.updated_at).filter_by(code=bareme_code)
+            ).scalar_one_or_none()
+            if updated_at is not None and updated_at == plan.updated_at:
+                plan.checked_at = now
+                return plan
+
+        plan = cls.compile(bareme_code)
+        cls._plans[bareme_code] = plan
+        return plan
+
+    @classmethod
+    def invalidate_plan(cls, bareme_code: str = None) -> None:
+        """Invalide le plan d'un barème (ou de tous si aucun code n'est fourni)."""
+        if bareme_code is None:
+            cls._plans = {}
+            cls._results.clear()
+        else:
+            cls._plans.pop(bareme_code, None)
+
+    # ------------------------------------------------------------------ #
+    #  Exécution                                                         #
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def _convert_input(cls, type_champ: str, val: Any) -> Any:
+        """Conversion intelligente d'une saisie selon le type de champ."""
+        if type_champ in cls.NUMERIC_TYPES:
+            try:
+                # On tente la conversion numérique (float) pour tous ces types
+                return float(val) if val is not None else 0.0
+            except (ValueError, TypeError):
+                return 0.0
+        elif type_champ == 'BOOLEEN':
+            # Gestion souple du booléen (string "True", bool réel, ou "y" du form HTML)
+            if isinstance(val, bool):
+                return val
+            return str(val).lower() in ['true', '1', 'y', 'on', 'yes']
+        return val
+
+    @classmethod
+    def _convert_input_fixe(cls, type_champ: str, val: Any) -> Any:
+        """Conversion d'une saisie en mode virgule fixe (nombres -> entiers à l'échelle)."""
+        if type_champ in cls.NUMERIC_TYPES:
+            try:
+                if isinstance(val, bool):
+                    val = int(val)
+                return vers_fixe(val if val is not None else 0)
+            except (InvalidOperation, ValueError, TypeError):
+                return 0
+        return cls._convert_input(type_champ, val)
+
+    @classmethod
+    def _mode_fixe(cls, fixed_point: Optional[bool]) -> bool:
+        """Résout le mode d'arithmétique : paramètre d'appel, puis configuration, puis défaut."""
+        if fixed_point is not None:
+            return fixed_point
+        if has_app_context():
+            return bool(current_app.config.get('BAREME_FIXED_POINT', cls.FIXED_POINT))
+        return cls.FIXED_POINT
+
+    @classmethod
+    def _build_context(cls, plan: BaremePlan, user_inputs: Dict[str, Any], fixe: bool = False,
+                       parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        """Contexte initial : taux de TVA et saisies converties selon leur type."""
         # Normalisation des inputs utilisateur en majuscules pour correspondre aux codes variables
         input_map = {str(k).upper(): v for k, v in user_inputs.items()}
-        
+        convert = cls._convert_input_fixe if fixe else cls._convert_input
+
+        tva_rate = SharedCalculator.parametres(parametres).tva_rate  # 0.18
         context = {
-            'TVA_RATE': float(SharedCalculator.TVA_RATE)  # 0.18
+            'TVA_RATE': vers_fixe(tva_rate) if fixe else float(tva_rate)
         }
-        
+
         # Injection des saisies utilisateur dans le contexte
-        for var in modele.variables:
-            code_upper = var.code.upper()
-            val = input_map.get(code_upper, var.valeur_defaut)
-            
-            # Conversion intelligente selon le type de champ
-            if var.type_champ in ['MONTANT', 'ENTIER', 'POURCENTAGE', 'CHOIX']:
-                try:
-                    # On tente la conversion numérique (float) pour tous ces types
-                    context[code_upper] = float(val) if val is not None else 0.0
-                except (ValueError, TypeError):
-                    context[code_upper] = 0.0
-            elif var.type_champ == 'BOOLEEN':
-                # Gestion souple du booléen (string "True", bool réel, ou "y" du form HTML)
-                if isinstance(val, bool):
-                    context[code_upper] = val
-                else:
-                    context[code_upper] = str(val).lower() in ['true', '1', 'y', 'on', 'yes']
-            else:
-                context[code_upper] = val
-                
+        for code_upper, type_champ, valeur_defaut in plan.variables:
+            val = input_map.get(code_upper, valeur_defaut)
+            context[code_upper] = convert(type_champ, val)
+        return context
+
+    @staticmethod
+    def _valeur_sortie(valeur: Any, fixe: bool) -> Any:
+        """Valeur du contexte telle que présentée à l'extérieur (nombres en float)."""
+        if fixe and type(valeur) is int:
+            return valeur / ECHELLE
+        return valeur
+
+    @classmethod
+    def _evaluateurs(cls, context: Dict[str, Any], fixe: bool = False):
+        """
+        Evaluateurs (conditions, formules) partagés par toutes les lignes : ils
+        lisent le même dictionnaire de contexte, enrichi au fil des lignes.
+        """
+        if fixe:
+            return FixedEval(names=context), FixedEval(names=context, functions=FIXED_FUNCTIONS)
+        return (simpleeval.SimpleEval(names=context),
+                simpleeval.SimpleEval(names=context, functions=cls.FORMULA_FUNCTIONS))
+
+    @classmethod
+    def _evaluer_ligne(cls, ligne: LignePlan, context: Dict[str, Any], eval_conditions, eval_formules,
+                       fixe: bool = False):
+        """
+        Evalue une ligne dans le contexte courant.
+        Retourne None si sa condition n'est pas remplie, sinon
+        (montant, détails des tranches, valeur à exposer dans le contexte).
+        Le montant est toujours un Decimal exact, quel que soit le mode.
+        """
+        # Vérifier la condition d'affichage/exécution
+        if ligne.condition and not cls._evaluate_condition(
+                ligne.condition, context, ligne.condition_ast_fixe if fixe else ligne.condition_ast, eval_conditions):
+            return None
+
+        montant_ligne = Decimal('0')
+        details_tranches = None
+
+        if fixe:
+            brut = 0
+            if ligne.type_ligne == 'TRANCHES':
+                base_calc = cls._evaluate_formula_fixe(ligne.formule, context, ligne.formule_ast_fixe, eval_formules)
+                if ligne.table_tranches:
+                    brut = ligne.table_tranches.total_fixe(base_calc)
+                    details_tranches = ligne.table_tranches.details(depuis_fixe(base_calc))
+            elif ligne.type_ligne in ['FORFAIT', 'FORMULE']:
+                brut = cls._evaluate_formula_fixe(ligne.formule, context, ligne.formule_ast_fixe, eval_formules)
+            return depuis_fixe(brut), details_tranches, brut
+
+        # Calculer le montant selon le type de ligne
+        if ligne.type_ligne == 'TRANCHES':
+            # Base de calcul de la tranche (souvent une simple variable comme 'prix_vente' mais on permet une formule)
+            base_calc = cls._evaluate_formula(ligne.formule, context, ligne.formule_ast, eval_formules)
+            if ligne.table_tranches:
+                montant_ligne = ligne.table_tranches.total(base_calc)
+                details_tranches = ligne.table_tranches.details(base_calc)
+
+        elif ligne.type_ligne in ['FORFAIT', 'FORMULE']:
+            montant_ligne = cls._evaluate_formula(ligne.formule, context, ligne.formule_ast, eval_formules)
+
+        return montant_ligne, details_tranches, float(montant_ligne)
+
+    @staticmethod
+    def _resultat_ligne(ligne: LignePlan, montant_ligne: Decimal, details_tranches) -> Dict[str, Any]:
+        resultat = {
+            'code': ligne.code,
+            'libelle': ligne.libelle,
+            'montant': float(montant_ligne),
+            'soumis_tva': ligne.soumis_tva
+        }
+        if details_tranches is not None:
+            resultat['details'] = details_tranches
+        return resultat
+
+    @staticmethod
+    def _ligne_tva(plan: BaremePlan, montant_tva_global: Decimal) -> Optional[Dict[str, Any]]:
+        """Ligne de TVA globale ajoutée lorsque le barème ne la calcule pas lui-même."""
+        # S'il y a déjà une ligne qui calcule spécifiquement la TVA dans le constructeur,
+        # on n'a pas besoin de l'ajouter magiquement, le constructeur aura fait (TVA_LIGNE)
+        # Mais pour la simplicité, on inclut le calcul TVA sur les lignes marquées `soumis_tva`
+        if plan.a_tva_explicite or montant_tva_global <= 0:
+            return None
+        return {
+            'code': 'TVA',
+            'libelle': 'TVA (18%)',
+            'montant': float(montant_tva_global),
+            'soumis_tva': False
+        }
+
+    @classmethod
+    def calculate(cls, bareme_code: str, user_inputs: Dict[str, Any],
+                  fixed_point: Optional[bool] = None,
+                  parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        """
+        Exécute le moteur de règles pour un type de barème donné.
+        user_inputs doit être un dictionnaire des variables (par ex. {'prix_vente': 15000000, 'morcellement': False})
+        fixed_point force (True) ou désactive (False) le mode virgule fixe ; par défaut
+        BAREME_FIXED_POINT de la configuration.
+        parametres : snapshot des paramètres de l'étude ; par défaut celui de la version courante.
+        """
+        plan = cls.get_plan(bareme_code)
+        fixe = cls._mode_fixe(fixed_point)
+        parametres = SharedCalculator.parametres(parametres)
+        context = cls._build_context(plan, user_inputs, fixe, parametres)
+
+        # Clé de mémorisation : barème et sa version, paramètres, mode, saisies converties
+        cle = (plan.code, plan.updated_at, parametres, fixe,
+               tuple(context[code] for code, _, _ in plan.variables))
+        return cls._results.get_or_compute(
+            cle, lambda: cls._calculate_plan(plan, user_inputs, fixe, context, parametres)[0]
+        )
+
+    @classmethod
+    def calculate_uncached(cls, bareme_code: str, user_inputs: Dict[str, Any],
+                           fixed_point: Optional[bool] = None,
+                           parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        """
+        Comme calculate(), sans passer par le cache de résultats : le plan est
+        évalué à chaque appel (banc d'essai, mesure du coût réel d'un calcul).
+        """
+        plan = cls.get_plan(bareme_code)
+        fixe = cls._mode_fixe(fixed_point)
+        return cls._calculate_plan(plan, user_inputs, fixe, parametres=parametres)[0]
+
+    @classmethod
+    def cache_stats(cls) -> Dict[str, Any]:
+        """Compteurs du cache de résultats (supervision)."""
+        return cls._results.stats()
+
+    @classmethod
+    def _calculate_plan(cls, plan: BaremePlan, user_inputs: Dict[str, Any], fixe: bool = False,
+                        context: Optional[Dict[str, Any]] = None,
+                        parametres: Optional[ParametresSnapshot] = None):
+        """Calcul complet d'un plan ; retourne (résultat, montants par ligne)."""
+        # 1. Préparation du contexte d'évaluation
+        parametres = SharedCalculator.parametres(parametres)
+        if context is None:
+            context = cls._build_context(plan, user_inputs, fixe, parametres)
+        eval_conditions, eval_formules = cls._evaluateurs(context, fixe)
+
         # 2. Exécution Ligne par Ligne
         resultats_lignes = []
+        montants: Dict[str, Optional[Decimal]] = {}
         somme_ht_tva = Decimal('0')  # Base soumise à TVA (généralement Honoraires)
         total_general = Decimal('0')
-        
-        lignes = sorted(modele.lignes, key=lambda l: l.ordre)
-        
-        for ligne in lignes:
-            # Vérifier la condition d'affichage/exécution
-            if ligne.condition_affichage and not cls._evaluate_condition(ligne.condition_affichage, context):
+
+        for ligne in plan.lignes:
+            evaluation = cls._evaluer_ligne(ligne, context, eval_conditions, eval_formules, fixe)
+            if evaluation is None:
+                montants[ligne.code] = None
                 continue
-                
-            montant_ligne = Decimal('0')
-            
-            # Calculer le montant selon le type de ligne
-            if ligne.type_ligne == 'TRANCHES':
-                # Base de calcul de la tranche (souvent une simple variable comme 'prix_vente' mais on permet une formule)
-                base_calc = cls._evaluate_formula(ligne.formule_ou_montant, context)
-                if ligne.tranches_json:
-                    montant_ligne = cls._calculate_tranches(base_calc, ligne.tranches_json)
-                    
-            elif ligne.type_ligne in ['FORFAIT', 'FORMULE']:
-                montant_ligne = cls._evaluate_formula(ligne.formule_ou_montant, context)
-                
+            montant_ligne, details_tranches, context[ligne.nom_contexte] = evaluation
+            montants[ligne.code] = montant_ligne
+
             # Cumul
             total_general += montant_ligne
             if ligne.soumis_tva:
                 somme_ht_tva += montant_ligne
-                
-            # Exposer ce résultat dans le contexte pour l'utiliser dans la ligne d'après (ex: calcul de la TVA)
-            # Normaliser le nom de la ligne (ex: "Droits d'Enregistrement" -> "droits_enregistrement")
-            nom_variable_ligne = ligne.code.lower()
-            context[nom_variable_ligne] = float(montant_ligne)
-            
-            resultats_lignes.append({
-                'code': ligne.code,
-                'libelle': ligne.libelle,
-                'montant': float(montant_ligne),
-                'soumis_tva': ligne.soumis_tva
-            })
-            
+
+            # Le résultat est exposé dans le contexte (context[ligne.nom_contexte], affecté
+            # ci-dessus) pour l'utiliser dans la ligne d'après (ex: calcul de la TVA)
+            resultats_lignes.append(cls._resultat_ligne(ligne, montant_ligne, details_tranches))
+
         # 3. Traitement global final (TVA globale, Arrondi)
-        montant_tva_global = somme_ht_tva * SharedCalculator.TVA_RATE
-        
-        # S'il y a déjà une ligne qui calcule spécifiquement la TVA dans le constructeur,
-        # on n'a pas besoin de l'ajouter magiquement, le constructeur aura fait (TVA_LIGNE)
-        # Mais pour la simplicité, on inclut le calcul TVA sur les lignes marquées `soumis_tva`
-        
-        # Vérifions si le barème a calculé la TVA explicitement
-        a_tva_explicite = any(l.code == 'TVA' for l in lignes)
-        if not a_tva_explicite and montant_tva_global > 0:
-            resultats_lignes.append({
-                'code': 'TVA',
-                'libelle': 'TVA (18%)',
-                'montant': float(montant_tva_global),
-                'soumis_tva': False
-            })
+        taux_tva = depuis_fixe(context['TVA_RATE']) if fixe else parametres.tva_rate
+        montant_tva_global = somme_ht_tva * taux_tva
+        ligne_tva = cls._ligne_tva(plan, montant_tva_global)
+        if ligne_tva:
+            resultats_lignes.append(ligne_tva)
             total_general += montant_tva_global
-            
+
         # Arrondir le total final aux 1000FCFA supérieurs (règle OHADA commune)
         total_arrondi = SharedCalculator.roundup_thousand(total_general)
-        
+
         return {
-            'inputs': context,
+            'inputs': {k: cls._valeur_sortie(v, fixe) for k, v in context.items()} if fixe else context,
             'lignes': resultats_lignes,
             'total_general': float(total_arrondi)
+        }, montants
+
+    # ------------------------------------------------------------------ #
+    #  Recalcul incrémental                                              #
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def _etat(cls, plan: BaremePlan, context: Dict[str, Any], montants: Dict[str, Optional[Decimal]],
+              fixe: bool = False) -> Dict[str, Any]:
+        """État sérialisable (JSON) renvoyé au client entre deux recalculs."""
+        return {
+            'bareme': plan.code,
+            'version': plan.updated_at.isoformat() if plan.updated_at else None,
+            'virgule_fixe': fixe,
+            'tva_rate': cls._valeur_sortie(context['TVA_RATE'], fixe),
+            'variables': {code: cls._valeur_sortie(context[code], fixe) for code, _, _ in plan.variables},
+            'montants': {code: (None if m is None else str(m)) for code, m in montants.items()},
+        }
+
+    @classmethod
+    def calculate_incremental(cls, bareme_code: str, delta: Dict[str, Any],
+                              etat: Optional[Dict[str, Any]] = None,
+                              fixed_point: Optional[bool] = None,
+                              parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        """
+        Recalcul « avec delta » pour la saisie en direct.
+
+        `etat` est l'état renvoyé par l'appel précédent (None au premier appel) ;
+        `delta` ne contient que les variables modifiées. Seules les lignes qui
+        dépendent, directement ou via d'autres lignes, d'une variable modifiée
+        sont réévaluées. Retourne :
+            {
+                'complet': bool,      # True si tout a été recalculé
+                'lignes': [...],      # lignes dont le résultat a changé (toutes si complet)
+                'supprimees': [...],  # codes des lignes dont la condition n'est plus remplie
+                'total_general': float,
+                'etat': {...}         # à renvoyer au prochain appel
+            }
+        Si l'état est absent ou ne correspond plus à la version du barème
+        (modifié entre-temps), le calcul est complet.
+        """
+        plan = cls.get_plan(bareme_code)
+        fixe = cls._mode_fixe(fixed_point)
+        parametres = SharedCalculator.parametres(parametres)
+        version = plan.updated_at.isoformat() if plan.updated_at else None
+
+        if (not etat or etat.get('bareme') != plan.code or etat.get('version') != version
+                or etat.get('virgule_fixe', False) != fixe
+                or set(etat.get('montants', {})) != {l.code for l in plan.lignes}):
+            inputs = dict((etat or {}).get('variables', {}))
+            inputs.update({str(k).upper(): v for k, v in delta.items()})
+            result, montants = cls._calculate_plan(plan, inputs, fixe, parametres=parametres)
+            return {
+                'complet': True,
+                'lignes': result['lignes'],
+                'supprimees': [],
+                'total_general': result['total_general'],
+                'etat': cls._etat(plan, cls._build_context(plan, inputs, fixe, parametres), montants, fixe),
+            }
+
+        # 1. Contexte des variables : état précédent + delta
+        inputs = dict(etat['variables'])
+        inputs.update({str(k).upper(): v for k, v in delta.items()})
+        context = cls._build_context(plan, inputs, fixe, parametres)
+        modifies = {
+            code for code, _, _ in plan.variables
+            if cls._valeur_sortie(context[code], fixe) != etat['variables'].get(code)
+        }
+        if cls._valeur_sortie(context['TVA_RATE'], fixe) != etat.get('tva_rate'):
+            modifies.add('TVA_RATE')
+
+        eval_conditions, eval_formules = cls._evaluateurs(context, fixe)
+
+        # 2. Parcours dans l'ordre : seules les lignes touchées sont réévaluées,
+        # les autres reprennent leur montant précédent. Le contexte est
+        # reconstruit au fil de l'eau pour rester identique au calcul complet.
+        anciens = {code: (None if m is None else Decimal(m)) for code, m in etat['montants'].items()}
+        montants: Dict[str, Optional[Decimal]] = {}
+        lignes_modifiees = []
+        supprimees = []
+        somme_ht_tva = Decimal('0')
+        total_general = Decimal('0')
+
+        for ligne in plan.lignes:
+            ancien = anciens[ligne.code]
+            if ligne.dependances & modifies:
+                evaluation = cls._evaluer_ligne(ligne, context, eval_conditions, eval_formules, fixe)
+                montant_ligne = None if evaluation is None else evaluation[0]
+                if montant_ligne != ancien:
+                    modifies.add(ligne.nom_contexte)
+                    if evaluation is None:
+                        supprimees.append(ligne.code)
+                    else:
+                        lignes_modifiees.append(cls._resultat_ligne(ligne, *evaluation[:2]))
+            else:
+                montant_ligne = ancien
+
+            montants[ligne.code] = montant_ligne
+            if montant_ligne is None:
+                continue
+            total_general += montant_ligne
+            if ligne.soumis_tva:
+                somme_ht_tva += montant_ligne
+            context[ligne.nom_contexte] = vers_fixe(montant_ligne) if fixe else float(montant_ligne)
+
+        # 3. TVA globale et arrondi, recalculés à partir des montants (aucune évaluation)
+        if not plan.a_tva_explicite:
+            ancienne_base = sum(
+                (anciens[l.code] for l in plan.lignes if l.soumis_tva and anciens[l.code] is not None),
+                Decimal('0')
+            )
+            ancienne_tva = ancienne_base * Decimal(str(etat['tva_rate']))
+            montant_tva_global = somme_ht_tva * Decimal(str(cls._valeur_sortie(context['TVA_RATE'], fixe)))
+            ligne_tva = cls._ligne_tva(plan, montant_tva_global)
+            if ligne_tva:
+                total_general += montant_tva_global
+                if montant_tva_global != ancienne_tva:
+                    lignes_modifiees.append(ligne_tva)
+            elif ancienne_tva > 0:
+                supprimees.append('TVA')
+
+        return {
+            'complet': False,
+            'lignes': lignes_modifiees,
+            'supprimees': supprimees,
+            'total_general': float(SharedCalculator.roundup_thousand(total_general)),
+            'etat': cls._etat(plan, context, montants, fixe),
+        }
+
+    # ------------------------------------------------------------------ #
+    #  Simulation en lot (vectorisée)                                    #
+    # ------------------------------------------------------------------ #
+
+    @classmethod
+    def calculate_many(cls, bareme_code: str, inputs_list: List[Dict[str, Any]],
+                       parametres: Optional[ParametresSnapshot] = None,
+                       fixed_point: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Evalue un barème pour une liste de jeux de saisies en une seule passe.
+
+        Le plan compilé n'est chargé qu'une fois ; chaque variable devient un
+        tableau NumPy et chaque ligne est évaluée une seule fois pour toutes
+        les simulations. Le résultat est renvoyé par colonnes :
+            {
+                'count': n,
+                'lignes': [{'code', 'libelle', 'soumis_tva', 'montants': [...]}],
+                'total_general': [...]
+            }
+        Un montant vaut None lorsque la condition de la ligne n'est pas
+        remplie pour la simulation correspondante.
+        En virgule fixe (fixed_point, par défaut BAREME_FIXED_POINT), les
+        simulations sont évaluées une à une : les tableaux NumPy sont en
+        flottants et ne donneraient pas les mêmes arrondis que calculate().
+        """
+
+        n = len(inputs_list)
+        if n > cls.MAX_BATCH_SIZE:
+            raise ValueError(f"Trop de simulations ({n}) : maximum {cls.MAX_BATCH_SIZE}.")
+
+        plan = cls.get_plan(bareme_code)
+        fixe = cls._mode_fixe(fixed_point)
+        if fixe or not plan.vectorisable:
+            return cls._calculate_many_scalar(bareme_code, inputs_list, parametres, fixe)
+
+        tva_rate = SharedCalculator.parametres(parametres).tva_rate
+
+        # 1. Contexte vectorisé : une colonne par variable
+        input_maps = [{str(k).upper(): v for k, v in inputs.items()} for inputs in inputs_list]
+        context = {'TVA_RATE': float(tva_rate)}
+        for code_upper, type_champ, valeur_defaut in plan.variables:
+            dtype = bool if type_champ == 'BOOLEEN' else float
+            context[code_upper] = np.fromiter(
+                (cls._convert_input(type_champ, m.get(code_upper, valeur_defaut)) for m in input_maps),
+                dtype=dtype, count=n
+            )
+
+        eval_conditions = VectorEval(names=context)
+        eval_formules = VectorEval(names=context, functions=VECTOR_FUNCTIONS)
+
+        # 2. Exécution ligne par ligne, toutes simulations confondues.
+        # `definis` : pour chaque ligne déjà évaluée, simulations où sa condition
+        # est remplie. Ailleurs son nom n'existe pas dans le calcul unitaire.
+        colonnes = []
+        definis: Dict[str, np.ndarray] = {}
+        somme_ht_tva = np.zeros(n)
+        total_general = np.zeros(n)
+
+        for ligne in plan.lignes:
+            if ligne.condition:
+                masque = vector_eval(ligne.condition, ligne.condition_ast, eval_conditions, context, n,
+                                     lambda ctx: cls._evaluate_condition(ligne.condition, ctx), dtype=bool,
+                                     definis=definis)
+            else:
+                masque = np.ones(n, dtype=bool)
+
+            montants = np.zeros(n)
+            if ligne.type_ligne == 'TRANCHES':
+                base_calc = cls._vector_formula(ligne, eval_formules, context, n, definis)
+                if ligne.table_tranches:
+                    montants = tranches_vectorisees(base_calc, ligne.table_tranches)
+            elif ligne.type_ligne in ['FORFAIT', 'FORMULE']:
+                montants = cls._vector_formula(ligne, eval_formules, context, n, definis)
+
+            # Simulations où la ligne lit le résultat d'une ligne non retenue :
+            # évaluées comme dans le calcul unitaire (nom inconnu)
+            references = [definis[nom] for nom in ligne.dependances if nom in definis]
+            if references:
+                for i in np.flatnonzero(~np.logical_and.reduce(references)):
+                    ctx = contexte_scalaire(context, i, definis)
+                    evaluation = cls._evaluer_ligne(ligne, ctx, *cls._evaluateurs(ctx))
+                    masque[i] = evaluation is not None
+                    montants[i] = 0.0 if evaluation is None else float(evaluation[0])
+
+            montants = np.where(masque, montants, 0.0)
+            total_general += montants
+            if ligne.soumis_tva:
+                somme_ht_tva += montants
+
+            context[ligne.nom_contexte] = montants
+            definis[ligne.nom_contexte] = masque
+            colonnes.append((ligne.code, ligne.libelle, ligne.soumis_tva, masque, montants))
+
+        # 3. TVA globale et arrondi au millier supérieur
+        montant_tva_global = somme_ht_tva * float(tva_rate)
+        if not plan.a_tva_explicite:
+            masque_tva = montant_tva_global > 0
+            colonnes.append(('TVA', 'TVA (18%)', False, masque_tva, montant_tva_global))
+            total_general += np.where(masque_tva, montant_tva_global, 0.0)
+
+        # Arrondi au centime avant le millier pour neutraliser le bruit flottant
+        total_arrondi = np.ceil(np.round(total_general, 2) / 1000) * 1000
+
+        return {
+            'count': n,
+            'lignes': [
+                {
+                    'code': code,
+                    'libelle': libelle,
+                    'soumis_tva': soumis_tva,
+                    'montants': [float(m) if ok else None for ok, m in zip(masque.tolist(), montants.tolist())]
+                }
+                for code, libelle, soumis_tva, masque, montants in colonnes
+                if masque.any()
+            ],
+            'total_general': total_arrondi.tolist()
+        }
+
+    @classmethod
+    def _vector_formula(cls, ligne: LignePlan, evaluator: VectorEval, context: Dict[str, Any], n: int,
+                        definis: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        """Evalue la formule d'une ligne sur toutes les simulations."""
+        if not ligne.formule or ligne.formule.strip() == '':
+            return np.zeros(n)
+        if ligne.formule_ast is None:
+            # Formule non parsable : même comportement que le calcul unitaire, une seule fois
+            cls._evaluate_formula(ligne.formule, {})
+            return np.zeros(n)
+        return vector_eval(ligne.formule, ligne.formule_ast, evaluator, context, n,
+                           lambda ctx: float(cls._evaluate_formula(ligne.formule, ctx)), definis=definis)
+
+    @classmethod
+    def _calculate_many_scalar(cls, bareme_code: str, inputs_list: List[Dict[str, Any]],
+                               parametres: Optional[ParametresSnapshot] = None,
+                               fixe: bool = False) -> Dict[str, Any]:
+        """Repli non vectorisé (variables texte, virgule fixe) : même format de sortie que calculate_many."""
+        parametres = SharedCalculator.parametres(parametres)
+        resultats = [cls.calculate(bareme_code, inputs, fixed_point=fixe, parametres=parametres)
+                     for inputs in inputs_list]
+        n = len(resultats)
+        colonnes: Dict[str, Dict[str, Any]] = {}
+        for i, res in enumerate(resultats):
+            for l in res['lignes']:
+                col = colonnes.setdefault(l['code'], {
+                    'code': l['code'], 'libelle': l['libelle'], 'soumis_tva': l['soumis_tva'], 'montants': [None] * n
+                })
+                col['montants'][i] = l['montant']
+        return {
+            'count': n,
+            'lignes': list(colonnes.values()),
+            'total_general': [res['total_general'] for res in resultats]
         }
@@ -1,21 +1,23 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class EchangeCalculator:
     # Standard Property Brackets
 
     @staticmethod
-    def calculate(valeur_base: float = 0, soulte: float = 0) -> Dict[str, Any]:
+    def calculate(valeur_base: float = 0, soulte: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(valeur_base))
         val_soulte = Decimal(str(soulte))
         
         # 1. Honoraires (Sur la plus haute valeur)
         honoraires_ht, details = SharedCalculator.calculate_brackets(
             val, 
-            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075')
+            SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075', parametres=p)
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (5% on value + 15% on soulte)
@@ -24,13 +26,13 @@ class EchangeCalculator:
         enregistrement = reg_valeur + reg_soulte
         
         # CF double pour échange
-        cf = SharedCalculator.conservation_fonciere(val, double=True)
+        cf = p.conservation_fonciere(val, double=True)
         
         # 4. Debours
         debours = {
             'mutation': Decimal('20000'),
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         
@@ -0,0 +1,174 @@
+"""
+Arithmétique en virgule fixe pour le moteur de barèmes dynamiques.
+
+En mode virgule fixe, tous les nombres (montants, taux, pourcentages,
+constantes des formules) sont des entiers Python exprimés en millionièmes
+d'unité : 15 000 000 FCFA -> 15_000_000_000_000, 2,25 % (0.0225) -> 22_500.
+Les multiplications et divisions sont réajustées à l'échelle et arrondies
+au plus proche (égalité au pair, comme Decimal).
+
+Les conversions n'ont lieu qu'aux bords : à l'entrée des saisies, lors de
+la compilation des constantes des formules et à la sortie d'un montant de
+ligne (Decimal exact). Aucune valeur ne transite plus par float, ce qui
+supprime la dérive à la frontière de l'arrondi au millier.
+"""
+
+import ast
+import copy
+import operator as op
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Any
+
+import simpleeval
+
+# Nombre de décimales conservées : 6 (millionième de FCFA)
+DECIMALES = 6
+ECHELLE = 10 ** DECIMALES
+
+# Exposant maximal accepté par l'opérateur **
+MAX_EXPOSANT = 100
+
+
+def vers_fixe(valeur: Any) -> int:
+    """Convertit un nombre (int, float, Decimal, str) en entier à l'échelle."""
+    if type(valeur) is int:
+        return valeur * ECHELLE
+    if isinstance(valeur, float):
+        valeur = repr(valeur)
+    if not isinstance(valeur, Decimal):
+        valeur = Decimal(str(valeur))
+    return int(valeur.scaleb(DECIMALES).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def depuis_fixe(brut: int) -> Decimal:
+    """Valeur exacte (Decimal) d'un entier à l'échelle."""
+    return Decimal(brut).scaleb(-DECIMALES)
+
+
+def division_arrondie(n: int, d: int) -> int:
+    """n / d arrondi à l'entier le plus proche, égalité au pair."""
+    if d < 0:
+        n, d = -n, -d
+    q, r = divmod(n, d)
+    if 2 * r > d or (2 * r == d and q & 1):
+        q += 1
+    return q
+
+
+def _e(v):
+    # Un booléen utilisé comme nombre vaut 1 ou 0 (comme en mode flottant)
+    if v is True:
+        return ECHELLE
+    if v is False:
+        return 0
+    return v
+
+
+def _add(a, b):
+    if a.__class__ is bool or b.__class__ is bool:
+        a, b = _e(a), _e(b)
+    return a + b
+
+
+def _sub(a, b):
+    if a.__class__ is bool or b.__class__ is bool:
+        a, b = _e(a), _e(b)
+    return a - b
+
+
+def _mul(a, b):
+    if a.__class__ is bool or b.__class__ is bool:
+        a, b = _e(a), _e(b)
+    # division_arrondie(a * b, ECHELLE), déroulée : c'est l'opération la plus fréquente
+    q, r = divmod(a * b, ECHELLE)
+    if 2 * r > ECHELLE or (2 * r == ECHELLE and q & 1):
+        q += 1
+    return q
+
+
+def _div(a, b):
+    a, b = _e(a), _e(b)
+    if b == 0:
+        raise ZeroDivisionError("division par zéro")
+    return division_arrondie(a * ECHELLE, b)
+
+
+def _floordiv(a, b):
+    return (_e(a) // _e(b)) * ECHELLE
+
+
+def _mod(a, b):
+    return _e(a) % _e(b)
+
+
+def _pow(a, b):
+    a, b = _e(a), _e(b)
+    if b % ECHELLE:
+        raise ValueError("Exposant non entier en mode virgule fixe.")
+    n = b // ECHELLE
+    if abs(n) > MAX_EXPOSANT:
+        raise simpleeval.NumberTooHigh(f"Exposant trop grand : {n}")
+    if n >= 1:
+        return division_arrondie(a ** n, ECHELLE ** (n - 1))
+    if n == 0:
+        return ECHELLE
+    return division_arrondie(ECHELLE ** (1 - n), a ** -n)
+
+
+def _comparaison(fonction):
+    def comparer(a, b):
+        if a.__class__ is bool or b.__class__ is bool:
+            return fonction(_e(a), _e(b))
+        return fonction(a, b)
+    return comparer
+
+
+FIXED_OPERATORS = dict(simpleeval.DEFAULT_OPERATORS)
+FIXED_OPERATORS.update({
+    ast.Add: _add,
+    ast.Sub: _sub,
+    ast.Mult: _mul,
+    ast.Div: _div,
+    ast.FloorDiv: _floordiv,
+    ast.Mod: _mod,
+    ast.Pow: _pow,
+    ast.Eq: _comparaison(op.eq),
+    ast.NotEq: _comparaison(op.ne),
+    ast.Gt: _comparaison(op.gt),
+    ast.Lt: _comparaison(op.lt),
+    ast.GtE: _comparaison(op.ge),
+    ast.LtE: _comparaison(op.le),
+})
+
+
+def _arrondi_mille(brut):
+    pas = 1000 * ECHELLE
+    return -(-_e(brut) // pas) * pas
+
+
+FIXED_FUNCTIONS = {
+    'min': min,
+    'max': max,
+    'arrondi_mille': _arrondi_mille,
+}
+
+
+class _ConstantesAEchelle(ast.NodeTransformer):
+    def visit_Constant(self, node):
+        if type(node.value) in (int, float):
+            return ast.copy_location(ast.Constant(value=vers_fixe(node.value)), node)
+        return node
+
+
+def convertir_constantes(parsed):
+    """Copie de l'AST dont les constantes numériques sont mises à l'échelle."""
+    if parsed is None:
+        return None
+    return ast.fix_missing_locations(_ConstantesAEchelle().visit(copy.deepcopy(parsed)))
+
+
+class FixedEval(simpleeval.SimpleEval):
+    """Evaluateur simpleeval opérant sur des entiers à l'échelle ECHELLE."""
+
+    def __init__(self, names, functions=None):
+        super().__init__(operators=FIXED_OPERATORS, functions=functions or {}, names=names)
@@ -1,21 +1,23 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class MainleveeCalculator:
     # Brackets for Mainlevée (often half of standard)
 
 
     @staticmethod
-    def calculate(montant: float = 0) -> Dict[str, Any]:
+    def calculate(montant: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(montant))
         
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(
             val, 
-            SharedCalculator.get_standard_brackets('0.0075', '0.005', '0.0025', '0.00125')
+            SharedCalculator.get_standard_brackets('0.0075', '0.005', '0.0025', '0.00125', parametres=p)
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (Fixed 5k as per common practice for discharge)
@@ -26,8 +28,8 @@ class MainleveeCalculator:
         
         # 4. Debours
         debours = {
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         
@@ -56,12 +58,13 @@ class MortgageCalculator:
     ]
 
     @staticmethod
-    def calculate(montant: float = 0) -> Dict[str, Any]:
+    def calculate(montant: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val = Decimal(str(montant))
         
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(val, MortgageCalculator.BRACKETS)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (Fixed 5k for loan/mortgage usually)
@@ -81,8 +84,8 @@ class MortgageCalculator:
         # 5. Debours
         debours = {
             'inscription': inscription,
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'frais_generaux': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'frais_generaux': p.frais_divers
         }
         total_debours = sum(debours.values())
         
@@ -16,6 +16,7 @@ from .divers import DiversCalculator
 from .tpv import TPVCalculator
 from .ao import AOCalculator
 from .succession import SuccessionCalculator
+from .result_cache import ResultCache
 
 def extract_float(key, default=0):
     val = request.form.get(key, default)
@@ -288,3 +289,29 @@ CALCULATOR_REGISTRY = {
         }
     }
 }
+
+
+# Résultats des calculateurs codés mémorisés par worker (cf. result_cache)
+LEGACY_RESULT_CACHE = ResultCache(maxsize=1024)
+
+
+def calculer(slug: str, params: Dict[str, Any]) -> Any:
+    """
+    Exécute le calculateur codé `slug` avec ses paramètres, via le cache de
+    résultats. Le calculateur reçoit le snapshot des paramètres de l'étude,
+    qui fait aussi partie de la clé : une modification de taux ou de seuil
+    dans l'admin invalide les résultats.
+    """
+    from app.actes.services.parametres import ParametreService
+
+    config = CALCULATOR_REGISTRY[slug]
+    if config.get('class'):
+        fonction = config['class'].calculate
+    elif config.get('calculator_func'):
+        fonction = config['calculator_func']
+    else:
+        return None
+    parametres = ParametreService.snapshot()
+    cle = (slug, parametres, tuple(sorted(params.items())))
+    return LEGACY_RESULT_CACHE.get_or_compute(cle, lambda: fonction(**params, parametres=parametres))
+
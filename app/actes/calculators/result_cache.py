@@ -0,0 +1,79 @@
+"""
+Cache LRU des résultats de simulation de barèmes.
+
+Les clercs recalculent sans cesse les mêmes simulations (allers-retours
+entre deux ou trois prix, action « save » qui refait le calcul). Les
+résultats sont donc mémorisés par worker, avec une clé qui contient tout
+ce dont ils dépendent :
+  - le code du barème (ou le slug du calculateur codé) ;
+  - sa version (updated_at du barème dynamique) ;
+  - la version des paramètres de l'étude (ParametreService.version()) ;
+  - les saisies normalisées.
+Un changement de barème ou de paramètre produit donc de nouvelles clés ; les
+anciennes sortent naturellement par éviction LRU.
+
+Les résultats renvoyés sont partagés entre appels : ils ne doivent pas être
+modifiés par l'appelant.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class ResultCache:
+    """Cache LRU borné en nombre d'entrées, avec compteurs de succès / échecs."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Retourne le résultat mémorisé pour `key`, ou le calcule via `compute()`
+        et le mémorise. Une clé non hachable (saisie de type liste, etc.)
+        désactive simplement le cache pour cet appel. Les exceptions ne sont
+        pas mémorisées.
+        """
+        try:
+            hash(key)
+        except TypeError:
+            return compute()
+
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self) -> None:
+        """Vide le cache (les compteurs sont conservés)."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Compteurs pour la supervision."""
+        total = self.hits + self.misses
+        return {
+            'entrees': len(self._data),
+            'capacite': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'taux_succes': round(self.hits / total, 4) if total else None,
+        }
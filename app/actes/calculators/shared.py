@@ -1,15 +1,16 @@
 from decimal import Decimal
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 
 from app.actes.calculators.base import BaseCalculator
+from app.actes.services.parametres import ParametresSnapshot
+from app.actes.calculators.brackets import BracketTable
 
 
 class _TVARateDescriptor:
-    """Descripteur qui résout TVA_RATE depuis ParametreService à l'exécution."""
+    """Descripteur qui résout TVA_RATE depuis le snapshot courant des paramètres."""
     def __get__(self, obj, objtype=None) -> Decimal:
         try:
-            from app.actes.services.parametres import ParametreService
-            return ParametreService.get_decimal('taux_tva', Decimal('0.18'))
+            return BaseCalculator.parametres().tva_rate
         except Exception:
             return Decimal('0.18')
 
@@ -28,19 +29,23 @@ class SharedCalculator(BaseCalculator):
     TVA_RATE est également accessible comme attribut (descripteur dynamique)
     pour la rétrocompatibilité avec le code existant :
         tva = honoraires_ht * SharedCalculator.TVA_RATE
+    Les calculateurs lisent plutôt le snapshot qu'ils reçoivent :
+        tva = honoraires_ht * p.tva_rate
     """
     # Descripteur dynamique : résout le taux depuis la DB à chaque accès
     TVA_RATE = _TVARateDescriptor()
 
     @classmethod
-    def get_standard_brackets(cls, rate1: str, rate2: str, rate3: str, rate4: str) -> List[Tuple[Any, Decimal, str]]:
+    def get_standard_brackets(cls, rate1: str, rate2: str, rate3: str, rate4: str,
+                              parametres: Optional[ParametresSnapshot] = None) -> List[Tuple[Any, Decimal, str]]:
         """
         Génère un barème standard à 4 tranches en utilisant les seuils configurables 
         (typiquement: 20M, 60M, 220M, reste).
         """
-        s1 = cls.seuil_bareme(1)
-        s2 = cls.seuil_bareme(2)
-        s3 = cls.seuil_bareme(3)
+        p = cls.parametres(parametres)
+        s1 = p.seuil_bareme_tranche1
+        s2 = p.seuil_bareme_tranche2
+        s3 = p.seuil_bareme_tranche3
         
         m1 = int(s1 / Decimal('1000000'))
         m2 = int((s1 + s2) / Decimal('1000000'))
@@ -61,6 +66,9 @@ class SharedCalculator(BaseCalculator):
     ) -> Tuple[Decimal, List[Dict]]:
         """
         Calcule les honoraires selon un barème à tranches.
+        La table (bornes et montants cumulés) est précalculée et mise en
+        cache par BracketTable : chaque appel ne coûte qu'une recherche
+        dichotomique et une multiplication.
 
         Args:
             amount: Montant de base.
@@ -71,35 +79,7 @@ class SharedCalculator(BaseCalculator):
         Returns:
             (total, details) : total Decimal, détails par tranche.
         """
-        remaining = amount
-        total = Decimal('0')
-        details = []
-
-        for limit, rate, label in brackets:
-            if remaining <= 0:
-                break
-
-            tranche_base = remaining if limit is None else min(remaining, limit)
-            amt = tranche_base * rate
-
-            # Appliquer le minimum uniquement sur la première tranche
-            if label == brackets[0][2] and amt < min_first_tranche:
-                amt = min_first_tranche
-
-            total += amt
-            details.append({
-                'tranche': label,
-                'taux': f"{float(rate) * 100}%",
-                'base': float(tranche_base),
-                'montant': float(amt)
-            })
-
-            if limit is not None:
-                remaining -= tranche_base
-            else:
-                remaining = Decimal('0')
-
-        return total, details
+        return BracketTable.depuis_largeurs(brackets, min_first_tranche).calculate(amount)
 
     # ------------------------------------------------------------------
     # Implémentation requise par BaseCalculator (non utilisée directement
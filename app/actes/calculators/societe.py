@@ -1,6 +1,7 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class SocieteCalculator:
     # OHADA Standard Brackets for Company Constitution
@@ -15,12 +16,13 @@ class SocieteCalculator:
     ]
 
     @staticmethod
-    def calculate_base_societe(capital: float, type_societe: str) -> Dict[str, Any]:
+    def calculate_base_societe(capital: float, type_societe: str, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         cap = Decimal(str(capital))
         
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(cap, SocieteCalculator.OHADA_BRACKETS, min_first_tranche=Decimal('100000'))
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (Fixed 25k if <= 100M, else 1%)
@@ -41,15 +43,15 @@ class SocieteCalculator:
         # 4. Debours specific to type
         if type_societe == 'SARL':
             debours = {
-                'publicite': SharedCalculator.frais_publicite(),
-                'expeditions': SharedCalculator.frais_expeditions(),
+                'publicite': p.frais_publicite,
+                'expeditions': p.frais_expeditions,
                 'drc': Decimal('59000'), # Declaration regularite
             }
         elif type_societe == 'SA':
             debours = {
-                'publicite': SharedCalculator.frais_publicite(),
-                'expeditions': SharedCalculator.frais_expeditions(),
-                'divers': SharedCalculator.frais_divers()
+                'publicite': p.frais_publicite,
+                'expeditions': p.frais_expeditions,
+                'divers': p.frais_divers
             }
         elif type_societe == 'SCI':
             debours = {
@@ -78,15 +80,15 @@ class SocieteCalculator:
 
 class SarlCalculator:
     @staticmethod
-    def calculate(capital: float = 0) -> Dict[str, Any]:
-        return SocieteCalculator.calculate_base_societe(capital, 'SARL')
+    def calculate(capital: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        return SocieteCalculator.calculate_base_societe(capital, 'SARL', parametres)
 
 class SciCalculator:
     @staticmethod
-    def calculate(capital: float = 0) -> Dict[str, Any]:
-        return SocieteCalculator.calculate_base_societe(capital, 'SCI')
+    def calculate(capital: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        return SocieteCalculator.calculate_base_societe(capital, 'SCI', parametres)
 
 class SaCalculator:
     @staticmethod
-    def calculate(capital: float = 0) -> Dict[str, Any]:
-        return SocieteCalculator.calculate_base_societe(capital, 'SA')
+    def calculate(capital: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        return SocieteCalculator.calculate_base_societe(capital, 'SA', parametres)
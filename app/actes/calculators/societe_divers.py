@@ -1,17 +1,19 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class SocieteModifCalculator:
     # Most of these are fixed fees or standard OHADA brackets
     
     @staticmethod
-    def calculate_dissolution(capital: float = 0) -> Dict[str, Any]:
+    def calculate_dissolution(capital: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         cap = Decimal(str(capital))
         
         # 1. Honoraires (Fixed for Dissolution usually 20k)
         honoraires_ht = Decimal('20000')
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement
@@ -28,9 +30,9 @@ class SocieteModifCalculator:
             
         # 4. Debours
         debours = {
-            'publicite': SharedCalculator.frais_publicite(),
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'publicite': p.frais_publicite,
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values()) + total_greffe
         
@@ -49,12 +51,13 @@ class SocieteModifCalculator:
         }
 
     @staticmethod
-    def calculate_transformation(capital: float = 0) -> Dict[str, Any]:
+    def calculate_transformation(capital: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         cap = Decimal(str(capital))
         
         # 1. Honoraires (Fixed or tiered but dump shows 20k)
         honoraires_ht = Decimal('20000')
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (Fixed 25k if cap <= 10M, then tiered)
@@ -74,9 +77,9 @@ class SocieteModifCalculator:
             
         # 4. Debours
         debours = {
-            'publicite': SharedCalculator.frais_publicite(),
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'publicite': p.frais_publicite,
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values()) + total_greffe
         
@@ -103,14 +106,15 @@ class FondsCommerceCalculator:
     ]
 
     @staticmethod
-    def calculate(prix_cession: float = 0, valeur_fonds: float = 0, marchandises: float = 0) -> Dict[str, Any]:
+    def calculate(prix_cession: float = 0, valeur_fonds: float = 0, marchandises: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         prix = Decimal(str(prix_cession))
         val_fonds = Decimal(str(valeur_fonds))
         val_march = Decimal(str(marchandises))
         
         # 1. Honoraires (On total price)
         honoraires_ht, details = SharedCalculator.calculate_brackets(prix, FondsCommerceCalculator.BRACKETS)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (10% on business assets, 1% on new goods)
@@ -121,9 +125,9 @@ class FondsCommerceCalculator:
         # 3. Debours
         debours = {
             'greffe_mod': Decimal('20000'),
-            'publicite': SharedCalculator.frais_publicite(),
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'publicite': p.frais_publicite,
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values())
         
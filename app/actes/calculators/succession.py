@@ -1,7 +1,8 @@
 from decimal import Decimal
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class SuccessionCalculator:
     """
@@ -17,9 +18,11 @@ class SuccessionCalculator:
         mois_penalite: int = 0,
         inclure_conservation: bool = True,
         lieu_deces: int = 1,  # 1: Sénégal, 2: Étranger
-        parente: int = 1      # 1: Epoux/Directe, 2: Autres
+        parente: int = 1,     # 1: Epoux/Directe, 2: Autres
+        parametres: Optional[ParametresSnapshot] = None
     ) -> Dict[str, Any]:
         
+        p = SharedCalculator.parametres(parametres)
         # Inputs Conversion
         val_immeuble = Decimal(str(valeur_immeuble))
         val_reste_actif = Decimal(str(reste_actif))
@@ -65,7 +68,7 @@ class SuccessionCalculator:
             honoraires_details.append({'tranche': 'Plus de 150M', 'taux': '0.5%', 'base': float(remaining), 'montant': float(amt4)})
             
         # TVA (18%)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 3. Droits de Succession (Fisc)
@@ -102,12 +105,12 @@ class SuccessionCalculator:
         if inclure_conservation and val_immeuble > 0:
             cf_base = max(Decimal(0), val_immeuble - val_passif)
             # floor to thousands then 1%
-            conservation_totale = SharedCalculator.conservation_fonciere(cf_base)
+            conservation_totale = p.conservation_fonciere(cf_base)
 
         # 5. Débours et Frais Fixes
         # Droit Mutation (Bracketed)
         droit_mutation = Decimal(0)
-        droit_mutation = SharedCalculator.mutation_amount(val_immeuble)
+        droit_mutation = p.mutation_amount(val_immeuble)
             
         debours = {
             'droit_mutation': droit_mutation,
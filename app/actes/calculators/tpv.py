@@ -1,6 +1,7 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class TPVCalculator:
     # Simplified coefficients based on holding years (usually provided by tax authorities)
@@ -16,7 +17,7 @@ class TPVCalculator:
     }
 
     @staticmethod
-    def calculate(prix_acquisition: float, annee_acquisition: int, annee_vente: int, prix_vente: float, depenses_travaux: float = 0) -> Dict[str, Any]:
+    def calculate(prix_acquisition: float, annee_acquisition: int, annee_vente: int, prix_vente: float, depenses_travaux: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
         acq = Decimal(str(prix_acquisition))
         vte = Decimal(str(prix_vente))
         travaux = Decimal(str(depenses_travaux))
@@ -0,0 +1,157 @@
+"""
+Evaluation vectorisée (NumPy) des plans de barèmes dynamiques.
+
+Utilisée par DynamicCalculatorEngine.calculate_many pour simuler des milliers
+de jeux de saisies en une seule passe (grilles tarifaires, contrôles contre
+BAREME.xlsm). Chaque variable du contexte devient un tableau NumPy d'une
+valeur par simulation ; les formules et conditions déjà compilées en AST
+sont évaluées une seule fois sur ces tableaux.
+"""
+
+import ast
+import operator
+from functools import reduce
+from typing import Dict, Any, List, Callable, Optional
+
+import numpy as np
+import simpleeval
+
+
+def _vmin(*args):
+    return reduce(np.minimum, args)
+
+
+def _vmax(*args):
+    return reduce(np.maximum, args)
+
+
+def _varrondi_mille(amount):
+    return np.ceil(np.asarray(amount, dtype=float) / 1000) * 1000
+
+
+def _vpower(a, b):
+    if np.any(np.abs(a) > simpleeval.MAX_POWER) or np.any(np.abs(b) > simpleeval.MAX_POWER):
+        raise simpleeval.NumberTooHigh(f"Sorry! I don't want to evaluate {a} ** {b}")
+    return np.power(a, b)
+
+
+VECTOR_FUNCTIONS = {
+    'min': _vmin,
+    'max': _vmax,
+    'arrondi_mille': _varrondi_mille,
+}
+
+VECTOR_OPERATORS = dict(simpleeval.DEFAULT_OPERATORS)
+VECTOR_OPERATORS.update({
+    ast.Add: np.add,
+    ast.Mult: np.multiply,
+    ast.Pow: _vpower,
+    ast.Not: np.logical_not,
+})
+
+
+class VectorEval(simpleeval.SimpleEval):
+    """
+    Evaluateur simpleeval opérant sur des tableaux NumPy.
+
+    Les opérateurs logiques (and/or/not), les comparaisons chaînées et
+    l'expression conditionnelle sont traduits en opérations élément par
+    élément. Tout ce qui n'est pas vectorisable lève une exception : l'appelant
+    retombe alors sur l'évaluation ligne par ligne.
+
+    Les divisions et modulos par zéro, qui lèvent une exception dans le calcul
+    unitaire, sont relevés dans `invalides` (masque des simulations concernées)
+    au lieu de produire silencieusement inf/nan.
+    """
+
+    def __init__(self, names, functions=None):
+        operators = dict(VECTOR_OPERATORS)
+        operators.update({
+            ast.Div: self._diviseur(operator.truediv),
+            ast.FloorDiv: self._diviseur(operator.floordiv),
+            ast.Mod: self._diviseur(operator.mod),
+        })
+        super().__init__(operators=operators, functions=functions or {}, names=names)
+        self.invalides = False
+
+    def _diviseur(self, op):
+        def diviser(a, b):
+            self.invalides = np.logical_or(self.invalides, np.asarray(b) == 0)
+            return op(a, b)
+        return diviser
+
+    def _eval_compare(self, node):
+        right = self._eval(node.left)
+        to_return = True
+        for operation, comp in zip(node.ops, node.comparators):
+            left = right
+            right = self._eval(comp)
+            to_return = np.logical_and(to_return, self.operators[type(operation)](left, right))
+        return to_return
+
+    def _eval_boolop(self, node):
+        values = [np.asarray(self._eval(v), dtype=bool) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return reduce(np.logical_and, values)
+        return reduce(np.logical_or, values)
+
+    def _eval_ifexp(self, node):
+        return np.where(np.asarray(self._eval(node.test), dtype=bool), self._eval(node.body), self._eval(node.orelse))
+
+
+def tranches_vectorisees(base: np.ndarray, table) -> np.ndarray:
+    """
+    Equivalent vectorisé de BracketTable.total : une recherche
+    (`searchsorted`) et une multiplication pour toutes les bases à la fois.
+    """
+    bornes, cumuls, taux = table.arrays()
+    i = np.clip(np.searchsorted(bornes, base, side='right') - 1, 0, None)
+    total = cumuls[i] + (base - bornes[i]) * taux[i]
+    if table.min_premiere_tranche:
+        premiere = (np.minimum(base, bornes[1]) if len(bornes) > 1 else base) * taux[0]
+        total = total + np.maximum(float(table.min_premiere_tranche) - premiere, 0.0)
+    return np.where(base > 0, total, 0.0)
+
+
+def contexte_scalaire(context: Dict[str, Any], i: int,
+                      definis: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+    """
+    Contexte scalaire de la simulation i. Les résultats de lignes dont la
+    condition n'est pas remplie pour elle (`definis[nom][i]` faux) en sont
+    retirés, comme dans le calcul unitaire.
+    """
+    return {
+        k: (v[i].item() if isinstance(v, np.ndarray) else v) for k, v in context.items()
+        if definis is None or k not in definis or definis[k][i]
+    }
+
+
+def vector_eval(expr: str, parsed, evaluator: VectorEval, context: Dict[str, Any], n: int,
+                scalar_fallback: Callable[[Dict[str, Any]], Any], dtype=float,
+                definis: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+    """
+    Evalue une expression compilée sur n simulations.
+
+    Le résultat (scalaire ou tableau) est diffusé sur n valeurs. Si
+    l'expression n'est pas vectorisable (fonction ou construction non
+    supportée), `scalar_fallback` est appelé pour chaque simulation avec un
+    contexte scalaire reconstitué. Il l'est aussi pour les seules simulations
+    dont le résultat vectorisé n'est pas fiable : division par zéro ou valeur
+    non finie (inf/nan), que le calcul unitaire traite comme une erreur.
+    """
+    evaluator.invalides = False
+    try:
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            valeurs = np.array(np.broadcast_to(
+                np.asarray(evaluator.eval(expr, previously_parsed=parsed), dtype=dtype), (n,)))
+    except Exception:
+        valeurs = np.zeros(n, dtype=dtype)
+        a_reprendre = range(n)
+    else:
+        invalides = np.broadcast_to(evaluator.invalides, (n,))
+        if np.issubdtype(valeurs.dtype, np.floating):
+            invalides = invalides | ~np.isfinite(valeurs)
+        a_reprendre = np.flatnonzero(invalides)
+    for i in a_reprendre:
+        valeurs[i] = scalar_fallback(contexte_scalaire(context, i, definis))
+    return valeurs
@@ -1,22 +1,24 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class VenteCalculator:
 
 
     @staticmethod
-    def calculate(prix: float = 0, taux_enregistrement: float = 10, morcellement: bool = True) -> Dict[str, Any]:
+    def calculate(prix: float = 0, taux_enregistrement: float = 10, morcellement: bool = True, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val_prix = Decimal(str(prix))
         
         # 1. Honoraires
         if taux_enregistrement == 1:
-            brackets = SharedCalculator.get_standard_brackets('0.0225', '0.015', '0.0075', '0.00375')
+            brackets = SharedCalculator.get_standard_brackets('0.0225', '0.015', '0.0075', '0.00375', parametres=p)
         else:
-            brackets = SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075')
+            brackets = SharedCalculator.get_standard_brackets('0.045', '0.03', '0.015', '0.0075', parametres=p)
             
         honoraires_ht, details = SharedCalculator.calculate_brackets(val_prix, brackets)
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement
@@ -24,21 +26,21 @@ class VenteCalculator:
         
         # 3. Conservation Fonciere
         # Rounded down price to thousand * 1%
-        cf_proportionnelle = (val_prix // 1000 * 1000) * SharedCalculator.cf_taux()
-        cf_fixe = Decimal('0') if morcellement else SharedCalculator.cf_fixe()
+        cf_proportionnelle = (val_prix // 1000 * 1000) * p.cf_taux
+        cf_fixe = Decimal('0') if morcellement else p.cf_fixe
         total_cf = cf_proportionnelle + cf_fixe
         
         # 4. Morcellement
-        frais_morcellement = SharedCalculator.frais_morcellement() if morcellement else Decimal('0')
+        frais_morcellement = p.frais_morcellement if morcellement else Decimal('0')
         
         # 5. Droits sur Mutation (Bracketed)
-        droit_mutation = SharedCalculator.mutation_amount(val_prix)
+        droit_mutation = p.mutation_amount(val_prix)
             
         # 6. Debours
         debours = {
             'mutation': droit_mutation,
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values()) + frais_morcellement
         
@@ -1,39 +1,41 @@
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.actes.calculators.shared import SharedCalculator
+from app.actes.services.parametres import ParametresSnapshot
 
 class AdjudicationCalculator:
     # High brackets for Adjudication
     
 
     @staticmethod
-    def calculate(prix: float = 0, morcellement: bool = True) -> Dict[str, Any]:
+    def calculate(prix: float = 0, morcellement: bool = True, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         val_prix = Decimal(str(prix))
         
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(
             val_prix, 
-            SharedCalculator.get_standard_brackets('0.09', '0.03', '0.015', '0.0075')
+            SharedCalculator.get_standard_brackets('0.09', '0.03', '0.015', '0.0075', parametres=p)
         )
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement (10%)
         enregistrement = val_prix * Decimal('0.10')
         
         # 3. Conservation Fonciere
-        cf = SharedCalculator.conservation_fonciere(val_prix)
+        cf = p.conservation_fonciere(val_prix)
         
         # 4. Morcellement
-        frais_morcellement = SharedCalculator.frais_morcellement() if morcellement else Decimal('0')
+        frais_morcellement = p.frais_morcellement if morcellement else Decimal('0')
         
         # 5. Droits sur Mutation
-        mutation = SharedCalculator.mutation_amount(val_prix)
+        mutation = p.mutation_amount(val_prix)
             
         # 6. Debours
         debours = {
             'mutation': mutation,
-            'expeditions': SharedCalculator.frais_expeditions(),
+            'expeditions': p.frais_expeditions,
             'huissier_pub': Decimal('150000')
         }
         total_debours = sum(debours.values()) + frais_morcellement
@@ -68,7 +70,8 @@ class AugmentationCapitalCalculator:
     ]
 
     @staticmethod
-    def calculate(ancien_capital: float = 0, nouveau_capital: float = 0) -> Dict[str, Any]:
+    def calculate(ancien_capital: float = 0, nouveau_capital: float = 0, parametres: Optional[ParametresSnapshot] = None) -> Dict[str, Any]:
+        p = SharedCalculator.parametres(parametres)
         ancien = Decimal(str(ancien_capital))
         nouveau = Decimal(str(nouveau_capital))
         augmentation = nouveau - ancien
@@ -77,7 +80,7 @@ class AugmentationCapitalCalculator:
             
         # 1. Honoraires
         honoraires_ht, details = SharedCalculator.calculate_brackets(augmentation, AugmentationCapitalCalculator.BRACKETS, min_first_tranche=Decimal('100000'))
-        tva = honoraires_ht * SharedCalculator.TVA_RATE
+        tva = honoraires_ht * p.tva_rate
         total_honoraires = honoraires_ht + tva
         
         # 2. Enregistrement
@@ -97,9 +100,9 @@ class AugmentationCapitalCalculator:
             
         # 4. Debours
         debours = {
-            'publicite': SharedCalculator.frais_publicite(),
-            'expeditions': SharedCalculator.frais_expeditions(),
-            'divers': SharedCalculator.frais_divers()
+            'publicite': p.frais_publicite,
+            'expeditions': p.frais_expeditions,
+            'divers': p.frais_divers
         }
         total_debours = sum(debours.values()) + greffe
         
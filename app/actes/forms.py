@@ -4,7 +4,8 @@ from wtforms import StringField, TextAreaField, SubmitField
 from wtforms.validators import DataRequired, Optional
 from wtforms_sqlalchemy.fields import QuerySelectField
 from app import db
-from app.models import Dossier, Template, TypeActe
+from app.models import Template, TypeActe
+from app.dossiers.forms import DossierPickerField
 
 def enabled_type_actes():
     return db.session.execute(db.select(TypeActe).order_by(TypeActe.nom)).scalars()
@@ -29,14 +30,11 @@ class TemplateForm(FlaskForm):
     ])
     submit = SubmitField('Enregistrer')
 
-def enabled_dossiers():
-    return db.session.execute(db.select(Dossier).order_by(Dossier.numero_dossier)).scalars()
-
 def enabled_templates():
     return db.session.execute(db.select(Template).order_by(Template.nom)).scalars()
 
 class ActGenerationForm(FlaskForm):
-    dossier = QuerySelectField('Dossier', query_factory=enabled_dossiers, get_label='numero_dossier', allow_blank=False)
+    dossier = DossierPickerField('Dossier', allow_blank=False)
     template = QuerySelectField('Modèle', query_factory=enabled_templates, get_label='nom', allow_blank=False)
     submit = SubmitField('Prévisualiser l\'Acte')
     save = SubmitField('Valider et Sauvegarder')
@@ -7,8 +7,9 @@ from app.models import Dossier, Acte, TypeActe, BaremeModele, BaremeVariable, Ba
 from app.decorators import role_required
 from datetime import datetime
 import json
-from app.actes.calculators.registry import CALCULATOR_REGISTRY
+from app.actes.calculators.registry import CALCULATOR_REGISTRY, LEGACY_RESULT_CACHE, calculer
 from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+from app.actes.calculators.dependencies import GrapheDependances
 
 # --- ROUTER DE CALCUL MÉTIER ---
 
@@ -80,14 +81,22 @@ def type_acte_bareme(id):
     return redirect(url_for('actes.types_acte_index'))
 
 
+def _dossier_preselectionne(dossier_id):
+    """
+    Dossiers rendus dans le sélecteur : uniquement le dossier présélectionné,
+    les autres options sont chargées au fil de la saisie (/dossiers/api/search).
+    """
+    dossier = db.session.get(Dossier, dossier_id) if dossier_id else None
+    return [dossier] if dossier else []
+
 # --- MOTEUR DYNAMIQUE (USER VIEW) ---
 
 @bp.route('/bareme-dynamique/<code>')
 @login_required
 def bareme_dynamique_view(code):
     bareme = BaremeModele.query.filter_by(code=code).first_or_404()
-    dossiers = Dossier.query.filter_by(statut='OUVERT').order_by(Dossier.numero_dossier.desc()).limit(50).all()
     selected_dossier_id = request.args.get('dossier_id', type=int)
+    dossiers = _dossier_preselectionne(selected_dossier_id)
     return render_template('actes/admin/bareme_dynamic.html', bareme=bareme, dossiers=dossiers, selected_dossier_id=selected_dossier_id)
 
 @bp.route('/bareme-dynamique/<code>/calc', methods=['POST'])
@@ -100,6 +109,53 @@ def bareme_dynamique_calc(code):
     except Exception as e:
         return jsonify({'message': str(e)}), 400
 
+@bp.route('/bareme-dynamique/<code>/calc-batch', methods=['POST'])
+@login_required
+def bareme_dynamique_calc_batch(code):
+    """
+    Simulation en lot. Corps JSON accepté :
+      - {"inputs": [{...}, {...}, ...]}
+      - {"base": {...}, "grille": {"variable": "prix_vente", "debut": 1000000, "fin": 500000000, "pas": 1000000}}
+    """
+    data = request.json or {}
+    try:
+        inputs_list = data.get('inputs')
+        grille = data.get('grille')
+        if grille:
+            debut, fin, pas = (float(grille[k]) for k in ('debut', 'fin', 'pas'))
+            if pas <= 0:
+                raise ValueError("Le pas de la grille doit être positif.")
+            nb_points = int((fin - debut) // pas) + 1
+            if nb_points > DynamicCalculatorEngine.MAX_BATCH_SIZE:
+                raise ValueError(f"Trop de simulations ({nb_points}) : maximum {DynamicCalculatorEngine.MAX_BATCH_SIZE}.")
+            base = data.get('base') or {}
+            valeurs = [debut + i * pas for i in range(max(nb_points, 0))]
+            inputs_list = [dict(base, **{grille['variable']: v}) for v in valeurs]
+        if not isinstance(inputs_list, list):
+            raise ValueError("Fournir une liste 'inputs' ou une 'grille'.")
+
+        result = DynamicCalculatorEngine.calculate_many(code, inputs_list)
+        if grille:
+            result['grille'] = {'variable': grille['variable'], 'valeurs': valeurs}
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'message': str(e)}), 400
+
+@bp.route('/bareme-dynamique/<code>/recalc', methods=['POST'])
+@login_required
+def bareme_dynamique_recalc(code):
+    """
+    Recalcul incrémental pour la saisie en direct. Corps JSON :
+      {"delta": {"prix_vente": 20000000}, "etat": <etat renvoyé par l'appel précédent ou null>}
+    Seules les lignes dont le résultat a changé sont renvoyées.
+    """
+    data = request.json or {}
+    try:
+        result = DynamicCalculatorEngine.calculate_incremental(code, data.get('delta') or {}, data.get('etat'))
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'message': str(e)}), 400
+
 @bp.route('/bareme-dynamique/<code>/save', methods=['POST'])
 @login_required
 def bareme_dynamique_save(code):
@@ -137,6 +193,16 @@ def bareme_admin_index():
     baremes = BaremeModele.query.order_by(BaremeModele.code).all()
     return render_template('actes/admin/baremes_index.html', baremes=baremes)
 
+@bp.route('/admin/baremes/cache')
+@login_required
+@role_required('ADMIN')
+def bareme_admin_cache_stats():
+    """Compteurs des caches de résultats de simulation (worker courant)."""
+    return jsonify({
+        'dynamique': DynamicCalculatorEngine.cache_stats(),
+        'calculateurs': LEGACY_RESULT_CACHE.stats(),
+    })
+
 @bp.route('/admin/baremes/new', methods=['GET', 'POST'])
 @login_required
 @role_required('ADMIN')
@@ -159,11 +225,14 @@ def bareme_admin_new():
 def bareme_admin_edit(id):
     b = db.session.get(BaremeModele, id)
     if request.method == 'POST':
+        ancien_code = b.code
         b.code = request.form.get('code', '').upper()
         b.nom = request.form.get('nom')
         b.description = request.form.get('description')
         b.is_active = 'is_active' in request.form
         db.session.commit()
+        DynamicCalculatorEngine.invalidate_plan(ancien_code)
+        DynamicCalculatorEngine.invalidate_plan(b.code)
         return redirect(url_for('actes.bareme_admin_index'))
     return render_template('actes/admin/bareme_form.html', bareme=b)
 
@@ -194,7 +263,18 @@ def bareme_admin_builder(id):
 def bareme_admin_save(id):
     b = db.session.get(BaremeModele, id)
     data = request.json
-    
+
+    # 0. Refuser les lignes qui utilisent une ligne calculée après elles (ou un cycle)
+    lignes_triees = sorted(
+        ({**l, 'code': (l.get('code') or '').upper()} for l in data.get('lines', [])),
+        key=lambda l: int(l.get('ordre', 0))
+    )
+    erreurs = GrapheDependances.depuis_lignes(
+        [v.get('code') or '' for v in data.get('variables', [])], lignes_triees
+    ).erreurs()
+    if erreurs:
+        return jsonify({'message': "\n".join(erreurs), 'erreurs': erreurs}), 400
+
     # 1. Sync Variables
     # Clean old ones (simple approach for now)
     BaremeVariable.query.filter_by(bareme_id=id).delete()
@@ -231,7 +311,11 @@ def bareme_admin_save(id):
         )
         db.session.add(l)
         
+    # Marquer le barème comme modifié : les autres workers recompileront
+    # leur plan dès qu'ils constateront le changement de `updated_at`.
+    b.updated_at = datetime.utcnow()
     db.session.commit()
+    DynamicCalculatorEngine.invalidate_plan(b.code)
     return jsonify({'status': 'ok'})
 
 
@@ -250,8 +334,8 @@ def bareme_generic(slug):
         
     result = None
     params = {}
-    dossiers = db.session.execute(db.select(Dossier).order_by(Dossier.numero_dossier.desc())).scalars().all()
-    selected_dossier_id = request.args.get('dossier_id', type=int)
+    selected_dossier_id = request.form.get('dossier_id', type=int) or request.args.get('dossier_id', type=int)
+    dossiers = _dossier_preselectionne(selected_dossier_id)
     
     if request.method == 'POST':
         if not current_app.testing:
@@ -262,8 +346,7 @@ def bareme_generic(slug):
         params = config['params_extractor']()
         
         try:
-            if config.get('class'): result = config['class'].calculate(**params)
-            elif config.get('calculator_func'): result = config['calculator_func'](**params)
+            result = calculer(slug, params)
         except Exception as e: flash(f"Erreur de calcul: {str(e)}", 'error')
             
         if action == 'save' and result:
@@ -2,10 +2,11 @@ from datetime import datetime
 from pathlib import Path
 import shutil
 import os
-from sqlalchemy import func, select, extract
 from flask import current_app
 from app import db
-from app.models import Dossier, Acte
+from app.sequences import SequenceService
+from app.audit_chain import seal_actes
+from app.models import Dossier
 
 class ArchiveService:
     @staticmethod
@@ -38,18 +39,13 @@ class ArchiveService:
         dossier_archive_path = archive_root / str(dossier.id)
         dossier_archive_path.mkdir(parents=True, exist_ok=True)
 
-        # Repertoire Numbering Strategy
-        # Get max reagent number for current year
-        year = datetime.utcnow().year
-        max_rep = db.session.scalar(
-            select(func.max(Acte.numero_repertoire)).filter(
-                extract('year', Acte.date_archivage) == year
-            )
-        ) or 0
-
         archived_count = 0
         
         try:
+            # Numéros de répertoire de l'année, réservés en une fois sous verrou
+            numeros = SequenceService.allouer('REPERTOIRE', datetime.utcnow().year, len(signed_acts))
+            max_rep = numeros[0] - 1
+
             for acte in signed_acts:
                 # 1. Move File
                 filename = f"acte_{acte.id}.docx"
@@ -70,7 +66,10 @@ class ArchiveService:
                 
                 archived_count += 1
 
-            # 3. Close Dossier
+            # 3. Chain the new repertoire entries (tamper-evident, see app/audit_chain.py)
+            seal_actes(db.session.connection(), signed_acts)
+
+            # 4. Close Dossier
             dossier.statut = 'ARCHIVE'
             db.session.commit()
             
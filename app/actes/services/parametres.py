@@ -2,15 +2,23 @@
 ParametreService — Service d'accès aux paramètres configurables de l'étude.
 
 Stratégie de cache :
-  - Les paramètres sont chargés depuis la DB une seule fois par process
-    et mis en cache dans un dict Python (_cache).
-  - Le cache est invalidé dès qu'un paramètre est modifié via `set()`.
+  - Les paramètres sont chargés depuis la DB en une requête et mis en cache
+    dans un dict Python (_cache), par process.
+  - Toute modification (`set()`, `set_many()`) incrémente dans la même
+    transaction le compteur de la table parametres_version.
+  - Chaque worker relit ce compteur au plus une fois toutes les
+    VERSION_CHECK_INTERVAL secondes (une requête sur clé primaire) et ne
+    recharge ses paramètres que s'il a changé : une modification faite
+    depuis un worker est vue par tous les autres dans ce délai.
+  - `version()` identifie l'état courant des paramètres ; il sert dans les
+    clés des caches qui en dépendent (résultats de barèmes).
   - Un fallback sur les valeurs par défaut (DEFAULTS) est toujours disponible
     si la DB n'est pas encore initialisée (premier démarrage).
 """
 
+import time
 from decimal import Decimal
-from typing import Any
+from typing import Any, Optional
 
 # ---------------------------------------------------------------------------
 # Valeurs par défaut — utilisées au premier démarrage (avant seed DB)
@@ -199,6 +207,100 @@ DEFAULTS: dict[str, dict] = {
 }
 
 
+class ParametresSnapshot:
+    """
+    Valeurs des paramètres de calcul figées pour une version donnée.
+
+    Construite une fois par version des paramètres (ParametreService.snapshot())
+    puis passée aux calculateurs via leur argument `parametres` : le calcul ne
+    fait plus que des lectures d'attributs, sans passer par le service.
+
+        p = ParametreService.snapshot()
+        tva = honoraires_ht * p.tva_rate
+        VenteCalculator.calculate(prix=15000000, parametres=p)
+
+    L'objet est immuable : une modification des paramètres produit un nouveau
+    snapshot, jamais la mise à jour de l'ancien. Deux snapshots aux mêmes
+    valeurs sont égaux (la version est ignorée), ce qui permet de s'en servir
+    dans les clés des caches de résultats.
+    """
+
+    # attribut -> (clé du paramètre, valeur de repli)
+    CHAMPS = {
+        'tva_rate': ('taux_tva', '0.18'),
+        'cf_taux': ('taux_cf_proportionnel', '0.01'),
+        'cf_fixe': ('frais_cf_fixe_standard', '6500'),
+        'cf_fixe_double': ('frais_cf_fixe_double', '14000'),
+        'seuil_mutation_moyen': ('seuil_mutation_moyen', '1500000'),
+        'seuil_mutation_haut': ('seuil_mutation_haut', '2500000'),
+        'frais_mutation_bas': ('frais_mutation_bas', '5000'),
+        'frais_mutation_moyen': ('frais_mutation_moyen', '10000'),
+        'frais_mutation_haut': ('frais_mutation_haut', '20000'),
+        'frais_expeditions': ('frais_expeditions_base', '50000'),
+        'frais_publicite': ('frais_publicite_base', '55000'),
+        'frais_divers': ('frais_divers_base', '50000'),
+        'frais_morcellement': ('frais_morcellement', '22500'),
+        'seuil_bareme_tranche1': ('seuil_bareme_tranche1', '20000000'),
+        'seuil_bareme_tranche2': ('seuil_bareme_tranche2', '60000000'),
+        'seuil_bareme_tranche3': ('seuil_bareme_tranche3', '220000000'),
+    }
+
+    __slots__ = ('version', '_hash') + tuple(CHAMPS)
+
+    def __init__(self, version: Any = None, **valeurs: Any):
+        inconnus = set(valeurs) - set(self.CHAMPS)
+        if inconnus:
+            raise TypeError(f"Paramètres inconnus : {', '.join(sorted(inconnus))}")
+        object.__setattr__(self, 'version', version)
+        for attr, (_, defaut) in self.CHAMPS.items():
+            val = valeurs.get(attr, defaut)
+            object.__setattr__(self, attr, val if isinstance(val, Decimal) else Decimal(str(val)))
+        object.__setattr__(self, '_hash', hash(self._valeurs()))
+
+    def _valeurs(self) -> tuple:
+        return tuple(getattr(self, attr) for attr in self.CHAMPS)
+
+    def __eq__(self, autre):
+        if self is autre:
+            return True
+        if not isinstance(autre, ParametresSnapshot):
+            return NotImplemented
+        return self._hash == autre._hash and self._valeurs() == autre._valeurs()
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __setattr__(self, nom, valeur):
+        raise AttributeError("ParametresSnapshot est immuable")
+
+    def __delattr__(self, nom):
+        raise AttributeError("ParametresSnapshot est immuable")
+
+    def __repr__(self) -> str:
+        return f"<ParametresSnapshot version={self.version!r} tva_rate={self.tva_rate}>"
+
+    @classmethod
+    def depuis_service(cls, service: type, version: Any = None) -> 'ParametresSnapshot':
+        """Lit chaque paramètre de calcul via `service.get_decimal`."""
+        return cls(version, **{
+            attr: service.get_decimal(cle, Decimal(defaut))
+            for attr, (cle, defaut) in cls.CHAMPS.items()
+        })
+
+    def mutation_amount(self, valeur: Decimal) -> Decimal:
+        """Droits de mutation selon la valeur du bien."""
+        if valeur > self.seuil_mutation_haut:
+            return self.frais_mutation_haut
+        elif valeur > self.seuil_mutation_moyen:
+            return self.frais_mutation_moyen
+        return self.frais_mutation_bas
+
+    def conservation_fonciere(self, valeur: Decimal, double: bool = False) -> Decimal:
+        """Taxe de Conservation Foncière (base arrondie au millier inférieur)."""
+        cf_fixe = self.cf_fixe_double if double else self.cf_fixe
+        return (valeur // 1000 * 1000) * self.cf_taux + cf_fixe
+
+
 class ParametreService:
     """
     Accès centralisé aux paramètres de l'étude avec cache in-process.
@@ -214,6 +316,13 @@ class ParametreService:
 
     _cache: dict[str, Any] = {}
     _loaded: bool = False
+    _version: int = 0                 # invalidations locales
+    _db_version: Optional[int] = None  # dernier compteur lu dans parametres_version
+    _checked_at: float = 0.0
+    _snapshot: Optional[ParametresSnapshot] = None
+
+    # Délai (secondes) entre deux relectures du compteur de version en base
+    VERSION_CHECK_INTERVAL = 5.0
 
     @classmethod
     def _load(cls) -> None:
@@ -234,6 +343,53 @@ class ParametreService:
         """Force le rechargement depuis la DB au prochain accès."""
         cls._cache = {}
         cls._loaded = False
+        cls._version += 1
+        cls._checked_at = 0.0
+
+    @classmethod
+    def _read_db_version(cls) -> Optional[int]:
+        """
+        Lit le compteur partagé sur une connexion dédiée, pour ne pas
+        interférer avec la transaction en cours de la session.
+        """
+        try:
+            from app import db
+            from app.models import ParametreVersion
+            with db.engine.connect() as conn:
+                return conn.execute(
+                    db.select(ParametreVersion.version).where(ParametreVersion.id == 1)
+                ).scalar()
+        except Exception:
+            return None
+
+    @classmethod
+    def _check_version(cls) -> None:
+        """Recharge le cache si un autre worker a modifié les paramètres."""
+        now = time.monotonic()
+        if now - cls._checked_at < cls.VERSION_CHECK_INTERVAL:
+            return
+        cls._checked_at = now
+        db_version = cls._read_db_version()
+        if db_version != cls._db_version:
+            cls.invalidate_cache()
+            cls._db_version = db_version
+            cls._checked_at = now
+
+    @classmethod
+    def version(cls) -> tuple:
+        """Identifiant de l'état des paramètres : (compteur partagé, invalidations locales)."""
+        cls._check_version()
+        return cls._db_version, cls._version
+
+    @classmethod
+    def snapshot(cls) -> ParametresSnapshot:
+        """Snapshot des paramètres de calcul, reconstruit seulement quand la version change."""
+        version = cls.version()
+        snap = cls._snapshot
+        if snap is None or snap.version != version:
+            snap = ParametresSnapshot.depuis_service(cls, version)
+            cls._snapshot = snap
+        return snap
 
     @classmethod
     def get(cls, cle: str, defaut: Any = None) -> Any:
@@ -241,6 +397,7 @@ class ParametreService:
         Retourne la valeur typée d'un paramètre.
         Priorité : Cache DB → DEFAULTS → defaut fourni.
         """
+        cls._check_version()
         if not cls._loaded:
             cls._load()
 
@@ -282,30 +439,75 @@ class ParametreService:
         Met à jour un paramètre en DB et invalide le cache.
         Crée le paramètre s'il n'existe pas encore.
         """
+        cls.set_many({cle: valeur}, user_id=user_id)
+
+    @classmethod
+    def set_many(cls, valeurs: dict[str, str], user_id: int = None) -> int:
+        """
+        Met à jour plusieurs paramètres dans une seule transaction, avec un
+        seul incrément du compteur de version. Retourne le nombre de paramètres écrits.
+        """
         from app import db
         from app.models import ParametreEtude
         from datetime import datetime
 
-        param = db.session.scalar(db.select(ParametreEtude).where(ParametreEtude.cle == cle))
-        if param:
-            param.valeur = str(valeur)
-            param.updated_by = user_id
-            param.updated_at = datetime.utcnow()
-        else:
-            meta = DEFAULTS.get(cle, {})
-            param = ParametreEtude(
-                cle=cle,
-                valeur=str(valeur),
-                type_valeur=meta.get('type_valeur', 'string'),
-                groupe=meta.get('groupe', 'FISCAL'),
-                libelle=meta.get('libelle', cle),
-                description=meta.get('description'),
-                updated_by=user_id,
-            )
-            db.session.add(param)
+        if not valeurs:
+            return 0
 
+        existants = {
+            p.cle: p for p in db.session.execute(
+                db.select(ParametreEtude).where(ParametreEtude.cle.in_(list(valeurs)))
+            ).scalars()
+        }
+        for cle, valeur in valeurs.items():
+            param = existants.get(cle)
+            if param:
+                param.valeur = str(valeur)
+                param.updated_by = user_id
+                param.updated_at = datetime.utcnow()
+            else:
+                meta = DEFAULTS.get(cle, {})
+                db.session.add(ParametreEtude(
+                    cle=cle,
+                    valeur=str(valeur),
+                    type_valeur=meta.get('type_valeur', 'string'),
+                    groupe=meta.get('groupe', 'FISCAL'),
+                    libelle=meta.get('libelle', cle),
+                    description=meta.get('description'),
+                    updated_by=user_id,
+                ))
+
+        nouvelle_version = cls._bump_version()
         db.session.commit()
+        cls._apres_modification(nouvelle_version)
+        return len(valeurs)
+
+    @classmethod
+    def _bump_version(cls) -> int:
+        """
+        Incrémente le compteur partagé dans la transaction courante (sans commit).
+        L'UPDATE atomique évite de perdre un incrément entre deux workers.
+        """
+        from app import db
+        from app.models import ParametreVersion
+        from datetime import datetime
+
+        result = db.session.execute(
+            db.update(ParametreVersion)
+            .where(ParametreVersion.id == 1)
+            .values(version=ParametreVersion.version + 1, updated_at=datetime.utcnow())
+        )
+        if not result.rowcount:
+            db.session.add(ParametreVersion(id=1, version=1))
+            db.session.flush()
+        return db.session.scalar(db.select(ParametreVersion.version).where(ParametreVersion.id == 1))
+
+    @classmethod
+    def _apres_modification(cls, nouvelle_version: int) -> None:
+        """Invalide le cache local ; le compteur lu en base est déjà connu."""
         cls.invalidate_cache()
+        cls._db_version = nouvelle_version
+        cls._checked_at = time.monotonic()
 
     @classmethod
     def seed_defaults(cls) -> int:
@@ -332,7 +534,8 @@ class ParametreService:
                 created += 1
 
         if created:
+            nouvelle_version = cls._bump_version()
             db.session.commit()
-            cls.invalidate_cache()
+            cls._apres_modification(nouvelle_version)
 
         return created
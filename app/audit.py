@@ -1,12 +1,22 @@
 import json
 from datetime import date, datetime
 from decimal import Decimal
-from flask import request, has_request_context
+from typing import Dict, NamedTuple, Optional, Tuple
+from flask import current_app, request, has_request_context
 from flask_login import current_user
 from sqlalchemy import event
-from sqlalchemy.orm.attributes import get_history
+from sqlalchemy.orm import Mapper
+from sqlalchemy.orm.attributes import instance_state
+from app.audit_chain import seal_logs
 from app.models import SecurityLog
 
+# Tables never audited
+EXCLUDED_TABLES = ('security_logs', 'profile_permissions', 'audit_chains')
+
+# Columns never logged, and columns not logged on update
+EXCLUDED_COLUMNS = ('password_hash',)
+EXCLUDED_UPDATE_COLUMNS = ('updated_at',)
+
 def serialize_val(val):
     if val is None:
         return None
@@ -18,123 +28,190 @@ def serialize_val(val):
         return val
     return str(val)
 
+class AuditPlan(NamedTuple):
+    """Audited columns of a mapper, computed once per mapper."""
+    table: str
+    create: Tuple[Tuple[str, str], ...]     # (attribute key, column name)
+    update: Dict[str, str]                  # attribute key -> column name
+    primary_key: Tuple[str, ...]            # attribute keys of the primary key
+
+_plans: Dict[Mapper, Optional[AuditPlan]] = {}
+
+def audit_plan(mapper: Mapper) -> Optional[AuditPlan]:
+    """Audit plan of a mapper (None if its table is not audited)."""
+    try:
+        return _plans[mapper]
+    except KeyError:
+        pass
+    table = getattr(mapper.local_table, 'name', None)
+    plan = None
+    if table and table not in EXCLUDED_TABLES:
+        columns = [(prop.key, prop.columns[0].key) for prop in mapper.column_attrs
+                   if prop.columns[0].table is mapper.local_table and prop.columns[0].key not in EXCLUDED_COLUMNS]
+        plan = AuditPlan(
+            table=table,
+            create=tuple(columns),
+            update={key: name for key, name in columns if name not in EXCLUDED_UPDATE_COLUMNS},
+            primary_key=tuple(mapper.get_property_by_column(c).key for c in mapper.primary_key),
+        )
+    _plans[mapper] = plan
+    return plan
+
+def _target_id(state, plan: AuditPlan) -> Optional[str]:
+    values = [state.dict.get(key) for key in plan.primary_key]
+    if any(v is None for v in values) and state.identity:
+        values = list(state.identity)
+    values = [str(v) for v in values if v is not None and v != '']
+    return ', '.join(values) or None
+
+def _audit_rows(session):
+    """One security_logs row per created, modified or deleted object of the flush."""
+    for obj in session.new:
+        state = instance_state(obj)
+        plan = audit_plan(state.mapper)
+        if plan is None:
+            continue
+        values = state.dict
+        changes = {name: [None, serialize_val(values[key])]
+                   for key, name in plan.create if values.get(key) is not None}
+        if changes:
+            yield ('CREATE', plan.table, _target_id(state, plan),
+                   f"Création d'un enregistrement dans {plan.table}", changes)
+
+    for obj in session.dirty:
+        state = instance_state(obj)
+        plan = audit_plan(state.mapper)
+        if plan is None:
+            continue
+        # Only attributes set since load have a committed state
+        changes = {}
+        for key in state.committed_state:
+            name = plan.update.get(key)
+            if name is None:
+                continue
+            hist = state.attrs[key].history
+            if hist.has_changes():
+                old = serialize_val(hist.deleted[0] if hist.deleted else None)
+                new = serialize_val(hist.added[0] if hist.added else None)
+                if old != new:
+                    changes[name] = [old, new]
+        if changes:
+            yield ('UPDATE', plan.table, _target_id(state, plan),
+                   f"Modification d'un enregistrement dans {plan.table}", changes)
+
+    for obj in session.deleted:
+        state = instance_state(obj)
+        plan = audit_plan(state.mapper)
+        if plan is None:
+            continue
+        yield ('DELETE', plan.table, _target_id(state, plan),
+               f"Suppression d'un enregistrement dans {plan.table}", None)
+
+def receive_after_flush(session, flush_context):
+    """
+    Build the audit rows of the flush and stage them on the session. Runs
+    after the INSERTs so created rows have their id; new/dirty/deleted and
+    attribute history still hold the pre-flush state.
+
+    Staged rows are chained and written by receive_before_commit, so the
+    head of the audit chain is locked for the commit only, not for the whole
+    business transaction. In async mode (see app.audit_writer), rows of
+    tables other than AUDIT_SYNC_TABLES are handed to the writer once the
+    transaction commits instead.
+    """
+    if not has_request_context():
+        return
+
+    rows = list(_audit_rows(session))
+    if not rows:
+        return
+
+    # Get context info
+    username = getattr(current_user, 'username', 'SYSTEM') if getattr(current_user, 'is_authenticated', False) else 'SYSTEM'
+    ip = getattr(request, 'remote_addr', None)
+    ua = getattr(request, 'user_agent', None)
+    uastring = ua.string if ua else None
+    now = datetime.utcnow()
+
+    rows = [
+        {'timestamp': now, 'event_type': event_type, 'username': username, 'ip_address': ip,
+         'user_agent': uastring, 'target_resource': table, 'target_id': target_id,
+         'details': details, 'changes': changes}
+        for event_type, table, target_id, details, changes in rows
+    ]
+
+    # Rows are tagged with the savepoint of the flush: a rollback to it discards them
+    pending = session.info.setdefault('audit_pending', [])
+    savepoint = session.get_nested_transaction()
+    writer = current_app.extensions.get('audit_writer')
+    if writer is not None:
+        sync_tables = current_app.config.get('AUDIT_SYNC_TABLES', ())
+        deferred = [row for row in rows if row['target_resource'] not in sync_tables]
+        if deferred:
+            pending.append((savepoint, writer, deferred))
+        rows = [row for row in rows if row['target_resource'] in sync_tables]
+    if rows:
+        pending.append((savepoint, None, rows))
+
+def receive_before_commit(session):
+    """
+    Write the staged audit rows with one INSERT (executemany), chained, just
+    before the outermost transaction commits. The session is flushed first so
+    the rows of the final flush are staged too.
+    """
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    pending = session.info.pop('audit_pending', None)
+    if not pending:
+        return
+
+    rows = []
+    for _, writer, staged in pending:
+        if writer is None:
+            rows.extend(staged)
+        else:
+            session.info.setdefault('audit_deferred', (writer, []))[1].extend(staged)
+    if rows:
+        conn = session.connection()
+        conn.execute(SecurityLog.__table__.insert(), seal_logs(conn, rows))
+
+def receive_after_commit(session):
+    deferred = session.info.pop('audit_deferred', None)
+    if deferred:
+        writer, rows = deferred
+        writer.submit(rows)
+
+def receive_after_soft_rollback(session, previous_transaction):
+    # Rollback to a savepoint: drop the rows staged inside it (or inside savepoints it contained)
+    pending = session.info.get('audit_pending')
+    if not pending or not previous_transaction.nested:
+        return
+
+    def rolled_back(savepoint):
+        while savepoint is not None:
+            if savepoint is previous_transaction:
+                return True
+            savepoint = savepoint.parent
+        return False
+
+    pending[:] = [entry for entry in pending if not rolled_back(entry[0])]
+
+def receive_after_transaction_end(session, transaction):
+    # Rollback of the outermost transaction: nothing to write nor to hand to the writer
+    if transaction.parent is None:
+        session.info.pop('audit_pending', None)
+        session.info.pop('audit_deferred', None)
+
 def register_audit_events(db):
     """
     Register SQLAlchemy event listeners to automatically track INSERT, UPDATE, DELETE.
     Will log modified fields and standard audit info directly into the SecurityLog table.
+    Registering again (one call per application) does not add a listener.
     """
-    
-    @event.listens_for(db.session, 'before_flush')
-    def receive_before_flush(session, flush_context, instances):
-        if not has_request_context():
-            return
-            
-        # Get context info
-        username = getattr(current_user, 'username', 'SYSTEM') if getattr(current_user, 'is_authenticated', False) else 'SYSTEM'
-        ip = getattr(request, 'remote_addr', None)
-        ua = getattr(request, 'user_agent', None)
-        uastring = ua.string if ua else None
-
-        logs = []
-        
-        # Process INSERTS (new objects)
-        for obj in list(session.new):
-            if isinstance(obj, SecurityLog): continue
-            
-            # Ensure the object has a __table__ mapped
-            if not hasattr(obj, '__table__'): continue
-            
-            table_name = obj.__table__.name
-            if table_name in ('security_logs', 'profile_permissions'): continue
-            
-            changes = {}
-            for c in obj.__table__.columns:
-                if c.key == 'password_hash': continue
-                val = getattr(obj, c.key, None)
-                if val is not None:
-                    changes[c.key] = [None, serialize_val(val)]
-                    
-            if changes:
-                # Primary key is often not set before flush for auto-increment IDs
-                pk_val = getattr(obj, 'id', None) 
-                # if not present, we get None
-                
-                log = SecurityLog(
-                    event_type='CREATE',
-                    username=username,
-                    ip_address=ip,
-                    user_agent=uastring,
-                    target_resource=table_name,
-                    target_id=str(pk_val) if pk_val else None,
-                    details=f"Création d'un enregistrement dans {table_name}",
-                    changes=changes
-                )
-                logs.append(log)
-
-        # Process UPDATES (dirty objects)
-        for obj in list(session.dirty):
-            if isinstance(obj, SecurityLog): continue
-            if not hasattr(obj, '__table__'): continue
-            
-            table_name = obj.__table__.name
-            if table_name in ('security_logs', 'profile_permissions'): continue
-            
-            changes = {}
-            for c in obj.__table__.columns:
-                if c.key in ('password_hash', 'updated_at'): continue
-                
-                try:
-                    hist = get_history(obj, c.key)
-                    if hist.has_changes():
-                        old = hist.deleted[0] if hist.deleted else None
-                        new = hist.added[0] if hist.added else None
-                        
-                        s_old = serialize_val(old)
-                        s_new = serialize_val(new)
-                        
-                        # Only log if it really changed
-                        if s_old != s_new:
-                            changes[c.key] = [s_old, s_new]
-                except Exception:
-                    pass
-                    
-            if changes:
-                # Primary key is known for dirty objects
-                pk_val = getattr(obj, 'id', getattr(obj, 'code', ''))
-                
-                log = SecurityLog(
-                    event_type='UPDATE',
-                    username=username,
-                    ip_address=ip,
-                    user_agent=uastring,
-                    target_resource=table_name,
-                    target_id=str(pk_val) if pk_val else None,
-                    details=f"Modification d'un enregistrement dans {table_name}",
-                    changes=changes
-                )
-                logs.append(log)
-
-        # Process DELETES
-        for obj in list(session.deleted):
-            if isinstance(obj, SecurityLog): continue
-            if not hasattr(obj, '__table__'): continue
-            
-            table_name = obj.__table__.name
-            if table_name in ('security_logs', 'profile_permissions'): continue
-            
-            pk_val = getattr(obj, 'id', getattr(obj, 'code', ''))
-            
-            log = SecurityLog(
-                event_type='DELETE',
-                username=username,
-                ip_address=ip,
-                user_agent=uastring,
-                target_resource=table_name,
-                target_id=str(pk_val) if pk_val else None,
-                details=f"Suppression d'un enregistrement dans {table_name}"
-            )
-            logs.append(log)
-
-        if logs:
-            session.add_all(logs)
-
+    for name, listener in (('after_flush', receive_after_flush), ('before_commit', receive_before_commit),
+                           ('after_commit', receive_after_commit),
+                           ('after_soft_rollback', receive_after_soft_rollback),
+                           ('after_transaction_end', receive_after_transaction_end)):
+        if not event.contains(db.session, name, listener):
+            event.listen(db.session, name, listener)
@@ -0,0 +1,72 @@
+"""
+Banc d'essai du journal d'audit (commande `flask bench-audit`).
+
+Chronomètre les flushs d'un lot de clients (création, modification de deux
+champs, suppression) dans un contexte de requête, où l'audit est actif, et
+hors requête, où il ne l'est pas. La différence, ramenée à l'objet, est le
+surcoût de l'audit.
+
+Le résultat est un dict sérialisable en JSON.
+"""
+
+import statistics
+import time
+from typing import Any, Dict, List
+
+from flask import current_app
+
+from app import db
+
+
+def _phases(nb_objets: int) -> List[tuple]:
+    from app.models import Client
+
+    clients: List[Client] = []
+
+    def creer():
+        clients[:] = [Client(type_client='PHYSIQUE', nom=f'Client {n}', prenom='Bench', telephone=f'77{n:07d}',
+                             email=f'client{n}@exemple.sn') for n in range(nb_objets)]
+        db.session.add_all(clients)
+
+    def modifier():
+        for client in clients:
+            client.adresse = 'Dakar'
+            client.kyc_statut = 'VALIDE'
+
+    def supprimer():
+        for client in clients:
+            db.session.delete(client)
+
+    return [('creation', creer), ('modification', modifier), ('suppression', supprimer)]
+
+
+def _mesurer(nb_objets: int) -> Dict[str, float]:
+    """Durée (ms) du flush de chaque phase."""
+    durees = {}
+    for nom, preparer in _phases(nb_objets):
+        preparer()
+        t0 = time.perf_counter()
+        db.session.flush()
+        durees[nom] = (time.perf_counter() - t0) * 1000
+    db.session.rollback()
+    return durees
+
+
+def run_benchmark(nb_objets: int = 1000, repetitions: int = 5) -> Dict[str, Any]:
+    """Médiane par phase avec et sans audit, et surcoût par objet (µs)."""
+    mesures = {'sans_audit': [], 'avec_audit': []}
+    for _ in range(repetitions):
+        mesures['sans_audit'].append(_mesurer(nb_objets))
+        with current_app.test_request_context():
+            mesures['avec_audit'].append(_mesurer(nb_objets))
+
+    resultats = {'objets': nb_objets, 'repetitions': repetitions, 'phases': {}}
+    for nom, _ in _phases(0):
+        sans = statistics.median(m[nom] for m in mesures['sans_audit'])
+        avec = statistics.median(m[nom] for m in mesures['avec_audit'])
+        resultats['phases'][nom] = {
+            'sans_audit_ms': round(sans, 1),
+            'avec_audit_ms': round(avec, 1),
+            'surcout_us_par_objet': round((avec - sans) * 1000 / nb_objets, 1),
+        }
+    return resultats
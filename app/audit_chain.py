@@ -0,0 +1,260 @@
+"""
+Tamper-evident hash chains of the audit trail and of the repertoire.
+
+Every security_logs row and every repertoire entry (archived Acte) carries
+the SHA-256 of its content chained to the hash of the previous entry:
+
+    hash(n) = sha256(hash(n - 1) + canonical JSON of entry n)
+
+Rows are chained when they are written: the chain head (audit_chains row)
+is locked with SELECT ... FOR UPDATE, the new rows are hashed after the
+last hash, and the head is moved, in the writing transaction. As with the
+document numbering (app/sequences.py), the lock is held until that
+transaction ends, so writers of a chain are serialized and chain order is
+insertion order: security_logs are chained by id, repertoire entries by
+their rang_chaine. The audit rows of a business transaction are staged
+during its flushes and written in its before_commit hook (app/audit.py):
+the security_logs head is only locked for the commit. In AUDIT_MODE =
+'async' the audit rows are chained by the writer's short batch
+transactions instead of the business ones.
+
+With AUDIT_CHAIN_KEY set, hashes are HMAC-SHA256 with that key: someone
+who can write to the database but does not have the key cannot recompute
+a consistent chain after an edit.
+
+verify() re-hashes only the entries after the last verified checkpoint,
+then moves the checkpoint: an hourly check costs the new rows only. It
+also re-reads the checkpoint entry and makes sure the last chained hash is
+still present, so edits, insertions and deletions of new entries, of the
+checkpoint entry and of the tail are detected. full=True re-verifies from
+the origin of the chain (rows written before the chain existed, and
+security_logs months moved to archives, are outside of it).
+"""
+
+import hashlib
+import hmac
+import json
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select, update
+
+from app.models import Acte, AuditChain, SecurityLog
+
+GENESIS = '0' * 64
+
+LOGS = 'security_logs'
+REPERTOIRE = 'repertoire'
+
+# HMAC key of the process (init_audit_chain), None: plain SHA-256
+_key: Optional[bytes] = None
+
+LOG_FIELDS = ('timestamp', 'event_type', 'username', 'ip_address', 'user_agent', 'details',
+              'target_resource', 'target_id', 'changes')
+
+
+def utc(valeur: Optional[datetime]) -> Optional[datetime]:
+    """Aware UTC datetime (naive values are UTC, see datetime.utcnow defaults)."""
+    if valeur is None:
+        return None
+    if valeur.tzinfo is None:
+        return valeur.replace(tzinfo=timezone.utc)
+    return valeur.astimezone(timezone.utc)
+
+
+def _canonical(valeur):
+    if isinstance(valeur, datetime):
+        return utc(valeur).replace(tzinfo=None).isoformat(timespec='microseconds')
+    if isinstance(valeur, date):
+        return valeur.isoformat()
+    return valeur
+
+
+def chain_hash(precedent: str, champs: Dict) -> str:
+    contenu = json.dumps({k: _canonical(v) for k, v in champs.items()}, sort_keys=True,
+                         separators=(',', ':'), ensure_ascii=False, default=str)
+    message = f'{precedent}\n{contenu}'.encode('utf-8')
+    if _key is not None:
+        return hmac.new(_key, message, hashlib.sha256).hexdigest()
+    return hashlib.sha256(message).hexdigest()
+
+
+def log_fields(row) -> Dict:
+    """Hashed content of a security_logs row (dict, Row mapping or SecurityLog)."""
+    if isinstance(row, SecurityLog):
+        return {name: getattr(row, name) for name in LOG_FIELDS}
+    return {name: row[name] for name in LOG_FIELDS}
+
+
+def acte_fields(acte: Acte) -> Dict:
+    """Hashed content of a repertoire entry: what must not change once an acte is archived."""
+    contenu = json.dumps(acte.contenu_json, sort_keys=True, ensure_ascii=False, default=str)
+    return {
+        'rang': acte.rang_chaine, 'id': acte.id, 'numero_repertoire': acte.numero_repertoire,
+        'dossier_id': acte.dossier_id, 'type_acte': acte.type_acte, 'type_acte_id': acte.type_acte_id,
+        'statut': acte.statut, 'date_signature': acte.date_signature, 'date_archivage': acte.date_archivage,
+        'archive_par_id': acte.archive_par_id, 'finalise_par_id': acte.finalise_par_id,
+        'signature_electronique': acte.signature_electronique,
+        'contenu_html': hashlib.sha256((acte.contenu_html or '').encode('utf-8')).hexdigest(),
+        'contenu_json': hashlib.sha256(contenu.encode('utf-8')).hexdigest(),
+    }
+
+
+# ── Writing ─────────────────────────────────────────────────────────────────
+
+def _lock_head(conn, name: str):
+    """Lock the head of a chain until the end of the transaction (created on first use)."""
+    table = AuditChain.__table__
+    head = conn.execute(select(table).where(table.c.name == name).with_for_update()).mappings().first()
+    if head is None:
+        conn.execute(table.insert().values(name=name, length=0, last_hash=GENESIS, origin_position=0,
+                                           origin_hash=GENESIS, checkpoint_position=0, checkpoint_hash=GENESIS))
+        head = conn.execute(select(table).where(table.c.name == name).with_for_update()).mappings().first()
+    return head
+
+
+def _move_head(conn, name: str, added: int, last_hash: str) -> None:
+    table = AuditChain.__table__
+    conn.execute(update(table).where(table.c.name == name)
+                 .values(length=table.c.length + added, last_hash=last_hash))
+
+
+def seal_logs(conn, rows: List[Dict]) -> List[Dict]:
+    """Chain security_logs rows (dicts) about to be inserted on `conn`; sets timestamp (UTC) and chain_hash."""
+    if not rows:
+        return rows
+    precedent = _lock_head(conn, LOGS)['last_hash']
+    for row in rows:
+        row['timestamp'] = utc(row.get('timestamp') or datetime.utcnow())
+        precedent = row['chain_hash'] = chain_hash(precedent, log_fields(row))
+    _move_head(conn, LOGS, len(rows), precedent)
+    return rows
+
+
+def receive_before_insert(mapper, conn, target: SecurityLog) -> None:
+    """SecurityLog objects added through the ORM (login events...) are chained too."""
+    if target.chain_hash is None:
+        row = {name: getattr(target, name) for name in LOG_FIELDS}
+        seal_logs(conn, [row])
+        target.timestamp, target.chain_hash = row['timestamp'], row['chain_hash']
+
+
+def seal_actes(conn, actes: Iterable[Acte]) -> None:
+    """Append archived actes to the repertoire chain (rang_chaine, hash_chaine), in their order."""
+    actes = list(actes)
+    if not actes:
+        return
+    head = _lock_head(conn, REPERTOIRE)
+    precedent, rang = head['last_hash'], head['length']
+    for acte in actes:
+        rang += 1
+        acte.rang_chaine = rang
+        acte.date_archivage = utc(acte.date_archivage)
+        precedent = acte.hash_chaine = chain_hash(precedent, acte_fields(acte))
+    _move_head(conn, REPERTOIRE, len(actes), precedent)
+
+
+# ── Verification ────────────────────────────────────────────────────────────
+
+def _entries(session, name: str, after: int, batch: int):
+    """(position, stored hash, hashed fields) of the entries after `after`, in chain order."""
+    if name == LOGS:
+        table = SecurityLog.__table__
+        requete = select(table).where(table.c.id > after).order_by(table.c.id)
+        for row in session.execute(requete.execution_options(yield_per=batch)).mappings():
+            yield row['id'], row['chain_hash'], log_fields(row)
+    else:
+        requete = select(Acte).where(Acte.rang_chaine > after).order_by(Acte.rang_chaine)
+        for acte in session.scalars(requete.execution_options(yield_per=batch)):
+            yield acte.rang_chaine, acte.hash_chaine, acte_fields(acte)
+
+
+def _entry(session, name: str, position: int):
+    """(stored hash, hashed fields) of the entry at `position`, None if it does not exist."""
+    if name == LOGS:
+        row = session.execute(select(SecurityLog.__table__).where(SecurityLog.id == position)).mappings().first()
+        return row and (row['chain_hash'], log_fields(row))
+    acte = session.scalars(select(Acte).where(Acte.rang_chaine == position)).first()
+    return acte and (acte.hash_chaine, acte_fields(acte))
+
+
+def _previous_hash(session, name: str, position: int, origin_position: int, origin_hash: str) -> Optional[str]:
+    """Stored hash of the entry before `position` (the origin hash for the first entry)."""
+    if name == LOGS:
+        requete = select(SecurityLog.chain_hash).where(SecurityLog.id < position, SecurityLog.id > origin_position)
+        requete = requete.order_by(SecurityLog.id.desc())
+    else:
+        requete = select(Acte.hash_chaine).where(Acte.rang_chaine < position, Acte.rang_chaine > origin_position)
+        requete = requete.order_by(Acte.rang_chaine.desc())
+    precedent = session.scalars(requete.limit(1)).first()
+    return precedent if precedent is not None else origin_hash
+
+
+def _checkpoint_intact(session, name: str, head: AuditChain) -> bool:
+    """The checkpoint entry still exists and still hashes to the checkpoint hash."""
+    entree = _entry(session, name, head.checkpoint_position)
+    if entree is None:
+        return False
+    stocke, champs = entree
+    precedent = _previous_hash(session, name, head.checkpoint_position, head.origin_position, head.origin_hash)
+    return stocke == head.checkpoint_hash == chain_hash(precedent, champs)
+
+
+def verify(session, name: str, full: bool = False, batch: int = 5000) -> Dict:
+    """
+    Verify a chain from its checkpoint (or origin if full) and move the
+    checkpoint when it is intact. Returns {'chain', 'checked', 'position',
+    'ok', 'error'}; the first broken entry stops the check.
+    """
+    resultat = {'chain': name, 'checked': 0, 'position': None, 'ok': True, 'error': None}
+    head = session.execute(select(AuditChain).where(AuditChain.name == name)).scalar_one_or_none()
+    if head is None:
+        return resultat
+    position, precedent = ((head.origin_position, head.origin_hash) if full
+                           else (head.checkpoint_position, head.checkpoint_hash))
+    last_hash = head.last_hash
+    resultat['position'] = position
+
+    if not full and position > head.origin_position and not _checkpoint_intact(session, name, head):
+        resultat.update(ok=False, error=f"checkpoint entry {position} modified or deleted")
+        return resultat
+
+    atteint = precedent == last_hash
+    for position, stocke, champs in _entries(session, name, position, batch):
+        attendu = chain_hash(precedent, champs)
+        if stocke != attendu:
+            resultat.update(ok=False, error=f"entry {position} modified, inserted or preceded by a deletion")
+            return resultat
+        precedent = attendu
+        resultat['checked'] += 1
+        resultat['position'] = position
+        atteint = atteint or precedent == last_hash
+    if not atteint:
+        resultat.update(ok=False, error="last chained entries deleted")
+        return resultat
+
+    head.checkpoint_position, head.checkpoint_hash = resultat['position'], precedent
+    head.checked_at = datetime.now(timezone.utc)
+    session.commit()
+    return resultat
+
+
+def move_origin(conn, name: str, position: int, hash_: str) -> None:
+    """Start the chain after `position` (entries up to it moved out of the database)."""
+    table = AuditChain.__table__
+    head = _lock_head(conn, name)
+    if position <= head['origin_position']:
+        return
+    valeurs = {'origin_position': position, 'origin_hash': hash_}
+    if head['checkpoint_position'] < position:
+        valeurs.update(checkpoint_position=position, checkpoint_hash=hash_)
+    conn.execute(update(table).where(table.c.name == name).values(**valeurs))
+
+
+def init_audit_chain(app) -> None:
+    """Set the HMAC key of the chains and chain the SecurityLog objects inserted through the ORM."""
+    global _key
+    cle = app.config.get('AUDIT_CHAIN_KEY')
+    _key = cle.encode('utf-8') if cle else None
+    if not event.contains(SecurityLog, 'before_insert', receive_before_insert):
+        event.listen(SecurityLog, 'before_insert', receive_before_insert)
@@ -0,0 +1,233 @@
+"""
+Asynchronous audit writer (AUDIT_MODE = 'async').
+
+Audit rows of a committed transaction are handed to the AuditWriter instead
+of being inserted in the business transaction:
+
+  1. submit() appends them to the open spool segment (one JSON line per
+     row, then fsync) and to the in-memory batch: once it returns, the
+     rows survive a crash;
+  2. a background thread writes the batch when it reaches
+     AUDIT_BATCH_SIZE rows or every AUDIT_FLUSH_INTERVAL seconds: the
+     segment is closed, its rows inserted with one executemany INSERT in
+     their own transaction, then the segment file is deleted;
+  3. at startup, segments left by a stopped process are replayed.
+
+Each process keeps its segments locked until they are written, so a
+process only replays the files of processes that are gone. Delivery is at
+least once: a crash between the INSERT and the file deletion replays the
+batch.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from app.audit_chain import seal_logs
+from app.models import SecurityLog
+
+logger = logging.getLogger(__name__)
+
+
+def _lock(fichier) -> bool:
+    """Exclusive, non-blocking lock on an open spool file; False if another process holds it."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fichier.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            fichier.seek(0)
+            msvcrt.locking(fichier.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _remove(path: Path, fichier) -> None:
+    """
+    Delete a spool file while its lock is still held, then close it: once
+    the lock is released nobody can lock and replay it again.
+    """
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except PermissionError:  # Windows: an open file cannot be deleted
+        fichier.close()
+        path.unlink(missing_ok=True)
+    fichier.close()
+
+
+def _encode(row: Dict) -> str:
+    return json.dumps(dict(row, timestamp=row['timestamp'].isoformat()), ensure_ascii=False)
+
+
+def _decode(line: str) -> Dict:
+    row = json.loads(line)
+    row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+    return row
+
+
+class _Segment:
+    """Spool file of one batch, locked by its process until the batch is written."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.fichier = open(path, 'a+', encoding='utf-8')
+        _lock(self.fichier)
+        self.rows: List[Dict] = []
+
+    def append(self, rows: List[Dict]) -> None:
+        self.fichier.write(''.join(_encode(row) + '\n' for row in rows))
+        self.fichier.flush()
+        os.fsync(self.fichier.fileno())
+        self.rows.extend(rows)
+
+    def delete(self) -> None:
+        _remove(self.path, self.fichier)
+
+
+class AuditWriter:
+    def __init__(self, engine, spool_dir: str, batch_size: int = 500, flush_interval: float = 2.0):
+        self.engine = engine
+        self.spool_dir = Path(spool_dir)
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._current: Optional[_Segment] = None
+        self._closed: deque = deque()
+        self._count = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _new_segment(self) -> _Segment:
+        self._count += 1
+        return _Segment(self.spool_dir / f'audit-{os.getpid()}-{time.time_ns()}-{self._count}.jsonl')
+
+    def _insert(self, rows: List[Dict]) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(SecurityLog.__table__.insert(), seal_logs(conn, rows))
+
+    def submit(self, rows: Iterable[Dict]) -> None:
+        """Spool the rows of a committed transaction (durable on return) and queue them."""
+        rows = list(rows)
+        if not rows:
+            return
+        with self._cond:
+            if self._current is None:
+                self._current = self._new_segment()
+            self._current.append(rows)
+            if len(self._current.rows) >= self.batch_size:
+                self._cond.notify()
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far. A failed INSERT keeps its segment
+        (and the following ones) for the next flush. Returns the number of
+        rows written.
+        """
+        with self._flush_lock:
+            with self._cond:
+                if self._current is not None:
+                    self._closed.append(self._current)
+                    self._current = None
+            written = 0
+            while self._closed:
+                segment = self._closed[0]
+                try:
+                    self._insert(segment.rows)
+                except Exception:
+                    logger.exception("Audit: %s row(s) kept in %s, retried at next flush",
+                                     len(segment.rows), segment.path.name)
+                    break
+                segment.delete()
+                self._closed.popleft()
+                written += len(segment.rows)
+            return written
+
+    def replay(self) -> int:
+        """Write the segments left by stopped processes. Returns the number of rows written."""
+        written = 0
+        for path in sorted(self.spool_dir.glob('audit-*.jsonl')):
+            try:
+                fichier = open(path, 'r+', encoding='utf-8')
+            except FileNotFoundError:
+                continue  # replayed by another process in the meantime
+            with fichier:
+                # Locked after another process replayed and deleted it: nothing left to write
+                if not _lock(fichier) or os.fstat(fichier.fileno()).st_nlink == 0:
+                    continue
+                rows = []
+                for line in fichier:
+                    try:
+                        rows.append(_decode(line))
+                    except ValueError:
+                        # Last line cut by a crash during the write: never acknowledged
+                        logger.warning("Audit: incomplete line skipped in %s", path.name)
+                if rows:
+                    self._insert(rows)
+                    written += len(rows)
+                _remove(path, fichier)
+        if written:
+            logger.info("Audit: %s spooled row(s) replayed", written)
+        return written
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping.is_set() or (
+                        self._current is not None and len(self._current.rows) >= self.batch_size),
+                    timeout=self.flush_interval)
+            self.flush()
+
+    def start(self) -> None:
+        """Start the background writer thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the thread and write what is left (segments that still fail stay spooled)."""
+        self._stopping.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+
+def init_audit_writer(app) -> Optional[AuditWriter]:
+    """Create, replay and start the writer of the application when AUDIT_MODE is 'async'."""
+    import atexit
+    from app import db
+
+    if app.config.get('AUDIT_MODE', 'sync') != 'async':
+        return None
+    spool_dir = app.config.get('AUDIT_SPOOL_DIR') or os.path.join(app.instance_path, 'audit_spool')
+    with app.app_context():
+        writer = AuditWriter(db.engine, spool_dir, batch_size=app.config.get('AUDIT_BATCH_SIZE', 500),
+                             flush_interval=app.config.get('AUDIT_FLUSH_INTERVAL', 2.0))
+    try:
+        writer.replay()
+    except Exception:
+        logger.exception("Audit: spool replay failed, retried at next startup")
+    writer.start()
+    atexit.register(writer.stop)
+    app.extensions['audit_writer'] = writer
+    return writer
@@ -134,8 +134,349 @@ def seed_profiles():
     print("Profils prédéfinis initialisés avec succès.")
 
 
+@click.command('bench-baremes')
+@click.option('-n', '--iterations', default=500, show_default=True, help='Appels mesurés par calculateur.')
+@click.option('--graine', default=42, show_default=True, help='Graine du générateur de saisies.')
+@click.option('--filtre', default=None, help='Ne mesurer que les slugs / codes contenant ce texte.')
+@click.option('--sqlite', 'sqlite_path', default=None,
+              help='Base SQLite locale utilisée pour la mesure (défaut : instance/bench_baremes.db).')
+@click.option('--json', 'json_path', default=None, help='Ecrire les résultats dans ce fichier JSON.')
+@click.option('--comparer', 'reference_path', default=None, help='Fichier JSON d\'une exécution précédente.')
+@with_appcontext
+def bench_baremes(iterations, graine, filtre, sqlite_path, json_path, reference_path):
+    """Mesure les performances de tous les calculateurs de barèmes."""
+    import json
+    import os
+    from flask import current_app
+    from app import create_app
+    from app.config import Config
+    from app.actes.services.parametres import ParametreService
+    from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+    from app.actes.calculators.benchmark import run_benchmark, comparer, exporter_baremes, copier_baremes
+
+    # Les barèmes dynamiques sont recopiés depuis la base de l'application
+    # quand elle est joignable ; sinon ceux déjà présents dans la base
+    # SQLite locale sont utilisés (mesure hors ligne).
+    try:
+        baremes = exporter_baremes()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Base de l'application injoignable ({e.__class__.__name__}) : barèmes de la base locale utilisés.")
+        baremes = []
+
+    if sqlite_path is None:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        sqlite_path = os.path.join(current_app.instance_path, 'bench_baremes.db')
+    uri = 'sqlite://' if sqlite_path == ':memory:' else f'sqlite:///{os.path.abspath(sqlite_path)}'
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = uri
+
+    bench_app = create_app(BenchConfig)
+    with bench_app.app_context():
+        db.create_all()
+        ParametreService.invalidate_cache()
+        ParametreService.seed_defaults()
+        if baremes:
+            copier_baremes(baremes)
+        DynamicCalculatorEngine.invalidate_plan()
+        try:
+            resultats = run_benchmark(iterations=iterations, graine=graine, filtre=filtre)
+        finally:
+            DynamicCalculatorEngine.invalidate_plan()
+            ParametreService.invalidate_cache()
+
+    print(f"{'Calculateur':<32}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}{'appels/s':>12}{'mémoire o':>12}{'erreurs':>9}")
+    for section, prefixe in (('calculateurs', ''), ('baremes', 'dyn:')):
+        for nom, st in resultats[section].items():
+            print(f"{prefixe + nom:<32}{st['p50_us']:>10}{st['p95_us']:>10}{st['p99_us']:>10}"
+                  f"{st['appels_par_seconde']:>12}{st['memoire_moyenne_octets']:>12}{st['erreurs']:>9}")
+
+    if reference_path:
+        with open(reference_path, encoding='utf-8') as f:
+            resultats['comparaison'] = comparer(resultats, json.load(f))
+        print(f"\nEcarts par rapport à {reference_path} :")
+        for e in resultats['comparaison']:
+            print(f"  {e['nom']:<30} p50 {e['p50_pct']:+.1f}%  p99 {e['p99_pct']:+.1f}%"
+                  if e['p50_pct'] is not None and e['p99_pct'] is not None else f"  {e['nom']:<30} n/a")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {json_path}.")
+
+
+@click.command('bench-comptabilite')
+@click.option('-n', '--mouvements', default=500000, show_default=True, help='Mouvements du grand livre généré.')
+@click.option('--graine', default=42, show_default=True, help='Graine du générateur d\'écritures.')
+@click.option('--repetitions', default=3, show_default=True, help='Appels mesurés par état.')
+@click.option('--sqlite', 'sqlite_path', default=None,
+              help='Base SQLite locale utilisée pour la mesure, recréée à chaque exécution '
+                   '(défaut : instance/bench_comptabilite.db). Un fichier existant est refusé sans --ecraser.')
+@click.option('--ecraser', is_flag=True, help='Supprimer le fichier --sqlite s\'il existe déjà.')
+@click.option('--json', 'json_path', default=None, help='Ecrire les résultats dans ce fichier JSON.')
+@with_appcontext
+def bench_comptabilite(mouvements, graine, repetitions, sqlite_path, ecraser, json_path):
+    """Mesure la Balance Générale, les totaux du tableau de bord et le Grand Livre."""
+    import json
+    import os
+    from flask import current_app
+    from app import create_app
+    from app.config import Config
+    from app.comptabilite.benchmark import generer_grand_livre, run_benchmark
+
+    if sqlite_path is None:
+        # Base dédiée au benchmark : toujours recréée
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        sqlite_path = os.path.join(current_app.instance_path, 'bench_comptabilite.db')
+        ecraser = True
+    if sqlite_path != ':memory:' and os.path.exists(sqlite_path):
+        if not ecraser:
+            raise click.UsageError(f"{sqlite_path} existe déjà : il serait supprimé. Ajouter --ecraser pour confirmer.")
+        os.remove(sqlite_path)
+    uri = 'sqlite://' if sqlite_path == ':memory:' else f'sqlite:///{os.path.abspath(sqlite_path)}'
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = uri
+
+    bench_app = create_app(BenchConfig)
+    with bench_app.app_context():
+        db.create_all()
+        print(f'Génération de {mouvements} mouvements...')
+        generer_grand_livre(mouvements, graine=graine)
+        resultats = run_benchmark(repetitions=repetitions)
+
+    print(f"{'Etat':<24}{'min ms':>10}{'médiane ms':>12}{'max ms':>10}")
+    for nom, st in resultats['mesures'].items():
+        print(f"{nom:<24}{st['min_ms']:>10}{st['mediane_ms']:>12}{st['max_ms']:>10}")
+    print(f"Balance Générale : x{resultats['gain_balance']} par rapport au calcul compte par compte.")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {json_path}.")
+
+
+@click.command('bench-audit')
+@click.option('-n', '--objets', default=1000, show_default=True, help='Objets créés, modifiés puis supprimés par flush.')
+@click.option('--repetitions', default=5, show_default=True, help='Mesures par phase.')
+@click.option('--json', 'json_path', default=None, help='Ecrire les résultats dans ce fichier JSON.')
+@with_appcontext
+def bench_audit(objets, repetitions, json_path):
+    """Mesure le surcoût du journal d'audit par objet flushé (base SQLite en mémoire)."""
+    import json
+    from app import create_app
+    from app.config import Config
+    from app.audit_benchmark import run_benchmark
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+    bench_app = create_app(BenchConfig)
+    with bench_app.app_context():
+        db.create_all()
+        resultats = run_benchmark(nb_objets=objets, repetitions=repetitions)
+
+    print(f"{'Phase':<16}{'sans audit ms':>15}{'avec audit ms':>15}{'surcoût µs/objet':>18}")
+    for nom, st in resultats['phases'].items():
+        print(f"{nom:<16}{st['sans_audit_ms']:>15}{st['avec_audit_ms']:>15}{st['surcout_us_par_objet']:>18}")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {json_path}.")
+
+
+@click.command('rebuild-soldes')
+@click.option('--verifier-seulement', is_flag=True, help='Comparer sans reconstruire (code retour 1 si écart).')
+@with_appcontext
+def rebuild_soldes(verifier_seulement):
+    """Recalcule la table compta_soldes à partir des écritures validées."""
+    from app.comptabilite.service import ComptabiliteService
+
+    ecarts = ComptabiliteService.verifier_soldes()
+    for e in ecarts:
+        print(f"Compte {e['compte_id']} {e['periode']} : attendu D={e['attendu'][0]} C={e['attendu'][1]} "
+              f"({e['attendu'][2]} mvts), trouvé D={e['actuel'][0]} C={e['actuel'][1]} ({e['actuel'][2]} mvts)")
+    print(f'{len(ecarts)} écart(s) détecté(s).')
+
+    if verifier_seulement:
+        if ecarts:
+            raise SystemExit(1)
+        return
+
+    lignes = ComptabiliteService.rebuild_soldes()
+    restants = ComptabiliteService.verifier_soldes()
+    print(f'{lignes} ligne(s) de solde reconstruite(s), {len(restants)} écart(s) après reconstruction.')
+    if restants:
+        raise SystemExit(1)
+
+
+@click.command('import-journal')
+@click.argument('fichier', type=click.Path(exists=True, dir_okay=False))
+@click.option('--valider', is_flag=True, help='Importer les écritures comme validées (soldes mis à jour).')
+@click.option('--verifier-seulement', is_flag=True, help='Contrôler le fichier sans rien importer.')
+@click.option('--separateur', default=';', show_default=True, help='Séparateur des fichiers CSV.')
+@click.option('--lot', 'taille_lot', default=5000, show_default=True, help='Lignes par transaction.')
+@click.option('--rapport', 'rapport_path', default=None, help='Ecrire les erreurs dans ce fichier CSV.')
+@with_appcontext
+def import_journal(fichier, valider, verifier_seulement, separateur, taille_lot, rapport_path):
+    """Importe en masse un journal (relevé bancaire, grand livre historique) CSV ou XLSX."""
+    import csv
+    import time
+    from app.comptabilite.imports import importer
+
+    format_ = 'xlsx' if fichier.lower().endswith('.xlsx') else 'csv'
+    debut = time.perf_counter()
+    with open(fichier, 'rb') as f:
+        rapport = importer(f, format_=format_, valider=valider, verifier_seulement=verifier_seulement,
+                           taille_lot=taille_lot, separateur=separateur)
+    duree = time.perf_counter() - debut
+
+    for e in rapport['erreurs'][:20]:
+        print(f"Ligne {e['ligne']} : {e['message']}")
+    if len(rapport['erreurs']) > 20:
+        print(f"... {len(rapport['erreurs']) - 20} autre(s) erreur(s).")
+    print(f"{rapport['lignes']} ligne(s) lue(s) en {duree:.1f} s, {rapport['ecritures']} écriture(s) et "
+          f"{rapport['mouvements']} mouvement(s) importé(s), {rapport['rejetees']} écriture(s) rejetée(s).")
+
+    if rapport_path:
+        with open(rapport_path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            writer.writerow(['Ligne', 'Erreur'])
+            writer.writerows((e['ligne'], e['message']) for e in rapport['erreurs'])
+        print(f"Rapport écrit dans {rapport_path}.")
+    if rapport['erreurs']:
+        raise SystemExit(1)
+
+
+@click.command('cloturer-exercice')
+@click.argument('annee', type=int)
+@with_appcontext
+def cloturer_exercice(annee):
+    """Clôture un exercice : soldes figés, à-nouveaux passés au 1er janvier suivant."""
+    from app.comptabilite.service import ComptabiliteService
+
+    try:
+        exercice = ComptabiliteService.cloturer_exercice(annee)
+    except ValueError as e:
+        print(f"Clôture impossible : {e}")
+        raise SystemExit(1)
+    piece = exercice.ecriture_an.numero_piece if exercice.ecriture_an else 'aucune'
+    print(f"Exercice {annee} clôturé : {len(exercice.soldes)} compte(s) figé(s), "
+          f"résultat {exercice.resultat}, écriture d'à-nouveaux {piece}.")
+
+
+@click.command('rapprocher')
+@click.argument('compte')
+@click.option('--releve', 'releve_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='Importer d\'abord ce relevé bancaire (CSV ou XLSX).')
+@click.option('--separateur', default=';', show_default=True, help='Séparateur des fichiers CSV.')
+@click.option('--fenetre', default=3, show_default=True, help='Écart maximal en jours entre banque et écriture.')
+@with_appcontext
+def rapprocher(compte, releve_path, separateur, fenetre):
+    """Rapproche automatiquement un compte 512 (512-OFFICE, 512-CLIENT) avec ses relevés bancaires."""
+    import os
+    import time
+    from app.comptabilite import rapprochement
+
+    try:
+        compte_id = rapprochement.compte_banque(compte).id
+        if releve_path:
+            format_ = 'xlsx' if releve_path.lower().endswith('.xlsx') else 'csv'
+            with open(releve_path, 'rb') as f:
+                rapport = rapprochement.importer_releve(f, compte_id, format_=format_,
+                                                        nom_fichier=os.path.basename(releve_path),
+                                                        separateur=separateur)
+            for e in rapport['erreurs'][:20]:
+                print(f"Ligne {e['ligne']} : {e['message']}")
+            print(f"Relevé : {rapport['importees']} ligne(s) importée(s), {rapport['doublons']} déjà présente(s), "
+                  f"{len(rapport['erreurs'])} en erreur.")
+    except ValueError as e:
+        print(str(e))
+        raise SystemExit(1)
+
+    debut = time.perf_counter()
+    rapport = rapprochement.rapprocher(compte_id, fenetre=fenetre)
+    methodes = ', '.join(f"{m} {n}" for m, n in sorted(rapport['par_methode'].items())) or 'aucun'
+    print(f"{rapport['rapprochees']} ligne(s) sur {rapport['lignes']} rapprochée(s) avec {rapport['mouvements']} "
+          f"mouvement(s) en {time.perf_counter() - debut:.1f} s ({methodes}).")
+
+
+@click.command('rollover-logs')
+@click.option('--mois-avance', default=2, show_default=True, help='Partitions créées au-delà du mois courant.')
+@with_appcontext
+def rollover_logs(mois_avance):
+    """Crée les partitions mensuelles à venir de security_logs (PostgreSQL, à lancer chaque mois)."""
+    from app import security_logs
+
+    if not security_logs.is_partitioned(db.session.connection()):
+        print("security_logs n'est pas partitionnée (base non PostgreSQL ou migration non appliquée).")
+        return
+    crees = security_logs.rollover(mois_avance=mois_avance)
+    print(f"{len(crees)} partition(s) créée(s){' : ' + ', '.join(crees) if crees else ''}.")
+
+
+@click.command('archive-logs')
+@click.option('--mois', default=None, type=int,
+              help='Mois conservés en base (défaut : AUDIT_RETENTION_MOIS).')
+@click.option('--avant', default=None, type=click.DateTime(formats=['%Y-%m']),
+              help='Archiver les mois antérieurs à ce mois (AAAA-MM), au lieu de --mois.')
+@click.option('--dossier', default=None, help='Dossier des archives (défaut : AUDIT_ARCHIVE_DIR).')
+@with_appcontext
+def archive_logs(mois, avant, dossier):
+    """Déplace les mois anciens de security_logs dans des fichiers JSONL compressés, consultables depuis la page des logs."""
+    from datetime import date
+    from flask import current_app
+    from app import security_logs
+
+    if avant is None:
+        retention = mois if mois is not None else current_app.config.get('AUDIT_RETENTION_MOIS', 12)
+        avant = security_logs.add_months(security_logs.month_start(date.today()), -retention)
+    else:
+        avant = avant.date()
+    dossier = dossier or security_logs.archive_dir()
+
+    resultats = security_logs.archive_logs(dossier, avant)
+    for mois_archive, nombre, chemin in resultats:
+        print(f"{mois_archive:%Y-%m} : {nombre} ligne(s) -> {chemin}")
+    print(f"{sum(n for _, n, _ in resultats)} ligne(s) archivée(s) avant {avant:%Y-%m} dans {dossier}.")
+
+
+@click.command('verifier-audit')
+@click.option('--complet', is_flag=True, help='Revérifier depuis l\'origine des chaînes, pas depuis le dernier point vérifié.')
+@with_appcontext
+def verifier_audit(complet):
+    """Vérifie les chaînes de hash des logs et du répertoire (code retour 1 si altération)."""
+    import time
+    from app import audit_chain
+
+    ok = True
+    for nom in (audit_chain.LOGS, audit_chain.REPERTOIRE):
+        debut = time.perf_counter()
+        resultat = audit_chain.verify(db.session, nom, full=complet)
+        duree = time.perf_counter() - debut
+        if resultat['ok']:
+            print(f"{nom} : {resultat['checked']} entrée(s) vérifiée(s) en {duree:.1f} s, "
+                  f"point vérifié {resultat['position']}.")
+        else:
+            ok = False
+            print(f"{nom} : ALTÉRATION après la position {resultat['position']} : {resultat['error']}.")
+    if not ok:
+        raise SystemExit(1)
+
 
 def register(app):
     app.cli.add_command(create_admin)
     app.cli.add_command(seed_parametres)
     app.cli.add_command(seed_profiles)
+    app.cli.add_command(bench_baremes)
+    app.cli.add_command(bench_comptabilite)
+    app.cli.add_command(bench_audit)
+    app.cli.add_command(rebuild_soldes)
+    app.cli.add_command(import_journal)
+    app.cli.add_command(cloturer_exercice)
+    app.cli.add_command(rapprocher)
+    app.cli.add_command(rollover_logs)
+    app.cli.add_command(archive_logs)
+    app.cli.add_command(verifier_audit)
@@ -6,15 +6,15 @@ from app.clients.forms import ClientForm
 from app.models import Client
 from sqlalchemy import select, or_
 from app.decorators import role_required
+from app.pagination import keyset_paginate
 
 @bp.route('/clients')
 @login_required
 @role_required('NOTAIRE', 'CLERC', 'SECRETAIRE', 'ADMIN')
 def index():
-    page = request.args.get('page', 1, type=int)
     q = request.args.get('q', '', type=str)
     
-    query = select(Client).order_by(Client.nom)
+    query = select(Client)
     
     if q:
         search_term = f"%{q}%"
@@ -26,7 +26,8 @@ def index():
             )
         )
         
-    pagination = db.paginate(query, page=page, per_page=10, error_out=False)
+    pagination = keyset_paginate(query, (Client.nom, Client.id), apres=request.args.get('apres'),
+                                 avant=request.args.get('avant'), per_page=10, total='approx')
     clients = pagination.items
     
     return render_template('clients/index.html', clients=clients, pagination=pagination, q=q)
@@ -0,0 +1,153 @@
+"""
+Banc d'essai des états comptables (commande `flask bench-comptabilite`).
+
+Génère un grand livre synthétique reproductible (plan comptable par défaut,
+écritures à deux mouvements réparties sur deux exercices, 95 % validées)
+puis chronomètre :
+  - la Balance Générale agrégée (un seul GROUP BY) ;
+  - la même balance calculée compte par compte, comme avant (une requête
+    ORM par compte, mouvements chargés en Python) : c'est la référence ;
+  - les totaux office / client du tableau de bord ;
+  - le Grand Livre d'un compte sur un exercice.
+
+Le résultat est un dict sérialisable en JSON.
+"""
+
+import platform
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+from flask import current_app
+
+from app import db
+
+# Taille des lots insérés lors de la génération
+TAILLE_LOT = 10000
+
+
+def generer_grand_livre(nb_mouvements: int, graine: int = 42) -> int:
+    """
+    Peuple la base courante (vide) avec environ nb_mouvements mouvements.
+    Retourne le nombre de mouvements insérés.
+    """
+    from app.models import ComptaCompte, ComptaEcriture, ComptaMouvement
+    from app.comptabilite.service import ComptabiliteService
+
+    ComptabiliteService.initialize_default_accounts()
+    comptes = db.session.execute(db.select(ComptaCompte.id)).scalars().all()
+
+    rng = random.Random(graine)
+    debut = date(2025, 1, 1)
+    nb_ecritures = max(nb_mouvements // 2, 1)
+    prochain_id = (db.session.execute(db.select(db.func.max(ComptaEcriture.id))).scalar() or 0) + 1
+
+    for lot in range(0, nb_ecritures, TAILLE_LOT):
+        ecritures, mouvements = [], []
+        for n in range(lot, min(lot + TAILLE_LOT, nb_ecritures)):
+            ecriture_id = prochain_id + n
+            debit, credit = rng.sample(comptes, 2)
+            montant = Decimal(rng.randint(1, 5000) * 1000)
+            ecritures.append({
+                'id': ecriture_id,
+                'date_ecriture': debut + timedelta(days=rng.randrange(730)),
+                'libelle_operation': f'Opération {ecriture_id}',
+                'journal_code': rng.choice(('BQ', 'CA', 'OD', 'VT')),
+                'numero_piece': f'P{ecriture_id}',
+                'valide': rng.random() < 0.95,
+            })
+            mouvements.append({'ecriture_id': ecriture_id, 'compte_id': debit, 'debit': montant, 'credit': 0})
+            mouvements.append({'ecriture_id': ecriture_id, 'compte_id': credit, 'debit': 0, 'credit': montant})
+        db.session.execute(db.insert(ComptaEcriture), ecritures)
+        db.session.execute(db.insert(ComptaMouvement), mouvements)
+    db.session.commit()
+
+    ComptabiliteService.rebuild_soldes()
+    return nb_ecritures * 2
+
+
+def _balance_par_compte(date_fin: date) -> list:
+    """Ancienne Balance Générale : une requête par compte, sommes en Python."""
+    from app.models import ComptaCompte, ComptaEcriture, ComptaMouvement
+
+    comptes = db.session.execute(
+        db.select(ComptaCompte).filter_by(actif=True).order_by(ComptaCompte.numero_compte)
+    ).scalars().all()
+    result = []
+    for compte in comptes:
+        mouvements = db.session.execute(
+            db.select(ComptaMouvement).join(ComptaEcriture).filter(
+                ComptaMouvement.compte_id == compte.id,
+                ComptaEcriture.valide == True,
+                ComptaEcriture.date_ecriture <= date_fin
+            )
+        ).scalars().all()
+        solde = sum(Decimal(str(m.debit)) for m in mouvements) - sum(Decimal(str(m.credit)) for m in mouvements)
+        if solde != 0:
+            result.append({'numero_compte': compte.numero_compte, 'solde': solde})
+    return result
+
+
+def chronometrer(fonction: Callable[[], Any], repetitions: int = 3) -> Dict[str, Any]:
+    """Durées (ms) de `repetitions` appels, après un appel d'échauffement."""
+    fonction()
+    durees = []
+    for _ in range(repetitions):
+        db.session.expunge_all()
+        t0 = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - t0) * 1000)
+    return {
+        'repetitions': repetitions,
+        'min_ms': round(min(durees), 1),
+        'mediane_ms': round(statistics.median(durees), 1),
+        'max_ms': round(max(durees), 1),
+    }
+
+
+def run_benchmark(repetitions: int = 3) -> Dict[str, Any]:
+    """Mesure les états comptables sur la base courante (déjà peuplée)."""
+    from app.models import ComptaCompte, ComptaMouvement
+    from app.comptabilite.service import ComptabiliteService
+
+    date_fin = date(2025, 12, 31)
+    compte_id = db.session.execute(
+        db.select(ComptaCompte.id).filter_by(numero_compte='512-OFFICE')
+    ).scalar()
+
+    def totaux_dashboard():
+        soldes = ComptabiliteService.get_soldes_comptes()
+        return (sum(s for c, s in soldes if c.categorie == 'OFFICE'),
+                sum(s for c, s in soldes if c.categorie == 'CLIENT'))
+
+    # Les deux calculs de la balance doivent rester identiques
+    agregee = [(b['numero_compte'], b['solde']) for b in ComptabiliteService.get_balance_generale(date_fin=date_fin)]
+    reference = [(b['numero_compte'], b['solde']) for b in _balance_par_compte(date_fin)]
+    if agregee != reference:
+        raise RuntimeError('La Balance Générale agrégée diffère du calcul compte par compte.')
+
+    mesures = {
+        'balance_generale': chronometrer(lambda: ComptabiliteService.get_balance_generale(date_fin=date_fin), repetitions),
+        'balance_par_compte': chronometrer(lambda: _balance_par_compte(date_fin), repetitions),
+        'totaux_dashboard': chronometrer(totaux_dashboard, repetitions),
+        'grand_livre_compte': chronometrer(lambda: ComptabiliteService.get_grand_livre(
+            compte_id=compte_id, date_debut=date(2025, 1, 1), date_fin=date_fin), repetitions),
+    }
+    avant, apres = mesures['balance_par_compte']['mediane_ms'], mesures['balance_generale']['mediane_ms']
+
+    return {
+        'meta': {
+            'date': datetime.utcnow().isoformat(timespec='seconds'),
+            'version': current_app.config.get('APP_VERSION'),
+            'python': platform.python_version(),
+            'plateforme': platform.platform(),
+            'base': db.engine.dialect.name,
+            'mouvements': db.session.execute(db.select(db.func.count(ComptaMouvement.id))).scalar(),
+            'repetitions': repetitions,
+        },
+        'mesures': mesures,
+        'gain_balance': round(avant / apres, 1) if apres else None,
+    }
@@ -0,0 +1,202 @@
+"""
+Streaming CSV / XLSX exports of the accounting reports.
+
+Each export is a generator of rows read from the database in batches
+(`yield_per`), so memory stays bounded whatever the period:
+  - CSV is produced chunk by chunk and sent while the query runs;
+  - XLSX uses openpyxl write-only mode (rows are spooled to a temporary
+    file, not kept in memory) and the finished workbook is then streamed
+    from that file.
+"""
+
+import csv
+import io
+import tempfile
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+from sqlalchemy import func
+
+from app import db
+from app.models import ComptaCompte, ComptaEcriture, ComptaMouvement, Recu, Facture, Dossier, Client
+
+# Rows fetched per database round trip
+TAILLE_LOT = 1000
+
+# Rows written per CSV chunk sent to the client
+LIGNES_PAR_BLOC = 500
+
+# Size of the chunks read back from the XLSX temporary file
+TAILLE_BLOC_XLSX = 64 * 1024
+
+ZERO = Decimal('0.00')
+
+
+def _stream(query) -> Iterator:
+    """Execute a select in batches (server-side cursor where supported)."""
+    return db.session.execute(query.execution_options(yield_per=TAILLE_LOT))
+
+
+def lignes_grand_livre(compte_id: int = None, date_debut: date = None, date_fin: date = None, **_) -> Iterator[Sequence]:
+    """General ledger rows, opening balance first for each account."""
+    from app.comptabilite.service import ComptabiliteService
+
+    query = ComptabiliteService.requete_grand_livre(compte_id, date_debut, date_fin)
+    for compte, ordre, date_ecriture, libelle, numero_piece, debit, credit, montant, cumul in _stream(query):
+        if ordre == 0:
+            yield (compte.numero_compte, compte.libelle, date_debut, 'Report à nouveau', '',
+                   cumul if cumul > 0 else ZERO, -cumul if cumul < 0 else ZERO, cumul)
+        else:
+            yield (compte.numero_compte, compte.libelle, date_ecriture, libelle, numero_piece or '',
+                   debit, credit, cumul)
+
+
+def lignes_balance(date_fin: date = None, **_) -> Iterator[Sequence]:
+    """Trial balance rows (one per account with a non-zero balance)."""
+    from app.comptabilite.service import ComptabiliteService
+
+    for item in ComptabiliteService.get_balance_generale(date_fin=date_fin):
+        yield (item['numero_compte'], item['libelle'], item['categorie'] or '',
+               item['debit'], item['credit'], item['solde'])
+
+
+def lignes_journal(journal_code: str = None, date_debut: date = None, date_fin: date = None, **_) -> Iterator[Sequence]:
+    """Journal rows: one per movement, in entry order."""
+    query = db.select(
+        ComptaEcriture.journal_code, ComptaEcriture.date_ecriture, ComptaEcriture.id,
+        ComptaEcriture.numero_piece, ComptaEcriture.libelle_operation, ComptaEcriture.valide,
+        ComptaCompte.numero_compte, ComptaCompte.libelle,
+        ComptaMouvement.debit, ComptaMouvement.credit,
+    ).select_from(ComptaMouvement).join(ComptaEcriture).outerjoin(
+        ComptaCompte, ComptaCompte.id == ComptaMouvement.compte_id
+    )
+    if journal_code:
+        query = query.filter(ComptaEcriture.journal_code == journal_code)
+    if date_debut:
+        query = query.filter(ComptaEcriture.date_ecriture >= date_debut)
+    if date_fin:
+        query = query.filter(ComptaEcriture.date_ecriture <= date_fin)
+    query = query.order_by(ComptaEcriture.date_ecriture, ComptaEcriture.id, ComptaMouvement.id)
+
+    for journal, jour, ecriture_id, piece, libelle, valide, numero, libelle_compte, debit, credit in _stream(query):
+        yield (journal, jour, ecriture_id, piece or '', libelle, numero or '', libelle_compte or '',
+               debit, credit, 'Oui' if valide else 'Non')
+
+
+def _nom_client():
+    return func.trim(func.coalesce(Client.nom, '') + ' ' + func.coalesce(Client.prenom, ''))
+
+
+def lignes_recus(date_debut: date = None, date_fin: date = None, **_) -> Iterator[Sequence]:
+    """Receipt rows, by issue date."""
+    query = db.select(
+        Recu.numero_recu, Recu.date_emission, Dossier.numero_dossier, _nom_client(),
+        Recu.montant, Recu.mode_paiement, Recu.reference_paiement, Recu.motif,
+    ).outerjoin(Dossier, Dossier.id == Recu.dossier_id).outerjoin(Client, Client.id == Recu.client_id)
+    if date_debut:
+        query = query.filter(Recu.date_emission >= date_debut)
+    if date_fin:
+        query = query.filter(Recu.date_emission <= date_fin)
+    query = query.order_by(Recu.date_emission, Recu.id)
+
+    for numero, jour, dossier, client, montant, mode, reference, motif in _stream(query):
+        yield (numero, jour, dossier or '', client or '', montant, mode, reference or '', motif)
+
+
+def lignes_factures(date_debut: date = None, date_fin: date = None, **_) -> Iterator[Sequence]:
+    """Invoice rows, by issue date."""
+    query = db.select(
+        Facture.numero_facture, Facture.date_emission, Facture.date_echeance, Dossier.numero_dossier,
+        _nom_client(), Facture.montant_ht, Facture.montant_tva, Facture.montant_ttc, Facture.statut,
+        Facture.description,
+    ).outerjoin(Dossier, Dossier.id == Facture.dossier_id).outerjoin(Client, Client.id == Facture.client_id)
+    if date_debut:
+        query = query.filter(Facture.date_emission >= date_debut)
+    if date_fin:
+        query = query.filter(Facture.date_emission <= date_fin)
+    query = query.order_by(Facture.date_emission, Facture.id)
+
+    for numero, jour, echeance, dossier, client, ht, tva, ttc, statut, description in _stream(query):
+        yield (numero, jour, echeance, dossier or '', client or '', ht, tva or ZERO, ttc, statut, description)
+
+
+# name -> (sheet / file title, column headers, row generator)
+EXPORTS: Dict[str, tuple] = {
+    'grand-livre': ('Grand Livre',
+                    ['Compte', 'Libellé compte', 'Date', 'Libellé', 'Pièce', 'Débit', 'Crédit', 'Solde cumulé'],
+                    lignes_grand_livre),
+    'balance': ('Balance Générale',
+                ['Compte', 'Libellé', 'Catégorie', 'Débit', 'Crédit', 'Solde'],
+                lignes_balance),
+    'journal': ('Journal',
+                ['Journal', 'Date', 'N° écriture', 'Pièce', 'Libellé', 'Compte', 'Libellé compte',
+                 'Débit', 'Crédit', 'Validée'],
+                lignes_journal),
+    'recus': ('Reçus',
+              ['Numéro', 'Date', 'Dossier', 'Client', 'Montant', 'Mode de paiement', 'Référence', 'Motif'],
+              lignes_recus),
+    'factures': ('Factures',
+                 ['Numéro', 'Date', 'Échéance', 'Dossier', 'Client', 'Montant HT', 'TVA', 'Montant TTC',
+                  'Statut', 'Description'],
+                 lignes_factures),
+}
+
+
+def _valeur_csv(valeur: Any) -> Any:
+    # Format attendu par Excel en français : virgule décimale, dates jj/mm/aaaa
+    if isinstance(valeur, Decimal):
+        return format(valeur, 'f').replace('.', ',')
+    if isinstance(valeur, date):
+        return valeur.strftime('%d/%m/%Y')
+    return '' if valeur is None else valeur
+
+
+def flux_csv(entetes: List[str], lignes: Iterable[Sequence]) -> Iterator[str]:
+    """CSV (';' separated, UTF-8 with BOM for Excel) yielded in chunks."""
+    tampon = io.StringIO()
+    writer = csv.writer(tampon, delimiter=';', lineterminator='\r\n')
+    tampon.write('\ufeff')
+    writer.writerow(entetes)
+    for n, ligne in enumerate(lignes, 1):
+        writer.writerow([_valeur_csv(v) for v in ligne])
+        if n % LIGNES_PAR_BLOC == 0:
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+    yield tampon.getvalue()
+
+
+def flux_xlsx(titre: str, entetes: List[str], lignes: Iterable[Sequence]) -> Iterator[bytes]:
+    """XLSX built in openpyxl write-only mode, then read back in chunks."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=titre[:31])
+    entete = []
+    for libelle in entetes:
+        cellule = WriteOnlyCell(ws, value=libelle)
+        cellule.font = Font(bold=True)
+        entete.append(cellule)
+    ws.append(entete)
+    for ligne in lignes:
+        ws.append(list(ligne))
+
+    with tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024) as fichier:
+        wb.save(fichier)
+        fichier.seek(0)
+        while True:
+            bloc = fichier.read(TAILLE_BLOC_XLSX)
+            if not bloc:
+                break
+            yield bloc
+
+
+def generer(nom: str, format_: str, **filtres) -> Iterator:
+    """Chunks of the export `nom` in `format_` ('csv' or 'xlsx')."""
+    titre, entetes, lignes = EXPORTS[nom]
+    if format_ == 'xlsx':
+        return flux_xlsx(titre, entetes, lignes(**filtres))
+    return flux_csv(entetes, lignes(**filtres))
@@ -1,12 +1,11 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SelectField, DateField, DecimalField, TextAreaField, SubmitField, HiddenField
+from flask_wtf.file import FileField, FileAllowed, FileRequired
+from wtforms import StringField, SelectField, DateField, DecimalField, TextAreaField, SubmitField, HiddenField, BooleanField
 from wtforms.validators import DataRequired, Optional, NumberRange
 from wtforms_sqlalchemy.fields import QuerySelectField
 from app import db
-from app.models import Dossier, Client, ComptaCompte
-
-def enabled_dossiers():
-    return db.session.execute(db.select(Dossier).order_by(Dossier.numero_dossier)).scalars()
+from app.models import Client, ComptaCompte
+from app.dossiers.forms import DossierPickerField
 
 def enabled_clients():
     return db.session.execute(db.select(Client).order_by(Client.nom)).scalars()
@@ -61,15 +60,13 @@ class EcritureForm(FlaskForm):
         ('OD', 'Opérations Diverses'),
         ('VT', 'Ventes')
     ], validators=[DataRequired()])
-    dossier = QuerySelectField('Dossier (optionnel)', query_factory=enabled_dossiers, 
-                               get_label='numero_dossier', allow_blank=True, blank_text='-- Aucun --')
+    dossier = DossierPickerField('Dossier (optionnel)', allow_blank=True, blank_text='-- Aucun --')
     submit_btn = SubmitField('Enregistrer')
 
 class RecuForm(FlaskForm):
     """Form for creating receipts."""
     date_emission = DateField('Date d\'émission', validators=[DataRequired()])
-    dossier = QuerySelectField('Dossier', query_factory=enabled_dossiers, 
-                               get_label='numero_dossier', allow_blank=True, blank_text='-- Sélectionner --')
+    dossier = DossierPickerField('Dossier', allow_blank=True, blank_text='-- Sélectionner --')
     client = QuerySelectField('Client', query_factory=enabled_clients,
                              get_label=lambda c: f"{c.nom} {c.prenom or ''}".strip(),
                              allow_blank=True, blank_text='-- Sélectionner --')
@@ -88,8 +85,7 @@ class FactureForm(FlaskForm):
     """Form for creating invoices."""
     date_emission = DateField('Date d\'émission', validators=[DataRequired()])
     date_echeance = DateField('Date d\'échéance')
-    dossier = QuerySelectField('Dossier', query_factory=enabled_dossiers,
-                               get_label='numero_dossier', allow_blank=True, blank_text='-- Sélectionner --')
+    dossier = DossierPickerField('Dossier', allow_blank=True, blank_text='-- Sélectionner --')
     client = QuerySelectField('Client', query_factory=enabled_clients,
                              get_label=lambda c: f"{c.nom} {c.prenom or ''}".strip(),
                              allow_blank=True, blank_text='-- Sélectionner --')
@@ -114,8 +110,7 @@ class RecetteForm(FlaskForm):
     ], validators=[DataRequired()])
     compte_produit = QuerySelectField('Compte de Contrepartie', query_factory=produit_comptes,
                                get_label=lambda c: f"{c.numero_compte} - {c.libelle}")
-    dossier = QuerySelectField('Dossier (optionnel)', query_factory=enabled_dossiers,
-                               get_label='numero_dossier', allow_blank=True, blank_text='-- Aucun --')
+    dossier = DossierPickerField('Dossier (optionnel)', allow_blank=True, blank_text='-- Aucun --')
     submit_btn = SubmitField('Enregistrer la Recette')
 
 class DepenseForm(FlaskForm):
@@ -134,8 +129,25 @@ class DepenseForm(FlaskForm):
     ], validators=[DataRequired()])
     compte_charge = QuerySelectField('Compte de Charge/Contrepartie', query_factory=charge_comptes,
                                get_label=lambda c: f"{c.numero_compte} - {c.libelle}")
-    dossier = QuerySelectField('Dossier (optionnel)', query_factory=enabled_dossiers,
-                               get_label='numero_dossier', allow_blank=True, blank_text='-- Aucun --')
+    dossier = DossierPickerField('Dossier (optionnel)', allow_blank=True, blank_text='-- Aucun --')
     submit_btn = SubmitField('Enregistrer la Dépense')
 
+class ImportJournalForm(FlaskForm):
+    """Form for the bulk import of journal entries (bank statements, legacy ledgers)."""
+    fichier = FileField('Fichier (.csv ou .xlsx)', validators=[
+        FileRequired('Sélectionnez un fichier.'),
+        FileAllowed(['csv', 'xlsx'], 'Seuls les fichiers .csv et .xlsx sont acceptés.')
+    ])
+    valider = BooleanField('Importer les écritures comme validées')
+    verifier_seulement = BooleanField('Contrôler seulement (rien n\'est importé)')
+    submit_btn = SubmitField('Importer')
 
+class ReleveBancaireForm(FlaskForm):
+    """Form for the import of a bank statement to reconcile a 512 account."""
+    compte = SelectField('Compte', choices=[('512-OFFICE', '512-OFFICE - Banque - Compte Office'),
+                                            ('512-CLIENT', '512-CLIENT - Banque - Compte Client')])
+    fichier = FileField('Relevé (.csv ou .xlsx)', validators=[
+        FileRequired('Sélectionnez un fichier.'),
+        FileAllowed(['csv', 'xlsx'], 'Seuls les fichiers .csv et .xlsx sont acceptés.')
+    ])
+    submit_btn = SubmitField('Importer le relevé')
@@ -0,0 +1,291 @@
+"""
+Bulk import of journal entries (bank statements, legacy ledgers).
+
+The file (CSV or XLSX) has one row per movement:
+
+    date;journal;piece;libelle;compte;debit;credit
+
+Headers are matched case- and accent-insensitively, so the Journal export
+(see exports.py) can be imported back as is. Consecutive rows with the
+same date, journal and piece (and 'N° écriture' when present) form one
+entry; the entry takes the label of its first row.
+
+The file is read in chunks of TAILLE_LOT rows (pandas chunks for CSV,
+openpyxl read-only mode for XLSX). Each chunk is checked column-wise with
+pandas (dates, journals, accounts, amounts, then balance per entry with a
+groupby). Its valid entries are written with two executemany INSERTs
+(entries, then movements) and, when imported as validated, one upsert of
+the running balances, in one transaction per chunk. Entries with an error
+are skipped and reported line by line; the others are imported.
+"""
+
+import unicodedata
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, IO, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from app import db
+from app.models import ComptaEcriture, ComptaMouvement, ComptaSolde
+
+# Rows read, checked and written per transaction
+TAILLE_LOT = 5000
+
+JOURNAUX = ('BQ', 'CA', 'OD', 'VT')
+
+COLONNES = ('date', 'journal', 'piece', 'libelle', 'compte', 'debit', 'credit')
+
+# Normalised header -> column
+ALIAS = {
+    'date': 'date', 'date ecriture': 'date', 'date operation': 'date',
+    'journal': 'journal', 'code journal': 'journal',
+    'piece': 'piece', 'n piece': 'piece', 'numero piece': 'piece',
+    'libelle': 'libelle', 'libelle operation': 'libelle',
+    'compte': 'compte', 'numero compte': 'compte', 'n compte': 'compte',
+    'debit': 'debit',
+    'credit': 'credit',
+    'n ecriture': 'ecriture', 'ecriture': 'ecriture',
+}
+
+
+def _normaliser_entete(valeur: Any) -> str:
+    """'N° Écriture ' -> 'n ecriture'."""
+    texte = unicodedata.normalize('NFKD', str(valeur or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in texte.lower()).split())
+
+
+def _renommage(entetes, alias: Dict[str, str], colonnes) -> Dict[str, str]:
+    renommage = {}
+    for entete in entetes:
+        nom = alias.get(_normaliser_entete(entete))
+        if nom and nom not in renommage.values():
+            renommage[entete] = nom
+    manquantes = [c for c in colonnes if c not in renommage.values()]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+    return renommage
+
+
+def _lots_csv(fichier: IO, taille: int, separateur: str) -> Iterator[pd.DataFrame]:
+    yield from pd.read_csv(fichier, sep=separateur, dtype=str, keep_default_na=False,
+                           encoding='utf-8-sig', chunksize=taille)
+
+
+def _lots_xlsx(fichier: IO, taille: int) -> Iterator[pd.DataFrame]:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        lignes = wb.active.iter_rows(values_only=True)
+        entetes = next(lignes, None)
+        if entetes is None:
+            return
+        entetes = [str(e) if e is not None else f'colonne_{n}' for n, e in enumerate(entetes)]
+        largeur, debut, lot = len(entetes), 0, []
+        for ligne in lignes:
+            lot.append((tuple(ligne) + (None,) * largeur)[:largeur])
+            if len(lot) == taille:
+                yield pd.DataFrame(lot, columns=entetes, index=range(debut, debut + len(lot)))
+                debut += len(lot)
+                lot = []
+        if lot:
+            yield pd.DataFrame(lot, columns=entetes, index=range(debut, debut + len(lot)))
+    finally:
+        wb.close()
+
+
+def lire_lots(fichier: IO, format_: str = 'csv', taille: int = TAILLE_LOT, separateur: str = ';',
+              alias: Dict[str, str] = ALIAS, colonnes=COLONNES) -> Iterator[pd.DataFrame]:
+    """
+    Chunks of the file with the standard column names (headers mapped with
+    `alias`, `colonnes` required) and a 'ligne' column (line number in the
+    file, header = 1).
+    """
+    lots = _lots_xlsx(fichier, taille) if format_ == 'xlsx' else _lots_csv(fichier, taille, separateur)
+    renommage = None
+    for lot in lots:
+        if renommage is None:
+            renommage = _renommage(lot.columns, alias, colonnes)
+        lot = lot[list(renommage)].rename(columns=renommage)
+        lot['ligne'] = lot.index + 2
+        yield lot
+
+
+def _texte(serie: pd.Series) -> pd.Series:
+    return serie.fillna('').astype(str).str.strip()
+
+
+def _dates(serie: pd.Series) -> pd.Series:
+    """ISO (aaaa-mm-jj, also Excel dates) or French (jj/mm/aaaa) dates; NaT if invalid."""
+    texte = _texte(serie).str[:10]
+    iso = pd.to_datetime(texte, format='%Y-%m-%d', errors='coerce')
+    return iso.fillna(pd.to_datetime(texte, format='%d/%m/%Y', errors='coerce'))
+
+
+def _montants(serie: pd.Series) -> pd.Series:
+    """Amounts with a decimal point or comma; empty = 0, NaN if invalid."""
+    texte = _texte(serie).str.replace(r'\s', '', regex=True).str.replace(',', '.', regex=False)
+    return pd.to_numeric(texte.where(texte != '', '0'), errors='coerce').round(2)
+
+
+def _groupes(lot: pd.DataFrame) -> pd.Series:
+    """Entry number of each row: a new entry starts when date, journal or piece changes."""
+    cles = [c for c in ('date', 'journal', 'piece', 'ecriture') if c in lot.columns]
+    valeurs = lot[cles].fillna('').astype(str)
+    return (valeurs != valeurs.shift()).any(axis=1).cumsum()
+
+
+def controler(lot: pd.DataFrame, comptes: Dict[str, int],
+              date_cloture: Optional[date] = None) -> Tuple[pd.DataFrame, List[Dict]]:
+    """
+    Check a chunk. Returns (rows of the valid entries, errors) where each
+    error is {'ligne': n, 'message': str}. Rows dated up to date_cloture
+    (last closed fiscal year) are rejected.
+    """
+    lot = lot.assign(
+        groupe=_groupes(lot),
+        jour=_dates(lot['date']),
+        journal=_texte(lot['journal']).str.upper(),
+        piece=_texte(lot['piece']),
+        libelle=_texte(lot['libelle']),
+        compte=_texte(lot['compte']),
+        debit=_montants(lot['debit']),
+        credit=_montants(lot['credit']),
+    )
+    lot['compte_id'] = lot['compte'].map(comptes)
+
+    controles = [
+        (lot['jour'].isna(), 'Date invalide : ' + _texte(lot['date'])),
+        (~lot['journal'].isin(JOURNAUX), 'Journal inconnu : ' + lot['journal']),
+        (lot['libelle'] == '', 'Libellé manquant'),
+        (lot['compte_id'].isna(), 'Compte inconnu ou inactif : ' + lot['compte']),
+        (lot['debit'].isna() | lot['credit'].isna(), 'Montant invalide'),
+        ((lot['debit'] < 0) | (lot['credit'] < 0), 'Montant négatif'),
+        (lot['debit'].notna() & lot['credit'].notna() & ((lot['debit'] > 0) == (lot['credit'] > 0)),
+         'Une ligne porte soit un débit soit un crédit'),
+    ]
+    if date_cloture is not None:
+        controles.append((lot['jour'] <= pd.Timestamp(date_cloture),
+                          f"Exercice clos : date antérieure ou égale au {date_cloture:%d/%m/%Y}"))
+    erreur = pd.Series(False, index=lot.index)
+    for masque, _ in controles:
+        erreur |= masque
+
+    # Entry-level checks, on the entries whose lines are all valid
+    par_groupe = lot.groupby('groupe')
+    totaux = par_groupe[['debit', 'credit']].transform('sum')
+    taille = par_groupe['ligne'].transform('size')
+    saine = ~erreur.groupby(lot['groupe']).transform('any')
+    desequilibre = saine & ((totaux['debit'] - totaux['credit']).abs() > 0.005)
+    controles += [
+        (saine & (taille < 2), 'Écriture à une seule ligne'),
+        (desequilibre, 'Écriture déséquilibrée (débit ' + totaux['debit'].map('{:.2f}'.format)
+         + ', crédit ' + totaux['credit'].map('{:.2f}'.format) + ')'),
+    ]
+
+    erreurs = []
+    for masque, message in controles:
+        if masque.any():
+            messages = message[masque] if isinstance(message, pd.Series) else pd.Series(message, index=lot.index[masque])
+            erreurs.extend({'ligne': int(n), 'message': m} for n, m in zip(lot.loc[masque, 'ligne'], messages))
+    erreurs.sort(key=lambda e: e['ligne'])
+
+    rejet = (erreur | desequilibre | (taille < 2)).groupby(lot['groupe']).transform('any')
+    return lot[~rejet], erreurs
+
+
+def _decimal(valeur: float) -> Decimal:
+    return Decimal(f'{valeur:.2f}')
+
+
+def enregistrer(lot: pd.DataFrame, valider: bool = False, user_id: int = None) -> int:
+    """
+    Insert the (checked) entries of a chunk in the current transaction,
+    without committing. Returns the number of entries written.
+    """
+    if lot.empty:
+        return 0
+    premieres = lot.drop_duplicates('groupe')
+    ecritures = [
+        {'date_ecriture': jour.date(), 'libelle_operation': libelle[:200], 'journal_code': journal,
+         'numero_piece': piece[:50] or None, 'valide': valider, 'created_by': user_id}
+        for jour, libelle, journal, piece in zip(
+            premieres['jour'], premieres['libelle'], premieres['journal'], premieres['piece'])
+    ]
+    ids = db.session.execute(
+        db.insert(ComptaEcriture).returning(ComptaEcriture.id, sort_by_parameter_order=True), ecritures
+    ).scalars().all()
+    ecriture_ids = lot['groupe'].map(dict(zip(premieres['groupe'], ids)))
+
+    db.session.execute(db.insert(ComptaMouvement), [
+        {'ecriture_id': int(ecriture_id), 'compte_id': int(compte_id),
+         'debit': _decimal(debit), 'credit': _decimal(credit)}
+        for ecriture_id, compte_id, debit, credit in zip(
+            ecriture_ids, lot['compte_id'], lot['debit'], lot['credit'])
+    ])
+
+    if valider:
+        from app.comptabilite.service import ComptabiliteService
+
+        mois = lot.assign(periode=lot['jour'].dt.strftime('%Y-%m')).groupby(['compte_id', 'periode']).agg(
+            debit=('debit', 'sum'), credit=('credit', 'sum'), nb=('ligne', 'size'))
+        total = mois.groupby(level='compte_id').sum()
+        deltas = {}
+        for (compte_id, periode), (debit, credit, nb) in mois.iterrows():
+            deltas[(int(compte_id), periode)] = (_decimal(debit), _decimal(credit), int(nb))
+        for compte_id, (debit, credit, nb) in total.iterrows():
+            deltas[(int(compte_id), ComptaSolde.PERIODE_TOTAL)] = (_decimal(debit), _decimal(credit), int(nb))
+        ComptabiliteService._appliquer_soldes(deltas)
+    return len(ids)
+
+
+def importer(fichier: IO, format_: str = 'csv', valider: bool = False, verifier_seulement: bool = False,
+             user_id: Optional[int] = None, taille_lot: int = TAILLE_LOT, separateur: str = ';') -> Dict:
+    """
+    Import a journal file. Each chunk is committed on its own: a database
+    error stops the import, the chunks already committed stay imported.
+
+    Returns {'lignes', 'ecritures', 'mouvements', 'rejetees', 'erreurs'}
+    where 'rejetees' counts the entries skipped and 'erreurs' lists
+    {'ligne', 'message'} in file order.
+
+    Raises:
+        ValueError: If a required column is missing
+    """
+    from app.comptabilite.plan_comptable import PlanComptable
+    from app.comptabilite.service import ComptabiliteService
+
+    comptes = PlanComptable.ids()
+    cloture = ComptabiliteService.derniere_cloture()
+    date_cloture = cloture.date_fin if cloture else None
+    rapport = {'lignes': 0, 'ecritures': 0, 'mouvements': 0, 'rejetees': 0, 'erreurs': []}
+
+    def traiter(lot):
+        valides, erreurs = controler(lot, comptes, date_cloture)
+        rapport['erreurs'].extend(erreurs)
+        rapport['rejetees'] += _groupes(lot).nunique() - valides['groupe'].nunique()
+        if verifier_seulement or valides.empty:
+            return
+        try:
+            rapport['ecritures'] += enregistrer(valides, valider=valider, user_id=user_id)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        rapport['mouvements'] += len(valides)
+
+    reste = None
+    for lot in lire_lots(fichier, format_, taille_lot, separateur):
+        rapport['lignes'] += len(lot)
+        if reste is not None:
+            lot = pd.concat([reste, lot])
+        # The last entry of the chunk may continue in the next one
+        groupes = _groupes(lot)
+        derniere = groupes == groupes.iloc[-1]
+        reste = lot[derniere]
+        if not derniere.all():
+            traiter(lot[~derniere])
+    if reste is not None and not reste.empty:
+        traiter(reste)
+    return rapport
@@ -0,0 +1,143 @@
+"""
+Per-worker cache of the active chart of accounts (numero_compte -> id).
+
+Receipts, invoices, recettes and dépenses resolve their accounts by number.
+The active chart is loaded in one query and kept per worker:
+  - any insert, deletion, renumbering or (de)activation of a ComptaCompte
+    clears the local cache after commit and bumps a shared counter
+    (parametres_version, row PlanComptable.VERSION_ID) in the same
+    transaction;
+  - each worker re-reads that counter at most every VERSION_CHECK_INTERVAL
+    seconds (one primary-key query) and reloads the chart only when it has
+    changed.
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from app import db
+from app.models import ComptaCompte, ParametreVersion
+
+
+class PlanComptable:
+    # Row of parametres_version holding the chart of accounts counter
+    VERSION_ID = 2
+
+    # Delay (seconds) between two reads of the shared counter
+    VERSION_CHECK_INTERVAL = 5.0
+
+    _ids: Optional[Dict[str, int]] = None
+    _db_version: Optional[int] = None
+    _checked_at: float = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def _load(cls) -> Dict[str, int]:
+        rows = db.session.execute(
+            db.select(ComptaCompte.numero_compte, ComptaCompte.id).filter_by(actif=True)
+        ).all()
+        return {numero: compte_id for numero, compte_id in rows}
+
+    @classmethod
+    def _read_db_version(cls) -> Optional[int]:
+        """Read the shared counter on a dedicated connection (outside the session transaction)."""
+        query = db.select(ParametreVersion.version).where(ParametreVersion.id == cls.VERSION_ID)
+        try:
+            if isinstance(db.engine.pool, (StaticPool, SingletonThreadPool)):
+                # Single shared connection (in-memory SQLite): closing a
+                # "dedicated" one would roll back the session's pending work
+                return db.session.scalar(query)
+            with db.engine.connect() as conn:
+                return conn.execute(query).scalar()
+        except Exception:
+            return None
+
+    @classmethod
+    def _check_version(cls) -> None:
+        now = time.monotonic()
+        if now - cls._checked_at < cls.VERSION_CHECK_INTERVAL:
+            return
+        cls._checked_at = now
+        db_version = cls._read_db_version()
+        if db_version != cls._db_version:
+            cls._ids = None
+            cls._db_version = db_version
+
+    @classmethod
+    def invalidate_cache(cls) -> None:
+        """Reload the chart on next access."""
+        with cls._lock:
+            cls._ids = None
+            cls._checked_at = 0.0
+
+    @classmethod
+    def ids(cls) -> Dict[str, int]:
+        """{numero_compte: id} of the active accounts."""
+        cls._check_version()
+        ids = cls._ids
+        if ids is None:
+            ids = cls._load()
+            with cls._lock:
+                cls._ids = ids
+        return ids
+
+    @classmethod
+    def id_compte(cls, numero: str) -> Optional[int]:
+        """Id of the active account `numero`, or None."""
+        return cls.ids().get(numero)
+
+    @classmethod
+    def id_compte_requis(cls, numero: str) -> int:
+        """Id of the active account `numero`; ValueError if it is missing or inactive."""
+        compte_id = cls.id_compte(numero)
+        if compte_id is None:
+            raise ValueError(f"Account {numero} not found in the active chart of accounts")
+        return compte_id
+
+    @classmethod
+    def _bump_version(cls, connection) -> None:
+        """Increment the shared counter on the flushing connection (same transaction)."""
+        table = ParametreVersion.__table__
+        result = connection.execute(
+            db.update(table).where(table.c.id == cls.VERSION_ID)
+            .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+        )
+        if not result.rowcount:
+            connection.execute(db.insert(table).values(id=cls.VERSION_ID, version=1, updated_at=datetime.utcnow()))
+
+
+def _plan_modifie(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None and not session.info.get('plan_comptable_modifie'):
+        session.info['plan_comptable_modifie'] = True
+        PlanComptable._bump_version(connection)
+
+
+@event.listens_for(ComptaCompte, 'after_update')
+def _compte_modifie(mapper, connection, target):
+    etat = inspect(target)
+    if etat.attrs.actif.history.has_changes() or etat.attrs.numero_compte.history.has_changes():
+        _plan_modifie(mapper, connection, target)
+
+
+event.listen(ComptaCompte, 'after_insert', _plan_modifie)
+event.listen(ComptaCompte, 'after_delete', _plan_modifie)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apres_commit(session):
+    if session.info.pop('plan_comptable_modifie', False):
+        PlanComptable.invalidate_cache()
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _fin_transaction(session, transaction):
+    # Rollback of the outermost transaction: the counter bump was rolled back too
+    if transaction.parent is None:
+        session.info.pop('plan_comptable_modifie', None)
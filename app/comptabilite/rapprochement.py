@@ -0,0 +1,363 @@
+"""
+Bank reconciliation of the 512 accounts (512-OFFICE, 512-CLIENT).
+
+Bank statement lines (LigneReleve, imported from the bank's CSV or XLSX
+file) are matched against the validated movements of the same account
+that are not reconciled yet. Each pass builds a hash index of the
+remaining movements, so a line finds its candidates with a dict lookup
+instead of a scan of all movements (linear, not quadratic, in the number
+of lines):
+
+  1. REFERENCE: (reference, amount) -> movements. References are the
+     entry's numero_piece, the payment reference of its receipt
+     (Recu.reference_paiement) and the numbers found in the labels;
+     dates may differ by up to FENETRE_REFERENCE_JOURS days.
+  2. MONTANT_DATE: (amount, bucket of `fenetre` days) -> movements; the
+     line's bucket and its two neighbours cover +/- `fenetre` days.
+  3. GROUPE: several movements of the same day whose total is the line
+     amount (a deposit of several cheques), then the reverse (one movement
+     settled by several lines of the same day).
+
+The closest date wins within a pass. Every match is stored as a
+Rapprochement pointing to its lines and movements; what is left is
+reconciled by hand.
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, FrozenSet, IO, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from app import db
+from app.comptabilite.imports import TAILLE_LOT, _dates, _montants, _texte, lire_lots
+from app.models import ComptaCompte, ComptaEcriture, ComptaMouvement, LigneReleve, Rapprochement, Recu, ReleveBancaire
+
+COMPTES = ('512-OFFICE', '512-CLIENT')
+
+# Maximum gap (days) between bank date and entry date
+FENETRE_JOURS = 3
+FENETRE_REFERENCE_JOURS = 31
+
+# Normalised header -> column (the bank's Crédit is money in)
+ALIAS_RELEVE = {
+    'date': 'date', 'date operation': 'date', 'date comptable': 'date',
+    'libelle': 'libelle', 'libelle operation': 'libelle',
+    'reference': 'reference', 'ref': 'reference', 'n piece': 'reference',
+    'montant': 'montant',
+    'debit': 'debit',
+    'credit': 'credit',
+}
+
+# (id, date as ordinal, amount in cents, references)
+Element = Tuple[int, int, int, FrozenSet[str]]
+
+
+def _cles(*textes: Optional[str]) -> FrozenSet[str]:
+    """Reference keys of free texts: words of 4+ characters holding a digit, upper case, alphanumerics only."""
+    cles = set()
+    for texte in textes:
+        for mot in str(texte or '').upper().split():
+            mot = ''.join(c for c in mot if c.isalnum())
+            if len(mot) >= 4 and any(c.isdigit() for c in mot):
+                cles.add(mot)
+    return frozenset(cles)
+
+
+def _centimes(valeur) -> int:
+    return int((Decimal(valeur or 0) * 100).to_integral_value())
+
+
+def _ordre(elements: Dict[int, Element]) -> List[Element]:
+    return sorted(elements.values(), key=lambda e: (e[1], e[0]))
+
+
+def _plus_proche(cible: Element, candidats: Iterable[Element], libres: Dict[int, Element],
+                 fenetre: int) -> Optional[Element]:
+    meilleur, cle_meilleure = None, None
+    for candidat in candidats:
+        ecart = abs(candidat[1] - cible[1])
+        if candidat[0] in libres and ecart <= fenetre and (meilleur is None or (ecart, candidat[0]) < cle_meilleure):
+            meilleur, cle_meilleure = candidat, (ecart, candidat[0])
+    return meilleur
+
+
+def _groupes(cibles: Dict[int, Element], elements: Dict[int, Element], fenetre: int):
+    """(target, group) pairs: elements of one day and sign whose total is the target amount."""
+    jours = defaultdict(list)
+    for element in elements.values():
+        jours[(element[1], element[2] > 0)].append(element)
+    index = defaultdict(list)
+    for cle, groupe in jours.items():
+        if len(groupe) > 1:
+            index[sum(e[2] for e in groupe)].append(cle)
+    pris = set()
+    for cible in _ordre(cibles):
+        choix = [(abs(jour - cible[1]), jour, signe) for jour, signe in index.get(cible[2], ())
+                 if abs(jour - cible[1]) <= fenetre and (jour, signe) not in pris]
+        if choix:
+            _, jour, signe = min(choix)
+            pris.add((jour, signe))
+            yield cible, jours[(jour, signe)]
+
+
+def apparier(lignes: Iterable[Element], mouvements: Iterable[Element], fenetre: int = FENETRE_JOURS,
+             fenetre_reference: int = FENETRE_REFERENCE_JOURS) -> List[Tuple[str, List[int], List[int]]]:
+    """
+    Match statement lines with movements (see module docstring).
+
+    Returns [(methode, line ids, movement ids)]; every line and movement
+    appears in one match at most, and both sides of a match have the same
+    total.
+    """
+    lignes = {e[0]: e for e in lignes}
+    mouvements = {e[0]: e for e in mouvements}
+    resultats = []
+
+    def retenir(methode, de_lignes, de_mouvements):
+        for e in de_lignes:
+            del lignes[e[0]]
+        for e in de_mouvements:
+            del mouvements[e[0]]
+        resultats.append((methode, [e[0] for e in de_lignes], [e[0] for e in de_mouvements]))
+
+    # 1. Même référence et même montant
+    index = defaultdict(list)
+    for m in mouvements.values():
+        for ref in m[3]:
+            index[(ref, m[2])].append(m)
+    for ligne in _ordre(lignes):
+        candidats = (m for ref in ligne[3] for m in index.get((ref, ligne[2]), ()))
+        mouvement = _plus_proche(ligne, candidats, mouvements, fenetre_reference)
+        if mouvement:
+            retenir('REFERENCE', [ligne], [mouvement])
+
+    # 2. Même montant, dates proches
+    taille = max(fenetre, 1)
+    index = defaultdict(list)
+    for m in mouvements.values():
+        index[(m[2], m[1] // taille)].append(m)
+    for ligne in _ordre(lignes):
+        seau = ligne[1] // taille
+        candidats = (m for s in (seau - 1, seau, seau + 1) for m in index.get((ligne[2], s), ()))
+        mouvement = _plus_proche(ligne, candidats, mouvements, fenetre)
+        if mouvement:
+            retenir('MONTANT_DATE', [ligne], [mouvement])
+
+    # 3. Plusieurs mouvements pour une ligne, puis l'inverse
+    for ligne, groupe in list(_groupes(lignes, mouvements, fenetre)):
+        retenir('GROUPE', [ligne], groupe)
+    for mouvement, groupe in list(_groupes(mouvements, lignes, fenetre)):
+        retenir('GROUPE', groupe, [mouvement])
+    return resultats
+
+
+def compte_banque(numero: str) -> ComptaCompte:
+    """
+    The 512 account `numero`.
+
+    Raises:
+        ValueError: If it is not a bank account or does not exist
+    """
+    if numero not in COMPTES:
+        raise ValueError(f"Le rapprochement ne concerne que les comptes {', '.join(COMPTES)}")
+    compte = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte=numero)).scalar_one_or_none()
+    if compte is None:
+        raise ValueError(f"Compte {numero} introuvable")
+    return compte
+
+
+def lignes_a_rapprocher(compte_id: int, date_debut: Optional[date] = None,
+                        date_fin: Optional[date] = None) -> List[Element]:
+    """Statement lines of the account not reconciled yet."""
+    query = db.select(
+        LigneReleve.id, LigneReleve.date_operation, LigneReleve.montant, LigneReleve.reference, LigneReleve.libelle
+    ).where(LigneReleve.compte_id == compte_id, LigneReleve.rapprochement_id.is_(None))
+    if date_debut:
+        query = query.where(LigneReleve.date_operation >= date_debut)
+    if date_fin:
+        query = query.where(LigneReleve.date_operation <= date_fin)
+    return [(id_, jour.toordinal(), _centimes(montant), _cles(reference, libelle))
+            for id_, jour, montant, reference, libelle in db.session.execute(query)]
+
+
+def _mouvements_en_attente(compte_id: int, *colonnes):
+    """Validated movements of the account (opening entries excluded) not reconciled yet."""
+    from app.comptabilite.service import ComptabiliteService
+
+    return db.select(*colonnes).select_from(ComptaMouvement).join(ComptaEcriture).where(
+        ComptaMouvement.compte_id == compte_id,
+        ComptaMouvement.rapprochement_id.is_(None),
+        ComptaEcriture.valide == True,
+        ComptaEcriture.journal_code != ComptabiliteService.JOURNAL_A_NOUVEAUX,
+    )
+
+
+def mouvements_a_rapprocher(compte_id: int, date_debut: Optional[date] = None,
+                            date_fin: Optional[date] = None) -> List[Element]:
+    """Movements of the account not reconciled yet; amount = debit - credit."""
+    query = _mouvements_en_attente(
+        compte_id, ComptaMouvement.id, ComptaEcriture.date_ecriture, ComptaMouvement.debit, ComptaMouvement.credit,
+        ComptaEcriture.numero_piece, ComptaEcriture.libelle_operation, Recu.reference_paiement
+    ).outerjoin(Recu, Recu.ecriture_id == ComptaEcriture.id)
+    if date_debut:
+        query = query.where(ComptaEcriture.date_ecriture >= date_debut)
+    if date_fin:
+        query = query.where(ComptaEcriture.date_ecriture <= date_fin)
+    return [(id_, jour.toordinal(), _centimes(debit) - _centimes(credit), _cles(piece, libelle, reference))
+            for id_, jour, debit, credit, piece, libelle, reference in db.session.execute(query)]
+
+
+def en_attente(compte_id: int, limite: int) -> Dict:
+    """
+    Items left to reconcile on the account, oldest first: {'nb_lignes',
+    'lignes' (LigneReleve), 'nb_mouvements', 'mouvements' (date, piece,
+    libelle, montant)}, at most `limite` of each.
+    """
+    filtre = (LigneReleve.compte_id == compte_id, LigneReleve.rapprochement_id.is_(None))
+    mouvements = _mouvements_en_attente(
+        compte_id, ComptaEcriture.date_ecriture, ComptaEcriture.numero_piece, ComptaEcriture.libelle_operation,
+        (ComptaMouvement.debit - ComptaMouvement.credit).label('montant')
+    ).order_by(ComptaEcriture.date_ecriture, ComptaMouvement.id).limit(limite)
+    return {
+        'nb_lignes': db.session.execute(db.select(db.func.count(LigneReleve.id)).where(*filtre)).scalar(),
+        'lignes': db.session.execute(
+            db.select(LigneReleve).where(*filtre).order_by(LigneReleve.date_operation, LigneReleve.id).limit(limite)
+        ).scalars().all(),
+        'nb_mouvements': db.session.execute(_mouvements_en_attente(compte_id, db.func.count(ComptaMouvement.id))).scalar(),
+        'mouvements': db.session.execute(mouvements).all(),
+    }
+
+
+def enregistrer(compte_id: int, appariements: List[Tuple[str, List[int], List[int]]],
+                user_id: Optional[int] = None) -> None:
+    """Store the matches in the current transaction, without committing."""
+    if not appariements:
+        return
+    maintenant = datetime.utcnow()
+    ids = db.session.execute(
+        db.insert(Rapprochement).returning(Rapprochement.id, sort_by_parameter_order=True),
+        [{'compte_id': compte_id, 'methode': methode, 'cree_par': user_id, 'cree_le': maintenant}
+         for methode, _, _ in appariements]
+    ).scalars().all()
+    db.session.execute(db.update(LigneReleve), [
+        {'id': ligne_id, 'rapprochement_id': rapprochement_id}
+        for rapprochement_id, (_, lignes, _) in zip(ids, appariements) for ligne_id in lignes
+    ])
+    db.session.execute(db.update(ComptaMouvement), [
+        {'id': mouvement_id, 'rapprochement_id': rapprochement_id}
+        for rapprochement_id, (_, _, mouvements) in zip(ids, appariements) for mouvement_id in mouvements
+    ])
+
+
+def rapprocher(compte_id: int, date_debut: Optional[date] = None, date_fin: Optional[date] = None,
+               fenetre: int = FENETRE_JOURS, user_id: Optional[int] = None) -> Dict:
+    """
+    Reconcile automatically the pending statement lines of the account
+    (between date_debut and date_fin when given) and commit.
+
+    Returns {'lignes', 'rapprochees', 'mouvements', 'par_methode'}: pending
+    lines, lines and movements reconciled, matches per method.
+    """
+    # Un seul rapprochement à la fois par compte
+    db.session.execute(db.select(ComptaCompte.id).where(ComptaCompte.id == compte_id).with_for_update())
+    lignes = lignes_a_rapprocher(compte_id, date_debut, date_fin)
+    rapport = {'lignes': len(lignes), 'rapprochees': 0, 'mouvements': 0, 'par_methode': {}}
+    if not lignes:
+        db.session.commit()
+        return rapport
+
+    marge = timedelta(days=max(fenetre, FENETRE_REFERENCE_JOURS))
+    mouvements = mouvements_a_rapprocher(
+        compte_id,
+        date.fromordinal(min(e[1] for e in lignes)) - marge,
+        date.fromordinal(max(e[1] for e in lignes)) + marge,
+    )
+    appariements = apparier(lignes, mouvements, fenetre)
+    try:
+        enregistrer(compte_id, appariements, user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for methode, de_lignes, de_mouvements in appariements:
+        rapport['rapprochees'] += len(de_lignes)
+        rapport['mouvements'] += len(de_mouvements)
+        rapport['par_methode'][methode] = rapport['par_methode'].get(methode, 0) + 1
+    return rapport
+
+
+def importer_releve(fichier: IO, compte_id: int, format_: str = 'csv', nom_fichier: Optional[str] = None,
+                    user_id: Optional[int] = None, separateur: str = ';') -> Dict:
+    """
+    Import a bank statement (date, libelle, optional reference, and montant
+    or debit/credit from the bank's point of view) and commit.
+
+    Lines already imported for the account (same date, amount, label and
+    reference) are skipped, so importing overlapping statements twice is
+    harmless. Returns {'releve_id', 'lignes', 'importees', 'doublons',
+    'erreurs'}; invalid lines are reported as {'ligne', 'message'} and
+    skipped.
+
+    Raises:
+        ValueError: If a required column is missing
+    """
+    rapport = {'releve_id': None, 'lignes': 0, 'importees': 0, 'doublons': 0, 'erreurs': []}
+    valides = []
+    for lot in lire_lots(fichier, format_, TAILLE_LOT, separateur, alias=ALIAS_RELEVE, colonnes=('date', 'libelle')):
+        if 'montant' in lot.columns:
+            montant = _montants(lot['montant'])
+        elif 'debit' in lot.columns and 'credit' in lot.columns:
+            montant = (_montants(lot['credit']) - _montants(lot['debit'])).round(2)
+        else:
+            raise ValueError("Colonnes manquantes : montant (ou debit et credit)")
+        jour = _dates(lot['date'])
+        libelle = _texte(lot['libelle']).str[:255]
+        reference = _texte(lot['reference']).str[:100] if 'reference' in lot.columns else pd.Series('', index=lot.index)
+        rapport['lignes'] += len(lot)
+
+        for masque, message in ((jour.isna(), 'Date invalide'), (montant.isna(), 'Montant invalide'),
+                                (montant == 0, 'Montant nul')):
+            rapport['erreurs'].extend({'ligne': int(n), 'message': message} for n in lot['ligne'][masque])
+        ok = jour.notna() & montant.notna() & (montant != 0)
+        valides.extend(
+            (j.date(), Decimal(f'{m:.2f}'), l, r or None)
+            for j, m, l, r in zip(jour[ok], montant[ok], libelle[ok], reference[ok])
+        )
+    rapport['erreurs'].sort(key=lambda e: e['ligne'])
+    if not valides:
+        return rapport
+
+    existantes = Counter(tuple(row) for row in db.session.execute(
+        db.select(LigneReleve.date_operation, LigneReleve.montant, LigneReleve.libelle, LigneReleve.reference).where(
+            LigneReleve.compte_id == compte_id,
+            LigneReleve.date_operation.between(min(v[0] for v in valides), max(v[0] for v in valides)),
+        )
+    ))
+    nouvelles = []
+    for valeurs in valides:
+        if existantes[valeurs] > 0:
+            existantes[valeurs] -= 1
+            rapport['doublons'] += 1
+        else:
+            nouvelles.append(valeurs)
+
+    try:
+        releve = ReleveBancaire(compte_id=compte_id, nom_fichier=(nom_fichier or '')[:255] or None,
+                                nb_lignes=len(nouvelles), importe_par=user_id)
+        db.session.add(releve)
+        db.session.flush()
+        if nouvelles:
+            db.session.execute(db.insert(LigneReleve), [
+                {'releve_id': releve.id, 'compte_id': compte_id, 'date_operation': jour, 'montant': montant,
+                 'libelle': libelle, 'reference': reference}
+                for jour, montant, libelle, reference in nouvelles
+            ])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    rapport.update(releve_id=releve.id, importees=len(nouvelles))
+    return rapport
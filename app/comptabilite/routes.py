@@ -3,11 +3,12 @@ from flask_login import login_required, current_user
 from app import db
 from app.comptabilite import bp
 from app.comptabilite.service import ComptabiliteService
-from app.comptabilite.forms import CompteForm, RecuForm, FactureForm, RecetteForm, DepenseForm
-from app.models import ComptaCompte, ComptaEcriture, Recu, Facture, TypeActe
+from app.comptabilite.plan_comptable import PlanComptable
+from app.comptabilite.forms import CompteForm, RecuForm, FactureForm, RecetteForm, DepenseForm, ImportJournalForm, ReleveBancaireForm
+from app.models import ComptaCompte, ComptaEcriture, ComptaExercice, Recu, Facture, TypeActe
 from datetime import datetime, date
 from io import BytesIO
-from flask import send_file, make_response
+from flask import send_file, make_response, abort, Response, stream_with_context, current_app
 
 from app.decorators import role_required
 
@@ -16,14 +17,12 @@ from app.decorators import role_required
 @role_required('COMPTABLE', 'NOTAIRE', 'ADMIN')
 def index():
     """Dashboard with financial overview."""
-    # Get account balances
-    comptes = db.session.execute(
-        db.select(ComptaCompte).filter_by(actif=True).order_by(ComptaCompte.numero_compte)
-    ).scalars().all()
-    
-    # Calculate totals
-    total_office = sum(c.get_solde() for c in comptes if c.categorie == 'OFFICE')
-    total_client = sum(c.get_solde() for c in comptes if c.categorie == 'CLIENT')
+    # Get account balances and totals from the same result set
+    soldes_comptes = ComptabiliteService.get_soldes_comptes()
+    comptes = [compte for compte, _ in soldes_comptes]
+    soldes = {compte.id: solde for compte, solde in soldes_comptes}
+    total_office = sum(solde for compte, solde in soldes_comptes if compte.categorie == 'OFFICE')
+    total_client = sum(solde for compte, solde in soldes_comptes if compte.categorie == 'CLIENT')
     
     # Get recent receipts and invoices
     recent_recus = db.session.execute(
@@ -45,6 +44,7 @@ def index():
     return render_template('comptabilite/dashboard.html',
                          stats=stats,
                          comptes=comptes,
+                         soldes=soldes,
                          recent_recus=recent_recus,
                          recent_factures=recent_factures)
 
@@ -317,21 +317,22 @@ def recettes_create():
             else:
                  compte_tresorerie_num = ComptabiliteService.COMPTE_CAISSE_CLIENT if form.mode_paiement.data == 'ESPECES' else ComptabiliteService.COMPTE_BANQUE_CLIENT
             
-            compte_treso = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte=compte_tresorerie_num)).scalar_one()
+            compte_treso_id = PlanComptable.id_compte_requis(compte_tresorerie_num)
             compte_contrepartie = form.compte_produit.data
             
-            ecriture = ComptabiliteService.create_ecriture(
-                date_ecriture=form.date_operation.data,
-                libelle=form.libelle.data,
-                journal_code='CA' if form.mode_paiement.data == 'ESPECES' else 'BQ',
-                mouvements=[
-                    {'compte_id': compte_treso.id, 'debit': float(form.montant.data), 'credit': 0},
-                    {'compte_id': compte_contrepartie.id, 'debit': 0, 'credit': float(form.montant.data)}
-                ],
-                dossier_id=form.dossier.data.id if form.dossier.data else None,
-                user_id=current_user.id
-            )
-            ComptabiliteService.valider_ecriture(ecriture.id)
+            with ComptabiliteService.unite_de_travail():
+                ComptabiliteService.preparer_ecriture(
+                    date_ecriture=form.date_operation.data,
+                    libelle=form.libelle.data,
+                    journal_code='CA' if form.mode_paiement.data == 'ESPECES' else 'BQ',
+                    mouvements=[
+                        {'compte_id': compte_treso_id, 'debit': float(form.montant.data), 'credit': 0},
+                        {'compte_id': compte_contrepartie.id, 'debit': 0, 'credit': float(form.montant.data)}
+                    ],
+                    dossier_id=form.dossier.data.id if form.dossier.data else None,
+                    user_id=current_user.id,
+                    valider=True
+                )
             flash('Recette enregistrée avec succès.', 'success')
             return redirect(url_for('comptabilite.index'))
         except Exception as e:
@@ -354,7 +355,7 @@ def depenses_create():
             else:
                  compte_tresorerie_num = ComptabiliteService.COMPTE_CAISSE_CLIENT if form.mode_paiement.data == 'ESPECES' else ComptabiliteService.COMPTE_BANQUE_CLIENT
             
-            compte_treso = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte=compte_tresorerie_num)).scalar_one()
+            compte_treso_id = PlanComptable.id_compte_requis(compte_tresorerie_num)
             
             compte_charge = form.compte_charge.data
             
@@ -362,18 +363,19 @@ def depenses_create():
                  flash("Plan comptable incomplet ou compte non sélectionné.", 'error')
                  return render_template('comptabilite/depenses/form.html', form=form)
 
-            ecriture = ComptabiliteService.create_ecriture(
-                date_ecriture=form.date_operation.data,
-                libelle=form.libelle.data,
-                journal_code='CA' if form.mode_paiement.data == 'ESPECES' else 'BQ',
-                mouvements=[
-                    {'compte_id': compte_charge.id, 'debit': float(form.montant.data), 'credit': 0},
-                    {'compte_id': compte_treso.id, 'debit': 0, 'credit': float(form.montant.data)}
-                ],
-                dossier_id=form.dossier.data.id if form.dossier.data else None,
-                user_id=current_user.id
-            )
-            ComptabiliteService.valider_ecriture(ecriture.id)
+            with ComptabiliteService.unite_de_travail():
+                ComptabiliteService.preparer_ecriture(
+                    date_ecriture=form.date_operation.data,
+                    libelle=form.libelle.data,
+                    journal_code='CA' if form.mode_paiement.data == 'ESPECES' else 'BQ',
+                    mouvements=[
+                        {'compte_id': compte_charge.id, 'debit': float(form.montant.data), 'credit': 0},
+                        {'compte_id': compte_treso_id, 'debit': 0, 'credit': float(form.montant.data)}
+                    ],
+                    dossier_id=form.dossier.data.id if form.dossier.data else None,
+                    user_id=current_user.id,
+                    valider=True
+                )
             flash('Dépense enregistrée avec succès.', 'success')
             return redirect(url_for('comptabilite.index'))
         except Exception as e:
@@ -526,6 +528,170 @@ def reports_grand_livre_download():
     )
 
 
+# ===== EXPORTS (CSV / XLSX) =====
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+@bp.route('/exports/<nom>.<format_>')
+@login_required
+@role_required('COMPTABLE', 'NOTAIRE', 'ADMIN')
+def exports_download(nom, format_):
+    """Stream a report (grand-livre, balance, journal, recus, factures) as CSV or XLSX."""
+    from app.comptabilite.exports import EXPORTS, generer
+
+    if nom not in EXPORTS or format_ not in EXPORT_MIMETYPES:
+        abort(404)
+
+    filtres = {'compte_id': request.args.get('compte_id', type=int),
+               'journal_code': request.args.get('journal_code') or None}
+    for champ in ('date_debut', 'date_fin'):
+        valeur = request.args.get(champ)
+        try:
+            filtres[champ] = datetime.strptime(valeur, '%Y-%m-%d').date() if valeur else None
+        except ValueError:
+            abort(400)
+    # Same default as the on-screen reports
+    if nom in ('grand-livre', 'balance') and filtres['date_fin'] is None:
+        filtres['date_fin'] = date.today()
+
+    filename = nom.replace('-', '_')
+    if filtres['journal_code']:
+        filename += f"_{filtres['journal_code']}"
+    if filtres['date_fin']:
+        filename += f"_{filtres['date_fin']}"
+
+    return Response(
+        stream_with_context(generer(nom, format_, **filtres)),
+        mimetype=EXPORT_MIMETYPES[format_],
+        headers={'Content-Disposition': f'attachment; filename="{filename}.{format_}"'}
+    )
+
+
+
+# Errors listed on the import page (the CLI writes the full report)
+ERREURS_AFFICHEES = 200
+
+@bp.route('/imports/journal', methods=['GET', 'POST'])
+@login_required
+@role_required('COMPTABLE', 'NOTAIRE', 'ADMIN')
+def imports_journal():
+    """Bulk import of journal entries from a CSV or XLSX file."""
+    from app.comptabilite.imports import importer
+
+    form = ImportJournalForm()
+    rapport = None
+    if form.validate_on_submit():
+        fichier = form.fichier.data
+        format_ = 'xlsx' if fichier.filename.lower().endswith('.xlsx') else 'csv'
+        try:
+            rapport = importer(fichier.stream, format_=format_, valider=form.valider.data,
+                               verifier_seulement=form.verifier_seulement.data, user_id=current_user.id)
+        except ValueError as e:
+            flash(str(e), 'error')
+        except Exception as e:
+            current_app.logger.error(f"IMPORT JOURNAL ERROR: {str(e)}")
+            flash('Une erreur est survenue pendant l\'import ; les lots déjà enregistrés sont conservés.', 'error')
+        else:
+            if form.verifier_seulement.data:
+                flash(f"Contrôle terminé : {len(rapport['erreurs'])} erreur(s).", 'info')
+            else:
+                flash(f"{rapport['ecritures']} écriture(s) importée(s), {rapport['rejetees']} rejetée(s).",
+                      'success' if not rapport['erreurs'] else 'warning')
+
+    return render_template('comptabilite/imports/journal.html', form=form, rapport=rapport,
+                           limite=ERREURS_AFFICHEES)
+
+@bp.route('/exercices')
+@login_required
+@role_required('COMPTABLE', 'NOTAIRE', 'ADMIN')
+def exercices_index():
+    """Closed fiscal years and closing of the next one."""
+    exercices = db.session.execute(
+        db.select(ComptaExercice).order_by(ComptaExercice.annee.desc())
+    ).scalars().all()
+    derniere = exercices[0].annee if exercices else None
+    premiere_ecriture = db.session.execute(db.select(db.func.min(ComptaEcriture.date_ecriture))).scalar()
+    if derniere:
+        # Years are closed in sequence: only the one after the last closing
+        annees = [derniere + 1] if derniere + 1 < date.today().year else []
+    else:
+        annees = list(range(premiere_ecriture.year if premiere_ecriture else date.today().year, date.today().year))
+    return render_template('comptabilite/exercices/index.html', exercices=exercices, annees=annees)
+
+@bp.route('/exercices/cloturer', methods=['POST'])
+@login_required
+@role_required('NOTAIRE', 'ADMIN')
+def exercices_cloturer():
+    """Close a fiscal year."""
+    annee = request.form.get('annee', type=int)
+    if not annee:
+        abort(400)
+    try:
+        ComptabiliteService.cloturer_exercice(annee, user_id=current_user.id)
+        flash(f'Exercice {annee} clôturé : les à-nouveaux ont été passés au 01/01/{annee + 1}.', 'success')
+    except ValueError as e:
+        flash(f'Clôture impossible : {e}', 'error')
+    return redirect(url_for('comptabilite.exercices_index'))
+
+# Lignes et mouvements en attente affichés sur la page de rapprochement
+EN_ATTENTE_AFFICHES = 200
+
+@bp.route('/rapprochement', methods=['GET', 'POST'])
+@login_required
+@role_required('COMPTABLE', 'NOTAIRE', 'ADMIN')
+def rapprochement_index():
+    """Bank statement import and pending items of a 512 account."""
+    from app.comptabilite import rapprochement
+
+    form = ReleveBancaireForm()
+    if request.method == 'GET' and request.args.get('compte') in rapprochement.COMPTES:
+        form.compte.data = request.args['compte']
+    try:
+        compte = rapprochement.compte_banque(form.compte.data or rapprochement.COMPTES[0])
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('comptabilite.index'))
+
+    if form.validate_on_submit():
+        fichier = form.fichier.data
+        format_ = 'xlsx' if fichier.filename.lower().endswith('.xlsx') else 'csv'
+        try:
+            rapport = rapprochement.importer_releve(fichier.stream, compte.id, format_=format_,
+                                                    nom_fichier=fichier.filename, user_id=current_user.id)
+        except ValueError as e:
+            flash(str(e), 'error')
+        except Exception as e:
+            current_app.logger.error(f"IMPORT RELEVE ERROR: {str(e)}")
+            flash('Une erreur est survenue pendant l\'import du relevé.', 'error')
+        else:
+            flash(f"{rapport['importees']} ligne(s) importée(s), {rapport['doublons']} déjà présente(s), "
+                  f"{len(rapport['erreurs'])} en erreur.", 'success' if not rapport['erreurs'] else 'warning')
+            return redirect(url_for('comptabilite.rapprochement_index', compte=compte.numero_compte))
+
+    return render_template('comptabilite/rapprochement/index.html', form=form, compte=compte,
+                           attente=rapprochement.en_attente(compte.id, EN_ATTENTE_AFFICHES),
+                           limite=EN_ATTENTE_AFFICHES, comptes=rapprochement.COMPTES,
+                           fenetre=rapprochement.FENETRE_JOURS)
+
+@bp.route('/rapprochement/lancer', methods=['POST'])
+@login_required
+@role_required('COMPTABLE', 'NOTAIRE', 'ADMIN')
+def rapprochement_lancer():
+    """Run the automatic reconciliation of a 512 account."""
+    from app.comptabilite import rapprochement
+
+    numero = request.form.get('compte', '')
+    try:
+        compte = rapprochement.compte_banque(numero)
+    except ValueError:
+        abort(400)
+    rapport = rapprochement.rapprocher(compte.id, user_id=current_user.id)
+    flash(f"{rapport['rapprochees']} ligne(s) sur {rapport['lignes']} rapprochée(s) "
+          f"avec {rapport['mouvements']} mouvement(s).", 'success')
+    return redirect(url_for('comptabilite.rapprochement_index', compte=numero))
 
 @bp.route('/api/dossier-info/<int:id>')
 @login_required
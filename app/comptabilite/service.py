@@ -3,12 +3,20 @@ Service layer for accounting operations.
 Handles business logic for double-entry bookkeeping, account management, and financial operations.
 """
 
-from datetime import datetime, date
+import calendar
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 from typing import List, Dict, Optional, Tuple
-from sqlalchemy import and_, or_, func
+from sqlalchemy import Date, Numeric, and_, or_, func, literal, null, type_coerce, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models import ComptaCompte, ComptaEcriture, ComptaMouvement, Recu, Facture, Dossier, Client, User
+from app.sequences import SequenceService
+from app.comptabilite.plan_comptable import PlanComptable
+from app.models import (ComptaCompte, ComptaEcriture, ComptaMouvement, ComptaSolde, ComptaExercice,
+                        ComptaSoldeCloture, Recu, Facture, Dossier, Client, User)
 
 class ComptabiliteService:
     """Service class for accounting operations."""
@@ -20,6 +28,13 @@ class ComptabiliteService:
     COMPTE_CAISSE_CLIENT = '531-CLIENT'
     COMPTE_HONORAIRES = '706'
     COMPTE_CLIENTS_DEBITEURS = '411'
+    COMPTE_RESULTAT_BENEFICE = '131'
+    COMPTE_RESULTAT_PERTE = '139'
+
+    # Opening entries (à-nouveaux) posted when a fiscal year is closed
+    JOURNAL_A_NOUVEAUX = 'AN'
+    # Income statement classes, transferred to the result account at closing
+    CLASSES_GESTION = ('6', '7', '8')
     
     @staticmethod
     def create_compte(numero: str, libelle: str, type_compte: str, categorie: str = None) -> ComptaCompte:
@@ -52,6 +67,8 @@ class ComptabiliteService:
             ('445', 'État - TVA récupérable', 'GENERAL', 'OFFICE'),
             ('462', 'Débours payés pour le compte des clients', 'GENERAL', 'OFFICE'),
             ('471', 'Comptes d\'Attente', 'GENERAL', 'OFFICE'),
+            ('131', 'Résultat net : Bénéfice', 'GENERAL', 'OFFICE'),
+            ('139', 'Résultat net : Perte', 'GENERAL', 'OFFICE'),
             
             # Office Accounts - Charges (Classe 6)
             ('605', 'Fournitures de bureau', 'CHARGE', 'OFFICE'),
@@ -71,37 +88,46 @@ class ComptabiliteService:
             ('467', 'Fonds de Tiers - Clients', 'CLIENT', 'CLIENT'),
         ]
         
+        existants = set(db.session.execute(db.select(ComptaCompte.numero_compte)).scalars())
         for numero, libelle, type_compte, categorie in default_accounts:
-            existing = db.session.execute(
-                db.select(ComptaCompte).filter_by(numero_compte=numero)
-            ).scalar_one_or_none()
-            
-            if not existing:
+            if numero not in existants:
                 ComptabiliteService.create_compte(numero, libelle, type_compte, categorie)
     
     @staticmethod
-    def create_ecriture(date_ecriture: date, libelle: str, journal_code: str,
-                       mouvements: List[Dict], dossier_id: int = None,
-                       numero_piece: str = None, user_id: int = None) -> ComptaEcriture:
+    @contextmanager
+    def unite_de_travail():
         """
-        Create a new accounting entry with movements.
-        
-        Args:
-            date_ecriture: Date of the entry
-            libelle: Description of the operation
-            journal_code: Journal code (BQ, CA, OD, VT)
-            mouvements: List of movements [{'compte_id': int, 'debit': float, 'credit': float}]
-            dossier_id: Optional dossier ID
-            numero_piece: Optional piece number (receipt, invoice, etc.)
-            user_id: User creating the entry
-            
-        Returns:
-            ComptaEcriture: The created entry
-            
+        Unit of work: everything staged inside the block is committed once
+        at the end, or rolled back entirely if an exception escapes.
+
+            with ComptabiliteService.unite_de_travail():
+                ecriture = ComptabiliteService.preparer_ecriture(..., valider=True)
+                db.session.add(Recu(..., ecriture=ecriture))
+        """
+        try:
+            yield db.session
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def preparer_ecriture(date_ecriture: date, libelle: str, journal_code: str,
+                          mouvements: List[Dict], dossier_id: int = None,
+                          numero_piece: str = None, user_id: int = None,
+                          valider: bool = False) -> ComptaEcriture:
+        """
+        Stage an accounting entry and its movements in the session, without
+        flushing or committing (see unite_de_travail).
+
+        With valider=True the entry is staged as validated and the running
+        balances are updated in the same transaction.
+
         Raises:
-            ValueError: If the entry is not balanced
+            ValueError: If the entry is not balanced or dated in a closed
+                fiscal year (nothing is staged)
         """
-        # Create the entry
+        ComptabiliteService.verifier_periode_ouverte(date_ecriture)
         ecriture = ComptaEcriture(
             date_ecriture=date_ecriture,
             libelle_operation=libelle,
@@ -111,45 +137,412 @@ class ComptabiliteService:
             created_by=user_id,
             valide=False
         )
-        db.session.add(ecriture)
-        db.session.flush()  # Get the ID
         
-        # Create movements
         total_debit = Decimal('0')
         total_credit = Decimal('0')
         
         for mouv_data in mouvements:
             mouvement = ComptaMouvement(
-                ecriture_id=ecriture.id,
                 compte_id=mouv_data['compte_id'],
                 debit=Decimal(str(mouv_data.get('debit', 0))),
                 credit=Decimal(str(mouv_data.get('credit', 0)))
             )
-            db.session.add(mouvement)
+            ecriture.mouvements.append(mouvement)
             total_debit += mouvement.debit
             total_credit += mouvement.credit
         
         # Check if balanced
         if abs(total_debit - total_credit) > Decimal('0.01'):
+            ecriture.mouvements.clear()
             raise ValueError(f"Entry not balanced: Debit={total_debit}, Credit={total_credit}")
         
-        db.session.commit()
+        db.session.add(ecriture)
+        if valider:
+            ecriture.valide = True
+            # Les soldes ne dépendent que des comptes : l'écriture sera écrite au flush du commit
+            with db.session.no_autoflush:
+                ComptabiliteService._maj_soldes(ecriture)
         return ecriture
+
+    @staticmethod
+    def create_ecriture(date_ecriture: date, libelle: str, journal_code: str,
+                       mouvements: List[Dict], dossier_id: int = None,
+                       numero_piece: str = None, user_id: int = None) -> ComptaEcriture:
+        """
+        Create a new accounting entry with movements.
+        
+        Args:
+            date_ecriture: Date of the entry
+            libelle: Description of the operation
+            journal_code: Journal code (BQ, CA, OD, VT)
+            mouvements: List of movements [{'compte_id': int, 'debit': float, 'credit': float}]
+            dossier_id: Optional dossier ID
+            numero_piece: Optional piece number (receipt, invoice, etc.)
+            user_id: User creating the entry
+            
+        Returns:
+            ComptaEcriture: The created entry
+            
+        Raises:
+            ValueError: If the entry is not balanced
+        """
+        with ComptabiliteService.unite_de_travail():
+            return ComptabiliteService.preparer_ecriture(
+                date_ecriture, libelle, journal_code, mouvements,
+                dossier_id=dossier_id, numero_piece=numero_piece, user_id=user_id
+            )
     
     @staticmethod
     def valider_ecriture(ecriture_id: int) -> ComptaEcriture:
-        """Validate an accounting entry (make it permanent)."""
+        """
+        Validate an accounting entry (make it permanent).
+
+        The running balances (compta_soldes) of the accounts involved are
+        updated in the same transaction. Validating an entry twice is a no-op.
+        """
         ecriture = db.session.get(ComptaEcriture, ecriture_id)
         if not ecriture:
             raise ValueError("Entry not found")
         
         if not ecriture.is_balanced():
             raise ValueError("Cannot validate unbalanced entry")
+        ComptabiliteService.verifier_periode_ouverte(ecriture.date_ecriture)
         
-        ecriture.valide = True
+        # UPDATE conditionnel : deux validations concurrentes ne comptent l'écriture qu'une fois
+        bascule = db.session.execute(
+            db.update(ComptaEcriture).where(
+                ComptaEcriture.id == ecriture.id, ComptaEcriture.valide == False
+            ).values(valide=True).execution_options(synchronize_session=False)
+        )
+        if bascule.rowcount:
+            ecriture.valide = True
+            ComptabiliteService._maj_soldes(ecriture)
         db.session.commit()
         return ecriture
+
+    @staticmethod
+    def contrepasser_ecriture(ecriture_id: int, date_ecriture: date = None,
+                              user_id: int = None) -> ComptaEcriture:
+        """
+        Reverse a validated entry by posting and validating its mirror entry
+        (debits and credits swapped). The balances are updated like for any
+        other validated entry.
+        """
+        ecriture = db.session.get(ComptaEcriture, ecriture_id)
+        if not ecriture:
+            raise ValueError("Entry not found")
+        if not ecriture.valide:
+            raise ValueError("Only validated entries can be reversed")
+
+        with ComptabiliteService.unite_de_travail():
+            return ComptabiliteService.preparer_ecriture(
+                date_ecriture=date_ecriture or date.today(),
+                libelle=f"Contre-passation - {ecriture.libelle_operation}"[:200],
+                journal_code=ecriture.journal_code,
+                mouvements=[
+                    {'compte_id': m.compte_id, 'debit': m.credit, 'credit': m.debit}
+                    for m in ecriture.mouvements
+                ],
+                dossier_id=ecriture.dossier_id,
+                numero_piece=ecriture.numero_piece,
+                user_id=user_id,
+                valider=True
+            )
+
+    # ===== RUNNING BALANCES (compta_soldes) =====
+
+    @staticmethod
+    def _periode(jour: date) -> str:
+        """Monthly period key of a date ('YYYY-MM')."""
+        return f"{jour.year:04d}-{jour.month:02d}"
+
+    @staticmethod
+    def _maj_soldes(ecriture: ComptaEcriture, signe: int = 1) -> None:
+        """
+        Add (signe=1) or remove (signe=-1) the movements of an entry to the
+        running balances, without committing. Opening entries are skipped.
+        """
+        if ecriture.journal_code == ComptabiliteService.JOURNAL_A_NOUVEAUX:
+            return
+        deltas = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0])
+        periode = ComptabiliteService._periode(ecriture.date_ecriture)
+        for m in ecriture.mouvements:
+            if m.compte_id is None:
+                continue
+            for cle in ((m.compte_id, periode), (m.compte_id, ComptaSolde.PERIODE_TOTAL)):
+                delta = deltas[cle]
+                delta[0] += Decimal(str(m.debit or 0)) * signe
+                delta[1] += Decimal(str(m.credit or 0)) * signe
+                delta[2] += signe
+        ComptabiliteService._appliquer_soldes(deltas)
+
+    @staticmethod
+    def _appliquer_soldes(deltas: Dict[Tuple[int, str], Tuple[Decimal, Decimal, int]]) -> None:
+        """Add {(compte_id, periode): (debit, credit, nb_mouvements)} to the running balances."""
+        # Ordre fixe des verrous de ligne : évite les interblocages entre écritures concurrentes
+        lignes = [
+            {'compte_id': compte_id, 'periode': periode, 'total_debit': debit,
+             'total_credit': credit, 'nb_mouvements': nb}
+            for (compte_id, periode), (debit, credit, nb) in sorted(deltas.items())
+        ]
+        if not lignes:
+            return
+
+        dialecte = db.session.get_bind().dialect.name
+        if dialecte in ('postgresql', 'sqlite'):
+            # Un seul aller-retour : INSERT ... ON CONFLICT DO UPDATE pour toutes les lignes
+            insert = postgresql.insert if dialecte == 'postgresql' else sqlite.insert
+            table = ComptaSolde.__table__
+            ordre = insert(table)
+            ordre = ordre.on_conflict_do_update(
+                index_elements=[table.c.compte_id, table.c.periode],
+                set_={
+                    'total_debit': table.c.total_debit + ordre.excluded.total_debit,
+                    'total_credit': table.c.total_credit + ordre.excluded.total_credit,
+                    'nb_mouvements': table.c.nb_mouvements + ordre.excluded.nb_mouvements,
+                },
+            )
+            db.session.execute(ordre, lignes)
+            return
+
+        for ligne in lignes:
+            ComptabiliteService._ajouter_solde(**ligne)
+
+    @staticmethod
+    def _ajouter_solde(compte_id: int, periode: str, total_debit: Decimal, total_credit: Decimal,
+                       nb_mouvements: int) -> None:
+        """Atomic increment of one balance row, created on first use (backends without upsert)."""
+        maj = db.update(ComptaSolde).where(
+            ComptaSolde.compte_id == compte_id, ComptaSolde.periode == periode
+        ).values(
+            total_debit=ComptaSolde.total_debit + total_debit,
+            total_credit=ComptaSolde.total_credit + total_credit,
+            nb_mouvements=ComptaSolde.nb_mouvements + nb_mouvements,
+        ).execution_options(synchronize_session=False)
+
+        if db.session.execute(maj).rowcount:
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.add(ComptaSolde(compte_id=compte_id, periode=periode, total_debit=total_debit,
+                                           total_credit=total_credit, nb_mouvements=nb_mouvements))
+        except IntegrityError:
+            # Ligne créée entre-temps par une autre transaction
+            db.session.execute(maj)
+
+    @staticmethod
+    def _soldes_attendus() -> Dict[Tuple[int, str], Tuple[Decimal, Decimal, int]]:
+        """Balances recomputed from the validated movements (one GROUP BY query)."""
+        annee = func.extract('year', ComptaEcriture.date_ecriture)
+        mois = func.extract('month', ComptaEcriture.date_ecriture)
+        rows = db.session.execute(
+            db.select(
+                ComptaMouvement.compte_id, annee, mois,
+                func.coalesce(func.sum(ComptaMouvement.debit), 0),
+                func.coalesce(func.sum(ComptaMouvement.credit), 0),
+                func.count(ComptaMouvement.id),
+            ).join(ComptaEcriture).filter(
+                ComptaEcriture.valide == True,
+                ComptaEcriture.journal_code != ComptabiliteService.JOURNAL_A_NOUVEAUX,
+                ComptaMouvement.compte_id.isnot(None)
+            ).group_by(ComptaMouvement.compte_id, annee, mois)
+        ).all()
+
+        attendus = {
+            (compte_id, f"{int(a):04d}-{int(m):02d}"): (Decimal(str(debit)), Decimal(str(credit)), nb)
+            for compte_id, a, m, debit, credit, nb in rows
+        }
+        mensuels = [(compte_id, periode) + valeurs for (compte_id, periode), valeurs in attendus.items()]
+        totaux = ComptabiliteService._totaux(mensuels, ComptabiliteService.derniere_cloture())
+        for compte_id, total in totaux.items():
+            attendus[(compte_id, ComptaSolde.PERIODE_TOTAL)] = total
+        return attendus
+
+    @staticmethod
+    def _totaux(mensuels, cloture: Optional[ComptaExercice]) -> Dict[int, Tuple[Decimal, Decimal, int]]:
+        """
+        'TOTAL' rows from monthly (compte_id, periode, debit, credit, nb)
+        totals: opening balances of the last closed year (on the debit or
+        credit side) plus the months after it.
+        """
+        totaux = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0])
+        depuis = None
+        if cloture is not None:
+            depuis = ComptabiliteService._periode(cloture.date_fin)
+            for solde in cloture.soldes:
+                ouverture = Decimal(str(solde.solde_ouverture))
+                totaux[solde.compte_id][0 if ouverture > 0 else 1] += abs(ouverture)
+        for compte_id, periode, debit, credit, nb in mensuels:
+            if depuis is None or periode > depuis:
+                total = totaux[compte_id]
+                total[0] += debit
+                total[1] += credit
+                total[2] += nb
+        return {compte_id: tuple(total) for compte_id, total in totaux.items()}
+
+    @staticmethod
+    def verifier_soldes() -> List[Dict]:
+        """
+        Compare compta_soldes with the movements. Returns the differences
+        (empty list when the table is consistent).
+        """
+        attendus = ComptabiliteService._soldes_attendus()
+        actuels = {
+            (s.compte_id, s.periode): (Decimal(str(s.total_debit)), Decimal(str(s.total_credit)), s.nb_mouvements)
+            for s in db.session.execute(db.select(ComptaSolde)).scalars()
+        }
+        vide = (Decimal('0'), Decimal('0'), 0)
+        ecarts = []
+        for cle in sorted(set(attendus) | set(actuels)):
+            attendu, actuel = attendus.get(cle, vide), actuels.get(cle, vide)
+            if attendu != actuel:
+                ecarts.append({'compte_id': cle[0], 'periode': cle[1], 'attendu': attendu, 'actuel': actuel})
+        return ecarts
+
+    @staticmethod
+    def rebuild_soldes() -> int:
+        """Recompute compta_soldes from scratch. Returns the number of rows written."""
+        attendus = ComptabiliteService._soldes_attendus()
+        db.session.execute(db.delete(ComptaSolde))
+        if attendus:
+            db.session.execute(db.insert(ComptaSolde), [
+                {'compte_id': compte_id, 'periode': periode, 'total_debit': debit,
+                 'total_credit': credit, 'nb_mouvements': nb}
+                for (compte_id, periode), (debit, credit, nb) in attendus.items()
+            ])
+        db.session.commit()
+        return len(attendus)
     
+    # ===== FISCAL YEAR CLOSING =====
+
+    @staticmethod
+    def derniere_cloture(avant: date = None) -> Optional[ComptaExercice]:
+        """Last closed fiscal year, or the last one ending strictly before `avant`."""
+        query = db.select(ComptaExercice).order_by(ComptaExercice.date_fin.desc()).limit(1)
+        if avant is not None:
+            query = query.filter(ComptaExercice.date_fin < avant)
+        return db.session.execute(query).scalar_one_or_none()
+
+    @staticmethod
+    def verifier_periode_ouverte(jour: date) -> None:
+        """
+        Read in the posting transaction on purpose (one query on the date_fin
+        index): a closed year is a legal lock, a per-worker cache would let
+        other workers post into it until they refresh.
+
+        Raises:
+            ValueError: If `jour` falls in a closed fiscal year
+        """
+        date_cloture = db.session.execute(db.select(func.max(ComptaExercice.date_fin))).scalar()
+        if date_cloture is not None and jour <= date_cloture:
+            raise ValueError(f"The books are closed up to {date_cloture}: no entry can be dated {jour}")
+
+    @staticmethod
+    def cloturer_exercice(annee: int, user_id: int = None) -> ComptaExercice:
+        """
+        Close fiscal year `annee` (calendar year) in one transaction:
+          - snapshot of every account's balance at 31/12 (ComptaSoldeCloture),
+            income and expense accounts (classes 6-8) being transferred to
+            the result account (131 profit / 139 loss) for the opening;
+          - opening entry (journal 'AN') dated 1/1 of the next year;
+          - 'TOTAL' running balances restarted from that snapshot.
+        Entries dated up to 31/12 can no longer be posted or validated.
+
+        Raises:
+            ValueError: If the year is not over, already closed (or a later
+                one is), not the one after the last closing, or still has
+                draft entries
+        """
+        date_fin = date(annee, 12, 31)
+        if date_fin >= date.today():
+            raise ValueError(f"Fiscal year {annee} is not over")
+        precedente = ComptabiliteService.derniere_cloture()
+        if precedente is not None and precedente.annee >= annee:
+            raise ValueError(f"Fiscal year {precedente.annee} is already closed")
+        if precedente is not None and annee != precedente.annee + 1:
+            raise ValueError(f"Fiscal year {precedente.annee + 1} must be closed first")
+        brouillons = db.session.execute(
+            db.select(func.count(ComptaEcriture.id)).filter(
+                ComptaEcriture.valide == False, ComptaEcriture.date_ecriture <= date_fin)
+        ).scalar()
+        if brouillons:
+            raise ValueError(f"{brouillons} draft entries dated up to {date_fin} must be validated first")
+
+        argent = Numeric(18, 2)
+        requete = ComptabiliteService.requete_soldes(date_fin=date_fin).subquery()
+        rows = db.session.execute(
+            db.select(requete.c.compte_id, ComptaCompte.numero_compte, type_coerce(requete.c.solde, argent))
+            .join(ComptaCompte, ComptaCompte.id == requete.c.compte_id)
+        ).all()
+
+        clotures, ouvertures = {}, {}
+        resultat = Decimal('0')
+        for compte_id, numero, solde in rows:
+            solde = Decimal(str(solde or 0))
+            clotures[compte_id] = solde
+            if numero.startswith(ComptabiliteService.CLASSES_GESTION):
+                resultat += solde
+            else:
+                ouvertures[compte_id] = solde
+        # Débit - crédit des classes 6-8 : négatif = bénéfice
+        if resultat:
+            compte_resultat = PlanComptable.id_compte_requis(
+                ComptabiliteService.COMPTE_RESULTAT_BENEFICE if resultat < 0 else ComptabiliteService.COMPTE_RESULTAT_PERTE
+            )
+            ouvertures[compte_resultat] = ouvertures.get(compte_resultat, Decimal('0')) + resultat
+
+        with ComptabiliteService.unite_de_travail():
+            exercice = ComptaExercice(
+                annee=annee, date_debut=date(annee, 1, 1), date_fin=date_fin,
+                resultat=-resultat, cloture_par=user_id
+            )
+            exercice.soldes = [
+                ComptaSoldeCloture(compte_id=compte_id, solde_cloture=clotures.get(compte_id, Decimal('0')),
+                                   solde_ouverture=ouvertures.get(compte_id, Decimal('0')))
+                for compte_id in sorted(set(clotures) | set(ouvertures))
+                if clotures.get(compte_id) or ouvertures.get(compte_id)
+            ]
+            mouvements = [
+                {'compte_id': compte_id, 'debit': max(solde, 0), 'credit': max(-solde, 0)}
+                for compte_id, solde in sorted(ouvertures.items()) if solde
+            ]
+            if mouvements:
+                exercice.ecriture_an = ComptabiliteService.preparer_ecriture(
+                    date_ecriture=date(annee + 1, 1, 1),
+                    libelle=f"À-nouveaux {annee + 1}",
+                    journal_code=ComptabiliteService.JOURNAL_A_NOUVEAUX,
+                    mouvements=mouvements,
+                    numero_piece=f"AN-{annee + 1}",
+                    user_id=user_id,
+                    valider=True
+                )
+            db.session.add(exercice)
+            db.session.flush()
+            ComptabiliteService._recalculer_totaux(exercice)
+        return exercice
+
+    @staticmethod
+    def _recalculer_totaux(cloture: ComptaExercice) -> None:
+        """Restart the 'TOTAL' rows from the opening balances of `cloture` plus the later months."""
+        rows = db.session.execute(
+            db.select(ComptaSolde.compte_id, ComptaSolde.periode, ComptaSolde.total_debit,
+                      ComptaSolde.total_credit, ComptaSolde.nb_mouvements).filter(
+                ComptaSolde.periode != ComptaSolde.PERIODE_TOTAL,
+                ComptaSolde.periode > ComptabiliteService._periode(cloture.date_fin)
+            )
+        ).all()
+        mensuels = [(compte_id, periode, Decimal(str(debit)), Decimal(str(credit)), nb)
+                    for compte_id, periode, debit, credit, nb in rows]
+        totaux = ComptabiliteService._totaux(mensuels, cloture)
+
+        db.session.execute(db.delete(ComptaSolde).where(ComptaSolde.periode == ComptaSolde.PERIODE_TOTAL))
+        if totaux:
+            db.session.execute(db.insert(ComptaSolde), [
+                {'compte_id': compte_id, 'periode': ComptaSolde.PERIODE_TOTAL, 'total_debit': debit,
+                 'total_credit': credit, 'nb_mouvements': nb}
+                for compte_id, (debit, credit, nb) in sorted(totaux.items())
+            ])
+
     @staticmethod
     def create_recu(date_emission: date, montant: float, mode_paiement: str,
                    motif: str, dossier_id: int = None, client_id: int = None,
@@ -170,30 +563,25 @@ class ComptabiliteService:
         Returns:
             Recu: The created receipt
         """
-        # Generate receipt number
-        last_recu = db.session.execute(
-            db.select(Recu).order_by(Recu.id.desc())
-        ).scalars().first()
-        
-        if last_recu:
-            last_num = int(last_recu.numero_recu.split('-')[1])
-            numero_recu = f"REC-{last_num + 1:06d}"
-        else:
-            numero_recu = "REC-000001"
+        with ComptabiliteService.unite_de_travail():
+            return ComptabiliteService._preparer_recu(
+                date_emission, montant, mode_paiement, motif, dossier_id,
+                client_id, reference_paiement, user_id
+            )
+
+    @staticmethod
+    def _preparer_recu(date_emission, montant, mode_paiement, motif, dossier_id,
+                       client_id, reference_paiement, user_id) -> Recu:
+        # Generate receipt number (REC-YYYY-NNNNNN, allocated under a row lock)
+        numero_recu = SequenceService.numero_document('REC', date_emission)
         
         # Determine accounts based on payment method
         if mode_paiement == 'ESPECES':
-            compte_tresorerie_id = db.session.execute(
-                db.select(ComptaCompte.id).filter_by(numero_compte=ComptabiliteService.COMPTE_CAISSE_CLIENT)
-            ).scalar_one()
+            compte_tresorerie_id = PlanComptable.id_compte_requis(ComptabiliteService.COMPTE_CAISSE_CLIENT)
         else:  # CHEQUE or VIREMENT
-            compte_tresorerie_id = db.session.execute(
-                db.select(ComptaCompte.id).filter_by(numero_compte=ComptabiliteService.COMPTE_BANQUE_CLIENT)
-            ).scalar_one()
+            compte_tresorerie_id = PlanComptable.id_compte_requis(ComptabiliteService.COMPTE_BANQUE_CLIENT)
         
-        compte_client_id = db.session.execute(
-            db.select(ComptaCompte.id).filter_by(numero_compte='467')
-        ).scalar_one()
+        compte_client_id = PlanComptable.id_compte_requis('467')
         
         # Create accounting entry
         mouvements = [
@@ -201,19 +589,18 @@ class ComptabiliteService:
             {'compte_id': compte_client_id, 'debit': 0, 'credit': montant}
         ]
         
-        ecriture = ComptabiliteService.create_ecriture(
+        # Validated immediately
+        ecriture = ComptabiliteService.preparer_ecriture(
             date_ecriture=date_emission,
             libelle=f"Reçu {numero_recu} - {motif}",
             journal_code='CA' if mode_paiement == 'ESPECES' else 'BQ',
             mouvements=mouvements,
             dossier_id=dossier_id,
             numero_piece=numero_recu,
-            user_id=user_id
+            user_id=user_id,
+            valider=True
         )
         
-        # Validate the entry immediately
-        ComptabiliteService.valider_ecriture(ecriture.id)
-        
         # Create the receipt
         recu = Recu(
             numero_recu=numero_recu,
@@ -224,12 +611,10 @@ class ComptabiliteService:
             mode_paiement=mode_paiement,
             reference_paiement=reference_paiement,
             motif=motif,
-            ecriture_id=ecriture.id,
+            ecriture=ecriture,
             created_by=user_id
         )
         db.session.add(recu)
-        db.session.commit()
-        
         return recu
     
     @staticmethod
@@ -237,48 +622,46 @@ class ComptabiliteService:
                       dossier_id: int = None, client_id: int = None,
                       montant_tva: float = 0, date_echeance: date = None,
                       user_id: int = None) -> Facture:
-        """Create an invoice and its corresponding accounting entry."""
-        # Generate invoice number
-        last_facture = db.session.execute(
-            db.select(Facture).order_by(Facture.id.desc())
-        ).scalars().first()
-        
-        if last_facture:
-            last_num = int(last_facture.numero_facture.split('-')[1])
-            numero_facture = f"FACT-{last_num + 1:06d}"
-        else:
-            numero_facture = "FACT-000001"
+        """Create an invoice and its corresponding accounting entry, in one transaction."""
+        with ComptabiliteService.unite_de_travail():
+            return ComptabiliteService._preparer_facture(
+                date_emission, montant_ht, description, dossier_id, client_id,
+                montant_tva, date_echeance, user_id
+            )
+
+    @staticmethod
+    def _preparer_facture(date_emission, montant_ht, description, dossier_id, client_id,
+                          montant_tva, date_echeance, user_id) -> Facture:
+        # Generate invoice number (FACT-YYYY-NNNNNN, allocated under a row lock)
+        numero_facture = SequenceService.numero_document('FACT', date_emission)
         
         montant_ttc = montant_ht + montant_tva
         
         # 1. Create the accounting entry for the invoice (VT - Ventes)
-        compte_client = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte='411')).scalar_one_or_none()
-        compte_honoraires = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte='706')).scalar_one_or_none()
-        compte_tva = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte='443')).scalar_one_or_none()
+        compte_client_id = PlanComptable.id_compte(ComptabiliteService.COMPTE_CLIENTS_DEBITEURS)
+        compte_honoraires_id = PlanComptable.id_compte(ComptabiliteService.COMPTE_HONORAIRES)
         # Fallback if specific accounts are missing
-        if not compte_tva:
-             compte_tva = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte='445')).scalar_one_or_none()
+        compte_tva_id = PlanComptable.id_compte('443') or PlanComptable.id_compte('445')
              
-        ecriture_id = None
-        if compte_client and compte_honoraires:
+        ecriture = None
+        if compte_client_id and compte_honoraires_id:
             mouvements = [
-                {'compte_id': compte_client.id, 'debit': float(montant_ttc), 'credit': 0},
-                {'compte_id': compte_honoraires.id, 'debit': 0, 'credit': float(montant_ht)}
+                {'compte_id': compte_client_id, 'debit': float(montant_ttc), 'credit': 0},
+                {'compte_id': compte_honoraires_id, 'debit': 0, 'credit': float(montant_ht)}
             ]
-            if compte_tva and montant_tva > 0:
-                mouvements.append({'compte_id': compte_tva.id, 'debit': 0, 'credit': float(montant_tva)})
+            if compte_tva_id and montant_tva > 0:
+                mouvements.append({'compte_id': compte_tva_id, 'debit': 0, 'credit': float(montant_tva)})
                 
-            ecriture = ComptabiliteService.create_ecriture(
+            ecriture = ComptabiliteService.preparer_ecriture(
                 date_ecriture=date_emission,
                 libelle=f"Facture {numero_facture} - {description}",
                 journal_code='VT',
                 mouvements=mouvements,
                 dossier_id=dossier_id,
                 numero_piece=numero_facture,
-                user_id=user_id
+                user_id=user_id,
+                valider=True
             )
-            ComptabiliteService.valider_ecriture(ecriture.id)
-            ecriture_id = ecriture.id
         
         # 2. Create the invoice
         facture = Facture(
@@ -292,20 +675,55 @@ class ComptabiliteService:
             montant_ttc=montant_ttc,
             statut='IMPAYEE',
             description=description,
-            ecriture_id=ecriture_id,
+            ecriture=ecriture,
             created_by=user_id
         )
         db.session.add(facture)
-        db.session.commit()
-        
         return facture
     
     @staticmethod
     def get_balance(compte_id: int, date_debut: date = None, date_fin: date = None) -> Decimal:
-        """Get the balance of an account for a given period."""
-        query = db.select(ComptaMouvement).join(ComptaEcriture).filter(
+        """
+        Get the balance of an account for a given period.
+
+        Read from compta_soldes when the period is made of whole months (or
+        unbounded); otherwise summed by the database from the movements.
+        Without date_debut, the balance starts from the opening balance of
+        the last year closed before date_fin.
+        """
+        ouverture = Decimal('0')
+        if date_debut is None and date_fin is not None:
+            cloture = ComptabiliteService.derniere_cloture(avant=date_fin)
+            if cloture is not None:
+                date_debut = cloture.date_fin + timedelta(days=1)
+                ouverture = Decimal(str(db.session.execute(
+                    db.select(func.coalesce(func.sum(ComptaSoldeCloture.solde_ouverture), 0)).filter_by(
+                        exercice_id=cloture.id, compte_id=compte_id)
+                ).scalar()))
+
+        debut_mois = date_debut is None or date_debut.day == 1
+        fin_mois = date_fin is None or date_fin.day == calendar.monthrange(date_fin.year, date_fin.month)[1]
+
+        if debut_mois and fin_mois:
+            query = db.select(
+                func.coalesce(func.sum(ComptaSolde.total_debit - ComptaSolde.total_credit), 0)
+            ).filter(ComptaSolde.compte_id == compte_id)
+            if date_debut is None and date_fin is None:
+                query = query.filter(ComptaSolde.periode == ComptaSolde.PERIODE_TOTAL)
+            else:
+                query = query.filter(ComptaSolde.periode != ComptaSolde.PERIODE_TOTAL)
+                if date_debut:
+                    query = query.filter(ComptaSolde.periode >= ComptabiliteService._periode(date_debut))
+                if date_fin:
+                    query = query.filter(ComptaSolde.periode <= ComptabiliteService._periode(date_fin))
+            return ouverture + Decimal(str(db.session.execute(query).scalar()))
+
+        query = db.select(
+            func.coalesce(func.sum(ComptaMouvement.debit - ComptaMouvement.credit), 0)
+        ).join(ComptaEcriture).filter(
             ComptaMouvement.compte_id == compte_id,
-            ComptaEcriture.valide == True
+            ComptaEcriture.valide == True,
+            ComptaEcriture.journal_code != ComptabiliteService.JOURNAL_A_NOUVEAUX
         )
         
         if date_debut:
@@ -313,90 +731,211 @@ class ComptabiliteService:
         if date_fin:
             query = query.filter(ComptaEcriture.date_ecriture <= date_fin)
         
-        mouvements = db.session.execute(query).scalars().all()
-        
-        total_debit = sum(Decimal(str(m.debit)) for m in mouvements)
-        total_credit = sum(Decimal(str(m.credit)) for m in mouvements)
-        
-        return total_debit - total_credit
+        return ouverture + Decimal(str(db.session.execute(query).scalar()))
+
+    @staticmethod
+    def requete_soldes(date_fin: date = None, date_debut: date = None, compte_id: int = None):
+        """
+        (compte_id, solde) of the accounts at the end of date_fin, or at the
+        start of date_debut (before its movements).
+
+        Starts from the opening balances of the last year closed before that
+        date and adds the validated movements since, so the cost depends on
+        the time elapsed since that closing, not on the age of the books.
+        """
+        borne = date_fin or date_debut
+        cloture = ComptabiliteService.derniere_cloture(avant=borne)
+
+        filtres = [
+            ComptaEcriture.valide == True,
+            ComptaEcriture.journal_code != ComptabiliteService.JOURNAL_A_NOUVEAUX,
+            ComptaMouvement.compte_id.isnot(None),
+            ComptaEcriture.date_ecriture <= date_fin if date_fin else ComptaEcriture.date_ecriture < date_debut,
+        ]
+        if cloture is not None:
+            filtres.append(ComptaEcriture.date_ecriture > cloture.date_fin)
+        if compte_id:
+            filtres.append(ComptaMouvement.compte_id == compte_id)
+        mouvements = db.select(
+            ComptaMouvement.compte_id.label('compte_id'),
+            func.sum(ComptaMouvement.debit - ComptaMouvement.credit).label('solde')
+        ).join(ComptaEcriture).filter(*filtres).group_by(ComptaMouvement.compte_id)
+        if cloture is None:
+            return mouvements
+
+        ouvertures = db.select(
+            ComptaSoldeCloture.compte_id.label('compte_id'),
+            ComptaSoldeCloture.solde_ouverture.label('solde')
+        ).filter(ComptaSoldeCloture.exercice_id == cloture.id)
+        if compte_id:
+            ouvertures = ouvertures.filter(ComptaSoldeCloture.compte_id == compte_id)
+        lignes = union_all(mouvements, ouvertures).subquery()
+        return db.select(
+            lignes.c.compte_id.label('compte_id'),
+            func.sum(lignes.c.solde).label('solde')
+        ).group_by(lignes.c.compte_id)
     
+    @staticmethod
+    def requete_grand_livre(compte_id: int = None, date_debut: date = None, date_fin: date = None):
+        """
+        Single query behind the general ledger.
+
+        The opening balance of each account is a GROUP BY row (ordre 0) of the
+        movements before date_debut; the period movements follow (ordre 1) and
+        the running balance (solde_cumule) is a SUM() OVER (PARTITION BY compte)
+        window over both. Rows: (compte, ordre, date_ecriture, libelle,
+        numero_piece, debit, credit, montant, solde_cumule), ordered by account
+        number then chronologically.
+
+        The opening balance comes from requete_soldes (nearest closing
+        snapshot); without date_debut the ledger starts the day after the
+        last closed year. Opening entries (journal 'AN') are not listed: the
+        opening balance row already carries them.
+        """
+        if date_debut is None:
+            cloture = ComptabiliteService.derniere_cloture(avant=date_fin)
+            if cloture is not None:
+                date_debut = cloture.date_fin + timedelta(days=1)
+
+        montant = ComptaMouvement.debit - ComptaMouvement.credit
+        filtres = [
+            ComptaEcriture.valide == True,
+            ComptaEcriture.journal_code != ComptabiliteService.JOURNAL_A_NOUVEAUX,
+            ComptaMouvement.compte_id.isnot(None),
+        ]
+        if compte_id:
+            filtres.append(ComptaMouvement.compte_id == compte_id)
+
+        # ordre 1 : mouvements de la période
+        periode = db.select(
+            ComptaMouvement.compte_id.label('compte_id'),
+            literal(1).label('ordre'),
+            ComptaEcriture.date_ecriture.label('date_ecriture'),
+            ComptaEcriture.id.label('ecriture_id'),
+            ComptaMouvement.id.label('mouvement_id'),
+            ComptaEcriture.libelle_operation.label('libelle'),
+            ComptaEcriture.numero_piece.label('numero_piece'),
+            ComptaMouvement.debit.label('debit'),
+            ComptaMouvement.credit.label('credit'),
+            montant.label('montant'),
+        ).join(ComptaEcriture).filter(*filtres)
+        if date_debut:
+            periode = periode.filter(ComptaEcriture.date_ecriture >= date_debut)
+        if date_fin:
+            periode = periode.filter(ComptaEcriture.date_ecriture <= date_fin)
+
+        lignes = periode
+        if date_debut:
+            # ordre 0 : report à nouveau, une ligne par compte
+            soldes = ComptabiliteService.requete_soldes(date_debut=date_debut, compte_id=compte_id).subquery()
+            report = db.select(
+                soldes.c.compte_id,
+                literal(0),
+                null(),
+                null(),
+                null(),
+                null(),
+                null(),
+                literal(0),
+                literal(0),
+                soldes.c.solde,
+            )
+            lignes = union_all(periode, report)
+        lignes = lignes.subquery()
+
+        solde_cumule = func.sum(lignes.c.montant).over(
+            partition_by=lignes.c.compte_id,
+            order_by=(lignes.c.ordre, lignes.c.date_ecriture, lignes.c.ecriture_id, lignes.c.mouvement_id),
+            rows=(None, 0),
+        )
+        argent = Numeric(18, 2)
+        query = db.select(
+            ComptaCompte,
+            lignes.c.ordre,
+            type_coerce(lignes.c.date_ecriture, Date),
+            lignes.c.libelle,
+            lignes.c.numero_piece,
+            type_coerce(lignes.c.debit, argent),
+            type_coerce(lignes.c.credit, argent),
+            type_coerce(lignes.c.montant, argent),
+            type_coerce(solde_cumule, argent),
+        ).join(lignes, lignes.c.compte_id == ComptaCompte.id).filter(
+            ComptaCompte.actif == True
+        ).order_by(
+            ComptaCompte.numero_compte, lignes.c.compte_id, lignes.c.ordre,
+            lignes.c.date_ecriture, lignes.c.ecriture_id, lignes.c.mouvement_id
+        )
+        return query
+
     @staticmethod
     def get_grand_livre(compte_id: int = None, date_debut: date = None, date_fin: date = None) -> List[Dict]:
         """
         Get the general ledger (Grand Livre).
         
         Returns a list of structured dictionaries for the template to group by account.
+        Everything comes from one round trip (see requete_grand_livre).
         """
-        query_comptes = db.select(ComptaCompte).filter_by(actif=True)
-        if compte_id:
-            query_comptes = query_comptes.filter_by(id=compte_id)
-        
-        comptes = db.session.execute(query_comptes.order_by(ComptaCompte.numero_compte)).scalars().all()
-        
+        query = ComptabiliteService.requete_grand_livre(compte_id, date_debut, date_fin)
+
         result = []
-        for compte in comptes:
-            # 1. Calculer le solde initial (tous les mouvements AVANT date_debut)
-            solde_initial = Decimal('0')
-            if date_debut:
-                mouvements_initiaux = db.session.execute(
-                    db.select(ComptaMouvement).join(ComptaEcriture).filter(
-                        ComptaMouvement.compte_id == compte.id,
-                        ComptaEcriture.valide == True,
-                        ComptaEcriture.date_ecriture < date_debut
-                    )
-                ).scalars().all()
-                for mouv in mouvements_initiaux:
-                    solde_initial += Decimal(str(mouv.debit)) - Decimal(str(mouv.credit))
-            
-            # 2. Récupérer les mouvements de la période
-            query_mouv = db.select(ComptaMouvement).join(ComptaEcriture).filter(
-                ComptaMouvement.compte_id == compte.id,
-                ComptaEcriture.valide == True
-            )
-            
-            if date_debut:
-                query_mouv = query_mouv.filter(ComptaEcriture.date_ecriture >= date_debut)
-            if date_fin:
-                query_mouv = query_mouv.filter(ComptaEcriture.date_ecriture <= date_fin)
-                
-            query_mouv = query_mouv.order_by(ComptaEcriture.date_ecriture, ComptaEcriture.id)
-            mouvements = db.session.execute(query_mouv).scalars().all()
-            
-            # Si pas de mouvements et solde initial à 0, on peut ignorer le compte
-            if not mouvements and solde_initial == Decimal('0'):
+        compte_data = None
+        for compte, ordre, date_ecriture, libelle, numero_piece, debit, credit, montant_ligne, cumul in db.session.execute(query):
+            if compte_data is None or compte_data['compte'] is not compte:
+                compte_data = {
+                    'compte': compte,
+                    'solde_initial': Decimal('0'),
+                    'ecritures': [],
+                    'total_debit': Decimal('0'),
+                    'total_credit': Decimal('0'),
+                    'solde_final': Decimal('0')
+                }
+                result.append(compte_data)
+
+            compte_data['solde_final'] = cumul or Decimal('0')
+            if ordre == 0:
+                compte_data['solde_initial'] = compte_data['solde_final']
                 continue
-                
-            compte_data = {
-                'compte': compte,
-                'solde_initial': solde_initial,
-                'ecritures': [],
-                'total_debit': Decimal('0'),
-                'total_credit': Decimal('0'),
-                'solde_final': solde_initial
-            }
-            
-            solde_cumule = solde_initial
-            
-            for mouv in mouvements:
-                montant = Decimal(str(mouv.debit)) - Decimal(str(mouv.credit))
-                solde_cumule += montant
-                
-                compte_data['total_debit'] += Decimal(str(mouv.debit))
-                compte_data['total_credit'] += Decimal(str(mouv.credit))
-                
-                compte_data['ecritures'].append({
-                    'date_ecriture': mouv.ecriture.date_ecriture,
-                    'libelle': mouv.ecriture.libelle_operation,
-                    'piece_reference': mouv.ecriture.numero_piece or '',
-                    'montant': montant,
-                    'solde_cumule': solde_cumule
-                })
-            
-            compte_data['solde_final'] = solde_cumule
-            result.append(compte_data)
-            
-        return result
+
+            compte_data['total_debit'] += debit
+            compte_data['total_credit'] += credit
+            compte_data['ecritures'].append({
+                'date_ecriture': date_ecriture,
+                'libelle': libelle,
+                'piece_reference': numero_piece or '',
+                'montant': montant_ligne,
+                'solde_cumule': cumul
+            })
+
+        # Si pas de mouvements et solde initial à 0, on peut ignorer le compte
+        return [c for c in result if c['ecritures'] or c['solde_initial'] != 0]
     
+    @staticmethod
+    def get_soldes_comptes(date_fin: date = None) -> List[Tuple[ComptaCompte, Decimal]]:
+        """
+        Balance of every active account, ordered by account number, in one query.
+
+        Without date_fin the running totals of compta_soldes are used;
+        otherwise the closing snapshot and validated movements up to
+        date_fin are aggregated (see requete_soldes). Accounts without
+        movements get 0.
+        """
+        if date_fin is None:
+            agregat = db.select(
+                ComptaSolde.compte_id.label('compte_id'),
+                (ComptaSolde.total_debit - ComptaSolde.total_credit).label('solde')
+            ).filter(ComptaSolde.periode == ComptaSolde.PERIODE_TOTAL)
+        else:
+            agregat = ComptabiliteService.requete_soldes(date_fin=date_fin)
+        agregat = agregat.subquery()
+
+        rows = db.session.execute(
+            db.select(ComptaCompte, type_coerce(func.coalesce(agregat.c.solde, 0), Numeric(18, 2)))
+            .outerjoin(agregat, agregat.c.compte_id == ComptaCompte.id)
+            .filter(ComptaCompte.actif == True)
+            .order_by(ComptaCompte.numero_compte)
+        ).all()
+        return [(compte, solde) for compte, solde in rows]
+
     @staticmethod
     def get_balance_generale(date_fin: date = None) -> List[Dict]:
         """
@@ -404,13 +943,8 @@ class ComptabiliteService:
         
         Returns a list of all accounts with their balances.
         """
-        comptes = db.session.execute(
-            db.select(ComptaCompte).filter_by(actif=True).order_by(ComptaCompte.numero_compte)
-        ).scalars().all()
-        
         result = []
-        for compte in comptes:
-            solde = ComptabiliteService.get_balance(compte.id, date_fin=date_fin)
+        for compte, solde in ComptabiliteService.get_soldes_comptes(date_fin=date_fin):
             if solde != 0:  # Only show accounts with non-zero balance
                 result.append({
                     'numero_compte': compte.numero_compte,
@@ -17,6 +17,26 @@ class Config:
     DEBUG = False
     TESTING = False
 
+    # Barèmes dynamiques : arithmétique entière en virgule fixe (exacte) au lieu des flottants
+    BAREME_FIXED_POINT = os.environ.get('BAREME_FIXED_POINT', '').lower() in ('1', 'true', 'yes')
+
+    # Numérotation : taille des blocs réservés par worker, par série (1 = numéro alloué dans la transaction)
+    SEQUENCE_BLOCS = {}
+
+    # Journal d'audit : 'sync' (écrit dans la transaction métier) ou 'async'
+    # (spool disque + écriture par lots en tâche de fond, voir app/audit_writer.py)
+    AUDIT_MODE = os.environ.get('AUDIT_MODE', 'sync')
+    AUDIT_SPOOL_DIR = os.environ.get('AUDIT_SPOOL_DIR')  # défaut : instance/audit_spool
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE') or 500)
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL') or 2.0)
+    # Tables toujours auditées dans la transaction (signature, archivage des actes)
+    AUDIT_SYNC_TABLES = ('actes', 'dossiers')
+    # Chaînage des logs et du répertoire (app/audit_chain.py) : clé HMAC, à garder hors de la base
+    AUDIT_CHAIN_KEY = os.environ.get('AUDIT_CHAIN_KEY')
+    # Archives de security_logs (flask archive-logs) : mois conservés en base, dossier des fichiers JSONL
+    AUDIT_RETENTION_MOIS = int(os.environ.get('AUDIT_RETENTION_MOIS') or 12)
+    AUDIT_ARCHIVE_DIR = os.environ.get('AUDIT_ARCHIVE_DIR')  # défaut : instance/audit_archives
+
     # Email config
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
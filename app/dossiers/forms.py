@@ -1,6 +1,58 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, DateField, SubmitField
-from wtforms.validators import DataRequired, Optional, Length
+from wtforms.fields.choices import SelectFieldBase
+from wtforms.validators import DataRequired, Optional, Length, ValidationError
+from wtforms.widgets import Select
+from app import db
+from app.models import Dossier
+
+
+def dossier_label(dossier):
+    return f"{dossier.numero_dossier} - {dossier.intitule}"
+
+
+class DossierPickerField(SelectFieldBase):
+    """
+    Sélection d'un dossier par recherche (API /dossiers/api/search).
+
+    Contrairement à QuerySelectField, la liste des dossiers n'est ni chargée
+    ni rendue : la balise <select> ne contient que le dossier sélectionné, les
+    autres options sont récupérées au fil de la saisie (attribut
+    data-dossier-picker, cf. base.html). La valeur postée est l'id du dossier,
+    relu par clé primaire ; `data` est l'objet Dossier, comme avec QuerySelectField.
+    """
+    widget = Select()
+
+    def __init__(self, label=None, validators=None, allow_blank=False, blank_text='', statut=None, **kwargs):
+        render_kw = dict(kwargs.pop('render_kw', None) or {})
+        render_kw.setdefault('data-dossier-picker', '')
+        if statut:
+            render_kw.setdefault('data-statut', statut)
+        super().__init__(label, validators, render_kw=render_kw, **kwargs)
+        self.allow_blank = allow_blank
+        self.blank_text = blank_text
+        self._invalide = False
+
+    def iter_choices(self):
+        if self.allow_blank:
+            yield ('__None', self.blank_text, self.data is None, {})
+        if self.data is not None:
+            yield (str(self.data.id), dossier_label(self.data), True, {})
+
+    def process_formdata(self, valuelist):
+        if not valuelist or valuelist[0] in ('', '__None'):
+            self.data = None
+            return
+        try:
+            self.data = db.session.get(Dossier, int(valuelist[0]))
+        except (TypeError, ValueError):
+            self.data = None
+        self._invalide = self.data is None
+
+    def pre_validate(self, form):
+        if self._invalide or (self.data is None and not self.allow_blank):
+            raise ValidationError('Veuillez sélectionner un dossier valide.')
+
 
 class DossierForm(FlaskForm):
     numero_dossier = StringField('Numéro Dossier', validators=[DataRequired(), Length(min=2, max=50)])
@@ -1,22 +1,22 @@
-from flask import render_template, flash, redirect, url_for, request
+from flask import render_template, flash, redirect, url_for, request, jsonify
 from flask_login import login_required, current_user
 from app import db
 from app.dossiers import bp
-from app.dossiers.forms import DossierForm, DossierPartyForm
+from app.dossiers.forms import DossierForm, DossierPartyForm, dossier_label
 from app.models import Dossier, User, Client, DossierParty
-from sqlalchemy import select, or_
+from sqlalchemy import select, or_, case
 from datetime import datetime
 
 from app.decorators import role_required
+from app.pagination import keyset_paginate
 
 @bp.route('/')
 @login_required
 @role_required('NOTAIRE', 'CLERC', 'ADMIN')
 def index():
-    page = request.args.get('page', 1, type=int)
     q = request.args.get('q', '', type=str)
 
-    query = select(Dossier).order_by(Dossier.created_at.desc())
+    query = select(Dossier)
     
     if q:
         search_term = f"%{q}%"
@@ -27,7 +27,9 @@ def index():
             )
         )
         
-    pagination = db.paginate(query, page=page, per_page=10, error_out=False)
+    pagination = keyset_paginate(query, (Dossier.created_at.desc(), Dossier.id.desc()),
+                                 apres=request.args.get('apres'), avant=request.args.get('avant'),
+                                 per_page=10, total='approx')
     dossiers = pagination.items
 
     return render_template('dossiers/index.html', dossiers=dossiers, pagination=pagination, q=q)
@@ -154,13 +156,12 @@ def delete(id):
 @login_required
 @role_required('NOTAIRE', 'CLERC', 'ADMIN')
 def archives():
-    page = request.args.get('page', 1, type=int)
     num = request.args.get('num', '', type=str)
     title = request.args.get('title', '', type=str)
     client_name = request.args.get('client', '', type=str)
     type_dos = request.args.get('type', '', type=str)
 
-    query = select(Dossier).where(Dossier.statut == 'ARCHIVE').order_by(Dossier.created_at.desc())
+    query = select(Dossier).where(Dossier.statut == 'ARCHIVE')
     
     if num:
         query = query.where(Dossier.numero_dossier.ilike(f"%{num}%"))
@@ -169,16 +170,85 @@ def archives():
     if type_dos:
         query = query.where(Dossier.type_dossier == type_dos)
     if client_name:
-        # Join with parties and clients to search by client name
-        query = query.join(Dossier.parties).join(DossierParty.client).where(
+        # Search by client name (EXISTS: a dossier with several matching parties is listed once)
+        query = query.where(Dossier.parties.any(DossierParty.client.has(
             or_(
                 Client.nom.ilike(f"%{client_name}%"),
                 Client.prenom.ilike(f"%{client_name}%")
             )
-        )
+        )))
         
-    pagination = db.paginate(query, page=page, per_page=10, error_out=False)
+    pagination = keyset_paginate(query, (Dossier.created_at.desc(), Dossier.id.desc()),
+                                 apres=request.args.get('apres'), avant=request.args.get('avant'),
+                                 per_page=10, total='approx')
     dossiers = pagination.items
 
     return render_template('dossiers/archives.html', dossiers=dossiers, pagination=pagination, 
                            num=num, title=title, client=client_name, type_dos=type_dos)
+
+# Nombre maximal de résultats par page de l'API de recherche
+SEARCH_MAX_PER_PAGE = 50
+
+
+def _like_escape(texte):
+    return texte.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_dossiers(q='', page=1, per_page=20, statut=None):
+    """
+    Recherche de dossiers pour les listes de sélection : correspondance sur le
+    début puis sur une partie du numéro ou de l'intitulé (index trigrammes
+    ix_dossiers_*_trgm sous PostgreSQL). Les correspondances de début de
+    numéro, puis d'intitulé, sont classées en premier.
+    Retourne (dossiers, has_more) ; has_more évite un COUNT(*).
+    """
+    query = select(Dossier)
+    if statut:
+        query = query.where(Dossier.statut == statut)
+
+    q = (q or '').strip()
+    if q:
+        motif = _like_escape(q)
+        query = query.where(or_(
+            Dossier.numero_dossier.ilike(f"%{motif}%", escape='\\'),
+            Dossier.intitule.ilike(f"%{motif}%", escape='\\'),
+        )).order_by(
+            case(
+                (Dossier.numero_dossier.ilike(f"{motif}%", escape='\\'), 0),
+                (Dossier.intitule.ilike(f"{motif}%", escape='\\'), 1),
+                else_=2,
+            ),
+            Dossier.numero_dossier.desc(),
+        )
+    else:
+        query = query.order_by(Dossier.numero_dossier.desc())
+
+    query = query.offset((page - 1) * per_page).limit(per_page + 1)
+    dossiers = db.session.scalars(query).all()
+    return dossiers[:per_page], len(dossiers) > per_page
+
+@bp.route('/api/search')
+@login_required
+@role_required('NOTAIRE', 'CLERC', 'COMPTABLE', 'SECRETAIRE', 'ADMIN')
+def api_search():
+    """Options des sélecteurs de dossier, chargées au fil de la saisie."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), SEARCH_MAX_PER_PAGE)
+    dossiers, has_more = search_dossiers(
+        request.args.get('q', '', type=str), page, per_page,
+        statut=request.args.get('statut') or None,
+    )
+    return jsonify({
+        'results': [
+            {
+                'id': d.id,
+                'numero_dossier': d.numero_dossier,
+                'intitule': d.intitule,
+                'statut': d.statut,
+                'label': dossier_label(d),
+            }
+            for d in dossiers
+        ],
+        'page': page,
+        'has_more': has_more,
+    })
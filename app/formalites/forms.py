@@ -3,16 +3,14 @@ from wtforms import StringField, SelectField, DateField, DecimalField, SubmitFie
 from wtforms.validators import DataRequired, Optional
 from wtforms_sqlalchemy.fields import QuerySelectField
 from app import db
-from app.models import Dossier, TypeFormalite
-
-def enabled_dossiers():
-    return db.session.execute(db.select(Dossier).order_by(Dossier.numero_dossier)).scalars()
+from app.models import TypeFormalite
+from app.dossiers.forms import DossierPickerField
 
 def get_type_formalites():
     return db.session.execute(db.select(TypeFormalite).order_by(TypeFormalite.nom)).scalars()
 
 class FormaliteForm(FlaskForm):
-    dossier = QuerySelectField('Dossier', query_factory=enabled_dossiers, get_label='numero_dossier', allow_blank=False)
+    dossier = DossierPickerField('Dossier', allow_blank=False)
     type_id = QuerySelectField('Type de Formalité', query_factory=get_type_formalites, get_label='nom', allow_blank=False, validators=[DataRequired()])
     statut = SelectField('Statut', choices=[
         ('A_FAIRE', 'À Faire'),
@@ -6,10 +6,11 @@ from app.formalites import bp
 from app.formalites.forms import FormaliteForm, TypeFormaliteForm
 from app.formalites.calculator import FormaliteCalculator, estimer_delai_formalite
 from app.models import Formalite, Dossier, TypeFormalite
-from sqlalchemy import select, or_
+from sqlalchemy import select, or_, func
 from datetime import datetime, timedelta
 
 from app.decorators import role_required
+from app.pagination import keyset_paginate
 
 @bp.route('/')
 @login_required
@@ -44,24 +45,29 @@ def index():
             )
         )
     
-    # Ordonner par date de dépôt (les plus récentes en premier)
-    query = query.order_by(Formalite.date_depot.desc().nullslast(), Formalite.id.desc())
-    
-    formalites = db.session.scalars(query).all()
+    # Ordonner par date de dépôt (les plus récentes en premier), page par clé
+    pagination = keyset_paginate(query, (Formalite.date_depot.desc().nullslast(), Formalite.id.desc()),
+                                 apres=request.args.get('apres'), avant=request.args.get('avant'), per_page=20)
+    formalites = pagination.items
     types_formalite = db.session.scalars(db.select(TypeFormalite).order_by(TypeFormalite.nom)).all()
     
-    # Calculer les statistiques
+    # Calculer les statistiques (une agrégation sur toutes les formalités filtrées)
+    filtrees = query.subquery()
+    par_statut = {statut: (nombre, estime, reel) for statut, nombre, estime, reel in db.session.execute(
+        db.select(filtrees.c.statut, func.count(), func.coalesce(func.sum(filtrees.c.cout_estime), 0),
+                  func.coalesce(func.sum(filtrees.c.cout_reel), 0)).group_by(filtrees.c.statut))}
     stats = {
-        'total': len(formalites),
-        'a_faire': sum(1 for f in formalites if f.statut == 'A_FAIRE'),
-        'en_cours': sum(1 for f in formalites if f.statut == 'EN_COURS'),
-        'termine': sum(1 for f in formalites if f.statut == 'TERMINE'),
-        'cout_total_estime': sum(f.cout_estime or 0 for f in formalites),
-        'cout_total_reel': sum(f.cout_reel or 0 for f in formalites)
+        'total': sum(n for n, _, _ in par_statut.values()),
+        'a_faire': par_statut.get('A_FAIRE', (0,))[0],
+        'en_cours': par_statut.get('EN_COURS', (0,))[0],
+        'termine': par_statut.get('TERMINE', (0,))[0],
+        'cout_total_estime': sum(e for _, e, _ in par_statut.values()),
+        'cout_total_reel': sum(r for _, _, r in par_statut.values())
     }
     
     return render_template('formalites/index.html', 
                          formalites=formalites, 
+                         pagination=pagination,
                          stats=stats,
                          statut_filter=statut_filter,
                          type_filter=type_filter,
@@ -3,7 +3,7 @@ from typing import Optional
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, ForeignKey, Text, Date, Boolean, Numeric, TIMESTAMP, JSON
+from sqlalchemy import String, Integer, ForeignKey, Text, Date, Boolean, Numeric, TIMESTAMP, JSON, Index, UniqueConstraint
 # from sqlalchemy.dialects.postgresql import JSONB
 from app import db, login
 
@@ -117,6 +117,10 @@ def load_user(id):
 
 class Client(db.Model):
     __tablename__ = 'clients'
+    __table_args__ = (
+        # Liste des clients : tri et pagination par clé (nom, id)
+        Index('ix_clients_nom_id', 'nom', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     type_client: Mapped[str] = mapped_column(String(20), nullable=False) # 'PHYSIQUE', 'MORALE'
@@ -159,6 +163,13 @@ class Client(db.Model):
 
 class SecurityLog(db.Model):
     __tablename__ = 'security_logs'
+    __table_args__ = (
+        # Filtres de la page des logs (période, type d'événement, utilisateur), tri par date décroissante.
+        # Sous PostgreSQL la table est partitionnée par mois sur timestamp (voir app/security_logs.py).
+        Index('ix_security_logs_timestamp', 'timestamp'),
+        Index('ix_security_logs_event_type_timestamp', 'event_type', 'timestamp'),
+        Index('ix_security_logs_username_timestamp', 'username', 'timestamp'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     timestamp: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
     event_type: Mapped[str] = mapped_column(String(50), nullable=False) # 'LOGIN_SUCCESS', 'LOGIN_FAILED', 'ACCOUNT_LOCKED', 'ACCOUNT_UNLOCKED'
@@ -171,14 +182,43 @@ class SecurityLog(db.Model):
     target_resource: Mapped[Optional[str]] = mapped_column(String(100)) # e.g. 'clients', 'dossiers'
     target_id: Mapped[Optional[str]] = mapped_column(String(50)) # The ID of the modified entity
     changes: Mapped[Optional[dict]] = mapped_column(JSON) # JSON object showing old vs new values
+    # Hash chaîné au log précédent (ordre des id), voir app/audit_chain.py
+    chain_hash: Mapped[Optional[str]] = mapped_column(String(64))
 
     def __repr__(self):
         return f'<SecurityLog {self.event_type} - {self.username}>'
+
+
+class AuditChain(db.Model):
+    """
+    Tête d'une chaîne de hash (security_logs, repertoire) : dernier hash
+    chaîné, origine de la chaîne et dernier point vérifié (app/audit_chain.py).
+    """
+    __tablename__ = 'audit_chains'
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    length: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    # Position (id du log, rang du répertoire) et hash à partir desquels la chaîne est vérifiable
+    origin_position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    origin_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    checkpoint_position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    checkpoint_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    checked_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
     
 
 
 class Dossier(db.Model):
     __tablename__ = 'dossiers'
+    __table_args__ = (
+        # Recherche par début ou partie du numéro / de l'intitulé (ILIKE, API /dossiers/api/search)
+        Index('ix_dossiers_numero_trgm', 'numero_dossier',
+              postgresql_using='gin', postgresql_ops={'numero_dossier': 'gin_trgm_ops'}),
+        Index('ix_dossiers_intitule_trgm', 'intitule',
+              postgresql_using='gin', postgresql_ops={'intitule': 'gin_trgm_ops'}),
+        # Listes des dossiers et des archives : tri et pagination par clé (created_at, id)
+        Index('ix_dossiers_created_at_id', 'created_at', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     numero_dossier: Mapped[str] = mapped_column(String(50), unique=True, nullable=False)
@@ -220,17 +260,18 @@ class ComptaCompte(db.Model):
     mouvements = relationship('ComptaMouvement', back_populates='compte')
 
     def get_solde(self):
-        """Calculate the current balance of the account."""
-        total_debit = sum(m.debit for m in self.mouvements if m.ecriture.valide)
-        total_credit = sum(m.credit for m in self.mouvements if m.ecriture.valide)
-        return total_debit - total_credit
+        """Current balance of the account, read from its running total in compta_soldes."""
+        solde = db.session.execute(
+            db.select(ComptaSolde).filter_by(compte_id=self.id, periode=ComptaSolde.PERIODE_TOTAL)
+        ).scalar_one_or_none()
+        return solde.solde if solde else 0
 
 class ComptaEcriture(db.Model):
     __tablename__ = 'compta_ecritures'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     numero_piece: Mapped[Optional[str]] = mapped_column(String(50)) # Receipt/Invoice number
-    date_ecriture: Mapped[datetime] = mapped_column(Date, default=datetime.utcnow, nullable=False)
+    date_ecriture: Mapped[datetime] = mapped_column(Date, default=datetime.utcnow, nullable=False, index=True)
     libelle_operation: Mapped[str] = mapped_column(String(200), nullable=False)
     dossier_id: Mapped[Optional[int]] = mapped_column(ForeignKey('dossiers.id'))
     journal_code: Mapped[str] = mapped_column(String(10), nullable=False) # 'BQ', 'CA', 'OD', 'VT'
@@ -256,13 +297,144 @@ class ComptaMouvement(db.Model):
     __tablename__ = 'compta_mouvements'
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    ecriture_id: Mapped[int] = mapped_column(ForeignKey('compta_ecritures.id', ondelete='CASCADE'))
+    ecriture_id: Mapped[int] = mapped_column(ForeignKey('compta_ecritures.id', ondelete='CASCADE'), index=True)
     compte_id: Mapped[Optional[int]] = mapped_column(ForeignKey('compta_comptes.id'))
     debit: Mapped[float] = mapped_column(Numeric(15, 2), default=0)
     credit: Mapped[float] = mapped_column(Numeric(15, 2), default=0)
+    # Rapprochement bancaire (comptes 512) : NULL tant que non rapproché
+    rapprochement_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey('rapprochements.id', ondelete='SET NULL'), index=True)
 
     ecriture = relationship('ComptaEcriture', back_populates='mouvements')
     compte = relationship('ComptaCompte', back_populates='mouvements')
+    rapprochement = relationship('Rapprochement', back_populates='mouvements')
+
+class ComptaSolde(db.Model):
+    """
+    Running totals of validated movements, per account.
+
+    One row per account and month (periode 'YYYY-MM') plus one current
+    balance row (periode 'TOTAL': opening balance of the last closed year,
+    see ComptaExercice, plus the movements since). Kept up to date by
+    ComptabiliteService.valider_ecriture in the same transaction; `flask
+    rebuild-soldes` recomputes it. Opening entries (journal 'AN') are not
+    counted: the closing snapshot already holds them.
+    """
+    __tablename__ = 'compta_soldes'
+    __table_args__ = (
+        UniqueConstraint('compte_id', 'periode', name='uq_compta_soldes_compte_periode'),
+    )
+
+    PERIODE_TOTAL = 'TOTAL'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    compte_id: Mapped[int] = mapped_column(ForeignKey('compta_comptes.id', ondelete='CASCADE'), nullable=False)
+    periode: Mapped[str] = mapped_column(String(7), nullable=False)
+    total_debit: Mapped[float] = mapped_column(Numeric(18, 2), nullable=False, default=0)
+    total_credit: Mapped[float] = mapped_column(Numeric(18, 2), nullable=False, default=0)
+    nb_mouvements: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    compte = relationship('ComptaCompte')
+
+    @property
+    def solde(self):
+        return self.total_debit - self.total_credit
+
+class ComptaExercice(db.Model):
+    """
+    Closed fiscal year (calendar year).
+
+    Closing freezes every entry dated up to date_fin, stores each account's
+    closing and opening balances (ComptaSoldeCloture) and posts the opening
+    entry (journal 'AN') of the next year. Balances after date_fin start
+    from this snapshot instead of the first day of the books.
+    """
+    __tablename__ = 'compta_exercices'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    annee: Mapped[int] = mapped_column(Integer, unique=True, nullable=False)
+    date_debut: Mapped[datetime] = mapped_column(Date, nullable=False)
+    date_fin: Mapped[datetime] = mapped_column(Date, nullable=False, index=True)
+    resultat: Mapped[float] = mapped_column(Numeric(18, 2), nullable=False, default=0)  # > 0 : bénéfice
+    ecriture_an_id: Mapped[Optional[int]] = mapped_column(ForeignKey('compta_ecritures.id'))
+    cloture_par: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'))
+    cloture_le: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+
+    ecriture_an = relationship('ComptaEcriture')
+    soldes = relationship('ComptaSoldeCloture', back_populates='exercice', cascade='all, delete-orphan')
+
+class ComptaSoldeCloture(db.Model):
+    """
+    Balance of an account at the end of a closed year (solde_cloture) and
+    at the start of the next one (solde_ouverture: income and expense
+    accounts are transferred to the result account).
+    """
+    __tablename__ = 'compta_soldes_cloture'
+    __table_args__ = (
+        UniqueConstraint('exercice_id', 'compte_id', name='uq_compta_soldes_cloture_exercice_compte'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    exercice_id: Mapped[int] = mapped_column(ForeignKey('compta_exercices.id', ondelete='CASCADE'), nullable=False)
+    compte_id: Mapped[int] = mapped_column(ForeignKey('compta_comptes.id', ondelete='CASCADE'), nullable=False)
+    solde_cloture: Mapped[float] = mapped_column(Numeric(18, 2), nullable=False, default=0)
+    solde_ouverture: Mapped[float] = mapped_column(Numeric(18, 2), nullable=False, default=0)
+
+    exercice = relationship('ComptaExercice', back_populates='soldes')
+    compte = relationship('ComptaCompte')
+
+class ReleveBancaire(db.Model):
+    """Bank statement file imported for reconciliation of a 512 account."""
+    __tablename__ = 'releves_bancaires'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    compte_id: Mapped[int] = mapped_column(ForeignKey('compta_comptes.id'), nullable=False)
+    nom_fichier: Mapped[Optional[str]] = mapped_column(String(255))
+    nb_lignes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    importe_par: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'))
+    importe_le: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+
+    compte = relationship('ComptaCompte')
+    lignes = relationship('LigneReleve', back_populates='releve', cascade='all, delete-orphan')
+
+class LigneReleve(db.Model):
+    """
+    Line of a bank statement. montant > 0 is money in (bank credit, debit
+    of the 512 account in our books), montant < 0 money out.
+    """
+    __tablename__ = 'lignes_releve'
+    __table_args__ = (
+        Index('ix_lignes_releve_compte_rapprochement_date', 'compte_id', 'rapprochement_id', 'date_operation'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    releve_id: Mapped[int] = mapped_column(ForeignKey('releves_bancaires.id', ondelete='CASCADE'), nullable=False)
+    compte_id: Mapped[int] = mapped_column(ForeignKey('compta_comptes.id'), nullable=False)
+    date_operation: Mapped[datetime] = mapped_column(Date, nullable=False)
+    libelle: Mapped[str] = mapped_column(String(255), nullable=False, default='')
+    reference: Mapped[Optional[str]] = mapped_column(String(100))
+    montant: Mapped[float] = mapped_column(Numeric(15, 2), nullable=False)
+    rapprochement_id: Mapped[Optional[int]] = mapped_column(ForeignKey('rapprochements.id', ondelete='SET NULL'))
+
+    releve = relationship('ReleveBancaire', back_populates='lignes')
+    rapprochement = relationship('Rapprochement', back_populates='lignes')
+
+class Rapprochement(db.Model):
+    """
+    Statement lines and ledger movements of a 512 account matched together
+    (same total). methode: REFERENCE, MONTANT_DATE, GROUPE (several
+    movements for one line, or the reverse) or MANUEL.
+    """
+    __tablename__ = 'rapprochements'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    compte_id: Mapped[int] = mapped_column(ForeignKey('compta_comptes.id'), nullable=False)
+    methode: Mapped[str] = mapped_column(String(20), nullable=False)
+    cree_par: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'))
+    cree_le: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+
+    lignes = relationship('LigneReleve', back_populates='rapprochement')
+    mouvements = relationship('ComptaMouvement', back_populates='rapprochement')
 
 class Recu(db.Model):
     """Model for receipts (Reçus)."""
@@ -310,6 +482,25 @@ class Facture(db.Model):
     ecriture = relationship('ComptaEcriture')
     auteur = relationship('User')
 
+class SequenceNumerotation(db.Model):
+    """
+    Dernier numéro attribué par série de documents (REC, FACT, REPERTOIRE...)
+    et par année ; annee = 0 pour une série continue. Alloué par
+    app.sequences.SequenceService.
+    """
+    __tablename__ = 'sequences'
+    __table_args__ = (
+        UniqueConstraint('code', 'annee', name='uq_sequences_code_annee'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    code: Mapped[str] = mapped_column(String(30), nullable=False)
+    annee: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    dernier: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<SequenceNumerotation {self.code} {self.annee}: {self.dernier}>'
+
 class TypeFormalite(db.Model):
     __tablename__ = 'type_formalites'
 
@@ -323,6 +514,10 @@ class TypeFormalite(db.Model):
 
 class Formalite(db.Model):
     __tablename__ = 'formalites'
+    __table_args__ = (
+        # Liste des formalités : tri et pagination par clé (date_depot, id)
+        Index('ix_formalites_date_depot_id', 'date_depot', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     dossier_id: Mapped[Optional[int]] = mapped_column(ForeignKey('dossiers.id', ondelete='CASCADE'))
@@ -387,6 +582,9 @@ class Acte(db.Model):
     numero_repertoire: Mapped[Optional[int]] = mapped_column(Integer)
     date_archivage: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=True))
     archive_par_id: Mapped[Optional[int]] = mapped_column(ForeignKey('users.id'))
+    # Chaîne du répertoire (app/audit_chain.py) : position et hash chaîné à l'entrée précédente
+    rang_chaine: Mapped[Optional[int]] = mapped_column(Integer, unique=True)
+    hash_chaine: Mapped[Optional[str]] = mapped_column(String(64))
     
     version: Mapped[int] = mapped_column(Integer, default=1)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
@@ -439,6 +637,23 @@ class ParametreEtude(db.Model):
     def __repr__(self):
         return f'<ParametreEtude {self.cle}={self.valeur}>'
 
+
+class ParametreVersion(db.Model):
+    """
+    Compteurs de version des caches partagés entre workers :
+      - id = 1 : paramètres de l'étude (ParametreEtude) ;
+      - id = 2 : plan comptable actif (voir PlanComptable).
+
+    Chaque compteur est incrémenté dans la même transaction que la
+    modification qu'il signale. Chaque worker le relit périodiquement et ne
+    recharge son cache que lorsqu'il a changé.
+    """
+    __tablename__ = 'parametres_version'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), default=datetime.utcnow)
+
 class BaremeModele(db.Model):
     __tablename__ = 'bareme_modeles'
     
@@ -0,0 +1,235 @@
+"""
+Pagination par clé (keyset / seek) des grandes listes.
+
+Au lieu de `OFFSET (page - 1) * n` et d'un COUNT(*) à chaque page, la page
+suivante est lue après la dernière ligne affichée :
+
+    WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC LIMIT n + 1
+
+Avec un index sur les colonnes du tri, le coût d'une page est le même à
+n'importe quelle profondeur. Le tri doit se terminer par une colonne unique
+(l'id) pour que la position soit sans ambiguïté ; une colonne nullable doit
+préciser .nullslast() / .nullsfirst().
+
+La position est passée dans l'URL (`apres` / `avant`) sous forme d'un jeton
+opaque ; un jeton invalide ramène à la première page. Le total est
+facultatif : exact (COUNT), approché (estimation du planificateur sous
+PostgreSQL, COUNT ailleurs) ou absent.
+"""
+
+import base64
+import json
+from collections import deque
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Sequence
+
+from flask import current_app
+from sqlalchemy import and_, false, func, or_, select, tuple_
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+
+from app import db
+
+
+class _Cle(NamedTuple):
+    expression: Any
+    desc: bool
+    nulls_last: Optional[bool]      # None : colonne non nullable
+
+
+def _cles(order_by: Sequence) -> List[_Cle]:
+    cles = []
+    for critere in order_by:
+        nulls_last = None
+        if isinstance(critere, UnaryExpression) and critere.modifier in (operators.nulls_last_op,
+                                                                         operators.nulls_first_op):
+            nulls_last = critere.modifier is operators.nulls_last_op
+            critere = critere.element
+        desc = isinstance(critere, UnaryExpression) and critere.modifier is operators.desc_op
+        if isinstance(critere, UnaryExpression) and critere.modifier in (operators.desc_op, operators.asc_op):
+            critere = critere.element
+        if nulls_last is None and getattr(critere, 'nullable', False):
+            raise ValueError(f"Colonne nullable sans .nullslast() / .nullsfirst() : {critere}")
+        cles.append(_Cle(critere, desc, nulls_last))
+    return cles
+
+
+def _tri(cle: _Cle, inverse: bool):
+    desc = cle.desc != inverse
+    critere = cle.expression.desc() if desc else cle.expression.asc()
+    if cle.nulls_last is not None:
+        critere = critere.nullslast() if cle.nulls_last != inverse else critere.nullsfirst()
+    return critere
+
+
+def _apres(cles: List[_Cle], valeurs: list, inverse: bool):
+    """Condition « après la position `valeurs` » dans l'ordre (éventuellement inversé) des clés."""
+    if all(c.nulls_last is None for c in cles) and len({c.desc for c in cles}) == 1:
+        # Comparaison de lignes : une seule borne d'index
+        gauche, droite = tuple_(*(c.expression for c in cles)), tuple_(*valeurs)
+        return gauche < droite if cles[0].desc != inverse else gauche > droite
+
+    cle, valeur = cles[0], valeurs[0]
+    desc = cle.desc != inverse
+    nulls_last = None if cle.nulls_last is None else cle.nulls_last != inverse
+    colonne = cle.expression
+    if valeur is None:
+        strictement_apres = colonne.isnot(None) if nulls_last is False else false()
+        egal = colonne.is_(None)
+    else:
+        strictement_apres = colonne < valeur if desc else colonne > valeur
+        if nulls_last:
+            strictement_apres = or_(strictement_apres, colonne.is_(None))
+        egal = colonne == valeur
+    if len(cles) == 1:
+        return strictement_apres
+    return or_(strictement_apres, and_(egal, _apres(cles[1:], valeurs[1:], inverse)))
+
+
+def _encoder(valeurs: Sequence) -> str:
+    def valeur(v):
+        if isinstance(v, datetime):
+            return {'t': v.isoformat()}
+        if isinstance(v, date):
+            return {'d': v.isoformat()}
+        if isinstance(v, Decimal):
+            return {'n': str(v)}
+        return v
+    brut = json.dumps([valeur(v) for v in valeurs], separators=(',', ':'))
+    return base64.urlsafe_b64encode(brut.encode()).decode().rstrip('=')
+
+
+def _decoder(jeton: str, nombre: int) -> Optional[list]:
+    def valeur(v):
+        if isinstance(v, dict):
+            (type_, texte), = v.items()
+            return {'t': datetime.fromisoformat, 'd': date.fromisoformat, 'n': Decimal}[type_](texte)
+        return v
+    try:
+        brut = base64.urlsafe_b64decode(jeton + '=' * (-len(jeton) % 4))
+        valeurs = [valeur(v) for v in json.loads(brut)]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    return valeurs if len(valeurs) == nombre else None
+
+
+class KeysetPagination:
+    """Une page : items, has_prev / has_next, prev_cursor / next_cursor, total (ou None)."""
+
+    def __init__(self, items: list, positions: List[Sequence], per_page: int, has_prev: bool, has_next: bool,
+                 total: Optional[int] = None, total_approx: bool = False):
+        self.items = items
+        self.per_page = per_page
+        self.has_prev = has_prev
+        self.has_next = has_next
+        self.prev_cursor = _encoder(positions[0]) if has_prev and positions else None
+        self.next_cursor = _encoder(positions[-1]) if has_next and positions else None
+        self.total = total
+        self.total_approx = total_approx
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _explain(query, dialect):
+    """
+    Texte SQL et paramètres de `query` pour EXPLAIN. Les paramètres « expanding »
+    (IN de listes) sont rendus, sinon le SQL contiendrait __[POSTCOMPILE_...].
+    """
+    compile_ = query.order_by(None).compile(dialect=dialect, compile_kwargs={'render_postcompile': True})
+    return f'EXPLAIN (FORMAT JSON) {compile_.string}', compile_.params
+
+
+def compter(query, approx: bool = False) -> int:
+    """
+    Nombre de lignes de `query`. Approché sous PostgreSQL : estimation du
+    planificateur (EXPLAIN), sans lecture de la table ; COUNT exact si
+    l'EXPLAIN échoue.
+    """
+    compte = select(func.count()).select_from(query.order_by(None).subquery())
+    if not approx or db.session.get_bind().dialect.name != 'postgresql':
+        return db.session.execute(compte).scalar()
+    conn = db.session.connection()
+    sql, params = _explain(query, conn.dialect)
+    try:
+        # Point de sauvegarde : un échec ne doit pas interrompre la transaction
+        with conn.begin_nested():
+            plan = conn.exec_driver_sql(sql, params).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except (DBAPIError, KeyError, IndexError, TypeError, ValueError):
+        current_app.logger.warning("Estimation du total impossible, COUNT exact", exc_info=True)
+        return db.session.execute(compte).scalar()
+
+
+def keyset_paginate(query, order_by: Sequence, apres: Optional[str] = None, avant: Optional[str] = None,
+                    per_page: int = 20, total: Optional[str] = None) -> KeysetPagination:
+    """
+    Page de `query` (un select d'entité, sans ORDER BY) triée par `order_by`,
+    après le jeton `apres` ou avant le jeton `avant` (première page sinon).
+    total : None, 'exact' ou 'approx'.
+    """
+    cles = _cles(order_by)
+    jeton, inverse = (avant, True) if avant else (apres, False)
+    valeurs = _decoder(jeton, len(cles)) if jeton else None
+    if valeurs is None:
+        inverse = False
+
+    page = query.add_columns(*(c.expression for c in cles)).order_by(*(_tri(c, inverse) for c in cles))
+    if valeurs is not None:
+        page = page.where(_apres(cles, valeurs, inverse))
+    lignes = db.session.execute(page.limit(per_page + 1)).all()
+    suite = len(lignes) > per_page
+    lignes = lignes[:per_page]
+    if inverse:
+        lignes.reverse()
+
+    items = [ligne[0] for ligne in lignes]
+    positions = [tuple(ligne[1:]) for ligne in lignes]
+    if inverse:
+        has_prev, has_next = suite, True
+    else:
+        has_prev, has_next = valeurs is not None, suite
+
+    nombre = compter(query, approx=total == 'approx') if total else None
+    return KeysetPagination(items, positions, per_page, has_prev, has_next, nombre,
+                            total_approx=total == 'approx' and db.session.get_bind().dialect.name == 'postgresql')
+
+
+def _page_liste(items: list, cle: Callable[[Any], Sequence], per_page: int, has_prev: bool,
+                has_next: bool) -> KeysetPagination:
+    return KeysetPagination(items, [tuple(cle(ligne)) for ligne in items], per_page, has_prev, has_next)
+
+
+def keyset_paginate_list(lignes: Iterable, cle: Callable[[Any], Sequence], apres: Optional[str] = None,
+                         avant: Optional[str] = None, per_page: int = 20) -> KeysetPagination:
+    """
+    Même interface pour des lignes déjà triées, en mémoire ou lues au fil de
+    l'eau (fichiers d'archives) : la lecture s'arrête dès que la page et la
+    ligne qui la suit sont connues. Pas de total.
+    """
+    lignes = iter(lignes)
+    tete = list(islice(lignes, per_page + 1))
+    jeton = avant or apres
+    valeurs = _decoder(jeton, len(cle(tete[0]))) if jeton and tete else None
+    if valeurs is not None:
+        suite = chain(tete, lignes)
+        precedentes = deque(maxlen=per_page + 1)    # dernières lignes lues avant la position
+        for ligne in suite:
+            if tuple(cle(ligne)) == tuple(valeurs):
+                if not avant:
+                    page = list(islice(suite, per_page + 1))
+                    return _page_liste(page[:per_page], cle, per_page, has_prev=True, has_next=len(page) > per_page)
+                if len(precedentes) > per_page:
+                    return _page_liste(list(precedentes)[1:], cle, per_page, has_prev=True, has_next=True)
+                break
+            precedentes.append(ligne)
+    # Première page : sans position, position introuvable ou à moins d'une page du début
+    return _page_liste(tete[:per_page], cle, per_page, has_prev=False, has_next=len(tete) > per_page)
@@ -0,0 +1,328 @@
+"""
+Monthly partitions, archives and filter helpers of security_logs.
+
+On PostgreSQL, security_logs is partitioned by month on "timestamp"
+(migration c3e7b5a9d214): one partition security_logs_pYYYYMM per month
+plus security_logs_default for rows outside them. `flask rollover-logs`,
+run monthly, creates the partitions of the coming months; rows that
+already landed in the default partition are moved to their month.
+
+`flask archive-logs` moves whole months older than AUDIT_RETENTION_MOIS
+to gzip-compressed JSONL files in AUDIT_ARCHIVE_DIR (one file per month
+and run), then drops the partition on PostgreSQL or deletes the rows
+elsewhere. The archived rows keep their chain_hash and the audit hash
+chain (app/audit_chain.py) then starts after them. The logs page can still
+search the archived months: only the files of the requested dates are read,
+newest month first, until the page is full.
+A row chained after rows of a later month (late async audit write) is kept
+until those are archived, so the chain never starts past a row in the table.
+
+Distinct event types and usernames are read with a loose index scan (one
+index probe per distinct value) instead of a scan of the whole table; the
+event types of the filter list are cached per worker.
+"""
+
+import gzip
+import json
+import os
+import re
+import time
+from datetime import date, datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import text
+
+from app import audit_chain, db
+from app.models import SecurityLog
+
+TABLE = 'security_logs'
+DEFAULT_PARTITION = 'security_logs_default'
+
+# Seconds during which the event types of the filter list are reused
+EVENT_TYPES_TTL = 300.0
+
+_event_types: Tuple[float, List[str]] = (0.0, [])
+
+_ARCHIVE_NAME = re.compile(r'^security_logs_(\d{4})-(\d{2})(?:\.\d+)?\.jsonl\.gz$')
+
+
+def month_start(jour: date) -> date:
+    return date(jour.year, jour.month, 1)
+
+
+def add_months(mois: date, nombre: int) -> date:
+    index = mois.year * 12 + mois.month - 1 + nombre
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(mois: date) -> str:
+    return f'{TABLE}_p{mois:%Y%m}'
+
+
+# ── Distinct values ─────────────────────────────────────────────────────────
+
+def _distinct_values(colonne: str) -> List[str]:
+    """Distinct values of an indexed column, one index probe per value."""
+    return db.session.execute(text(f'''
+        WITH RECURSIVE valeurs(valeur) AS (
+            SELECT min({colonne}) FROM {TABLE}
+            UNION ALL
+            SELECT (SELECT min({colonne}) FROM {TABLE} WHERE {colonne} > valeurs.valeur)
+            FROM valeurs WHERE valeurs.valeur IS NOT NULL
+        )
+        SELECT valeur FROM valeurs WHERE valeur IS NOT NULL
+    ''')).scalars().all()
+
+
+def event_types() -> List[str]:
+    """Event types found in security_logs (cached EVENT_TYPES_TTL seconds)."""
+    global _event_types
+    expire, types = _event_types
+    if time.monotonic() >= expire:
+        types = _distinct_values('event_type')
+        _event_types = (time.monotonic() + EVENT_TYPES_TTL, types)
+    return types
+
+
+def invalidate_event_types() -> None:
+    global _event_types
+    _event_types = (0.0, [])
+
+
+def matching_usernames(fragment: str) -> List[str]:
+    """Usernames of security_logs containing `fragment` (case-insensitive)."""
+    fragment = fragment.casefold()
+    return [nom for nom in _distinct_values('username') if fragment in nom.casefold()]
+
+
+# ── Partitions (PostgreSQL) ─────────────────────────────────────────────────
+
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text("SELECT relkind FROM pg_class WHERE relname = :t AND relkind = 'p'"),
+                        {'t': TABLE}).scalar() is not None
+
+
+def _partition_exists(conn, nom: str) -> bool:
+    return conn.execute(text('SELECT to_regclass(:nom)'), {'nom': nom}).scalar() is not None
+
+
+def create_partition(conn, mois: date) -> bool:
+    """
+    Create the partition of a month (no-op if it exists). Rows of that
+    month stored meanwhile in the default partition are moved into it.
+    Returns True if the partition was created.
+    """
+    nom = partition_name(mois)
+    if _partition_exists(conn, nom):
+        return False
+    debut, fin = mois.isoformat(), add_months(mois, 1).isoformat()
+    plage = f""""timestamp" >= '{debut}' AND "timestamp" < '{fin}'"""
+    conn.execute(text(f'CREATE TABLE {nom} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    conn.execute(text(f'INSERT INTO {nom} SELECT * FROM {DEFAULT_PARTITION} WHERE {plage}'))
+    conn.execute(text(f'DELETE FROM {DEFAULT_PARTITION} WHERE {plage}'))
+    conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {nom} FOR VALUES FROM ('{debut}') TO ('{fin}')"))
+    return True
+
+
+def rollover(mois_avance: int = 2, aujourd_hui: Optional[date] = None) -> List[str]:
+    """
+    Create the partitions of the current month and of the `mois_avance`
+    next ones, and commit. Returns the partitions created ([] when the
+    table is not partitioned).
+    """
+    conn = db.session.connection()
+    if not is_partitioned(conn):
+        return []
+    mois = month_start(aujourd_hui or date.today())
+    crees = []
+    for n in range(mois_avance + 1):
+        if create_partition(conn, add_months(mois, n)):
+            crees.append(partition_name(add_months(mois, n)))
+    db.session.commit()
+    return crees
+
+
+# ── Archives ────────────────────────────────────────────────────────────────
+
+def archive_dir() -> str:
+    return current_app.config.get('AUDIT_ARCHIVE_DIR') or os.path.join(current_app.instance_path, 'audit_archives')
+
+
+def _encode(log: Dict) -> str:
+    return json.dumps(dict(log, timestamp=log['timestamp'].isoformat()), ensure_ascii=False)
+
+
+def _archive_path(dossier: Path, mois: date) -> Path:
+    chemin = dossier / f'{TABLE}_{mois:%Y-%m}.jsonl.gz'
+    partie = 2
+    while chemin.exists():
+        chemin = dossier / f'{TABLE}_{mois:%Y-%m}.{partie}.jsonl.gz'
+        partie += 1
+    return chemin
+
+
+def _month_rows(mois: date, limite: Optional[int]):
+    """
+    Condition on the rows of a month that can be archived: all of them, but
+    the chained rows at or above `limite` (smallest id of the chained rows
+    kept in the table) wait for a later run.
+    """
+    table = SecurityLog.__table__
+    condition = db.and_(table.c.timestamp >= mois, table.c.timestamp < add_months(mois, 1))
+    if limite is not None:
+        condition = db.and_(condition, db.or_(table.c.chain_hash.is_(None), table.c.id < limite))
+    return condition
+
+
+def _first_kept_id(mois: date) -> Optional[int]:
+    """Smallest id of the chained rows of other months still in the table."""
+    table = SecurityLog.__table__
+    return db.session.execute(db.select(db.func.min(table.c.id)).where(
+        table.c.chain_hash.isnot(None),
+        db.or_(table.c.timestamp < mois, table.c.timestamp >= add_months(mois, 1))
+    )).scalar()
+
+
+def _export_month(dossier: Path, mois: date, limite: Optional[int] = None
+                  ) -> Tuple[int, Optional[Path], Optional[Tuple[int, str]]]:
+    """
+    Write the archivable rows of a month (see _month_rows) to a new archive
+    file (fsync'd). Returns (rows, path, (id, chain_hash) of the last chained row).
+    """
+    table = SecurityLog.__table__
+    requete = db.select(table).where(_month_rows(mois, limite)).order_by(table.c.timestamp, table.c.id)
+    chemin = _archive_path(dossier, mois)
+    temporaire = chemin.with_name(chemin.name + '.tmp')
+    nombre, dernier = 0, None
+    with gzip.open(temporaire, 'wt', encoding='utf-8') as fichier:
+        for ligne in db.session.execute(requete.execution_options(yield_per=5000)).mappings():
+            fichier.write(_encode(dict(ligne)) + '\n')
+            nombre += 1
+            if ligne['chain_hash'] and (dernier is None or ligne['id'] > dernier[0]):
+                dernier = (ligne['id'], ligne['chain_hash'])
+    if not nombre:
+        temporaire.unlink()
+        return 0, None, None
+    with open(temporaire, 'rb') as fichier:
+        os.fsync(fichier.fileno())
+    temporaire.replace(chemin)
+    return nombre, chemin, dernier
+
+
+def _archive_month(dossier: Path, mois: date, partitionne: bool) -> Tuple[int, Optional[Path], int]:
+    """Archive and remove the archivable rows of a month, in one transaction. Returns (rows, file, rows kept)."""
+    try:
+        limite = _first_kept_id(mois)
+        nombre, chemin, dernier = _export_month(dossier, mois, limite)
+        restants = db.session.execute(db.select(db.func.count()).select_from(SecurityLog).where(
+            SecurityLog.timestamp >= mois, SecurityLog.timestamp < add_months(mois, 1))).scalar() - nombre
+        conn = db.session.connection()
+        if not restants and partitionne and _partition_exists(conn, partition_name(mois)):
+            conn.execute(text(f'ALTER TABLE {TABLE} DETACH PARTITION {partition_name(mois)}'))
+            conn.execute(text(f'DROP TABLE {partition_name(mois)}'))
+        elif nombre:
+            db.session.execute(db.delete(SecurityLog).where(_month_rows(mois, limite)))
+        if dernier:
+            # The hash chain now starts after the archived rows
+            audit_chain.move_origin(db.session.connection(), audit_chain.LOGS, *dernier)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return nombre, chemin, restants
+
+
+def archive_logs(dossier: str, avant: date) -> List[Tuple[date, int, Optional[Path]]]:
+    """
+    Archive every whole month before `avant` (first day of a month) and
+    remove it from the database, one transaction per month. Returns
+    [(month, rows, file)].
+
+    The chain is ordered by id but months by timestamp: a row written late
+    (async audit mode) can have an id above rows of the next month. Such
+    rows stay in the table until every row below them is archived, so the
+    archived rows always form the start of the chain and its origin never
+    skips a row still in the table. Months are passed over again while that
+    lets them go; what remains (below a month kept in the table) waits for
+    a later run and goes to an additional file of its month.
+    """
+    dossier = Path(dossier)
+    dossier.mkdir(parents=True, exist_ok=True)
+    avant = month_start(avant)
+    partitionne = is_partitioned(db.session.connection())
+    resultats = []
+    while True:
+        premier = db.session.execute(db.select(db.func.min(SecurityLog.timestamp))).scalar()
+        mois = month_start(premier.date()) if premier else avant
+        archives, gardes = 0, 0
+        while mois < avant:
+            nombre, chemin, restants = _archive_month(dossier, mois, partitionne)
+            if nombre:
+                resultats.append((mois, nombre, chemin))
+            archives, gardes = archives + nombre, gardes + restants
+            mois = add_months(mois, 1)
+        if not gardes or not archives:
+            break
+    if gardes:
+        current_app.logger.warning("Archives: %s row(s) kept, chained after rows that stay in the table", gardes)
+    return resultats
+
+
+def archived_months(dossier: str) -> Dict[date, List[Path]]:
+    """{month: archive files} of the archive directory."""
+    mois = {}
+    dossier = Path(dossier)
+    if not dossier.is_dir():
+        return mois
+    for chemin in sorted(dossier.iterdir()):
+        correspondance = _ARCHIVE_NAME.match(chemin.name)
+        if correspondance:
+            mois.setdefault(date(int(correspondance[1]), int(correspondance[2]), 1), []).append(chemin)
+    return mois
+
+
+class ArchivedLog(SimpleNamespace):
+    """Archived security_logs row, with the attributes of SecurityLog used by the logs page."""
+
+
+def iter_archives(dossier: str, username: str = '', event_type: str = '',
+                  date_start: Optional[datetime] = None, date_end: Optional[datetime] = None) -> Iterator[ArchivedLog]:
+    """
+    Archived rows matching the filters of the logs page, newest first. Files
+    are read one month at a time, when the caller gets that far: a page of
+    the logs stops reading once it has its rows.
+    """
+    fragment = username.casefold()
+    for mois, chemins in sorted(archived_months(dossier).items(), reverse=True):
+        if date_start and add_months(mois, 1) <= month_start(date_start.date()):
+            continue
+        if date_end and mois > date_end.date():
+            continue
+        lignes = []
+        for chemin in chemins:
+            with gzip.open(chemin, 'rt', encoding='utf-8') as fichier:
+                for ligne in fichier:
+                    log = json.loads(ligne)
+                    if event_type and log['event_type'] != event_type:
+                        continue
+                    if fragment and fragment not in (log['username'] or '').casefold():
+                        continue
+                    log['timestamp'] = datetime.fromisoformat(log['timestamp'])
+                    horodatage = log['timestamp'].replace(tzinfo=None)
+                    if (date_start and horodatage < date_start) or (date_end and horodatage > date_end):
+                        continue
+                    lignes.append(ArchivedLog(**log))
+        lignes.sort(key=lambda log: (log.timestamp.replace(tzinfo=None), log.id), reverse=True)
+        yield from lignes
+
+
+def search_archives(dossier: str, username: str = '', event_type: str = '',
+                    date_start: Optional[datetime] = None, date_end: Optional[datetime] = None) -> List[ArchivedLog]:
+    """All the archived rows matching the filters, newest first."""
+    return list(iter_archives(dossier, username, event_type, date_start, date_end))
+
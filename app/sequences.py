@@ -0,0 +1,120 @@
+"""
+Numérotation des documents (reçus, factures, répertoire...).
+
+Chaque série (code, année) a une ligne dans la table `sequences`. Un numéro
+est alloué par un seul ordre SQL :
+
+    INSERT INTO sequences (code, annee, dernier) VALUES (:code, :annee, :n)
+    ON CONFLICT (code, annee) DO UPDATE SET dernier = sequences.dernier + :n
+    RETURNING dernier
+
+Sous PostgreSQL la ligne reste verrouillée jusqu'à la fin de la transaction
+appelante : deux caissiers ne peuvent pas obtenir le même numéro, et un
+numéro alloué dans une transaction annulée est rendu (pas de trou). SQLite
+sérialise de toute façon les écritures ; les autres bases passent par un
+SELECT ... FOR UPDATE.
+
+Réservation par blocs (optionnelle, config SEQUENCE_BLOCS = {'REC': 20}) :
+chaque worker réserve N numéros dans une transaction courte et séparée,
+puis les distribue sans accès à la base. Les numéros restent uniques mais
+ne sont plus strictement chronologiques entre workers, et un bloc non
+épuisé à l'arrêt du worker laisse un trou : à réserver aux séries qui le
+tolèrent.
+"""
+
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import SequenceNumerotation
+
+
+class SequenceService:
+    # Blocs réservés par ce worker : (code, annee) -> [prochain, dernier]
+    _blocs: Dict[Tuple[str, int], List[int]] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _incrementer(connexion, code: str, annee: int, quantite: int) -> int:
+        """Ajoute `quantite` au compteur (créé au besoin) et renvoie sa nouvelle valeur."""
+        table = SequenceNumerotation.__table__
+        dialecte = connexion.get_bind().dialect.name if hasattr(connexion, 'get_bind') else connexion.dialect.name
+
+        if dialecte in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialecte == 'postgresql' else sqlite.insert
+            ordre = insert(table).values(code=code, annee=annee, dernier=quantite)
+            ordre = ordre.on_conflict_do_update(
+                index_elements=[table.c.code, table.c.annee],
+                set_={'dernier': table.c.dernier + quantite},
+            ).returning(table.c.dernier)
+            return connexion.execute(ordre).scalar_one()
+
+        dernier = connexion.execute(
+            db.select(table.c.dernier).where(table.c.code == code, table.c.annee == annee).with_for_update()
+        ).scalar()
+        if dernier is None:
+            connexion.execute(db.insert(table).values(code=code, annee=annee, dernier=quantite))
+            return quantite
+        connexion.execute(
+            db.update(table).where(table.c.code == code, table.c.annee == annee)
+            .values(dernier=table.c.dernier + quantite)
+        )
+        return dernier + quantite
+
+    @staticmethod
+    def allouer(code: str, annee: Optional[int] = None, quantite: int = 1) -> range:
+        """
+        Alloue `quantite` numéros consécutifs de la série dans la transaction
+        courante (ils ne sont acquis qu'au commit). `annee=None` : année en
+        cours ; 0 : série continue.
+        """
+        if quantite < 1:
+            raise ValueError("La quantité à allouer doit être positive.")
+        if annee is None:
+            annee = date.today().year
+        dernier = SequenceService._incrementer(db.session, code, annee, quantite)
+        return range(dernier - quantite + 1, dernier + 1)
+
+    @staticmethod
+    def suivant(code: str, annee: Optional[int] = None) -> int:
+        """Prochain numéro de la série (par bloc si SEQUENCE_BLOCS le prévoit)."""
+        if annee is None:
+            annee = date.today().year
+        taille = current_app.config.get('SEQUENCE_BLOCS', {}).get(code, 1)
+        if taille <= 1:
+            return SequenceService.allouer(code, annee)[0]
+
+        cle = (code, annee)
+        with SequenceService._lock:
+            bloc = SequenceService._blocs.get(cle)
+            if bloc is None or bloc[0] > bloc[1]:
+                # Transaction séparée : le verrou est relâché aussitôt le bloc réservé
+                with db.engine.begin() as connexion:
+                    dernier = SequenceService._incrementer(connexion, code, annee, taille)
+                bloc = SequenceService._blocs[cle] = [dernier - taille + 1, dernier]
+            numero = bloc[0]
+            bloc[0] += 1
+            return numero
+
+    @staticmethod
+    def formater(prefixe: str, numero: int, annee: Optional[int] = None, chiffres: int = 6) -> str:
+        """'REC', 42, 2026 -> 'REC-2026-000042' ; sans année : 'REC-000042'."""
+        if annee:
+            return f"{prefixe}-{annee}-{numero:0{chiffres}d}"
+        return f"{prefixe}-{numero:0{chiffres}d}"
+
+    @staticmethod
+    def numero_document(prefixe: str, jour: Optional[date] = None) -> str:
+        """Numéro annuel d'un document daté (reçu, facture) : 'FACT-2026-000007'."""
+        annee = (jour or date.today()).year
+        return SequenceService.formater(prefixe, SequenceService.suivant(prefixe, annee), annee)
+
+    @staticmethod
+    def reinitialiser_blocs() -> None:
+        """Oublie les blocs réservés par ce worker (tests, changement de configuration)."""
+        with SequenceService._lock:
+            SequenceService._blocs.clear()
@@ -6,6 +6,8 @@ from app.users.forms import UserCreateForm, UserEditForm, ChangePasswordForm, Ad
 from app.models import User, SecurityLog
 from flask import request
 from app.decorators import admin_required
+from app import security_logs as security_logs_store
+from app.pagination import keyset_paginate, keyset_paginate_list
 from datetime import datetime
 
 
@@ -256,39 +258,55 @@ def unlock(id):
 @admin_required
 def security_logs():
     """Display security logs - Admin only"""
-    page = request.args.get('page', 1, type=int)
+    apres = request.args.get('apres')
+    avant = request.args.get('avant')
     
     # Filters
     username_filter = request.args.get('username', '')
     action_filter = request.args.get('action', '')
     date_start = request.args.get('date_start', '')
     date_end = request.args.get('date_end', '')
-    
-    logs_query = db.select(SecurityLog)
-    
-    if username_filter:
-        logs_query = logs_query.where(SecurityLog.username.ilike(f'%{username_filter}%'))
-    if action_filter:
-        logs_query = logs_query.where(SecurityLog.event_type == action_filter)
+    source = request.args.get('source', '')
+
+    d_start = d_end = None
     if date_start:
         try:
             d_start = datetime.strptime(date_start, '%Y-%m-%d')
-            logs_query = logs_query.where(SecurityLog.timestamp >= d_start)
         except ValueError:
             pass
     if date_end:
         try:
             # End of day
             d_end = datetime.strptime(date_end, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
-            logs_query = logs_query.where(SecurityLog.timestamp <= d_end)
         except ValueError:
             pass
-            
-    logs_query = logs_query.order_by(SecurityLog.timestamp.desc())
-    logs_pagination = db.paginate(logs_query, page=page, per_page=50, error_out=False)
-    
-    # Get distinct event types for the filter dropdown
-    event_types = db.session.scalars(db.select(SecurityLog.event_type).distinct()).all()
+
+    if source == 'archives':
+        # Months moved out of the database by `flask archive-logs`, read newest first until the page is full
+        rows = security_logs_store.iter_archives(security_logs_store.archive_dir(), username_filter,
+                                                 action_filter, d_start, d_end)
+        logs_pagination = keyset_paginate_list(rows, lambda log: (log.timestamp, log.id),
+                                               apres=apres, avant=avant, per_page=50)
+    else:
+        logs_query = db.select(SecurityLog)
+
+        if username_filter:
+            # Distinct usernames are few: IN (...) uses the (username, timestamp) index, ILIKE '%...%' would not
+            usernames = security_logs_store.matching_usernames(username_filter)
+            logs_query = logs_query.where(SecurityLog.username.in_(usernames))
+        if action_filter:
+            logs_query = logs_query.where(SecurityLog.event_type == action_filter)
+        if d_start:
+            logs_query = logs_query.where(SecurityLog.timestamp >= d_start)
+        if d_end:
+            logs_query = logs_query.where(SecurityLog.timestamp <= d_end)
+
+        # Keyset pagination on the (timestamp) indexes, approximate total: no OFFSET nor COUNT(*) scan
+        logs_pagination = keyset_paginate(logs_query, (SecurityLog.timestamp.desc(), SecurityLog.id.desc()),
+                                          apres=apres, avant=avant, per_page=50, total='approx')
+
+    # Event types for the filter dropdown (cached per worker)
+    event_types = security_logs_store.event_types()
     
     return render_template('users/security_logs.html',
                          title='Logs d\'Audit et de Sécurité',
@@ -299,7 +317,8 @@ def security_logs():
                              'username': username_filter,
                              'action': action_filter,
                              'date_start': date_start,
-                             'date_end': date_end
+                             'date_end': date_end,
+                             'source': source
                          })
 
 
@@ -22,7 +22,7 @@ def parametres_etude():
         except ValidationError:
             abort(400, "Jeton CSRF invalide.")
         
-        updated = 0
+        valeurs = {}
         errors = []
 
         for cle in DEFAULTS:
@@ -42,8 +42,10 @@ def parametres_etude():
                 errors.append(f"Valeur invalide pour « {DEFAULTS[cle]['libelle']} » : {nouvelle_valeur}")
                 continue
 
-            ParametreService.set(cle, nouvelle_valeur, user_id=current_user.id)
-            updated += 1
+            valeurs[cle] = nouvelle_valeur
+
+        # Une seule transaction et un seul changement de version pour tout le formulaire
+        updated = ParametreService.set_many(valeurs, user_id=current_user.id)
 
         if errors:
             for err in errors:
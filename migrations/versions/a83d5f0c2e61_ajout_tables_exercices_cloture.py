@@ -0,0 +1,66 @@
+"""ajout tables compta_exercices et compta_soldes_cloture
+
+Revision ID: a83d5f0c2e61
+Revises: f7c3a91e5b20
+Create Date: 2026-10-18 17:48:12.305617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a83d5f0c2e61'
+down_revision = 'f7c3a91e5b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('compta_exercices',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('annee', sa.Integer(), nullable=False),
+    sa.Column('date_debut', sa.Date(), nullable=False),
+    sa.Column('date_fin', sa.Date(), nullable=False),
+    sa.Column('resultat', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('ecriture_an_id', sa.Integer(), nullable=True),
+    sa.Column('cloture_par', sa.Integer(), nullable=True),
+    sa.Column('cloture_le', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['cloture_par'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['ecriture_an_id'], ['compta_ecritures.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('annee')
+    )
+    with op.batch_alter_table('compta_exercices', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_compta_exercices_date_fin'), ['date_fin'], unique=False)
+
+    op.create_table('compta_soldes_cloture',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('exercice_id', sa.Integer(), nullable=False),
+    sa.Column('compte_id', sa.Integer(), nullable=False),
+    sa.Column('solde_cloture', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('solde_ouverture', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.ForeignKeyConstraint(['compte_id'], ['compta_comptes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['exercice_id'], ['compta_exercices.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('exercice_id', 'compte_id', name='uq_compta_soldes_cloture_exercice_compte')
+    )
+
+    # Les états partent de la dernière clôture : lectures par plage de dates
+    with op.batch_alter_table('compta_ecritures', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_compta_ecritures_date_ecriture'), ['date_ecriture'], unique=False)
+    with op.batch_alter_table('compta_mouvements', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_compta_mouvements_ecriture_id'), ['ecriture_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('compta_mouvements', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_compta_mouvements_ecriture_id'))
+    with op.batch_alter_table('compta_ecritures', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_compta_ecritures_date_ecriture'))
+
+    op.drop_table('compta_soldes_cloture')
+    with op.batch_alter_table('compta_exercices', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_compta_exercices_date_fin'))
+
+    op.drop_table('compta_exercices')
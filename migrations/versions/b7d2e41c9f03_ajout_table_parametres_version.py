@@ -0,0 +1,33 @@
+"""ajout table parametres_version
+
+Revision ID: b7d2e41c9f03
+Revises: 8fde36b06327
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2e41c9f03'
+down_revision = '8fde36b06327'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    parametres_version = op.create_table('parametres_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Ligne unique lue par tous les workers
+    op.bulk_insert(parametres_version, [{'id': 1, 'version': 1, 'updated_at': datetime.utcnow()}])
+
+
+def downgrade():
+    op.drop_table('parametres_version')
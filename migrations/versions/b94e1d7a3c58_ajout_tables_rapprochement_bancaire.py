@@ -0,0 +1,78 @@
+"""ajout tables rapprochement bancaire (releves_bancaires, lignes_releve, rapprochements)
+
+Revision ID: b94e1d7a3c58
+Revises: a83d5f0c2e61
+Create Date: 2026-10-18 19:12:40.518236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b94e1d7a3c58'
+down_revision = 'a83d5f0c2e61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rapprochements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('compte_id', sa.Integer(), nullable=False),
+    sa.Column('methode', sa.String(length=20), nullable=False),
+    sa.Column('cree_par', sa.Integer(), nullable=True),
+    sa.Column('cree_le', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['compte_id'], ['compta_comptes.id'], ),
+    sa.ForeignKeyConstraint(['cree_par'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('releves_bancaires',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('compte_id', sa.Integer(), nullable=False),
+    sa.Column('nom_fichier', sa.String(length=255), nullable=True),
+    sa.Column('nb_lignes', sa.Integer(), nullable=False),
+    sa.Column('importe_par', sa.Integer(), nullable=True),
+    sa.Column('importe_le', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['compte_id'], ['compta_comptes.id'], ),
+    sa.ForeignKeyConstraint(['importe_par'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('lignes_releve',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('releve_id', sa.Integer(), nullable=False),
+    sa.Column('compte_id', sa.Integer(), nullable=False),
+    sa.Column('date_operation', sa.Date(), nullable=False),
+    sa.Column('libelle', sa.String(length=255), nullable=False),
+    sa.Column('reference', sa.String(length=100), nullable=True),
+    sa.Column('montant', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('rapprochement_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['compte_id'], ['compta_comptes.id'], ),
+    sa.ForeignKeyConstraint(['rapprochement_id'], ['rapprochements.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['releve_id'], ['releves_bancaires.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Lignes en attente d'un compte : compte_id, rapprochement_id IS NULL, par date
+    with op.batch_alter_table('lignes_releve', schema=None) as batch_op:
+        batch_op.create_index('ix_lignes_releve_compte_rapprochement_date',
+                              ['compte_id', 'rapprochement_id', 'date_operation'], unique=False)
+
+    with op.batch_alter_table('compta_mouvements', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rapprochement_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_compta_mouvements_rapprochement_id'), ['rapprochement_id'], unique=False)
+        batch_op.create_foreign_key('fk_compta_mouvements_rapprochement_id', 'rapprochements',
+                                    ['rapprochement_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade():
+    with op.batch_alter_table('compta_mouvements', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_compta_mouvements_rapprochement_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_compta_mouvements_rapprochement_id'))
+        batch_op.drop_column('rapprochement_id')
+
+    with op.batch_alter_table('lignes_releve', schema=None) as batch_op:
+        batch_op.drop_index('ix_lignes_releve_compte_rapprochement_date')
+
+    op.drop_table('lignes_releve')
+    op.drop_table('releves_bancaires')
+    op.drop_table('rapprochements')
@@ -0,0 +1,84 @@
+"""partitionnement mensuel et index de security_logs
+
+Revision ID: c3e7b5a9d214
+Revises: b94e1d7a3c58
+Create Date: 2026-10-18 20:41:09.227315
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7b5a9d214'
+down_revision = 'b94e1d7a3c58'
+branch_labels = None
+depends_on = None
+
+# Mois créés d'avance au-delà du mois courant (ensuite : flask rollover-logs)
+MOIS_AVANCE = 2
+
+
+def _mois_suivant(mois):
+    return date(mois.year + mois.month // 12, mois.month % 12 + 1, 1)
+
+
+def _partitionner():
+    """PostgreSQL : security_logs devient une table partitionnée par mois sur "timestamp"."""
+    conn = op.get_bind()
+    op.execute('ALTER TABLE security_logs RENAME TO security_logs_ancienne')
+    op.execute('ALTER INDEX security_logs_pkey RENAME TO security_logs_ancienne_pkey')
+    # Mêmes colonnes, valeurs par défaut (id : nextval('security_logs_id_seq')) et contraintes
+    op.execute('CREATE TABLE security_logs (LIKE security_logs_ancienne INCLUDING DEFAULTS INCLUDING CONSTRAINTS) '
+               'PARTITION BY RANGE ("timestamp")')
+    op.execute('ALTER TABLE security_logs ALTER COLUMN "timestamp" SET NOT NULL')
+    # La clé de partitionnement fait partie de toute contrainte d'unicité
+    op.execute('ALTER TABLE security_logs ADD CONSTRAINT security_logs_pkey PRIMARY KEY (id, "timestamp")')
+    op.execute('CREATE TABLE security_logs_default PARTITION OF security_logs DEFAULT')
+
+    premier = conn.execute(sa.text('SELECT min("timestamp") FROM security_logs_ancienne')).scalar()
+    aujourd_hui = date.today()
+    mois = date((premier or aujourd_hui).year, (premier or aujourd_hui).month, 1)
+    fin = date(aujourd_hui.year, aujourd_hui.month, 1)
+    for _ in range(MOIS_AVANCE):
+        fin = _mois_suivant(fin)
+    while mois <= fin:
+        suivant = _mois_suivant(mois)
+        op.execute(f"CREATE TABLE security_logs_p{mois:%Y%m} PARTITION OF security_logs "
+                   f"FOR VALUES FROM ('{mois.isoformat()}') TO ('{suivant.isoformat()}')")
+        mois = suivant
+
+    op.execute('INSERT INTO security_logs SELECT * FROM security_logs_ancienne')
+    op.execute('ALTER SEQUENCE security_logs_id_seq OWNED BY security_logs.id')
+    op.execute('DROP TABLE security_logs_ancienne')
+
+
+def _departitionner():
+    op.execute('ALTER TABLE security_logs RENAME TO security_logs_partitionnee')
+    op.execute('ALTER INDEX security_logs_pkey RENAME TO security_logs_partitionnee_pkey')
+    op.execute('CREATE TABLE security_logs (LIKE security_logs_partitionnee INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+    op.execute('ALTER TABLE security_logs ADD CONSTRAINT security_logs_pkey PRIMARY KEY (id)')
+    op.execute('INSERT INTO security_logs SELECT * FROM security_logs_partitionnee')
+    op.execute('ALTER SEQUENCE security_logs_id_seq OWNED BY security_logs.id')
+    op.execute('DROP TABLE security_logs_partitionnee')
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _partitionner()
+    # Filtres de la page des logs ; sur une table partitionnée, chaque partition reçoit ses index
+    with op.batch_alter_table('security_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_security_logs_timestamp', ['timestamp'], unique=False)
+        batch_op.create_index('ix_security_logs_event_type_timestamp', ['event_type', 'timestamp'], unique=False)
+        batch_op.create_index('ix_security_logs_username_timestamp', ['username', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('security_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_security_logs_username_timestamp')
+        batch_op.drop_index('ix_security_logs_event_type_timestamp')
+        batch_op.drop_index('ix_security_logs_timestamp')
+    if op.get_bind().dialect.name == 'postgresql':
+        _departitionner()
@@ -0,0 +1,33 @@
+"""index recherche dossiers
+
+Revision ID: c41f8a2d6e17
+Revises: b7d2e41c9f03
+Create Date: 2026-10-18 10:03:27.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f8a2d6e17'
+down_revision = 'b7d2e41c9f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Index trigrammes : accélèrent les ILIKE '%...%' de l'API de recherche de dossiers
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.batch_alter_table('dossiers', schema=None) as batch_op:
+        batch_op.create_index('ix_dossiers_numero_trgm', ['numero_dossier'], unique=False,
+                              postgresql_using='gin', postgresql_ops={'numero_dossier': 'gin_trgm_ops'})
+        batch_op.create_index('ix_dossiers_intitule_trgm', ['intitule'], unique=False,
+                              postgresql_using='gin', postgresql_ops={'intitule': 'gin_trgm_ops'})
+
+
+def downgrade():
+    with op.batch_alter_table('dossiers', schema=None) as batch_op:
+        batch_op.drop_index('ix_dossiers_intitule_trgm')
+        batch_op.drop_index('ix_dossiers_numero_trgm')
@@ -0,0 +1,35 @@
+"""index de pagination par clé (clients, dossiers, formalites)
+
+Revision ID: d1a6f3c8b472
+Revises: c3e7b5a9d214
+Create Date: 2026-10-18 21:26:53.640118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1a6f3c8b472'
+down_revision = 'c3e7b5a9d214'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Une page se lit par un parcours d'index borné par la dernière ligne affichée (app/pagination.py)
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.create_index('ix_clients_nom_id', ['nom', 'id'], unique=False)
+    with op.batch_alter_table('dossiers', schema=None) as batch_op:
+        batch_op.create_index('ix_dossiers_created_at_id', ['created_at', 'id'], unique=False)
+    with op.batch_alter_table('formalites', schema=None) as batch_op:
+        batch_op.create_index('ix_formalites_date_depot_id', ['date_depot', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('formalites', schema=None) as batch_op:
+        batch_op.drop_index('ix_formalites_date_depot_id')
+    with op.batch_alter_table('dossiers', schema=None) as batch_op:
+        batch_op.drop_index('ix_dossiers_created_at_id')
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.drop_index('ix_clients_nom_id')
@@ -0,0 +1,61 @@
+"""ajout table compta_soldes
+
+Revision ID: d5a73e19b084
+Revises: c41f8a2d6e17
+Create Date: 2026-10-18 11:42:09.731250
+
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a73e19b084'
+down_revision = 'c41f8a2d6e17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    soldes = op.create_table('compta_soldes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('compte_id', sa.Integer(), nullable=False),
+    sa.Column('periode', sa.String(length=7), nullable=False),
+    sa.Column('total_debit', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('total_credit', sa.Numeric(precision=18, scale=2), nullable=False),
+    sa.Column('nb_mouvements', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['compte_id'], ['compta_comptes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('compte_id', 'periode', name='uq_compta_soldes_compte_periode')
+    )
+
+    # Reprise : soldes mensuels et totaux des écritures déjà validées
+    rows = op.get_bind().execute(sa.text(
+        "SELECT m.compte_id, e.date_ecriture, m.debit, m.credit "
+        "FROM compta_mouvements m JOIN compta_ecritures e ON e.id = m.ecriture_id "
+        "WHERE e.valide = :valide AND m.compte_id IS NOT NULL"
+    ), {'valide': True})
+
+    cumuls = defaultdict(lambda: [Decimal('0'), Decimal('0'), 0])
+    for compte_id, jour, debit, credit in rows:
+        # SQLite renvoie les dates brutes en texte ('YYYY-MM-DD')
+        periode = jour[:7] if isinstance(jour, str) else f"{jour.year:04d}-{jour.month:02d}"
+        for cle in ((compte_id, periode), (compte_id, 'TOTAL')):
+            cumul = cumuls[cle]
+            cumul[0] += Decimal(str(debit or 0))
+            cumul[1] += Decimal(str(credit or 0))
+            cumul[2] += 1
+
+    if cumuls:
+        op.bulk_insert(soldes, [
+            {'compte_id': compte_id, 'periode': periode, 'total_debit': debit,
+             'total_credit': credit, 'nb_mouvements': nb}
+            for (compte_id, periode), (debit, credit, nb) in cumuls.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('compta_soldes')
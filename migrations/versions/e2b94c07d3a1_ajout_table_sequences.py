@@ -0,0 +1,47 @@
+"""ajout table sequences
+
+Revision ID: e2b94c07d3a1
+Revises: d5a73e19b084
+Create Date: 2026-10-18 14:05:51.208734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b94c07d3a1'
+down_revision = 'd5a73e19b084'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    sequences = op.create_table('sequences',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=30), nullable=False),
+    sa.Column('annee', sa.Integer(), nullable=False),
+    sa.Column('dernier', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('code', 'annee', name='uq_sequences_code_annee')
+    )
+
+    # Reprise des numéros de répertoire déjà attribués, année par année
+    rows = op.get_bind().execute(sa.text(
+        "SELECT date_archivage, numero_repertoire FROM actes "
+        "WHERE numero_repertoire IS NOT NULL AND date_archivage IS NOT NULL"
+    ))
+    derniers = {}
+    for archivage, numero in rows:
+        # SQLite renvoie les horodatages bruts en texte
+        annee = int(archivage[:4]) if isinstance(archivage, str) else archivage.year
+        derniers[annee] = max(derniers.get(annee, 0), numero)
+    if derniers:
+        op.bulk_insert(sequences, [
+            {'code': 'REPERTOIRE', 'annee': annee, 'dernier': dernier}
+            for annee, dernier in derniers.items()
+        ])
+
+
+def downgrade():
+    op.drop_table('sequences')
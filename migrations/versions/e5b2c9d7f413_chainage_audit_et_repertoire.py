@@ -0,0 +1,56 @@
+"""chaînage par hash de security_logs et du répertoire (audit_chains)
+
+Revision ID: e5b2c9d7f413
+Revises: d1a6f3c8b472
+Create Date: 2026-10-18 22:08:31.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b2c9d7f413'
+down_revision = 'd1a6f3c8b472'
+branch_labels = None
+depends_on = None
+
+GENESIS = '0' * 64
+
+
+def upgrade():
+    audit_chains = op.create_table('audit_chains',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('length', sa.Integer(), nullable=False),
+    sa.Column('last_hash', sa.String(length=64), nullable=False),
+    sa.Column('origin_position', sa.Integer(), nullable=False),
+    sa.Column('origin_hash', sa.String(length=64), nullable=False),
+    sa.Column('checkpoint_position', sa.Integer(), nullable=False),
+    sa.Column('checkpoint_hash', sa.String(length=64), nullable=False),
+    sa.Column('checked_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    with op.batch_alter_table('security_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('chain_hash', sa.String(length=64), nullable=True))
+    with op.batch_alter_table('actes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rang_chaine', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('hash_chaine', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_actes_rang_chaine', ['rang_chaine'])
+
+    # Les logs existants restent hors de la chaîne : elle commence après le dernier id
+    dernier_log = op.get_bind().execute(sa.text('SELECT max(id) FROM security_logs')).scalar() or 0
+    op.bulk_insert(audit_chains, [
+        {'name': nom, 'length': 0, 'last_hash': GENESIS, 'origin_position': origine, 'origin_hash': GENESIS,
+         'checkpoint_position': origine, 'checkpoint_hash': GENESIS}
+        for nom, origine in (('security_logs', dernier_log), ('repertoire', 0))
+    ])
+
+
+def downgrade():
+    with op.batch_alter_table('actes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_actes_rang_chaine', type_='unique')
+        batch_op.drop_column('hash_chaine')
+        batch_op.drop_column('rang_chaine')
+    with op.batch_alter_table('security_logs', schema=None) as batch_op:
+        batch_op.drop_column('chain_hash')
+    op.drop_table('audit_chains')
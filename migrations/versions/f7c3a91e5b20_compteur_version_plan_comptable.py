@@ -0,0 +1,32 @@
+"""compteur de version du plan comptable
+
+Revision ID: f7c3a91e5b20
+Revises: e2b94c07d3a1
+Create Date: 2026-10-18 16:20:37.482915
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c3a91e5b20'
+down_revision = 'e2b94c07d3a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Ligne id = 2 de parametres_version : plan comptable (voir PlanComptable)
+    parametres_version = sa.table('parametres_version',
+        sa.column('id', sa.Integer()),
+        sa.column('version', sa.Integer()),
+        sa.column('updated_at', sa.TIMESTAMP(timezone=True)),
+    )
+    op.bulk_insert(parametres_version, [{'id': 2, 'version': 1, 'updated_at': datetime.utcnow()}])
+
+
+def downgrade():
+    op.execute("DELETE FROM parametres_version WHERE id = 2")
@@ -1,4 +1,4 @@
-from app import create_app, db
+from app import audit_chain, create_app, db
 from app.models import Dossier, ComptaCompte, ComptaEcriture, ComptaMouvement, Recu, Facture
 from sqlalchemy import func
 import sys
@@ -11,12 +11,12 @@ def run_audit():
         warnings = []
 
         # 1. Dossier Checks
-        dossiers = db.session.execute(db.select(Dossier)).scalars().all()
-        nums = [d.numero_dossier for d in dossiers]
-        if len(nums) != len(set(nums)):
-            errors.append(f"CRITICAL: Non-unique dossier numbers found! {len(nums) - len(set(nums))} duplicates.")
+        dossier_count, number_count = db.session.execute(
+            db.select(func.count(Dossier.id), func.count(Dossier.numero_dossier.distinct()))).one()
+        if dossier_count != number_count:
+            errors.append(f"CRITICAL: Non-unique dossier numbers found! {dossier_count - number_count} duplicates.")
         else:
-            print(f"OK: All {len(dossiers)} dossiers have unique numbers.")
+            print(f"OK: All {dossier_count} dossiers have unique numbers.")
 
         # 2. Accounting Internal Consistency
         # Sum of all movements should be 0 (Debit - Credit = 0)
@@ -29,15 +29,18 @@ def run_audit():
             print(f"OK: General Ledger is balanced. Total: {total_debit} FCFA.")
 
         # 3. Double-Entry Validation (Each Ecriture must be balanced)
-        ecritures = db.session.execute(db.select(ComptaEcriture)).scalars().all()
-        for ec in ecritures:
-            d = sum(m.debit for m in ec.mouvements)
-            c = sum(m.credit for m in ec.mouvements)
-            if d != c:
-                errors.append(f"ERROR: Ecriture #{ec.id} ({ec.numero_ecriture}) is imbalanced! D:{d} C:{c}")
+        imbalanced = db.session.execute(
+            db.select(ComptaEcriture.id, ComptaEcriture.numero_piece,
+                      func.sum(ComptaMouvement.debit), func.sum(ComptaMouvement.credit))
+            .join(ComptaMouvement, ComptaMouvement.ecriture_id == ComptaEcriture.id)
+            .group_by(ComptaEcriture.id, ComptaEcriture.numero_piece)
+            .having(func.sum(ComptaMouvement.debit) != func.sum(ComptaMouvement.credit))).all()
+        for ec_id, number, d, c in imbalanced:
+            errors.append(f"ERROR: Ecriture #{ec_id} ({number}) is imbalanced! D:{d} C:{c}")
         
-        if not any("Ecriture" in e for e in errors):
-            print(f"OK: All {len(ecritures)} individual entries are balanced.")
+        if not imbalanced:
+            ecriture_count = db.session.scalar(db.select(func.count(ComptaEcriture.id)))
+            print(f"OK: All {ecriture_count} individual entries are balanced.")
 
         # 4. Orphans
         mouvements_without_account = db.session.query(ComptaMouvement).filter(ComptaMouvement.compte_id == None).count()
@@ -47,12 +50,20 @@ def run_audit():
             print("OK: No orphaned movements found.")
 
         # 5. Receipts/Invoices Link
-        recus = db.session.execute(db.select(Recu)).scalars().all()
-        for r in recus:
-            if not r.ecriture:
-                warnings.append(f"WARN: Receipt {r.numero_recu} has no associated accounting entry.")
+        unlinked_receipts = db.session.scalars(
+            db.select(Recu.numero_recu).where(~Recu.ecriture.has())).all()
+        for number in unlinked_receipts:
+            warnings.append(f"WARN: Receipt {number} has no associated accounting entry.")
         
-        print(f"OK: {len(recus)} receipts verified.")
+        print(f"OK: {db.session.scalar(db.select(func.count(Recu.id)))} receipts verified.")
+
+        # 6. Hash chains of the audit trail and of the repertoire, from the last verified checkpoint
+        for chain in (audit_chain.LOGS, audit_chain.REPERTOIRE):
+            result = audit_chain.verify(db.session, chain, full='--complet' in sys.argv)
+            if result['ok']:
+                print(f"OK: {result['checked']} new {chain} entries chained (checkpoint {result['position']}).")
+            else:
+                errors.append(f"CRITICAL: {chain} hash chain broken after {result['position']}: {result['error']}")
 
         # Summary
         print("\n=== AUDIT SUMMARY ===")
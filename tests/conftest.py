@@ -27,6 +27,11 @@ def app():
     app = create_app(TestConfig)
     
     with app.app_context():
+        # Caches par worker : chaque test part d'une base neuve
+        from app.comptabilite.plan_comptable import PlanComptable
+        PlanComptable.invalidate_cache()
+        from app.security_logs import invalidate_event_types
+        invalidate_event_types()
         db.create_all()
         # Create default admin user for tests
         u = User(username='admin', email='admin@example.com', role='ADMIN')
@@ -50,3 +55,34 @@ def runner(app):
 @pytest.fixture
 def auth(client):
     return AuthActions(client)
+
+@pytest.fixture
+def bareme_vente(app):
+    """Barème VENTE équivalent à celui de seed_dynamic_bareme.py."""
+    from app.models import BaremeModele, BaremeVariable, BaremeLigneCalcul
+    from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+    DynamicCalculatorEngine.invalidate_plan()
+    bareme = BaremeModele(code='VENTE', nom='Vente Immobilière')
+    db.session.add(bareme)
+    db.session.flush()
+    db.session.add_all([
+        BaremeVariable(bareme_id=bareme.id, code='PRIX_VENTE', label='Prix', type_champ='MONTANT', valeur_defaut='0', ordre=1),
+        BaremeVariable(bareme_id=bareme.id, code='TAUX_ENREG', label='Taux', type_champ='CHOIX', choix_json=[1, 2, 5, 10], valeur_defaut='10', ordre=2),
+        BaremeVariable(bareme_id=bareme.id, code='MORCELLEMENT', label='Morcellement', type_champ='BOOLEEN', valeur_defaut='True', ordre=3),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=2, code='HONORAIRES_NORMAL', libelle='Honoraires', type_ligne='TRANCHES',
+                          condition_affichage='TAUX_ENREG != 1', formule_ou_montant='PRIX_VENTE',
+                          tranches_json=[{"max": 60000000, "taux": 3.0}, {"max": 20000000, "taux": 4.5},
+                                         {"max": None, "taux": 0.75}, {"max": 220000000, "taux": 1.5}], soumis_tva=True),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=1, code='HONORAIRES_REDUIT', libelle='Honoraires (réduit)', type_ligne='TRANCHES',
+                          condition_affichage='TAUX_ENREG == 1', formule_ou_montant='PRIX_VENTE',
+                          tranches_json=[{"max": 20000000, "taux": 2.25}, {"max": None, "taux": 0.375}], soumis_tva=True),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=3, code='ENREGISTREMENT', libelle='Enregistrement', type_ligne='FORMULE',
+                          formule_ou_montant='PRIX_VENTE * (TAUX_ENREG / 100)'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=4, code='CONSERVATION', libelle='CF', type_ligne='FORMULE',
+                          condition_affichage='MORCELLEMENT', formule_ou_montant='(PRIX_VENTE // 1000 * 1000) * 0.01 + 5000'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=5, code='DIVERS', libelle='Divers', type_ligne='FORFAIT', formule_ou_montant='50000'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=6, code='INVALIDE', libelle='Formule invalide', type_ligne='FORMULE', formule_ou_montant='PRIX_VENTE *'),
+    ])
+    db.session.commit()
+    yield bareme
+    DynamicCalculatorEngine.invalidate_plan()
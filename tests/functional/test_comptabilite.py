@@ -1,4 +1,4 @@
-from app.models import Recu, Facture, ComptaCompte
+from app.models import Recu, Facture, ComptaCompte, ComptaEcriture
 
 def test_comptabilite_access_protected(client):
     """Test that comptabilite routes are protected."""
@@ -68,3 +68,99 @@ def test_create_receipt(client, auth, app):
     # Check for success message or redirect to view
     assert b'Recu REC-' in response.data or b'Test Receipt' in response.data
 
+
+
+def test_exports_streaming(client, auth, app):
+    """CSV and XLSX exports of the ledger, journal and receipts."""
+    from datetime import date
+    from io import BytesIO
+    from openpyxl import load_workbook
+    from app.comptabilite.service import ComptabiliteService
+
+    auth.login()
+    with app.app_context():
+        ComptabiliteService.initialize_default_accounts()
+        banque = ComptaCompte.query.filter_by(numero_compte='512-OFFICE').first()
+        caisse = ComptaCompte.query.filter_by(numero_compte='531-OFFICE').first()
+        for jour, montant in ((date(2025, 1, 10), 1000), (date(2025, 2, 10), 250.5)):
+            ecriture = ComptabiliteService.create_ecriture(
+                date_ecriture=jour, libelle='Versement', journal_code='BQ', numero_piece='P1',
+                mouvements=[{'compte_id': banque.id, 'debit': montant, 'credit': 0},
+                            {'compte_id': caisse.id, 'debit': 0, 'credit': montant}])
+            ComptabiliteService.valider_ecriture(ecriture.id)
+
+    response = client.get('/comptabilite/exports/grand-livre.csv?date_debut=2025-02-01&date_fin=2025-12-31')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'attachment; filename="grand_livre_2025-12-31.csv"' == response.headers['Content-Disposition']
+    lignes = response.get_data(as_text=True).lstrip('\ufeff').splitlines()
+    assert lignes[0].startswith('Compte;Libellé compte;Date')
+    assert '512-OFFICE;Banque - Compte Office;01/02/2025;Report à nouveau;;1000,00;0,00;1000,00' in lignes
+    assert '512-OFFICE;Banque - Compte Office;10/02/2025;Versement;P1;250,50;0,00;1250,50' in lignes
+
+    response = client.get('/comptabilite/exports/journal.xlsx?journal_code=BQ')
+    assert response.status_code == 200
+    feuille = load_workbook(BytesIO(response.get_data())).active
+    rows = list(feuille.iter_rows(values_only=True))
+    assert rows[0][:3] == ('Journal', 'Date', 'N° écriture')
+    assert len(rows) == 5
+    assert rows[1][0] == 'BQ'
+
+    assert client.get('/comptabilite/exports/recus.csv').status_code == 200
+    assert client.get('/comptabilite/exports/inconnu.csv').status_code == 404
+    assert client.get('/comptabilite/exports/balance.pdf').status_code == 404
+
+
+def test_import_journal(client, auth, app):
+    """Upload of a journal file: valid entries imported, errors reported per line."""
+    from io import BytesIO
+    from app.comptabilite.service import ComptabiliteService
+
+    auth.login()
+    with app.app_context():
+        ComptabiliteService.initialize_default_accounts()
+
+    contenu = ('Date;Journal;Pièce;Libellé;Compte;Débit;Crédit\n'
+               '05/01/2026;BQ;R1;Virement reçu;512-OFFICE;1 000,50;\n'
+               '05/01/2026;BQ;R1;Virement reçu;706;;1000,50\n'
+               '06/01/2026;BQ;R2;Frais;631;15;\n'
+               '06/01/2026;BQ;R2;Frais;999;;15\n').encode('utf-8')
+    response = client.post('/comptabilite/imports/journal', data={
+        'fichier': (BytesIO(contenu), 'releve.csv'), 'valider': 'y',
+    }, content_type='multipart/form-data', follow_redirects=True)
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Compte inconnu ou inactif : 999' in page
+
+    with app.app_context():
+        ecriture = ComptaEcriture.query.one()
+        assert ecriture.numero_piece == 'R1' and ecriture.valide
+        banque = ComptaCompte.query.filter_by(numero_compte='512-OFFICE').first()
+        assert float(banque.get_solde()) == 1000.5
+
+
+def test_rapprochement_bancaire(client, auth, app):
+    """Upload of a bank statement then automatic reconciliation of 512-CLIENT."""
+    from io import BytesIO
+    from datetime import date
+    from app.comptabilite.service import ComptabiliteService
+    from app.models import LigneReleve
+
+    auth.login()
+    with app.app_context():
+        ComptabiliteService.initialize_default_accounts()
+        ComptabiliteService.create_recu(date(2026, 1, 5), 75000, 'VIREMENT', 'Provision')
+
+    assert client.get('/comptabilite/rapprochement?compte=512-CLIENT').status_code == 200
+    response = client.post('/comptabilite/rapprochement', data={
+        'compte': '512-CLIENT', 'fichier': (BytesIO(b'date;libelle;montant\n2026-01-06;VIR DUPONT;75000\n'), 'releve.csv'),
+    }, content_type='multipart/form-data', follow_redirects=True)
+    assert '1 ligne(s) importée(s)' in response.get_data(as_text=True)
+
+    response = client.post('/comptabilite/rapprochement/lancer', data={'compte': '512-CLIENT'},
+                           follow_redirects=True)
+    assert '1 ligne(s) sur 1 rapprochée(s)' in response.get_data(as_text=True)
+    assert 'Aucune ligne en attente.' in response.get_data(as_text=True)
+    with app.app_context():
+        assert LigneReleve.query.one().rapprochement_id is not None
+    assert client.post('/comptabilite/rapprochement/lancer', data={'compte': '706'}).status_code == 400
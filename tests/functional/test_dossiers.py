@@ -93,3 +93,50 @@ def test_edit_dossier(client, auth, app):
     assert b'Dossier mis \xc3\xa0 jour' in response.data
     assert b'DOS-EDIT-01-MOD' in response.data
     assert b'SUCCESSION' in response.data
+
+def test_dossier_search_api(client, auth, app):
+    auth.login()
+    with app.app_context():
+        user = db.session.execute(db.select(User).filter_by(username='admin')).scalar_one()
+        db.session.add_all([
+            Dossier(numero_dossier='VTE-2024-001', intitule='Vente Diallo', responsable_id=user.id),
+            Dossier(numero_dossier='SUC-2024-002', intitule='Succession Ndiaye (vente)', responsable_id=user.id),
+            Dossier(numero_dossier='SOC-2024-003', intitule='Constitution SARL', responsable_id=user.id, statut='CLOS'),
+            Dossier(numero_dossier='SOC-100%', intitule='Pourcentage', responsable_id=user.id),
+        ])
+        db.session.commit()
+
+    data = client.get('/dossiers/api/search?q=vente').get_json()
+    # Début d'intitulé avant correspondance partielle
+    assert [r['numero_dossier'] for r in data['results']] == ['VTE-2024-001', 'SUC-2024-002']
+    assert data['results'][0]['label'] == 'VTE-2024-001 - Vente Diallo'
+
+    data = client.get('/dossiers/api/search?q=SOC&statut=OUVERT').get_json()
+    assert [r['numero_dossier'] for r in data['results']] == ['SOC-100%']
+
+    # Les jokers LIKE saisis sont pris littéralement
+    data = client.get('/dossiers/api/search?q=%25').get_json()
+    assert [r['numero_dossier'] for r in data['results']] == ['SOC-100%']
+
+    page1 = client.get('/dossiers/api/search?q=2024&per_page=2').get_json()
+    page2 = client.get('/dossiers/api/search?q=2024&per_page=2&page=2').get_json()
+    assert page1['has_more'] and not page2['has_more']
+    assert len(page1['results']) == 2 and len(page2['results']) == 1
+
+
+def test_bareme_page_renders_only_selected_dossier(client, auth, app):
+    auth.login()
+    with app.app_context():
+        user = db.session.execute(db.select(User).filter_by(username='admin')).scalar_one()
+        choisi = Dossier(numero_dossier='PICK-001', intitule='Choisi', responsable_id=user.id)
+        autre = Dossier(numero_dossier='PICK-002', intitule='Autre', responsable_id=user.id)
+        db.session.add_all([choisi, autre])
+        db.session.commit()
+        choisi_id = choisi.id
+
+    # Le sélecteur de sauvegarde apparaît avec le résultat du calcul
+    response = client.post(f'/actes/bareme/vente?dossier_id={choisi_id}', data={'prix': '15000000'})
+    assert response.status_code == 200
+    assert b'data-dossier-picker' in response.data
+    assert b'PICK-001' in response.data
+    assert b'PICK-002' not in response.data
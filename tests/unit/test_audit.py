@@ -0,0 +1,167 @@
+from sqlalchemy import event
+
+from app import audit_chain, db
+from app.audit import register_audit_events
+from app.models import SecurityLog, TypeFormalite, User
+
+
+def _journal():
+    return db.session.execute(db.select(SecurityLog).order_by(SecurityLog.id)).scalars().all()
+
+
+def test_creation_modification_suppression(app):
+    # Un nouvel appel (une autre application) n'ajoute pas d'écouteur
+    register_audit_events(db)
+
+    with app.test_request_context():
+        type_formalite = TypeFormalite(nom='Enregistrement')
+        db.session.add(type_formalite)
+        db.session.commit()
+        assert type_formalite.nom == 'Enregistrement'
+        type_formalite.nom = 'Enregistrement fiscal'
+        type_formalite.description = type_formalite.description
+        db.session.commit()
+        db.session.delete(type_formalite)
+        db.session.commit()
+
+    journal = _journal()
+    assert [(log.event_type, log.target_resource, log.target_id, log.username) for log in journal] == [
+        ('CREATE', 'type_formalites', str(type_formalite.id), 'SYSTEM'),
+        ('UPDATE', 'type_formalites', str(type_formalite.id), 'SYSTEM'),
+        ('DELETE', 'type_formalites', str(type_formalite.id), 'SYSTEM'),
+    ]
+    assert journal[1].changes == {'nom': ['Enregistrement', 'Enregistrement fiscal']}
+
+
+def test_un_insert_par_flush_sans_mot_de_passe(app):
+    requetes = []
+
+    def compter(conn, cursor, statement, parameters, context, executemany):
+        if 'security_logs' in statement:
+            requetes.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', compter)
+    try:
+        with app.test_request_context():
+            for n in range(3):
+                user = User(username=f'clerc{n}', email=f'clerc{n}@example.com', role='CLERC')
+                user.set_password('secret')
+                db.session.add(user)
+            db.session.add(TypeFormalite(nom='Publicité foncière'))
+            db.session.commit()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', compter)
+
+    assert len(requetes) == 1
+    journal = _journal()
+    assert len(journal) == 4
+    assert all('password_hash' not in log.changes for log in journal)
+
+
+def test_hors_requete_pas_d_audit(app):
+    db.session.add(TypeFormalite(nom='Cadastre'))
+    db.session.commit()
+    assert _journal() == []
+
+
+def test_ecriture_au_commit_et_rollback_de_savepoint(app):
+    from app.models import AuditChain
+
+    with app.test_request_context():
+        db.session.add(TypeFormalite(nom='Enregistrement'))
+        db.session.flush()
+        # Rien n'est écrit ni verrouillé avant le commit
+        assert db.session.execute(db.select(SecurityLog)).first() is None
+        assert db.session.execute(db.select(AuditChain)).first() is None
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(TypeFormalite(nom='Cadastre'))
+                db.session.flush()
+                raise ValueError
+        except ValueError:
+            pass
+        with db.session.begin_nested():
+            db.session.add(TypeFormalite(nom='Publicité foncière'))
+        db.session.commit()
+
+    journal = _journal()
+    assert [log.changes['nom'][1] for log in journal] == ['Enregistrement', 'Publicité foncière']
+    assert audit_chain.verify(db.session, audit_chain.LOGS, full=True)['ok']
+
+
+def _writer(app, tmp_path, **kwargs):
+    from app.audit_writer import AuditWriter
+
+    writer = AuditWriter(db.engine, str(tmp_path), **kwargs)
+    app.extensions['audit_writer'] = writer
+    return writer
+
+
+def test_mode_asynchrone_spool_puis_lot(app, tmp_path):
+    writer = _writer(app, tmp_path)
+    app.config['AUDIT_SYNC_TABLES'] = ('users',)
+    try:
+        with app.test_request_context():
+            db.session.add(TypeFormalite(nom='Enregistrement'))
+            user = User(username='clerc', email='clerc@example.com', role='CLERC')
+            user.set_password('secret')
+            db.session.add(user)
+            db.session.commit()
+
+            db.session.add(TypeFormalite(nom='Annulée'))
+            db.session.flush()
+            db.session.rollback()
+    finally:
+        del app.extensions['audit_writer']
+
+    # Audit synchrone dans la transaction ; le reste est seulement dans le spool
+    assert [log.target_resource for log in _journal()] == ['users']
+    spool = list(tmp_path.glob('audit-*.jsonl'))
+    assert len(spool) == 1 and 'Enregistrement' in spool[0].read_text(encoding='utf-8')
+
+    assert writer.flush() == 1
+    assert [log.target_resource for log in _journal()] == ['users', 'type_formalites']
+    # Lignes écrites en lot chaînées après celles écrites dans la transaction
+    assert audit_chain.verify(db.session, audit_chain.LOGS)['checked'] == 2
+    assert list(tmp_path.glob('audit-*.jsonl')) == []
+
+
+def test_rejeu_du_spool(app, tmp_path):
+    # Segment laissé par un processus arrêté, dernière ligne coupée par le crash
+    (tmp_path / 'audit-1-1-1.jsonl').write_text(
+        '{"timestamp": "2026-10-18T10:00:00", "event_type": "UPDATE", "username": "admin", "ip_address": null, '
+        '"user_agent": null, "target_resource": "clients", "target_id": "7", "details": "Modification", '
+        '"changes": {"nom": ["A", "B"]}}\n{"timestamp": "2026-10-18T10:0', encoding='utf-8')
+
+    assert _writer(app, tmp_path).replay() == 1
+    del app.extensions['audit_writer']
+    log, = _journal()
+    assert (log.target_id, log.changes) == ('7', {'nom': ['A', 'B']})
+    assert list(tmp_path.glob('audit-*.jsonl')) == []
+
+
+def test_rejeu_concurrent_sans_doublon(app, tmp_path, monkeypatch):
+    import os
+    from pathlib import Path
+    from app.audit_writer import _lock
+
+    chemin = tmp_path / 'audit-1-1-1.jsonl'
+    chemin.write_text(
+        '{"timestamp": "2026-10-18T10:00:00", "event_type": "DELETE", "username": "admin", "ip_address": null, '
+        '"user_agent": null, "target_resource": "clients", "target_id": "8", "details": "Suppression", '
+        '"changes": null}\n', encoding='utf-8')
+    writer = _writer(app, tmp_path)
+    del app.extensions['audit_writer']
+
+    # Un autre worker ouvre le segment avant qu'il ne soit supprimé par le premier rejeu
+    concurrent = open(chemin, 'r+', encoding='utf-8')
+    assert writer.replay() == 1
+    # Il obtient le verrou une fois le fichier supprimé : il ne le relit pas
+    assert _lock(concurrent) and os.fstat(concurrent.fileno()).st_nlink == 0
+    concurrent.close()
+
+    # Liste de fichiers lue avant la suppression : le segment n'est pas rejoué une seconde fois
+    monkeypatch.setattr(Path, 'glob', lambda self, motif: iter([chemin]))
+    assert writer.replay() == 0
+    assert len(_journal()) == 1
@@ -0,0 +1,109 @@
+from datetime import date, datetime
+
+from flask import current_app
+
+from app import audit_chain, db, security_logs
+from app.models import Acte, AuditChain, SecurityLog, TypeFormalite
+
+
+def _verifier(**kwargs):
+    return audit_chain.verify(db.session, audit_chain.LOGS, **kwargs)
+
+
+def _journaliser(*noms):
+    with current_app.test_request_context():
+        for nom in noms:
+            db.session.add(TypeFormalite(nom=nom))
+            db.session.commit()
+
+
+def test_chaine_des_logs_incrementale(app):
+    _journaliser('Enregistrement', 'Publicité')
+    # Log ajouté par l'ORM (connexions) : chaîné lui aussi
+    db.session.add(SecurityLog(event_type='LOGIN_SUCCESS', username='admin'))
+    db.session.commit()
+
+    resultat = _verifier()
+    assert resultat['ok'] and resultat['checked'] == 3
+    # Seules les lignes nouvelles sont relues
+    assert _verifier()['checked'] == 0
+    _journaliser('Hypothèque')
+    assert _verifier()['checked'] == 1
+
+    # Modification silencieuse d'un log déjà vérifié : détectée par la vérification complète
+    premier = db.session.scalars(db.select(SecurityLog).order_by(SecurityLog.id)).first()
+    db.session.execute(db.update(SecurityLog).where(SecurityLog.id == premier.id).values(username='pirate'))
+    db.session.commit()
+    assert _verifier()['ok']
+    resultat = _verifier(full=True)
+    assert not resultat['ok'] and str(premier.id) in resultat['error']
+
+
+def test_alterations_des_nouvelles_lignes(app):
+    _journaliser('Enregistrement')
+    assert _verifier()['ok']
+    point = db.session.get(AuditChain, audit_chain.LOGS).checkpoint_position
+
+    _journaliser('Publicité', 'Hypothèque')
+    dernier = db.session.scalars(db.select(SecurityLog).order_by(SecurityLog.id.desc())).first()
+    db.session.execute(db.delete(SecurityLog).where(SecurityLog.id == dernier.id))
+    db.session.commit()
+    resultat = _verifier()
+    assert not resultat['ok'] and 'deleted' in resultat['error']
+    # Le point vérifié n'avance pas tant que la chaîne est rompue
+    db.session.expire_all()
+    assert db.session.get(AuditChain, audit_chain.LOGS).checkpoint_position == point
+
+    db.session.add(SecurityLog(event_type='UPDATE', username='admin', chain_hash='0' * 64))
+    db.session.commit()
+    assert not _verifier()['ok']
+
+
+def test_archivage_deplace_l_origine(app, tmp_path):
+    db.session.add_all([SecurityLog(timestamp=datetime(2025, 1, d), event_type='LOGIN_SUCCESS', username='admin')
+                        for d in (5, 6)])
+    db.session.add(SecurityLog(timestamp=datetime(2025, 3, 1), event_type='LOGIN_SUCCESS', username='admin'))
+    db.session.commit()
+
+    security_logs.archive_logs(str(tmp_path), date(2025, 2, 1))
+    assert _verifier(full=True)['ok']
+    archive, = security_logs.search_archives(str(tmp_path))[:1]
+    assert archive.chain_hash == db.session.get(AuditChain, audit_chain.LOGS).origin_hash
+
+
+def test_archivage_ligne_tardive_gardee(app, tmp_path):
+    # Ligne de janvier chaînée (id 4) après une ligne de février (id 3) : écriture différée
+    for jour in (datetime(2025, 1, 5), datetime(2025, 1, 6), datetime(2025, 2, 1), datetime(2025, 1, 31),
+                 datetime(2025, 3, 1)):
+        db.session.add(SecurityLog(timestamp=jour, event_type='LOGIN_SUCCESS', username='admin'))
+        db.session.commit()
+
+    security_logs.archive_logs(str(tmp_path), date(2025, 2, 1))
+    assert db.session.get(AuditChain, audit_chain.LOGS).origin_position == 2
+    assert [log.id for log in db.session.scalars(db.select(SecurityLog).order_by(SecurityLog.id))] == [3, 4, 5]
+    assert _verifier(full=True)['ok']
+
+    security_logs.archive_logs(str(tmp_path), date(2025, 3, 1))
+    assert db.session.get(AuditChain, audit_chain.LOGS).origin_position == 4
+    assert [log.id for log in db.session.scalars(db.select(SecurityLog))] == [5]
+    assert _verifier(full=True)['ok']
+    assert len(security_logs.search_archives(str(tmp_path))) == 4
+
+
+def test_chaine_du_repertoire(app):
+    actes = [Acte(type_acte='Vente', statut='ARCHIVE', contenu_html=f'<p>Acte {n}</p>', numero_repertoire=n,
+                  date_archivage=datetime(2026, 1, 2, 10, n)) for n in (1, 2)]
+    db.session.add_all(actes)
+    db.session.flush()
+    audit_chain.seal_actes(db.session.connection(), actes)
+    db.session.commit()
+    assert [a.rang_chaine for a in actes] == [1, 2]
+
+    resultat = audit_chain.verify(db.session, audit_chain.REPERTOIRE)
+    assert resultat['ok'] and resultat['checked'] == 2
+
+    db.session.execute(db.update(Acte).where(Acte.id == actes[1].id).values(contenu_html='<p>Autre</p>'))
+    db.session.commit()
+    assert not audit_chain.verify(db.session, audit_chain.REPERTOIRE, full=True)['ok']
+    # Entrée du point vérifié modifiée : vue aussi par la vérification incrémentale
+    assert not audit_chain.verify(db.session, audit_chain.REPERTOIRE)['ok']
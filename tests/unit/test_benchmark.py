@@ -0,0 +1,70 @@
+import json
+
+from app.actes.calculators.benchmark import mesurer, comparer
+
+
+def test_mesurer_percentiles():
+    stats = mesurer(lambda x: sum(range(x)), list(range(100)), echauffement=5)
+    assert stats['appels'] == 100
+    assert stats['erreurs'] == 0
+    assert stats['p50_us'] <= stats['p95_us'] <= stats['p99_us'] <= stats['max_us']
+    assert stats['appels_par_seconde'] > 0
+
+    stats = mesurer(lambda x: 1 / x, [0, 1, 2, 0])
+    assert stats['erreurs'] == 2
+
+
+def test_bench_baremes_command(runner, tmp_path, bareme_vente):
+    sortie = tmp_path / 'bench.json'
+    result = runner.invoke(args=['bench-baremes', '-n', '20', '--sqlite', str(tmp_path / 'bench.db'),
+                                 '--json', str(sortie)])
+    assert result.exit_code == 0, result.output
+
+    resultats = json.loads(sortie.read_text(encoding='utf-8'))
+    assert resultats['meta']['iterations'] == 20
+    # Tous les calculateurs codés et le barème dynamique recopié dans la base locale
+    assert {'vente', 'sarl', 'succession', 'tpv'} <= set(resultats['calculateurs'])
+    assert resultats['baremes']['VENTE']['appels'] == 20
+    assert all(st['erreurs'] == 0 for st in resultats['calculateurs'].values())
+
+    ecarts = comparer(resultats, resultats)
+    assert all(e['p50_pct'] == 0 for e in ecarts if e['p50_pct'] is not None)
+
+
+def test_bench_comptabilite_command(runner, tmp_path):
+    sortie = tmp_path / 'bench_compta.json'
+    result = runner.invoke(args=['bench-comptabilite', '-n', '2000', '--repetitions', '1',
+                                 '--sqlite', str(tmp_path / 'compta.db'), '--json', str(sortie)])
+    assert result.exit_code == 0, result.output
+
+    resultats = json.loads(sortie.read_text(encoding='utf-8'))
+    assert resultats['meta']['mouvements'] == 2000
+    assert set(resultats['mesures']) == {'balance_generale', 'balance_par_compte', 'totaux_dashboard', 'grand_livre_compte'}
+
+
+def test_bench_comptabilite_refuse_un_fichier_existant(runner, tmp_path):
+    base = tmp_path / 'app.db'
+    base.write_bytes(b'donnees')
+    result = runner.invoke(args=['bench-comptabilite', '-n', '100', '--repetitions', '1', '--sqlite', str(base)])
+    assert result.exit_code != 0
+    assert '--ecraser' in result.output
+    assert base.read_bytes() == b'donnees'
+
+    result = runner.invoke(args=['bench-comptabilite', '-n', '100', '--repetitions', '1', '--sqlite', str(base),
+                                 '--ecraser'])
+    assert result.exit_code == 0, result.output
+
+
+def test_run_benchmark_hors_cache(app, bareme_vente):
+    from app.actes.calculators.benchmark import run_benchmark
+    from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+
+    inputs = {'PRIX_VENTE': 30000000, 'TAUX_ENREG': 10, 'MORCELLEMENT': True}
+    assert DynamicCalculatorEngine.calculate_uncached('VENTE', inputs) == DynamicCalculatorEngine.calculate('VENTE', inputs)
+
+    avant = DynamicCalculatorEngine.cache_stats()
+    resultats = run_benchmark(iterations=20, filtre='VENTE')
+    apres = DynamicCalculatorEngine.cache_stats()
+    assert resultats['baremes']['VENTE']['appels'] == 20
+    # Ni les appels mesurés ni l'échauffement ni la passe mémoire ne touchent le cache
+    assert (apres['hits'], apres['misses'], apres['entrees']) == (avant['hits'], avant['misses'], avant['entrees'])
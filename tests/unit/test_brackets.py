@@ -0,0 +1,55 @@
+from decimal import Decimal
+import pytest
+from app.actes.calculators.brackets import BracketTable
+from app.actes.calculators.shared import SharedCalculator
+from app.actes.calculators.societe import SocieteCalculator
+from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+
+
+def reference_brackets(amount, brackets, min_first_tranche=Decimal('0')):
+    """Boucle tranche par tranche historique, utilisée comme référence."""
+    remaining = amount
+    total = Decimal('0')
+    details = []
+    for i, (limit, rate, label) in enumerate(brackets):
+        if remaining <= 0:
+            break
+        tranche_base = remaining if limit is None else min(remaining, limit)
+        amt = tranche_base * rate
+        if i == 0 and amt < min_first_tranche:
+            amt = min_first_tranche
+        total += amt
+        details.append({'tranche': label, 'taux': f"{float(rate) * 100}%", 'base': float(tranche_base), 'montant': float(amt)})
+        remaining = remaining - tranche_base if limit is not None else Decimal('0')
+    return total, details
+
+
+MONTANTS = [Decimal(v) for v in ('0', '-5', '1', '999999', '20000000', '20000001', '79999999.5',
+                                 '80000000', '300000000', '1500000000', '9000000000')]
+
+
+@pytest.mark.parametrize('amount', MONTANTS)
+def test_societe_brackets_match_reference(amount):
+    brackets = SocieteCalculator.OHADA_BRACKETS
+    attendu = reference_brackets(amount, brackets, Decimal('100000'))
+    assert SharedCalculator.calculate_brackets(amount, brackets, min_first_tranche=Decimal('100000')) == attendu
+
+
+@pytest.mark.parametrize('amount', MONTANTS)
+def test_bounded_last_tranche(amount):
+    brackets = [(Decimal('1000000'), Decimal('0.05'), 'A'), (Decimal('2000000'), Decimal('0.02'), 'B')]
+    assert BracketTable.depuis_largeurs(brackets).calculate(amount) == reference_brackets(amount, brackets)
+
+
+def test_table_is_cached():
+    brackets = [(Decimal('1000000'), Decimal('0.05'), 'A'), (None, Decimal('0.02'), 'B')]
+    assert BracketTable.depuis_largeurs(brackets) is BracketTable.depuis_largeurs(list(brackets))
+
+
+@pytest.mark.parametrize('amount', MONTANTS)
+def test_dynamic_tranches(amount):
+    tranches = [{"max": 10000000, "taux": 1.5}, {"max": None, "taux": 0.75}, {"max": 3000000, "taux": 2.25}]
+    attendu = reference_brackets(amount, [
+        (Decimal('3000000'), Decimal('0.0225'), ''), (Decimal('7000000'), Decimal('0.015'), ''), (None, Decimal('0.0075'), '')
+    ])[0]
+    assert DynamicCalculatorEngine._calculate_tranches(amount, tranches) == attendu
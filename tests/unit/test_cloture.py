@@ -0,0 +1,112 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.comptabilite.service import ComptabiliteService
+from app.models import ComptaCompte, ComptaEcriture, ComptaExercice
+
+
+def _comptes(*numeros):
+    return [db.session.execute(db.select(ComptaCompte).filter_by(numero_compte=n)).scalar_one() for n in numeros]
+
+
+def _ecriture(jour, debit, credit, montant, valider=True):
+    ecriture = ComptabiliteService.create_ecriture(jour, 'Opération', 'OD', [
+        {'compte_id': debit.id, 'debit': montant, 'credit': 0},
+        {'compte_id': credit.id, 'debit': 0, 'credit': montant},
+    ])
+    if valider:
+        ComptabiliteService.valider_ecriture(ecriture.id)
+    return ecriture
+
+
+@pytest.fixture
+def exercice_2025(app):
+    ComptabiliteService.initialize_default_accounts()
+    banque, honoraires, loyer = _comptes('512-OFFICE', '706', '613')
+    _ecriture(date(2025, 3, 1), banque, honoraires, 1000)
+    _ecriture(date(2025, 9, 1), loyer, banque, 300)
+    _ecriture(date(2026, 1, 15), banque, honoraires, 50)
+    return banque, honoraires, loyer
+
+
+def test_cloture_a_nouveaux_et_soldes(exercice_2025):
+    banque, honoraires, loyer = exercice_2025
+    resultat_compte, = _comptes('131')
+
+    exercice = ComptabiliteService.cloturer_exercice(2025)
+
+    assert exercice.resultat == Decimal('700')
+    an = exercice.ecriture_an
+    assert (an.journal_code, an.date_ecriture, an.valide) == ('AN', date(2026, 1, 1), True)
+    assert {(m.compte_id, m.debit, m.credit) for m in an.mouvements} == {
+        (banque.id, Decimal('700'), Decimal('0')), (resultat_compte.id, Decimal('0'), Decimal('700'))}
+
+    # Balance-sheet accounts keep their balance, income and expense accounts restart at 0
+    soldes = {c.numero_compte: s for c, s in ComptabiliteService.get_soldes_comptes(date(2026, 1, 31))}
+    assert soldes['512-OFFICE'] == Decimal('750')
+    assert soldes['706'] == Decimal('-50')
+    assert soldes['613'] == 0
+    assert soldes['131'] == Decimal('-700')
+    assert {c.numero_compte: s for c, s in ComptabiliteService.get_soldes_comptes(date(2025, 12, 31))}['706'] == Decimal('-1000')
+    assert banque.get_solde() == Decimal('750')
+    assert ComptabiliteService.get_balance(banque.id, date_fin=date(2026, 1, 31)) == Decimal('750')
+    assert ComptabiliteService.verifier_soldes() == []
+
+
+def test_grand_livre_part_des_a_nouveaux(exercice_2025):
+    banque, _, _ = exercice_2025
+    ComptabiliteService.cloturer_exercice(2025)
+
+    grand_livre = ComptabiliteService.get_grand_livre(compte_id=banque.id, date_fin=date(2026, 12, 31))
+    assert len(grand_livre) == 1
+    assert grand_livre[0]['solde_initial'] == Decimal('700')
+    assert [e['montant'] for e in grand_livre[0]['ecritures']] == [Decimal('50')]
+    assert grand_livre[0]['solde_final'] == Decimal('750')
+
+
+def test_exercice_clos_fige(exercice_2025):
+    banque, honoraires, _ = exercice_2025
+    brouillon = _ecriture(date(2025, 12, 20), banque, honoraires, 10, valider=False)
+    with pytest.raises(ValueError):
+        ComptabiliteService.cloturer_exercice(2025)
+
+    db.session.delete(brouillon)
+    db.session.commit()
+    ComptabiliteService.cloturer_exercice(2025)
+    with pytest.raises(ValueError):
+        _ecriture(date(2025, 12, 31), banque, honoraires, 10)
+    with pytest.raises(ValueError):
+        ComptabiliteService.cloturer_exercice(2025)
+    assert db.session.execute(db.select(db.func.count(ComptaExercice.id))).scalar() == 1
+    assert db.session.execute(
+        db.select(db.func.count(ComptaEcriture.id)).filter_by(journal_code='AN')
+    ).scalar() == 1
+
+
+def test_cloture_vue_sans_delai(exercice_2025):
+    banque, honoraires, _ = exercice_2025
+    ComptabiliteService.verifier_periode_ouverte(date(2025, 6, 1))
+    # Clôture enregistrée par un autre worker : refusée dès l'écriture suivante
+    db.session.add(ComptaExercice(annee=2025, date_debut=date(2025, 1, 1), date_fin=date(2025, 12, 31), resultat=0))
+    db.session.commit()
+    with pytest.raises(ValueError):
+        _ecriture(date(2025, 6, 1), banque, honoraires, 10)
+
+
+def test_exercices_clotures_dans_l_ordre(app, client, auth):
+    ComptabiliteService.initialize_default_accounts()
+    banque, honoraires = _comptes('512-OFFICE', '706')
+    _ecriture(date(2023, 5, 1), banque, honoraires, 10)
+    _ecriture(date(2024, 5, 1), banque, honoraires, 1000)
+    ComptabiliteService.cloturer_exercice(2023)
+
+    with pytest.raises(ValueError, match='2024 must be closed first'):
+        ComptabiliteService.cloturer_exercice(2025)
+    assert db.session.execute(db.select(db.func.count(ComptaExercice.id))).scalar() == 1
+
+    auth.login()
+    page = client.get('/comptabilite/exercices').get_data(as_text=True)
+    assert 'value="2024"' in page and 'value="2025"' not in page
@@ -0,0 +1,295 @@
+import pytest
+from app import db
+from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+
+
+def test_calculate_vente(bareme_vente):
+    res = DynamicCalculatorEngine.calculate('VENTE', {'prix_vente': 15000000, 'taux_enreg': 5, 'morcellement': True})
+    montants = {l['code']: l['montant'] for l in res['lignes']}
+
+    assert 'HONORAIRES_REDUIT' not in montants
+    assert montants['HONORAIRES_NORMAL'] == 675000.0
+    details = next(l['details'] for l in res['lignes'] if l['code'] == 'HONORAIRES_NORMAL')
+    assert details == [{'tranche': '0 à 20 000 000', 'taux': '4.5%', 'base': 15000000.0, 'montant': 675000.0}]
+    assert montants['ENREGISTREMENT'] == 750000.0
+    assert montants['CONSERVATION'] == 155000.0
+    assert montants['INVALIDE'] == 0.0
+    assert montants['TVA'] == 121500.0
+    # 675k + 750k + 155k + 50k + 121.5k = 1,751,500 -> 1,752,000
+    assert res['total_general'] == 1752000.0
+
+
+def test_plan_is_cached_and_invalidated(bareme_vente):
+    plan = DynamicCalculatorEngine.get_plan('VENTE')
+    assert DynamicCalculatorEngine.get_plan('VENTE') is plan
+    assert [l.code for l in plan.lignes][:2] == ['HONORAIRES_REDUIT', 'HONORAIRES_NORMAL']
+    # Tranches triées à la compilation : 20M à 4.5%, 40M à 3%, 160M à 1.5%, reste à 0.75%
+    assert [float(b) for b in plan.lignes[1].table_tranches.bornes] == [0, 20000000, 60000000, 220000000]
+
+    DynamicCalculatorEngine.invalidate_plan('VENTE')
+    assert DynamicCalculatorEngine.get_plan('VENTE') is not plan
+
+
+def test_plan_recompiled_when_updated_at_changes(bareme_vente, monkeypatch):
+    from datetime import datetime, timedelta
+    plan = DynamicCalculatorEngine.get_plan('VENTE')
+    bareme_vente.updated_at = datetime.utcnow() + timedelta(seconds=1)
+    db.session.commit()
+
+    # Dans le délai PLAN_TTL, le plan en cache est servi sans relire la base
+    assert DynamicCalculatorEngine.get_plan('VENTE') is plan
+    monkeypatch.setattr(DynamicCalculatorEngine, 'PLAN_TTL', 0)
+    assert DynamicCalculatorEngine.get_plan('VENTE') is not plan
+
+
+def test_unknown_bareme(app):
+    with pytest.raises(ValueError):
+        DynamicCalculatorEngine.calculate('INCONNU', {})
+
+
+def test_calculate_many_matches_calculate(bareme_vente):
+    inputs_list = [
+        {'prix_vente': prix, 'taux_enreg': taux, 'morcellement': morc}
+        for prix in range(0, 300000001, 7500000)
+        for taux in (1, 5, 10)
+        for morc in (True, 'off')
+    ]
+    batch = DynamicCalculatorEngine.calculate_many('VENTE', inputs_list)
+    assert batch['count'] == len(inputs_list)
+
+    colonnes = {l['code']: l['montants'] for l in batch['lignes']}
+    for i, inputs in enumerate(inputs_list):
+        unitaire = DynamicCalculatorEngine.calculate('VENTE', inputs)
+        assert batch['total_general'][i] == unitaire['total_general']
+        for l in unitaire['lignes']:
+            assert colonnes[l['code']][i] == pytest.approx(l['montant'])
+        if inputs['morcellement'] == 'off':
+            assert colonnes['CONSERVATION'][i] is None
+
+
+def test_calc_batch_route_grille(client, auth, bareme_vente):
+    auth.login()
+    response = client.post('/actes/bareme-dynamique/VENTE/calc-batch', json={
+        'base': {'taux_enreg': 10, 'morcellement': True},
+        'grille': {'variable': 'prix_vente', 'debut': 1000000, 'fin': 500000000, 'pas': 1000000}
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 500
+    assert data['grille']['valeurs'][-1] == 500000000
+    assert data['total_general'][14] == DynamicCalculatorEngine.calculate(
+        'VENTE', {'prix_vente': 15000000, 'taux_enreg': 10, 'morcellement': True})['total_general']
+
+    response = client.post('/actes/bareme-dynamique/VENTE/calc-batch', json={'inputs': 'invalide'})
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def bareme_conditionnel(app):
+    """Lignes qui lisent le résultat d'une ligne conditionnelle, divisions par une saisie."""
+    from app.models import BaremeModele, BaremeVariable, BaremeLigneCalcul
+    DynamicCalculatorEngine.invalidate_plan()
+    bareme = BaremeModele(code='PARTAGE', nom='Partage')
+    db.session.add(bareme)
+    db.session.flush()
+    db.session.add_all([
+        BaremeVariable(bareme_id=bareme.id, code='PRIX', label='Prix', type_champ='MONTANT', valeur_defaut='0'),
+        BaremeVariable(bareme_id=bareme.id, code='TAUX', label='Taux', type_champ='CHOIX', valeur_defaut='1'),
+        BaremeVariable(bareme_id=bareme.id, code='NB', label='Parts', type_champ='ENTIER', valeur_defaut='1'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=1, code='HON', libelle='Honoraires', type_ligne='FORMULE',
+                          condition_affichage='TAUX == 1', formule_ou_montant='PRIX * 0.02', soumis_tva=True),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=2, code='FRAIS', libelle='Frais', type_ligne='FORMULE',
+                          formule_ou_montant='hon + 20000'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=3, code='COMPL', libelle='Complément', type_ligne='FORFAIT',
+                          condition_affichage='hon > 100000 or TAUX == 5', formule_ou_montant='10000'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=4, code='RAPPEL', libelle='Rappel', type_ligne='FORFAIT',
+                          condition_affichage='TAUX != 1 or hon > 100000', formule_ou_montant='5000'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=5, code='PART', libelle='Part', type_ligne='FORMULE',
+                          condition_affichage='PRIX / NB >= 0', formule_ou_montant='PRIX / NB'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=6, code='RESTE', libelle='Reste', type_ligne='FORMULE',
+                          formule_ou_montant='PRIX % NB + (PRIX / NB if NB else 0)'),
+    ])
+    db.session.commit()
+    yield bareme
+    DynamicCalculatorEngine.invalidate_plan()
+
+
+def test_calculate_many_matches_calculate_with_conditional_references(bareme_conditionnel):
+    inputs_list = [
+        {'prix': prix, 'taux': taux, 'nb': nb}
+        for prix in (0, 1000000, 5000000, 12345678)
+        for taux in (1, 2, 5)
+        for nb in (0, 1, 3)
+    ]
+    batch = DynamicCalculatorEngine.calculate_many('PARTAGE', inputs_list)
+    colonnes = {l['code']: l['montants'] for l in batch['lignes']}
+
+    for i, inputs in enumerate(inputs_list):
+        unitaire = DynamicCalculatorEngine.calculate('PARTAGE', inputs)
+        assert batch['total_general'][i] == unitaire['total_general'], inputs
+        attendus = {l['code']: l['montant'] for l in unitaire['lignes']}
+        for code, montants in colonnes.items():
+            assert montants[i] == pytest.approx(attendus.get(code)), (code, inputs)
+
+    # HON non retenue : FRAIS lit un nom inconnu et vaut 0, comme en calcul unitaire
+    i = inputs_list.index({'prix': 5000000, 'taux': 2, 'nb': 1})
+    assert colonnes['FRAIS'][i] == 0.0
+    assert colonnes['COMPL'][i] is None
+    assert colonnes['RAPPEL'][i] == 5000.0
+
+
+def test_calculate_many_division_by_zero(client, auth, bareme_conditionnel):
+    inputs_list = [{'prix': 1000000, 'taux': 2, 'nb': nb} for nb in (0, 4)]
+    batch = DynamicCalculatorEngine.calculate_many('PARTAGE', inputs_list)
+    colonnes = {l['code']: l['montants'] for l in batch['lignes']}
+    assert colonnes['PART'] == [None, 250000.0]
+    assert colonnes['RESTE'] == [0.0, 250000.0]
+
+    auth.login()
+    response = client.post('/actes/bareme-dynamique/PARTAGE/calc-batch', json={
+        'base': {'prix': 1000000, 'taux': 1},
+        'grille': {'variable': 'nb', 'debut': 0, 'fin': 3, 'pas': 1}
+    })
+    assert response.status_code == 200
+    assert b'Infinity' not in response.data and b'NaN' not in response.data
+    assert response.get_json()['total_general'][0] == DynamicCalculatorEngine.calculate(
+        'PARTAGE', {'prix': 1000000, 'taux': 1, 'nb': 0})['total_general']
+
+
+def test_calculate_incremental_matches_calculate(bareme_vente, monkeypatch):
+    premier = DynamicCalculatorEngine.calculate_incremental(
+        'VENTE', {'prix_vente': 15000000, 'taux_enreg': 5, 'morcellement': True})
+    assert premier['complet'] is True
+    assert premier['total_general'] == 1752000.0
+
+    # Seule la conservation dépend de MORCELLEMENT : les autres lignes ne sont pas réévaluées
+    evaluees = []
+    original = DynamicCalculatorEngine._evaluer_ligne.__func__
+
+    def espion(cls, ligne, *args):
+        evaluees.append(ligne.code)
+        return original(cls, ligne, *args)
+    monkeypatch.setattr(DynamicCalculatorEngine, '_evaluer_ligne', classmethod(espion))
+
+    second = DynamicCalculatorEngine.calculate_incremental('VENTE', {'morcellement': False}, premier['etat'])
+    assert second['complet'] is False
+    assert evaluees == ['CONSERVATION']
+    assert second['lignes'] == []
+    assert second['supprimees'] == ['CONSERVATION']
+    assert second['total_general'] == DynamicCalculatorEngine.calculate(
+        'VENTE', {'prix_vente': 15000000, 'taux_enreg': 5, 'morcellement': False})['total_general']
+
+    # Changement de taux : bascule honoraires normal/réduit, TVA recalculée
+    evaluees.clear()
+    troisieme = DynamicCalculatorEngine.calculate_incremental('VENTE', {'taux_enreg': 1}, second['etat'])
+    assert 'CONSERVATION' not in evaluees and 'DIVERS' not in evaluees
+    assert {l['code'] for l in troisieme['lignes']} == {'HONORAIRES_REDUIT', 'ENREGISTREMENT', 'TVA'}
+    assert troisieme['supprimees'] == ['HONORAIRES_NORMAL']
+    complet = DynamicCalculatorEngine.calculate('VENTE', {'prix_vente': 15000000, 'taux_enreg': 1, 'morcellement': False})
+    assert troisieme['total_general'] == complet['total_general']
+
+
+def test_calculate_incremental_stale_state(bareme_vente):
+    premier = DynamicCalculatorEngine.calculate_incremental('VENTE', {'prix_vente': 15000000})
+    etat = dict(premier['etat'], version='2000-01-01T00:00:00')
+    res = DynamicCalculatorEngine.calculate_incremental('VENTE', {'taux_enreg': 5}, etat)
+    assert res['complet'] is True
+    assert res['etat']['variables']['PRIX_VENTE'] == 15000000.0
+
+
+def test_graphe_dependances():
+    from app.actes.calculators.dependencies import GrapheDependances
+    lignes = [
+        {'code': 'HONORAIRES', 'condition_affichage': None, 'formule_ou_montant': 'PRIX * 0.02'},
+        {'code': 'TVA', 'condition_affichage': 'honoraires > 0', 'formule_ou_montant': 'honoraires * TVA_RATE'},
+        {'code': 'DIVERS', 'condition_affichage': '', 'formule_ou_montant': '50000'},
+    ]
+    graphe = GrapheDependances.depuis_lignes(['PRIX'], lignes)
+    assert graphe.impactees(['PRIX']) == ['honoraires', 'tva']
+    assert graphe.erreurs() == []
+
+    lignes[0]['formule_ou_montant'] = 'tva + PRIX'
+    erreurs = GrapheDependances.depuis_lignes(['PRIX'], lignes).erreurs()
+    assert erreurs[0] == 'Cycle de dépendances : HONORAIRES → TVA → HONORAIRES'
+    assert "La ligne HONORAIRES utilise TVA, qui n'est calculée qu'après elle." in erreurs
+
+
+def test_admin_save_rejects_forward_reference(client, auth, bareme_vente):
+    auth.login()
+    response = client.post(f'/actes/admin/baremes/{bareme_vente.id}/save', json={
+        'variables': [{'code': 'PRIX_VENTE', 'label': 'Prix', 'type_champ': 'MONTANT', 'valeur_defaut': '0'}],
+        'lines': [
+            {'ordre': 1, 'code': 'tva', 'libelle': 'TVA', 'type_ligne': 'FORMULE', 'formule_ou_montant': 'honoraires * 0.18'},
+            {'ordre': 2, 'code': 'honoraires', 'libelle': 'Honoraires', 'type_ligne': 'FORMULE', 'formule_ou_montant': 'PRIX_VENTE * 0.02'},
+        ]
+    })
+    assert response.status_code == 400
+    assert 'HONORAIRES' in response.get_json()['message']
+    # Le barème n'a pas été modifié
+    assert len(DynamicCalculatorEngine.get_plan('VENTE').lignes) == 6
+
+
+def test_fixed_point_matches_float_mode(bareme_vente):
+    for prix in (0, 999999.99, 15000000, 20000000, 123456789.5, 300000000):
+        for taux in (1, 5, 10):
+            inputs = {'prix_vente': prix, 'taux_enreg': taux, 'morcellement': taux != 5}
+            flottant = DynamicCalculatorEngine.calculate('VENTE', inputs, fixed_point=False)
+            fixe = DynamicCalculatorEngine.calculate('VENTE', inputs, fixed_point=True)
+            assert fixe['total_general'] == flottant['total_general']
+            assert [(l['code'], l['montant']) for l in fixe['lignes']] == \
+                   [(l['code'], pytest.approx(l['montant'])) for l in flottant['lignes']]
+            assert fixe['inputs']['PRIX_VENTE'] == float(prix)
+
+
+def test_fixed_point_is_exact_at_rounding_boundary(app):
+    from app.models import BaremeModele, BaremeVariable, BaremeLigneCalcul
+    DynamicCalculatorEngine.invalidate_plan()
+    bareme = BaremeModele(code='FRAIS', nom='Frais')
+    db.session.add(bareme)
+    db.session.flush()
+    db.session.add_all([
+        BaremeVariable(bareme_id=bareme.id, code='BASE', label='Base', type_champ='MONTANT', valeur_defaut='0'),
+        BaremeLigneCalcul(bareme_id=bareme.id, ordre=1, code='FRAIS', libelle='Frais 7%', type_ligne='FORMULE',
+                          formule_ou_montant='BASE * 0.07'),
+    ])
+    db.session.commit()
+
+    # En flottant, 100000 * 0.07 = 7000.000000000001 : le total passe au millier supérieur
+    assert DynamicCalculatorEngine.calculate('FRAIS', {'base': 100000}, fixed_point=False)['total_general'] == 8000.0
+    assert DynamicCalculatorEngine.calculate('FRAIS', {'base': 100000}, fixed_point=True)['total_general'] == 7000.0
+
+    app.config['BAREME_FIXED_POINT'] = True
+    assert DynamicCalculatorEngine.calculate('FRAIS', {'base': 100000})['total_general'] == 7000.0
+    res = DynamicCalculatorEngine.calculate_incremental('FRAIS', {'base': 100000})
+    res = DynamicCalculatorEngine.calculate_incremental('FRAIS', {'base': 200000}, res['etat'])
+    assert res['complet'] is False
+    assert res['lignes'][0]['montant'] == 14000.0
+
+    # Le calcul par lots suit le même mode que calculate()
+    inputs_list = [{'base': 100000}, {'base': 200000}, {'base': 123457}]
+    batch = DynamicCalculatorEngine.calculate_many('FRAIS', inputs_list)
+    assert batch['total_general'][0] == 7000.0
+    assert batch['total_general'] == [DynamicCalculatorEngine.calculate('FRAIS', i)['total_general'] for i in inputs_list]
+    assert batch['lignes'][0]['montants'] == [
+        DynamicCalculatorEngine.calculate('FRAIS', i)['lignes'][0]['montant'] for i in inputs_list]
+    app.config['BAREME_FIXED_POINT'] = False
+    assert DynamicCalculatorEngine.calculate_many('FRAIS', inputs_list, fixed_point=True) == batch
+    DynamicCalculatorEngine.invalidate_plan()
+
+
+def test_fixed_point_operators():
+    from app.actes.calculators.fixed_point import FixedEval, convertir_constantes, vers_fixe, depuis_fixe
+    from decimal import Decimal
+    import simpleeval
+
+    def evaluer(expr, **names):
+        parsed = convertir_constantes(simpleeval.SimpleEval.parse(expr))
+        return FixedEval(names={k: v if isinstance(v, bool) else vers_fixe(v) for k, v in names.items()}).eval(
+            expr, previously_parsed=parsed)
+
+    assert depuis_fixe(evaluer('(P // 1000 * 1000) * 0.01 + 5000', P=15000999)) == Decimal('155000')
+    assert depuis_fixe(evaluer('P * (T / 100)', P=1234567, T=2.25)) == Decimal('27777.7575')
+    assert depuis_fixe(evaluer('1 / 3')) == Decimal('0.333333')
+    assert depuis_fixe(evaluer('2 ** 3')) == Decimal('8')
+    assert evaluer('T == 1', T=1) is True
+    assert depuis_fixe(evaluer('M * 22500', M=True)) == Decimal('22500')
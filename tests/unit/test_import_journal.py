@@ -0,0 +1,52 @@
+import io
+from datetime import date
+
+from app import db
+from app.comptabilite.imports import importer
+from app.comptabilite.service import ComptabiliteService
+from app.models import ComptaEcriture, ComptaMouvement
+
+ENTETE = 'date;journal;piece;libelle;compte;debit;credit\n'
+
+
+def test_ecriture_a_cheval_sur_deux_lots(app):
+    ComptabiliteService.initialize_default_accounts()
+    contenu = ENTETE + (
+        '2026-01-05;OD;P1;Répartition;512-OFFICE;300;\n'
+        '2026-01-05;OD;P1;Répartition;706;;100\n'
+        '2026-01-05;OD;P1;Répartition;708;;200\n'
+        '2026-01-06;OD;P2;Autre;531-OFFICE;50;\n'
+        '2026-01-06;OD;P2;Autre;706;;50\n'
+    )
+    rapport = importer(io.StringIO(contenu), valider=True, taille_lot=2)
+
+    assert rapport['erreurs'] == []
+    assert (rapport['lignes'], rapport['ecritures'], rapport['mouvements']) == (5, 2, 5)
+    p1 = db.session.execute(db.select(ComptaEcriture).filter_by(numero_piece='P1')).scalar_one()
+    assert p1.date_ecriture == date(2026, 1, 5) and len(p1.mouvements) == 3
+    assert ComptabiliteService.verifier_soldes() == []
+
+
+def test_erreurs_par_ligne(app):
+    ComptabiliteService.initialize_default_accounts()
+    contenu = ENTETE + (
+        '31/02/2026;BQ;P1;Date fausse;512-OFFICE;10;\n'
+        '31/02/2026;BQ;P1;Date fausse;706;;10\n'
+        '2026-01-07;BQ;P2;Déséquilibre;512-OFFICE;10;\n'
+        '2026-01-07;BQ;P2;Déséquilibre;706;;9\n'
+        '2026-01-08;BQ;P3;Seule;512-OFFICE;10;5\n'
+    )
+    rapport = importer(io.StringIO(contenu))
+
+    assert [e['ligne'] for e in rapport['erreurs']] == [2, 3, 4, 5, 6]
+    assert rapport['erreurs'][2]['message'] == 'Écriture déséquilibrée (débit 10.00, crédit 9.00)'
+    assert rapport['rejetees'] == 3
+    assert db.session.execute(db.select(db.func.count(ComptaMouvement.id))).scalar() == 0
+
+
+def test_verifier_seulement(app):
+    ComptabiliteService.initialize_default_accounts()
+    contenu = ENTETE + '2026-01-05;CA;P1;Vente;531-OFFICE;10;\n2026-01-05;CA;P1;Vente;706;;10\n'
+    rapport = importer(io.StringIO(contenu), verifier_seulement=True)
+    assert rapport['erreurs'] == [] and rapport['ecritures'] == 0
+    assert db.session.execute(db.select(db.func.count(ComptaEcriture.id))).scalar() == 0
@@ -0,0 +1,97 @@
+from datetime import date
+
+from app import db
+from app.models import Client, Formalite
+from app.pagination import keyset_paginate, keyset_paginate_list
+
+
+def _parcourir(requete, order_by, per_page):
+    """Pages dans l'ordre, puis en revenant en arrière depuis la dernière."""
+    pages, page = [], keyset_paginate(requete, order_by, per_page=per_page, total='exact')
+    pages.append(page)
+    while page.has_next:
+        page = keyset_paginate(requete, order_by, apres=page.next_cursor, per_page=per_page)
+        pages.append(page)
+    retour = [page]
+    while page.has_prev:
+        page = keyset_paginate(requete, order_by, avant=page.prev_cursor, per_page=per_page)
+        retour.append(page)
+    return pages, retour
+
+
+def test_pages_sur_colonne_non_unique(app):
+    noms = ['Diop', 'Ba', 'Diop', 'Fall', 'Ba', 'Ndiaye', 'Diop']
+    db.session.add_all([Client(type_client='PHYSIQUE', nom=nom) for nom in noms])
+    db.session.commit()
+    attendu = db.session.scalars(db.select(Client).order_by(Client.nom, Client.id)).all()
+
+    pages, retour = _parcourir(db.select(Client), (Client.nom, Client.id), per_page=3)
+    assert [c for p in pages for c in p.items] == attendu
+    assert [len(p) for p in pages] == [3, 3, 1]
+    assert pages[0].total == 7 and not pages[0].has_prev
+    assert [c for p in reversed(retour) for c in p.items] == attendu
+
+
+def test_pages_avec_nulls_en_fin(app):
+    dates = [date(2025, 3, 1), None, date(2025, 1, 1), date(2025, 3, 1), None, date(2025, 2, 1)]
+    db.session.add_all([Formalite(type_formalite='Enregistrement', date_depot=d) for d in dates])
+    db.session.commit()
+    ordre = (Formalite.date_depot.desc().nullslast(), Formalite.id.desc())
+
+    pages, retour = _parcourir(db.select(Formalite), ordre, per_page=2)
+    vus = [f for p in pages for f in p.items]
+    assert [f.date_depot for f in vus] == [date(2025, 3, 1), date(2025, 3, 1), date(2025, 2, 1), date(2025, 1, 1),
+                                          None, None]
+    assert [f.id for f in vus[:2]] == sorted((f.id for f in vus[:2]), reverse=True)
+    assert [f for p in reversed(retour) for f in p.items] == vus
+
+
+def test_jeton_invalide_et_liste_en_memoire(app):
+    db.session.add(Client(type_client='PHYSIQUE', nom='Sow'))
+    db.session.commit()
+    page = keyset_paginate(db.select(Client), (Client.nom, Client.id), apres='pas-un-jeton', per_page=5)
+    assert [c.nom for c in page.items] == ['Sow'] and not page.has_prev
+
+    lignes = list(range(10, 0, -1))
+    page = keyset_paginate_list(lignes, lambda n: (n,), per_page=4)
+    page = keyset_paginate_list(lignes, lambda n: (n,), apres=page.next_cursor, per_page=4)
+    assert page.items == [6, 5, 4, 3] and page.has_prev and page.has_next
+    page = keyset_paginate_list(lignes, lambda n: (n,), avant=page.prev_cursor, per_page=4)
+    assert page.items == [10, 9, 8, 7] and not page.has_prev
+
+
+def test_liste_lue_au_fil_de_l_eau():
+    lues = []
+
+    def lignes():
+        for n in range(100, 0, -1):
+            lues.append(n)
+            yield n
+
+    page = keyset_paginate_list(lignes(), lambda n: (n,), per_page=4)
+    assert page.items == [100, 99, 98, 97] and page.has_next and len(lues) == 5
+    lues.clear()
+    page = keyset_paginate_list(lignes(), lambda n: (n,), apres=page.next_cursor, per_page=4)
+    assert page.items == [96, 95, 94, 93] and page.has_prev and page.has_next
+    # Lecture arrêtée une ligne après la page
+    assert lues[-1] == 92
+    page = keyset_paginate_list(lignes(), lambda n: (n,), apres=page.next_cursor, per_page=4)
+    page = keyset_paginate_list(lignes(), lambda n: (n,), avant=page.prev_cursor, per_page=4)
+    assert page.items == [96, 95, 94, 93] and page.has_prev and page.has_next
+    page = keyset_paginate_list(lignes(), lambda n: (n,), avant=page.prev_cursor, per_page=4)
+    assert page.items == [100, 99, 98, 97] and not page.has_prev
+
+    page = keyset_paginate_list(range(3, 0, -1), lambda n: (n,), per_page=4)
+    assert page.items == [3, 2, 1] and not page.has_next
+
+
+def test_explain_rend_les_listes_in_pour_postgresql(app):
+    from sqlalchemy.dialects import postgresql
+    from app.models import SecurityLog
+    from app.pagination import _explain
+
+    requete = db.select(SecurityLog).where(SecurityLog.username.in_(['admin', 'clerc']))
+    sql, params = _explain(requete.order_by(SecurityLog.id), postgresql.psycopg2.dialect())
+    assert sql.startswith('EXPLAIN (FORMAT JSON) SELECT')
+    assert 'POSTCOMPILE' not in sql and 'ORDER BY' not in sql
+    assert sorted(v for k, v in params.items() if k.startswith('username')) == ['admin', 'clerc']
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.models import ParametreVersion
+from app.actes.calculators.vente import VenteCalculator
+from app.actes.services.parametres import ParametreService, ParametresSnapshot
+
+
+def _version_en_base():
+    return db.session.scalar(db.select(ParametreVersion.version).where(ParametreVersion.id == 1))
+
+
+def test_set_many_bumps_version_once(app):
+    with app.app_context():
+        avant = _version_en_base() or 0
+        assert ParametreService.set_many({'taux_tva': '0.2', 'taux_cf_proportionnel': '0.02'}) == 2
+        assert _version_en_base() == avant + 1
+        assert ParametreService.get('taux_tva') == Decimal('0.2')
+        assert ParametreService.get('taux_cf_proportionnel') == Decimal('0.02')
+        ParametreService.invalidate_cache()
+
+
+def test_change_from_another_worker_is_picked_up(app, monkeypatch):
+    with app.app_context():
+        ParametreService.set('taux_tva', '0.18')
+        assert ParametreService.get('taux_tva') == Decimal('0.18')
+        version = ParametreService.version()
+
+        # Un autre worker modifie la valeur : écriture directe + incrément du compteur
+        with db.engine.begin() as conn:
+            conn.execute(db.text("UPDATE parametres_etude SET valeur = '0.2' WHERE cle = 'taux_tva'"))
+            conn.execute(db.text("UPDATE parametres_version SET version = version + 1 WHERE id = 1"))
+
+        # Dans l'intervalle de vérification, le cache local est encore utilisé
+        assert ParametreService.get('taux_tva') == Decimal('0.18')
+
+        monkeypatch.setattr(ParametreService, 'VERSION_CHECK_INTERVAL', 0.0)
+        assert ParametreService.get('taux_tva') == Decimal('0.2')
+        assert ParametreService.version() != version
+        ParametreService.invalidate_cache()
+
+
+def test_snapshot_is_frozen_and_typed():
+    snap = ParametresSnapshot(version=1, tva_rate='0.2')
+    assert snap.tva_rate == Decimal('0.2')
+    assert snap.cf_fixe == Decimal('6500')   # valeur de repli
+    with pytest.raises(AttributeError):
+        snap.tva_rate = Decimal('0.1')
+    with pytest.raises(AttributeError):
+        snap.autre = 1
+    # Egalité par valeurs, indépendamment de la version
+    assert snap == ParametresSnapshot(version=2, tva_rate=Decimal('0.2'))
+    assert hash(snap) == hash(ParametresSnapshot(tva_rate='0.2'))
+    assert snap != ParametresSnapshot()
+
+
+def test_snapshot_is_rebuilt_only_when_version_changes(app):
+    with app.app_context():
+        premier = ParametreService.snapshot()
+        assert ParametreService.snapshot() is premier
+        ParametreService.set('frais_divers_base', '60000')
+        second = ParametreService.snapshot()
+        assert second is not premier
+        assert second.frais_divers == Decimal('60000')
+        ParametreService.invalidate_cache()
+
+
+def test_calculator_uses_snapshot_passed_explicitly(app):
+    with app.app_context():
+        courant = VenteCalculator.calculate(prix=15000000)
+        snap = ParametresSnapshot(tva_rate='0.2', frais_expeditions='60000')
+        res = VenteCalculator.calculate(prix=15000000, parametres=snap)
+        assert res['tva'] == res['honoraires_ht'] * 0.2
+        assert res['debours_details']['expeditions'] == 60000.0
+        assert courant['debours_details']['expeditions'] == 50000.0
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.comptabilite.plan_comptable import PlanComptable
+from app.comptabilite.service import ComptabiliteService
+from app.models import ComptaCompte, ParametreVersion
+
+
+def _compter_requetes():
+    requetes = []
+
+    def compter(conn, cursor, statement, parameters, context, executemany):
+        requetes.append(statement)
+
+    return requetes, compter
+
+
+def test_plan_charge_une_seule_fois(app):
+    ComptabiliteService.initialize_default_accounts()
+    PlanComptable.invalidate_cache()
+    requetes, compter = _compter_requetes()
+
+    event.listen(db.engine, 'before_cursor_execute', compter)
+    try:
+        caisse = PlanComptable.id_compte_requis(ComptabiliteService.COMPTE_CAISSE_CLIENT)
+        PlanComptable.id_compte_requis('467')
+        PlanComptable.id_compte('706')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', compter)
+
+    assert len([r for r in requetes if 'compta_comptes' in r]) == 1
+    assert caisse == db.session.execute(
+        db.select(ComptaCompte.id).filter_by(numero_compte=ComptabiliteService.COMPTE_CAISSE_CLIENT)
+    ).scalar_one()
+
+
+def test_creation_et_desactivation_invalident(app):
+    ComptabiliteService.initialize_default_accounts()
+    version = db.session.get(ParametreVersion, PlanComptable.VERSION_ID).version
+    assert PlanComptable.id_compte('4711') is None
+
+    compte = ComptabiliteService.create_compte('4711', 'Attente - Virements', 'GENERAL', 'OFFICE')
+    assert PlanComptable.id_compte('4711') == compte.id
+
+    compte.actif = False
+    db.session.commit()
+    assert PlanComptable.id_compte('4711') is None
+    db.session.expire_all()
+    assert db.session.get(ParametreVersion, PlanComptable.VERSION_ID).version == version + 2
+
+
+def test_rollback_ne_change_rien(app):
+    ComptabiliteService.initialize_default_accounts()
+    PlanComptable.ids()
+    db.session.add(ComptaCompte(numero_compte='4712', libelle='Brouillon', type_compte='GENERAL', actif=True))
+    db.session.flush()
+    db.session.rollback()
+
+    assert PlanComptable.id_compte('4712') is None
+    assert not db.session.info.get('plan_comptable_modifie')
+
+
+def test_compte_manquant(app):
+    with pytest.raises(ValueError):
+        ComptabiliteService.create_recu(date(2026, 1, 5), 50000, 'ESPECES', 'Provision')
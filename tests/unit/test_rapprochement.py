@@ -0,0 +1,80 @@
+from datetime import date
+from io import StringIO
+
+from app import db
+from app.comptabilite import rapprochement
+from app.comptabilite.rapprochement import apparier
+from app.comptabilite.service import ComptabiliteService
+from app.models import ComptaCompte, ComptaMouvement, LigneReleve, Rapprochement
+
+
+def _element(id_, jour, montant, *references):
+    return (id_, jour.toordinal(), montant, frozenset(references))
+
+
+def test_apparier_par_reference_puis_montant_et_date():
+    lignes = [
+        _element(1, date(2026, 1, 20), 50000, 'CHQ7781234'),
+        _element(2, date(2026, 1, 6), 12000),
+        _element(3, date(2026, 1, 6), -2500),
+    ]
+    mouvements = [
+        # Même montant que la ligne 1 mais sans référence, à la bonne date
+        _element(10, date(2026, 1, 20), 50000),
+        _element(11, date(2026, 1, 5), 50000, 'CHQ7781234'),
+        _element(12, date(2026, 1, 8), 12000),
+        # Hors fenêtre de 3 jours
+        _element(13, date(2026, 1, 1), -2500),
+    ]
+    assert apparier(lignes, mouvements) == [('REFERENCE', [1], [11]), ('MONTANT_DATE', [2], [12])]
+
+
+def test_apparier_groupes():
+    lignes = [
+        # Remise de deux chèques
+        _element(1, date(2026, 2, 3), 30000),
+        # Prélèvement réglé en deux fois par la banque
+        _element(2, date(2026, 2, 10), -4000),
+        _element(3, date(2026, 2, 10), -6000),
+    ]
+    mouvements = [
+        _element(10, date(2026, 2, 2), 10000),
+        _element(11, date(2026, 2, 2), 20000),
+        _element(12, date(2026, 2, 9), -10000),
+    ]
+    assert apparier(lignes, mouvements) == [('GROUPE', [1], [10, 11]), ('GROUPE', [2, 3], [12])]
+
+
+def test_import_et_rapprochement(app):
+    ComptabiliteService.initialize_default_accounts()
+    banque = rapprochement.compte_banque('512-CLIENT')
+    ComptabiliteService.create_recu(date(2026, 1, 5), 75000, 'CHEQUE', 'Provision', reference_paiement='7781234')
+    client = db.session.execute(db.select(ComptaCompte).filter_by(numero_compte='467')).scalar_one()
+    virement = ComptabiliteService.create_ecriture(date(2026, 1, 12), 'Virement client', 'BQ', [
+        {'compte_id': banque.id, 'debit': 20000, 'credit': 0},
+        {'compte_id': client.id, 'debit': 0, 'credit': 20000},
+    ])
+    ComptabiliteService.valider_ecriture(virement.id)
+
+    releve = ('Date;Libellé;Référence;Débit;Crédit\n'
+              '09/01/2026;REMISE CHQ 7781234;;;75 000\n'
+              '13/01/2026;VIR RECU;;;20000\n'
+              '14/01/2026;FRAIS TENUE COMPTE;;1500;\n'
+              'xx;Ligne illisible;;;10\n')
+    rapport = rapprochement.importer_releve(StringIO(releve), banque.id)
+    assert (rapport['importees'], rapport['erreurs']) == (3, [{'ligne': 5, 'message': 'Date invalide'}])
+    assert rapprochement.importer_releve(StringIO(releve), banque.id)['doublons'] == 3
+
+    rapport = rapprochement.rapprocher(banque.id)
+    assert rapport == {'lignes': 3, 'rapprochees': 2, 'mouvements': 2,
+                       'par_methode': {'REFERENCE': 1, 'MONTANT_DATE': 1}}
+    assert db.session.execute(db.select(db.func.count(Rapprochement.id))).scalar() == 2
+    restantes = db.session.execute(db.select(LigneReleve).filter_by(rapprochement_id=None)).scalars().all()
+    assert [ligne.libelle for ligne in restantes] == ['FRAIS TENUE COMPTE']
+    rapproches = db.session.execute(
+        db.select(ComptaMouvement).where(ComptaMouvement.rapprochement_id.is_not(None))
+    ).scalars().all()
+    assert sorted(m.debit for m in rapproches) == [20000, 75000]
+
+    # Déjà rapprochés : rien de nouveau
+    assert rapprochement.rapprocher(banque.id)['rapprochees'] == 0
@@ -0,0 +1,58 @@
+from app.actes.calculators.result_cache import ResultCache
+from app.actes.calculators.dynamic_engine import DynamicCalculatorEngine
+from app.actes.calculators.registry import LEGACY_RESULT_CACHE, calculer
+from app.actes.services.parametres import ParametreService
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(maxsize=2)
+    appels = []
+
+    def calcul(v):
+        appels.append(v)
+        return v * 2
+
+    assert cache.get_or_compute('a', lambda: calcul(1)) == 2
+    assert cache.get_or_compute('b', lambda: calcul(2)) == 4
+    assert cache.get_or_compute('a', lambda: calcul(1)) == 2   # hit, 'a' redevient le plus récent
+    assert cache.get_or_compute('c', lambda: calcul(3)) == 6   # évince 'b'
+    assert cache.get_or_compute('b', lambda: calcul(2)) == 4
+    assert appels == [1, 2, 3, 2]
+    assert cache.stats() == {'entrees': 2, 'capacite': 2, 'hits': 1, 'misses': 4, 'evictions': 2, 'taux_succes': 0.2}
+
+    # Clé non hachable : calcul direct, rien n'est mémorisé
+    assert cache.get_or_compute(('x', [1]), lambda: calcul(5)) == 10
+    assert cache.stats()['entrees'] == 2
+
+
+def test_dynamic_results_are_memoized(bareme_vente):
+    inputs = {'prix_vente': 15000000, 'taux_enreg': 5, 'morcellement': True}
+    avant = DynamicCalculatorEngine.cache_stats()
+    premier = DynamicCalculatorEngine.calculate('VENTE', inputs)
+    # Saisie équivalente après conversion : même clé
+    second = DynamicCalculatorEngine.calculate('VENTE', {'PRIX_VENTE': '15000000', 'taux_enreg': 5.0, 'morcellement': 'on'})
+    assert second is premier
+    stats = DynamicCalculatorEngine.cache_stats()
+    assert stats['hits'] == avant['hits'] + 1
+    assert stats['misses'] == avant['misses'] + 1
+
+    # Un changement de paramètre de l'étude change la clé
+    ParametreService.set('taux_tva', '0.2')
+    troisieme = DynamicCalculatorEngine.calculate('VENTE', inputs)
+    assert troisieme is not premier
+    assert next(l['montant'] for l in troisieme['lignes'] if l['code'] == 'TVA') == 135000.0
+    ParametreService.invalidate_cache()
+
+
+def test_legacy_results_are_memoized(app):
+    params = {'capital': 10000000.0}
+    avant = LEGACY_RESULT_CACHE.stats()['hits']
+    assert calculer('sarl', params) is calculer('sarl', dict(params))
+    assert LEGACY_RESULT_CACHE.stats()['hits'] == avant + 1
+
+
+def test_cache_stats_route(client, auth, app):
+    auth.login()
+    data = client.get('/actes/admin/baremes/cache').get_json()
+    assert set(data) == {'dynamique', 'calculateurs'}
+    assert 'taux_succes' in data['dynamique']
@@ -0,0 +1,92 @@
+from datetime import date, datetime
+from pathlib import Path
+
+from app import db, security_logs
+from app.models import SecurityLog
+
+
+def _log(horodatage, event_type='LOGIN_SUCCESS', username='admin'):
+    return SecurityLog(timestamp=horodatage, event_type=event_type, username=username, ip_address='127.0.0.1',
+                       details='test', changes={'nom': ['A', 'B']} if event_type == 'UPDATE' else None)
+
+
+def test_archivage_puis_recherche(app, tmp_path):
+    db.session.add_all([
+        _log(datetime(2025, 1, 10, 8, 0)),
+        _log(datetime(2025, 1, 20, 9, 30), 'UPDATE', 'Notaire1'),
+        _log(datetime(2025, 3, 5, 12, 0), 'LOGIN_FAILED', 'notaire2'),
+        _log(datetime(2025, 4, 1, 0, 0)),
+    ])
+    db.session.commit()
+
+    resultats = security_logs.archive_logs(str(tmp_path), date(2025, 4, 1))
+    assert [(mois, nombre) for mois, nombre, _ in resultats] == [(date(2025, 1, 1), 2), (date(2025, 3, 1), 1)]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'security_logs_2025-01.jsonl.gz', 'security_logs_2025-03.jsonl.gz']
+    # Seul avril reste en base
+    assert db.session.scalars(db.select(SecurityLog.timestamp)).all() == [datetime(2025, 4, 1, 0, 0)]
+
+    tous = security_logs.search_archives(str(tmp_path))
+    assert [log.username for log in tous] == ['notaire2', 'Notaire1', 'admin']
+    assert tous[1].changes == {'nom': ['A', 'B']}
+    assert tous[1].timestamp.strftime('%d/%m/%Y %H:%M') == '20/01/2025 09:30'
+
+    assert [log.username for log in security_logs.search_archives(str(tmp_path), username='NOTAIRE')] == [
+        'notaire2', 'Notaire1']
+    assert [log.event_type for log in security_logs.search_archives(
+        str(tmp_path), date_start=datetime(2025, 1, 15), date_end=datetime(2025, 2, 28, 23, 59, 59))] == ['UPDATE']
+
+    # Ligne de janvier écrite après celle d'avril : gardée tant qu'avril est en base
+    db.session.add(_log(datetime(2025, 1, 25)))
+    db.session.commit()
+    assert security_logs.archive_logs(str(tmp_path), date(2025, 4, 1)) == []
+    assert len(db.session.scalars(db.select(SecurityLog)).all()) == 2
+
+    # Une seconde exécution n'écrase pas les fichiers existants
+    resultats = security_logs.archive_logs(str(tmp_path), date(2025, 5, 1))
+    assert [(mois, nombre) for mois, nombre, _ in resultats] == [(date(2025, 4, 1), 1), (date(2025, 1, 1), 1)]
+    assert (tmp_path / 'security_logs_2025-01.2.jsonl.gz').exists()
+    assert len(security_logs.search_archives(str(tmp_path), event_type='LOGIN_SUCCESS')) == 3
+
+
+def test_archives_lues_du_plus_recent_au_plus_ancien(app, tmp_path, monkeypatch):
+    db.session.add_all([_log(datetime(2025, 1, 10)), _log(datetime(2025, 2, 10)), _log(datetime(2025, 3, 10))])
+    db.session.commit()
+    security_logs.archive_logs(str(tmp_path), date(2025, 4, 1))
+
+    ouverts = []
+    gzip_open = security_logs.gzip.open
+    monkeypatch.setattr(security_logs.gzip, 'open', lambda chemin, *args, **kwargs: (
+        ouverts.append(Path(chemin).name), gzip_open(chemin, *args, **kwargs))[1])
+    lignes = security_logs.iter_archives(str(tmp_path))
+    assert next(lignes).timestamp.month == 3
+    assert ouverts == ['security_logs_2025-03.jsonl.gz']
+
+
+def test_types_et_utilisateurs_distincts(app):
+    db.session.add_all([_log(datetime(2025, 5, 1)), _log(datetime(2025, 5, 2), 'UPDATE', 'Notaire1'),
+                        _log(datetime(2025, 5, 3), 'UPDATE', 'clerc')])
+    db.session.commit()
+
+    assert security_logs.event_types() == ['LOGIN_SUCCESS', 'UPDATE']
+    db.session.add(_log(datetime(2025, 5, 4), 'DELETE'))
+    db.session.commit()
+    # Liste en cache jusqu'à expiration ou invalidation
+    assert security_logs.event_types() == ['LOGIN_SUCCESS', 'UPDATE']
+    security_logs.invalidate_event_types()
+    assert security_logs.event_types() == ['DELETE', 'LOGIN_SUCCESS', 'UPDATE']
+
+    assert security_logs.matching_usernames('NOT') == ['Notaire1']
+
+
+def test_page_des_logs_base_et_archives(app, client, auth, tmp_path):
+    app.config['AUDIT_ARCHIVE_DIR'] = str(tmp_path)
+    db.session.add_all([_log(datetime(2024, 6, 1), 'UPDATE', 'ancien'), _log(datetime.utcnow(), 'UPDATE', 'recent')])
+    db.session.commit()
+    security_logs.archive_logs(str(tmp_path), date(2024, 7, 1))
+    auth.login()
+
+    page = client.get('/users/security-logs?username=REC').get_data(as_text=True)
+    assert 'recent' in page and 'ancien' not in page
+    page = client.get('/users/security-logs?source=archives&username=anc').get_data(as_text=True)
+    assert 'ancien' in page and 'recent' not in page
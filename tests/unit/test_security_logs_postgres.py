@@ -0,0 +1,136 @@
+"""
+Migration c3e7b5a9d214 (partitionnement de security_logs) et `flask
+rollover-logs` sur un vrai PostgreSQL.
+
+Ignoré sans POSTGRES_TEST_URL (base vide jetable, par exemple
+postgresql+psycopg2://postgres@localhost/agen_test) : la job CI
+.github/workflows/postgres.yml la fournit.
+"""
+
+import importlib.util
+import os
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app import create_app, security_logs
+from app.config import Config
+
+POSTGRES_TEST_URL = os.environ.get('POSTGRES_TEST_URL')
+
+pytestmark = pytest.mark.skipif(not POSTGRES_TEST_URL, reason='POSTGRES_TEST_URL non définie')
+
+MIGRATION = Path(__file__).resolve().parents[2] / 'migrations' / 'versions' / 'c3e7b5a9d214_partitionnement_security_logs.py'
+
+
+class PostgresConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = POSTGRES_TEST_URL
+
+
+def _migration():
+    spec = importlib.util.spec_from_file_location('partitionnement_security_logs', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _executer(engine, etape):
+    with engine.begin() as conn:
+        with Operations.context(MigrationContext.configure(conn)):
+            etape()
+
+
+def _table_avant_migration(metadata):
+    """security_logs telle que la laisse la révision b94e1d7a3c58."""
+    return sa.Table(
+        'security_logs', metadata,
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('timestamp', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('username', sa.String(length=50), nullable=False),
+        sa.Column('ip_address', sa.String(length=45)),
+        sa.Column('user_agent', sa.String(length=255)),
+        sa.Column('details', sa.Text()),
+        sa.Column('target_resource', sa.String(length=100)),
+        sa.Column('target_id', sa.String(length=50)),
+        sa.Column('changes', sa.JSON()),
+    )
+
+
+def _emplacements(conn):
+    """{id: partition qui contient la ligne}"""
+    return dict(conn.execute(sa.text('SELECT id, tableoid::regclass::text FROM security_logs')).all())
+
+
+def _partitions(conn):
+    return set(conn.execute(sa.text(
+        "SELECT relname FROM pg_class WHERE relname LIKE 'security_logs_p%' AND relkind = 'r'")).scalars())
+
+
+@pytest.fixture
+def engine():
+    engine = sa.create_engine(POSTGRES_TEST_URL)
+    with engine.begin() as conn:
+        conn.execute(sa.text('DROP TABLE IF EXISTS security_logs CASCADE'))
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(sa.text('DROP TABLE IF EXISTS security_logs CASCADE'))
+    engine.dispose()
+
+
+def test_partitionnement_rollover_et_retour(engine):
+    migration = _migration()
+    table = _table_avant_migration(sa.MetaData())
+    mois_courant = security_logs.month_start(date.today())
+    lointain = security_logs.add_months(mois_courant, 8)
+    with engine.begin() as conn:
+        table.create(conn)
+        conn.execute(table.insert(), [
+            {'timestamp': datetime(2025, 3, 10, 10, 0, tzinfo=timezone.utc), 'event_type': 'LOGIN', 'username': 'a'},
+            {'timestamp': datetime.now(timezone.utc), 'event_type': 'LOGIN', 'username': 'b'},
+            {'timestamp': datetime(lointain.year, lointain.month, 1, tzinfo=timezone.utc),
+             'event_type': 'LOGIN', 'username': 'c'},
+        ])
+
+    _executer(engine, migration.upgrade)
+    with engine.begin() as conn:
+        assert security_logs.is_partitioned(conn)
+        # Du mois de la plus ancienne ligne jusqu'à deux mois après le mois courant
+        assert {'security_logs_p202503', security_logs.partition_name(mois_courant),
+                security_logs.partition_name(security_logs.add_months(mois_courant, 2))} <= _partitions(conn)
+        assert security_logs.partition_name(security_logs.add_months(mois_courant, 3)) not in _partitions(conn)
+        assert _emplacements(conn) == {1: 'security_logs_p202503', 2: security_logs.partition_name(mois_courant),
+                                       3: 'security_logs_default'}
+        index = set(conn.execute(sa.text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = :t"), {'t': security_logs.partition_name(mois_courant)}
+        ).scalars())
+        assert len(index) == 4  # clé primaire (id, "timestamp") + les trois index de la migration
+        # La séquence reste celle de la table d'origine
+        assert conn.execute(table.insert().values(timestamp=datetime.now(timezone.utc), event_type='LOGIN',
+                                                  username='d').returning(table.c.id)).scalar() == 4
+
+    app = create_app(PostgresConfig)
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['rollover-logs'])
+    assert result.exit_code == 0, result.output
+    assert '0 partition(s)' in result.output
+    result = runner.invoke(args=['rollover-logs', '--mois-avance', '8'])
+    assert result.exit_code == 0, result.output
+    assert security_logs.partition_name(lointain) in result.output
+    with engine.begin() as conn:
+        # La ligne du mois lointain quitte la partition par défaut
+        assert _emplacements(conn)[3] == security_logs.partition_name(lointain)
+
+    _executer(engine, migration.downgrade)
+    with engine.begin() as conn:
+        assert not security_logs.is_partitioned(conn)
+        assert _partitions(conn) == set()
+        assert sorted(_emplacements(conn)) == [1, 2, 3, 4]
+        assert set(_emplacements(conn).values()) == {'security_logs'}
+        assert conn.execute(table.insert().values(timestamp=datetime.now(timezone.utc), event_type='LOGIN',
+                                                  username='e').returning(table.c.id)).scalar() == 5
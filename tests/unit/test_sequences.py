@@ -0,0 +1,49 @@
+import pytest
+
+from app import db
+from app.models import SequenceNumerotation
+from app.sequences import SequenceService
+
+
+def test_allocation_par_serie_et_par_annee(app):
+    assert SequenceService.suivant('REC', 2026) == 1
+    assert SequenceService.suivant('REC', 2026) == 2
+    assert SequenceService.suivant('REC', 2027) == 1
+    assert SequenceService.suivant('FACT', 2026) == 1
+    assert list(SequenceService.allouer('REPERTOIRE', 2026, 3)) == [1, 2, 3]
+    assert list(SequenceService.allouer('REPERTOIRE', 2026, 2)) == [4, 5]
+    db.session.commit()
+
+    ligne = db.session.execute(db.select(SequenceNumerotation).filter_by(code='REC', annee=2026)).scalar_one()
+    assert ligne.dernier == 2
+    with pytest.raises(ValueError):
+        SequenceService.allouer('REC', 2026, 0)
+
+
+def test_rollback_rend_le_numero(app):
+    assert SequenceService.suivant('REC', 2026) == 1
+    db.session.commit()
+    assert SequenceService.suivant('REC', 2026) == 2
+    db.session.rollback()
+    assert SequenceService.suivant('REC', 2026) == 2
+
+
+def test_numero_document():
+    assert SequenceService.formater('REC', 42, 2026) == 'REC-2026-000042'
+    assert SequenceService.formater('REP', 7, chiffres=4) == 'REP-0007'
+
+
+def test_reservation_par_blocs(app, tmp_path):
+    app.config['SEQUENCE_BLOCS'] = {'REC': 10}
+    SequenceService.reinitialiser_blocs()
+    try:
+        numeros = [SequenceService.suivant('REC', 2026) for _ in range(12)]
+        assert numeros == list(range(1, 13))
+        # Deux blocs réservés en base, le second entamé
+        dernier = db.session.execute(
+            db.select(SequenceNumerotation.dernier).filter_by(code='REC', annee=2026)
+        ).scalar_one()
+        assert dernier == 20
+    finally:
+        app.config['SEQUENCE_BLOCS'] = {}
+        SequenceService.reinitialiser_blocs()
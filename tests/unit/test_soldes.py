@@ -0,0 +1,130 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import db
+from app.comptabilite.service import ComptabiliteService
+from app.models import ComptaCompte, ComptaSolde
+
+
+@pytest.fixture
+def comptes(app):
+    banque = ComptaCompte(numero_compte='512-OFFICE', libelle='Banque', type_compte='GENERAL', categorie='OFFICE')
+    honoraires = ComptaCompte(numero_compte='706', libelle='Honoraires', type_compte='GENERAL', categorie='OFFICE')
+    db.session.add_all([banque, honoraires])
+    db.session.commit()
+    return banque, honoraires
+
+
+def _ecriture(banque, honoraires, montant, jour=date(2026, 3, 15)):
+    return ComptabiliteService.create_ecriture(
+        date_ecriture=jour, libelle='Honoraires', journal_code='BQ',
+        mouvements=[
+            {'compte_id': banque.id, 'debit': montant, 'credit': 0},
+            {'compte_id': honoraires.id, 'debit': 0, 'credit': montant},
+        ]
+    )
+
+
+def test_validation_met_a_jour_les_soldes(comptes):
+    banque, honoraires = comptes
+    e1 = _ecriture(banque, honoraires, 100000)
+    assert ComptabiliteService.get_balance(banque.id) == 0
+
+    ComptabiliteService.valider_ecriture(e1.id)
+    ComptabiliteService.valider_ecriture(_ecriture(banque, honoraires, 50000, date(2026, 4, 2)).id)
+
+    assert banque.get_solde() == Decimal('150000')
+    assert ComptabiliteService.get_balance(honoraires.id) == Decimal('-150000')
+    assert ComptabiliteService.get_soldes_comptes() == [(banque, Decimal('150000')), (honoraires, Decimal('-150000'))]
+    # Période en mois entiers : lue dans les soldes mensuels ; sinon agrégée en SQL
+    assert ComptabiliteService.get_balance(banque.id, date(2026, 3, 1), date(2026, 3, 31)) == Decimal('100000')
+    assert ComptabiliteService.get_balance(banque.id, date_fin=date(2026, 4, 2)) == Decimal('150000')
+    assert ComptabiliteService.get_balance(banque.id, date(2026, 3, 16)) == Decimal('50000')
+
+
+def test_double_validation_compte_une_seule_fois(comptes):
+    banque, honoraires = comptes
+    ecriture = _ecriture(banque, honoraires, 100000)
+    ComptabiliteService.valider_ecriture(ecriture.id)
+    ComptabiliteService.valider_ecriture(ecriture.id)
+
+    total = db.session.execute(
+        db.select(ComptaSolde).filter_by(compte_id=banque.id, periode=ComptaSolde.PERIODE_TOTAL)
+    ).scalar_one()
+    assert total.total_debit == Decimal('100000')
+    assert total.nb_mouvements == 1
+
+
+def test_contrepassation_annule_le_solde(comptes):
+    banque, honoraires = comptes
+    ecriture = _ecriture(banque, honoraires, 100000)
+    ComptabiliteService.valider_ecriture(ecriture.id)
+
+    inverse = ComptabiliteService.contrepasser_ecriture(ecriture.id, date_ecriture=date(2026, 3, 20))
+
+    assert inverse.valide
+    assert ComptabiliteService.get_balance(banque.id) == 0
+    assert ComptabiliteService.get_balance(honoraires.id) == 0
+    assert ComptabiliteService.verifier_soldes() == []
+
+
+def test_rebuild_soldes_corrige_les_ecarts(app, comptes, runner):
+    banque, honoraires = comptes
+    ComptabiliteService.valider_ecriture(_ecriture(banque, honoraires, 100000).id)
+    db.session.execute(db.update(ComptaSolde).values(total_debit=0))
+    db.session.commit()
+
+    assert len(ComptabiliteService.verifier_soldes()) == 2
+    result = runner.invoke(args=['rebuild-soldes', '--verifier-seulement'])
+    assert result.exit_code == 1
+
+    result = runner.invoke(args=['rebuild-soldes'])
+    assert result.exit_code == 0, result.output
+    assert '0 écart(s) après reconstruction' in result.output
+    assert ComptabiliteService.verifier_soldes() == []
+    assert ComptabiliteService.get_balance(banque.id) == Decimal('100000')
+
+
+def test_grand_livre_report_et_solde_cumule(comptes):
+    banque, honoraires = comptes
+    ComptabiliteService.valider_ecriture(_ecriture(banque, honoraires, 100000, date(2026, 2, 10)).id)
+    ComptabiliteService.valider_ecriture(_ecriture(banque, honoraires, 30000, date(2026, 3, 5)).id)
+    ComptabiliteService.valider_ecriture(_ecriture(banque, honoraires, 20000, date(2026, 3, 20)).id)
+    _ecriture(banque, honoraires, 999999, date(2026, 3, 10))  # non validée : ignorée
+
+    livre = ComptabiliteService.get_grand_livre(date_debut=date(2026, 3, 1), date_fin=date(2026, 3, 31))
+
+    assert [c['compte'].numero_compte for c in livre] == ['512-OFFICE', '706']
+    banque_data = livre[0]
+    assert banque_data['solde_initial'] == Decimal('100000')
+    assert [e['solde_cumule'] for e in banque_data['ecritures']] == [Decimal('130000'), Decimal('150000')]
+    assert banque_data['total_debit'] == Decimal('50000')
+    assert banque_data['total_credit'] == 0
+    assert banque_data['solde_final'] == Decimal('150000')
+    assert livre[1]['solde_final'] == Decimal('-150000')
+
+    # Compte avec seulement un report à nouveau
+    livre = ComptabiliteService.get_grand_livre(compte_id=banque.id, date_debut=date(2026, 4, 1))
+    assert len(livre) == 1
+    assert livre[0]['ecritures'] == []
+    assert livre[0]['solde_initial'] == livre[0]['solde_final'] == Decimal('150000')
+
+
+def test_balance_generale_agregee(comptes):
+    banque, honoraires = comptes
+    inactif = ComptaCompte(numero_compte='471', libelle='Attente', type_compte='GENERAL', actif=False)
+    vide = ComptaCompte(numero_compte='531', libelle='Caisse', type_compte='GENERAL')
+    db.session.add_all([inactif, vide])
+    db.session.commit()
+    ComptabiliteService.valider_ecriture(_ecriture(banque, honoraires, 100000, date(2026, 2, 10)).id)
+    ComptabiliteService.valider_ecriture(_ecriture(banque, honoraires, 30000, date(2026, 3, 5)).id)
+
+    assert ComptabiliteService.get_soldes_comptes(date_fin=date(2026, 2, 28)) == [
+        (banque, Decimal('100000')), (vide, 0), (honoraires, Decimal('-100000'))
+    ]
+    balance = ComptabiliteService.get_balance_generale(date_fin=date(2026, 3, 31))
+    assert [(b['numero_compte'], b['debit'], b['credit']) for b in balance] == [
+        ('512-OFFICE', Decimal('130000'), 0), ('706', 0, Decimal('130000'))
+    ]
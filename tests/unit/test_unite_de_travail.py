@@ -0,0 +1,55 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.comptabilite.service import ComptabiliteService
+from app.models import ComptaCompte, ComptaEcriture, Recu, SequenceNumerotation
+
+
+def test_recu_en_un_seul_commit(app):
+    ComptabiliteService.initialize_default_accounts()
+    commits = []
+
+    def compter(session):
+        commits.append(session)
+
+    event.listen(db.session, 'after_commit', compter)
+    try:
+        recu = ComptabiliteService.create_recu(date(2026, 1, 5), 50000, 'ESPECES', 'Provision')
+    finally:
+        event.remove(db.session, 'after_commit', compter)
+
+    assert len(commits) == 1
+    assert recu.numero_recu == 'REC-2026-000001'
+    assert recu.ecriture.valide
+    assert len(recu.ecriture.mouvements) == 2
+    caisse = db.session.execute(
+        db.select(ComptaCompte).filter_by(numero_compte=ComptabiliteService.COMPTE_CAISSE_CLIENT)
+    ).scalar_one()
+    assert caisse.get_solde() == Decimal('50000')
+    assert ComptabiliteService.verifier_soldes() == []
+
+
+def test_echec_ne_laisse_rien(app):
+    # Plan comptable absent : le reçu échoue après l'allocation de son numéro
+    with pytest.raises(Exception):
+        ComptabiliteService.create_recu(date(2026, 1, 5), 50000, 'ESPECES', 'Provision')
+
+    assert db.session.execute(db.select(db.func.count(ComptaEcriture.id))).scalar() == 0
+    assert db.session.execute(db.select(db.func.count(Recu.id))).scalar() == 0
+    assert db.session.execute(db.select(SequenceNumerotation)).first() is None
+
+
+def test_ecriture_desequilibree_non_preparee(app):
+    ComptabiliteService.initialize_default_accounts()
+    compte = db.session.execute(db.select(ComptaCompte)).scalars().first()
+    with pytest.raises(ValueError):
+        with ComptabiliteService.unite_de_travail():
+            ComptabiliteService.preparer_ecriture(
+                date(2026, 1, 5), 'Erreur', 'OD',
+                [{'compte_id': compte.id, 'debit': 100, 'credit': 0}], valider=True
+            )
+    assert db.session.execute(db.select(db.func.count(ComptaEcriture.id))).scalar() == 0